@@ -6,7 +6,9 @@
 
 import asyncio
 import time
-import threading
+import re
+import heapq
+import itertools
 from collections import deque
 from typing import Dict, Optional, Any, List
 import aiohttp
@@ -17,13 +19,157 @@
 from urllib.parse import urlencode, unquote
 import logging
 
+from core.utils.price_cache import price_cache
+from core.utils.instrumentation import metrics_registry
+
 logger = logging.getLogger(__name__)
 
+class SlidingWindowLimiter:
+    """슬라이딩 윈도우 비동기 레이트 리미터
+    
+    다음 슬롯이 열리는 정확한 시각을 윈도우에서 계산하여 그 시각에 한 번만 깨어나고,
+    대기자는 우선순위(값이 작을수록 먼저) → 도착 순서로 슬롯을 받는다.
+    슬롯은 승인 시점에 기록되므로 별도 기록 호출이 필요 없다.
+    """
+    
+    def __init__(self, name: str, per_second: int, per_minute: Optional[int] = None):
+        self.name = name
+        self.per_second = per_second
+        self.per_minute = per_minute
+        
+        # 승인 시각 (monotonic) - 초/분 윈도우
+        self._second: deque = deque()
+        self._minute: deque = deque()
+        
+        self._waiters: List[tuple] = []  # (priority, seq, future) 힙
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._blocked_until = 0.0  # 429 응답 등으로 강제 차단된 시각
+        
+        self.stats = {
+            "granted": 0,
+            "waited": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+            "header_corrections": 0,
+            "penalties": 0
+        }
+    
+    def _prune(self, now: float):
+        while self._second and now - self._second[0] >= 1.0:
+            self._second.popleft()
+        while self._minute and now - self._minute[0] >= 60.0:
+            self._minute.popleft()
+    
+    def _record(self, now: float, count: int = 1):
+        for _ in range(count):
+            self._second.append(now)
+            if self.per_minute:
+                self._minute.append(now)
+    
+    def next_slot_time(self, now: Optional[float] = None) -> float:
+        """다음 슬롯이 열리는 시각 (monotonic) - 지금 가능하면 now"""
+        now = time.monotonic() if now is None else now
+        self._prune(now)
+        
+        slot_time = max(now, self._blocked_until)
+        if len(self._second) >= self.per_second:
+            slot_time = max(slot_time, self._second[-self.per_second] + 1.0)
+        if self.per_minute and len(self._minute) >= self.per_minute:
+            slot_time = max(slot_time, self._minute[-self.per_minute] + 60.0)
+        return slot_time
+    
+    def try_acquire(self) -> bool:
+        """즉시 슬롯 확보 시도 (대기자가 있으면 순서를 지키기 위해 실패)"""
+        now = time.monotonic()
+        if self._waiters or self.next_slot_time(now) > now:
+            return False
+        self._record(now)
+        self.stats["granted"] += 1
+        return True
+    
+    async def acquire(self, priority: int = 3) -> float:
+        """슬롯이 열릴 때까지 대기 후 확보 - 대기한 시간(초) 반환"""
+        if self.try_acquire():
+            return 0.0
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        started_at = time.monotonic()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._schedule(loop)
+        
+        await future  # 취소되면 힙에 남은 항목은 디스패치 때 건너뜀
+        
+        waited = time.monotonic() - started_at
+        self.stats["waited"] += 1
+        self.stats["total_wait"] += waited
+        self.stats["max_wait"] = max(self.stats["max_wait"], waited)
+        return waited
+    
+    def _schedule(self, loop: asyncio.AbstractEventLoop):
+        """다음 슬롯 시각에 디스패치 예약 (타이머는 항상 1개)"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._waiters:
+            return
+        now = time.monotonic()
+        self._timer = loop.call_later(max(0.0, self.next_slot_time(now) - now), self._dispatch, loop)
+    
+    def _dispatch(self, loop: asyncio.AbstractEventLoop):
+        self._timer = None
+        now = time.monotonic()
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():  # 취소된 대기자
+                heapq.heappop(self._waiters)
+                continue
+            if self.next_slot_time(now) > now:
+                break
+            heapq.heappop(self._waiters)
+            self._record(now)
+            self.stats["granted"] += 1
+            future.set_result(None)
+        self._schedule(loop)
+    
+    def record(self, count: int = 1):
+        """슬롯 대기 없이 보낸 요청 기록"""
+        self._record(time.monotonic(), count)
+        self.stats["granted"] += count
+    
+    def sync_remaining(self, remaining_per_second: int):
+        """서버가 알려준 초당 잔여 횟수로 보정 - 서버 기준 사용량이 더 많으면 차이만큼 기록 추가"""
+        now = time.monotonic()
+        self._prune(now)
+        missing = (self.per_second - remaining_per_second) - len(self._second)
+        if missing > 0:
+            self._record(now, missing)
+            self.stats["header_corrections"] += 1
+    
+    def penalize(self, seconds: float):
+        """지정 시간 동안 슬롯 발급 중단 (429 응답 등)"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self.stats["penalties"] += 1
+    
+    def remaining(self) -> Dict:
+        now = time.monotonic()
+        self._prune(now)
+        return {
+            "per_second": max(0, self.per_second - len(self._second)),
+            "per_minute": max(0, self.per_minute - len(self._minute)) if self.per_minute else None,
+            "waiters": sum(1 for _, _, future in self._waiters if not future.done())
+        }
+
+
 class UpbitRateLimiter:
-    """업비트 API 레이트 리밋 관리자"""
+    """업비트 API 레이트 리밋 관리자 - 요청 그룹별 슬라이딩 윈도우 스케줄러"""
+    
+    # Remaining-Req 헤더 예: "group=market; min=573; sec=9"
+    REMAINING_REQ_PATTERN = re.compile(r"group=([\w-]+);\s*(?:min=(\d+);\s*)?sec=(\d+)")
     
     def __init__(self):
-        # REST API 제한: 분당 600회, 초당 10회
+        # 시세(REST) API 제한: 초당 10회, 분당 600회
         self.rest_per_second = 10
         self.rest_per_minute = 600
         
@@ -31,140 +177,91 @@ def __init__(self):
         self.order_per_second = 8  
         self.order_per_minute = 200
         
-        # 요청 기록 (타임스탬프 저장)
-        self.rest_requests = deque()
-        self.order_requests = deque()
-        
-        # 스레드 안전성을 위한 락
-        self.rest_lock = threading.Lock()
-        self.order_lock = threading.Lock()
-        
-        # 🏦 계정 단위 통합 요청 카운팅 (2024년 정책)
-        self.total_requests = deque()  # 모든 API 요청 통합 추적
-        self.total_lock = threading.Lock()
+        # 주문 외 거래소 API 제한 (계좌/주문 조회): 초당 30회, 분당 900회
+        self.exchange_per_second = 30
+        self.exchange_per_minute = 900
         
-        # 우선순위 큐 (긴급한 요청 우선 처리)
-        self.high_priority_queue = asyncio.Queue()
-        self.normal_priority_queue = asyncio.Queue()
-        
-    def _clean_old_requests(self, request_queue: deque, time_window: int):
-        """오래된 요청 기록 정리"""
-        current_time = time.time()
-        while request_queue and current_time - request_queue[0] > time_window:
-            request_queue.popleft()
+        # 업비트 요청 그룹별 버킷 (Remaining-Req 헤더의 group 이름과 동일)
+        self.groups: Dict[str, SlidingWindowLimiter] = {
+            "market": SlidingWindowLimiter("market", self.rest_per_second, self.rest_per_minute),
+            "order": SlidingWindowLimiter("order", self.order_per_second, self.order_per_minute),
+            "default": SlidingWindowLimiter("default", self.exchange_per_second, self.exchange_per_minute)
+        }
     
     async def can_make_rest_request(self) -> bool:
         """REST API 요청 가능 여부 확인"""
-        with self.rest_lock:
-            current_time = time.time()
-            
-            # 1분, 1초 윈도우 정리
-            self._clean_old_requests(self.rest_requests, 60)  # 1분
-            
-            # 초당 제한 확인
-            recent_requests = [req for req in self.rest_requests if current_time - req <= 1]
-            if len(recent_requests) >= self.rest_per_second:
-                return False
-            
-            # 분당 제한 확인
-            if len(self.rest_requests) >= self.rest_per_minute:
-                return False
-                
-            return True
+        limiter = self.groups["market"]
+        return not limiter.remaining()["waiters"] and limiter.next_slot_time() <= time.monotonic()
     
     async def can_make_order_request(self) -> bool:
         """주문 API 요청 가능 여부 확인"""
-        with self.order_lock:
-            current_time = time.time()
-            
-            # 1분, 1초 윈도우 정리
-            self._clean_old_requests(self.order_requests, 60)
-            
-            # 초당 제한 확인
-            recent_requests = [req for req in self.order_requests if current_time - req <= 1]
-            if len(recent_requests) >= self.order_per_second:
-                return False
-            
-            # 분당 제한 확인
-            if len(self.order_requests) >= self.order_per_minute:
-                return False
-                
-            return True
-    
-    
-    async def wait_for_rest_slot(self):
-        """REST API 슬롯이 사용 가능할 때까지 대기 - 429 에러 방지 강화"""
-        consecutive_waits = 0
-        while not await self.can_make_rest_request():
-            consecutive_waits += 1
-            # 🔧 백오프 전략: 연속 대기 시 점진적 증가
-            base_delay = 0.2 if consecutive_waits < 5 else 0.5  # 429 에러 방지
-            delay = base_delay * (1.2 ** min(consecutive_waits, 10))  # 최대 약 6초
-            await asyncio.sleep(delay)
-            
-            if consecutive_waits > 20:  # 극한 상황 방지
-                print(f"⚠️ REST API 레이트 리밋 대기 중... ({consecutive_waits}회)")
-    
-    async def wait_for_order_slot(self):
-        """주문 API 슬롯이 사용 가능할 때까지 대기 - 429 에러 방지 강화"""
-        consecutive_waits = 0
-        while not await self.can_make_order_request():
-            consecutive_waits += 1
-            # 🔧 주문 API는 더 보수적으로 처리
-            base_delay = 0.3 if consecutive_waits < 3 else 0.8
-            delay = base_delay * (1.5 ** min(consecutive_waits, 8))  # 최대 약 10초
-            await asyncio.sleep(delay)
-            
-            if consecutive_waits > 15:
-                print(f"⚠️ 주문 API 레이트 리밋 대기 중... ({consecutive_waits}회)")
+        limiter = self.groups["order"]
+        return not limiter.remaining()["waiters"] and limiter.next_slot_time() <= time.monotonic()
+    
+    async def wait_for_slot(self, group: str, priority: int = 3) -> float:
+        """그룹 슬롯 확보까지 대기 (확보 시 요청으로 기록됨) - 대기 시간 반환"""
+        waited = await self.groups.get(group, self.groups["default"]).acquire(priority)
+        metrics_registry.observe("rate_limit_wait", waited, group=group)
+        return waited
     
+    async def wait_for_rest_slot(self, priority: int = 3) -> float:
+        """시세 API 슬롯 확보까지 대기"""
+        return await self.wait_for_slot("market", priority)
+    
+    async def wait_for_order_slot(self, priority: int = 1) -> float:
+        """주문 API 슬롯 확보까지 대기"""
+        return await self.wait_for_slot("order", priority)
     
     def record_rest_request(self):
-        """REST API 요청 기록"""
-        with self.rest_lock:
-            self.rest_requests.append(time.time())
-            # 통합 요청 기록
-            with self.total_lock:
-                self.total_requests.append(time.time())
+        """슬롯 대기 없이 보낸 시세 API 요청 기록"""
+        self.groups["market"].record()
     
     def record_order_request(self):
-        """주문 API 요청 기록"""
-        with self.order_lock:
-            self.order_requests.append(time.time())
-            # 통합 요청 기록
-            with self.total_lock:
-                self.total_requests.append(time.time())
+        """슬롯 대기 없이 보낸 주문 API 요청 기록"""
+        self.groups["order"].record()
+    
+    def update_from_headers(self, headers) -> Optional[Dict]:
+        """응답의 Remaining-Req 헤더로 해당 그룹 잔여량 보정"""
+        value = headers.get("Remaining-Req") if headers else None
+        if not value:
+            return None
+        match = self.REMAINING_REQ_PATTERN.search(value)
+        if not match:
+            return None
+        
+        group, remaining_min, remaining_sec = match.group(1), match.group(2), int(match.group(3))
+        limiter = self.groups.get(group)
+        if limiter is not None:
+            limiter.sync_remaining(remaining_sec)
+        return {"group": group, "min": int(remaining_min) if remaining_min else None, "sec": remaining_sec}
     
+    def handle_rate_limited(self, group: str, retry_after: float = 1.0):
+        """429 응답 처리 - 그룹 슬롯 발급을 잠시 중단 (이후 대기자는 정확한 재개 시각에 깨어남)"""
+        limiter = self.groups.get(group, self.groups["default"])
+        limiter.penalize(retry_after)
+        logger.warning(f"⏳ {group} 그룹 레이트 리밋 초과 - {retry_after:.1f}초간 요청 중단")
     
     async def execute_rest_request(self, request_func, *args, **kwargs):
         """레이트 리밋을 고려한 REST 요청 실행"""
         await self.wait_for_rest_slot()
-        self.record_rest_request()
         return await request_func(*args, **kwargs)
     
     async def execute_order_request(self, request_func, *args, **kwargs):
         """레이트 리밋을 고려한 주문 요청 실행"""
         await self.wait_for_order_slot()
-        self.record_order_request()
         return await request_func(*args, **kwargs)
     
     def get_remaining_capacity(self) -> Dict:
         """남은 요청 용량 조회"""
-        current_time = time.time()
-        
-        with self.rest_lock:
-            self._clean_old_requests(self.rest_requests, 60)
-            recent_rest = [req for req in self.rest_requests if current_time - req <= 1]
-            
-        with self.order_lock:
-            self._clean_old_requests(self.order_requests, 60)
-            recent_order = [req for req in self.order_requests if current_time - req <= 1]
+        rest = self.groups["market"].remaining()
+        order = self.groups["order"].remaining()
         
         return {
-            "rest_remaining_per_second": self.rest_per_second - len(recent_rest),
-            "rest_remaining_per_minute": self.rest_per_minute - len(self.rest_requests),
-            "order_remaining_per_second": self.order_per_second - len(recent_order),
-            "order_remaining_per_minute": self.order_per_minute - len(self.order_requests)
+            "rest_remaining_per_second": rest["per_second"],
+            "rest_remaining_per_minute": rest["per_minute"],
+            "order_remaining_per_second": order["per_second"],
+            "order_remaining_per_minute": order["per_minute"],
+            "groups": {name: {**limiter.remaining(), "stats": limiter.stats.copy()} for name, limiter in self.groups.items()}
         }
 
 
@@ -231,14 +328,17 @@ async def get_accounts(self) -> List[Dict]:
             'Authorization': f'Bearer {self._generate_jwt_token()}'
         }
         
+        await rate_limiter.wait_for_slot("default", priority=4)
         session = await self._get_session()
         try:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"계좌 조회 실패 {response.status}: {error_text}")
+            with metrics_registry.timer("upbit_request", endpoint="/v1/accounts", method="GET"):
+                async with session.get(url, headers=headers) as response:
+                    rate_limiter.update_from_headers(response.headers)
+                    if response.status == 200:
+                        return await response.json()
+                    else:
+                        error_text = await response.text()
+                        raise Exception(f"계좌 조회 실패 {response.status}: {error_text}")
         except Exception as e:
             raise Exception(f"계좌 조회 오류: {str(e)}")
     
@@ -248,14 +348,19 @@ async def get_ticker(self, markets: List[str]) -> List[Dict]:
         url = f"{self.base_url}/v1/ticker"
         params = {'markets': markets_param}
         
+        await rate_limiter.wait_for_slot("market", priority=2)
         session = await self._get_session()
         try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"현재가 조회 실패 {response.status}: {error_text}")
+            with metrics_registry.timer("upbit_request", endpoint="/v1/ticker", method="GET"):
+                async with session.get(url, params=params) as response:
+                    rate_limiter.update_from_headers(response.headers)
+                    if response.status == 200:
+                        data = await response.json()
+                        price_cache.update_from_tickers(data)
+                        return data
+                    else:
+                        error_text = await response.text()
+                        raise Exception(f"현재가 조회 실패 {response.status}: {error_text}")
         except Exception as e:
             raise Exception(f"현재가 조회 오류: {str(e)}")
     
@@ -276,14 +381,17 @@ async def buy_market_order(self, market: str, price: float) -> Dict:
             'Content-Type': 'application/json'
         }
         
+        await rate_limiter.wait_for_slot("order", priority=1)
         session = await self._get_session()
         try:
-            async with session.post(url, json=query, headers=headers) as response:
-                if response.status == 201:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"매수 주문 실패 {response.status}: {error_text}")
+            with metrics_registry.timer("upbit_request", endpoint="/v1/orders", method="POST"):
+                async with session.post(url, json=query, headers=headers) as response:
+                    rate_limiter.update_from_headers(response.headers)
+                    if response.status == 201:
+                        return await response.json()
+                    else:
+                        error_text = await response.text()
+                        raise Exception(f"매수 주문 실패 {response.status}: {error_text}")
         except Exception as e:
             raise Exception(f"매수 주문 오류: {str(e)}")
     
@@ -304,14 +412,17 @@ async def sell_market_order(self, market: str, volume: float) -> Dict:
             'Content-Type': 'application/json'
         }
         
+        await rate_limiter.wait_for_slot("order", priority=1)
         session = await self._get_session()
         try:
-            async with session.post(url, json=query, headers=headers) as response:
-                if response.status == 201:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"매도 주문 실패 {response.status}: {error_text}")
+            with metrics_registry.timer("upbit_request", endpoint="/v1/orders", method="POST"):
+                async with session.post(url, json=query, headers=headers) as response:
+                    rate_limiter.update_from_headers(response.headers)
+                    if response.status == 201:
+                        return await response.json()
+                    else:
+                        error_text = await response.text()
+                        raise Exception(f"매도 주문 실패 {response.status}: {error_text}")
         except Exception as e:
             raise Exception(f"매도 주문 오류: {str(e)}")
     
@@ -325,14 +436,17 @@ async def get_order(self, uuid: str) -> Dict:
             'Authorization': f'Bearer {self._generate_jwt_token(query_string.decode())}'
         }
         
+        await rate_limiter.wait_for_slot("default", priority=2)
         session = await self._get_session()
         try:
-            async with session.get(url, params=query, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"주문 조회 실패 {response.status}: {error_text}")
+            with metrics_registry.timer("upbit_request", endpoint="/v1/order", method="GET"):
+                async with session.get(url, params=query, headers=headers) as response:
+                    rate_limiter.update_from_headers(response.headers)
+                    if response.status == 200:
+                        return await response.json()
+                    else:
+                        error_text = await response.text()
+                        raise Exception(f"주문 조회 실패 {response.status}: {error_text}")
         except Exception as e:
             raise Exception(f"주문 조회 오류: {str(e)}")
     
@@ -371,17 +485,21 @@ async def get_minute_candles(self, market: str, count: int = 20) -> List[Dict]:
             'count': count
         }
         
+        await rate_limiter.wait_for_slot("market", priority=3)
         session = await self._get_session()
         try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    logger.debug(f"📊 {market} 캔들 데이터 {len(data)}개 조회 성공")
-                    return data
-                else:
-                    error_text = await response.text()
-                    logger.error(f"⚠️ {market} 캔들 데이터 조회 실패 {response.status}: {error_text}")
-                    return []
+            with metrics_registry.timer("upbit_request", endpoint="/v1/candles/minutes/1", method="GET", market=market):
+                async with session.get(url, params=params) as response:
+                    rate_limiter.update_from_headers(response.headers)
+                    if response.status == 200:
+                        data = await response.json()
+                        price_cache.update_from_candles(market, data)
+                        logger.debug(f"📊 {market} 캔들 데이터 {len(data)}개 조회 성공")
+                        return data
+                    else:
+                        error_text = await response.text()
+                        logger.error(f"⚠️ {market} 캔들 데이터 조회 실패 {response.status}: {error_text}")
+                        return []
         except Exception as e:
             logger.error(f"⚠️ {market} 캔들 데이터 조회 오류: {str(e)}")
             return []
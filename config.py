@@ -12,6 +12,10 @@
 
 # API 설정
 UPBIT_BASE = "https://api.upbit.com"
+UPBIT_WEBSOCKET_URL = os.getenv("UPBIT_WEBSOCKET_URL", "wss://api.upbit.com/websocket/v1")
+
+# 시장 데이터 수집 모드 - rest: REST 폴링, stream: WebSocket 체결 스트림 (끊기면 REST 자동 대체)
+MARKET_DATA_MODE = os.getenv("MARKET_DATA_MODE", "rest")
 
 # 시장 설정 - MTFA 최적화된 10개 코인
 DEFAULT_MARKETS = os.getenv("MARKETS", "KRW-IOTA,KRW-WCT,KRW-GMT,KRW-BTC,KRW-MEW,KRW-ETH,KRW-SHIB,KRW-PEPE,KRW-ANIME,KRW-LPT").split(",")
@@ -19,8 +23,9 @@
 
 # 데이터 수집 설정
 UNITS = [1, 5, 15]  # 1/5/15분봉
+ROLLUP_UNITS = [5, 15, 60, 240, 1440]  # 1분봉에서 집계하는 상위 봉 (분)
 BATCH = 200  # Upbit candles limit
-CONCURRENCY = 1  # 안전하게 직렬(레이트리밋 고려)
+CONCURRENCY = int(os.getenv("CONCURRENCY", "4"))  # 과거 캔들 동시 수집 요청 수 (초당 요청 수는 공유 레이트 리미터가 제한)
 
 # 거래 설정 (스캘핑 모드)
 SCALPING_CONFIG = {
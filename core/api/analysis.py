@@ -18,16 +18,31 @@ async def volume_surge_analysis(
     hours: int = Query(24, description="분석 기간 (시간)"),
     current_user: Dict[str, Any] = Depends(require_auth)
 ):
-    """거래량 급증 분석"""
+    """거래량 급증 분석 - 저장된 1분봉 누적합 기반"""
     try:
-        # 실제 구현 예정 - 현재는 스텁
-        return {
+        from ..services.volume_scanner import volume_scanner
+
+        result = await volume_scanner.analyze(market, hours)
+        response = {
             "market": market,
-            "analysis_period_hours": hours,
-            "surge_detected": False,
-            "volume_ratio": 1.0,
-            "message": "거래량 분석 기능은 구현 예정입니다"
+            "analysis_period_hours": result["hours"],
+            "surge_detected": result["surge_detected"],
+            "volume_ratio": result["surge_ratio"],
+            "bars": result["bars"]
         }
+        if not result["bars"]:
+            response["message"] = "저장된 1분봉 데이터가 없습니다 (과거 캔들 수집 필요)"
+            return response
+        response.update({
+            "current_volume": result["current_volume"],
+            "current_zscore": result["current_zscore"],
+            "mean_volume": result["mean_volume"],
+            "surge_count": result["surge_count"],
+            "max_zscore": result["max_zscore"],
+            "max_zscore_ts": result["max_zscore_ts"],
+            "price_change": result["price_change"]
+        })
+        return response
     except Exception as e:
         logger.error(f"거래량 급증 분석 오류: {str(e)}")
         return {"error": str(e)}
@@ -38,19 +53,34 @@ async def advanced_volume_surge_analysis(
     hours: int = Query(24, description="분석 기간"),
     current_user: Dict[str, Any] = Depends(require_auth)
 ):
-    """고급 거래량 급증 분석"""
+    """고급 거래량 급증 분석 - 롤링 z-score/급증 강도/모멘텀"""
     try:
-        # 실제 구현 예정 - 현재는 스텁
-        return {
+        from ..services.volume_scanner import volume_scanner
+
+        result = await volume_scanner.analyze(market, hours)
+        response = {
             "market": market,
-            "analysis_period_hours": hours,
+            "analysis_period_hours": result["hours"],
             "advanced_metrics": {
-                "surge_intensity": 0.0,
-                "volume_trend": "stable",
-                "momentum_score": 0.0
-            },
-            "message": "고급 거래량 분석 기능은 구현 예정입니다"
+                "surge_intensity": result.get("surge_intensity", 0.0),
+                "volume_trend": result.get("volume_trend", "stable"),
+                "momentum_score": result.get("momentum_score", 0.0)
+            }
         }
+        if not result["bars"]:
+            response["message"] = "저장된 1분봉 데이터가 없습니다 (과거 캔들 수집 필요)"
+            return response
+        response["advanced_metrics"].update({
+            "surge_ratio": result["surge_ratio"],
+            "surge_frequency": result["surge_frequency"],
+            "volume_momentum": result["volume_momentum"],
+            "current_zscore": result["current_zscore"],
+            "max_zscore": result["max_zscore"],
+            "volume_std": result["volume_std"],
+            "price_change": result["price_change"]
+        })
+        response["window"] = {"start_ts": result["start_ts"], "end_ts": result["end_ts"], "bars": result["bars"]}
+        return response
     except Exception as e:
         logger.error(f"고급 거래량 분석 오류: {str(e)}")
         return {"error": str(e)}
@@ -61,20 +91,29 @@ async def backtest_performance(
     days: int = Query(30, description="백테스트 기간 (일)"),
     current_user: Dict[str, Any] = Depends(require_auth)
 ):
-    """백테스트 성과 분석"""
+    """백테스트 성과 분석 - 저장된 1분봉으로 진입 신호/청산 규칙 재현 (수수료/슬리피지 포함)"""
     try:
-        # 실제 구현 예정 - 현재는 스텁
-        return {
+        from ..services.backtest_engine import backtest_engine
+
+        result = await backtest_engine.run(market, days)
+        market_config = MTFA_OPTIMIZED_CONFIG.get(market, {})
+        response = {
             "market": market,
             "backtest_period_days": days,
-            "performance": {
-                "total_return": 0.0,
-                "win_rate": 0.0,
-                "total_trades": 0,
-                "profit_factor": 0.0
+            "bars": result["bars"],
+            "signals": result["signals"],
+            "performance": result["performance"],
+            "expected": {
+                "expected_return": market_config.get("expected_return"),
+                "expected_win_rate": market_config.get("expected_win_rate")
             },
-            "message": "백테스트 분석 기능은 구현 예정입니다"
+            "params": result["params"],
+            "recent_trades": result["trades"][-20:],
+            "elapsed_seconds": result["seconds"]
         }
+        if not result["bars"]:
+            response["message"] = "저장된 1분봉 데이터가 없습니다 (과거 캔들 수집 필요)"
+        return response
     except Exception as e:
         logger.error(f"백테스트 성과 분석 오류: {str(e)}")
         return {"error": str(e)}
@@ -84,19 +123,31 @@ async def multi_coin_analysis(
     hours: int = Query(24, description="분석 기간 (시간)"),
     current_user: Dict[str, Any] = Depends(require_auth)
 ):
-    """멀티 코인 종합 분석"""
+    """멀티 코인 종합 분석 - 추적 중인 전체 마켓 거래량/가격 동시 분석"""
     try:
-        # 실제 구현 예정 - 현재는 스텁
-        return {
+        from ..services.volume_scanner import volume_scanner
+
+        scan = await volume_scanner.scan(hours=hours, sort_by="surge_ratio")
+        ranked = scan["ranked"]
+        by_price = sorted(ranked, key=lambda result: result["price_change"], reverse=True)
+        average_change = sum(result["price_change"] for result in ranked) / len(ranked) if ranked else 0.0
+
+        response = {
             "analysis_period_hours": hours,
-            "coins": {},
+            "coins": scan["results"],
+            "ranking": scan["ranking"],
             "summary": {
-                "best_performer": None,
-                "worst_performer": None,
-                "market_sentiment": "neutral"
-            },
-            "message": "멀티 코인 분석 기능은 구현 예정입니다"
+                "best_performer": by_price[0]["market"] if by_price else None,
+                "worst_performer": by_price[-1]["market"] if by_price else None,
+                "strongest_surge": ranked[0]["market"] if ranked else None,
+                "surging_coins": [result["market"] for result in ranked if result["surge_detected"]],
+                "average_price_change": round(average_change, 4),
+                "market_sentiment": "bullish" if average_change > 1 else "bearish" if average_change < -1 else "neutral"
+            }
         }
+        if not ranked:
+            response["message"] = "저장된 1분봉 데이터가 없습니다 (과거 캔들 수집 필요)"
+        return response
     except Exception as e:
         logger.error(f"멀티 코인 분석 오류: {str(e)}")
         return {"error": str(e)}
@@ -104,23 +155,63 @@ async def multi_coin_analysis(
 @router.get("/coin-comparison")
 async def coin_comparison(
     markets: str = Query(..., description="비교할 마켓들 (쉼표로 구분)"),
+    hours: int = Query(24, description="분석 기간 (시간)"),
+    sort_by: str = Query("momentum_score", description="순위 기준 (momentum_score, surge_ratio, surge_intensity, price_change)"),
     current_user: Dict[str, Any] = Depends(require_auth)
 ):
     """코인 비교 분석"""
     try:
-        market_list = [m.strip() for m in markets.split(",")]
-        
-        # 실제 구현 예정 - 현재는 스텁
-        return {
+        from ..services.volume_scanner import volume_scanner
+
+        market_list = [m.strip() for m in markets.split(",") if m.strip()]
+        if sort_by not in ("momentum_score", "surge_ratio", "surge_intensity", "price_change"):
+            return {"error": f"지원하지 않는 순위 기준: {sort_by}"}
+
+        scan = await volume_scanner.scan(market_list, hours=hours, sort_by=sort_by)
+        response = {
             "markets": market_list,
-            "comparison": {},
-            "ranking": [],
-            "message": "코인 비교 분석 기능은 구현 예정입니다"
+            "analysis_period_hours": hours,
+            "comparison": scan["results"],
+            "ranking": scan["ranking"]
         }
+        if not scan["ranking"]:
+            response["message"] = "저장된 1분봉 데이터가 없습니다 (과거 캔들 수집 필요)"
+        return response
     except Exception as e:
         logger.error(f"코인 비교 분석 오류: {str(e)}")
         return {"error": str(e)}
 
+@router.get("/krw-signal-scan")
+async def krw_signal_scan(
+    limit: int = Query(20, description="반환할 매수 신호 수"),
+    current_user: Dict[str, Any] = Depends(require_auth)
+):
+    """KRW 전체 마켓 매수 신호 일괄 평가 - 엔진과 같은 파라미터/MTFA 임계값, 증분 지표 및 MTFA 게이트 적용"""
+    try:
+        from ..services.batch_signal_evaluator import batch_signal_evaluator
+
+        # 엔진과 같은 진입 파라미터 (설정에 없는 마켓은 KRW-BTC 설정 사용)
+        default_config = MTFA_OPTIMIZED_CONFIG["KRW-BTC"]
+        params = {"volume_mult": 1.5, "price_change": 0.3,
+                  "mtfa_threshold": default_config.get("mtfa_threshold", 0.80)}
+        mtfa_thresholds = {market: market_config.get("mtfa_threshold", 0.80)
+                           for market, market_config in MTFA_OPTIMIZED_CONFIG.items()}
+
+        scan = await batch_signal_evaluator.scan_krw_markets(params, mtfa_thresholds)
+        if "error" in scan:
+            return {"error": scan["error"]}
+        return {
+            "markets_requested": scan["markets_requested"],
+            "markets_evaluated": scan["markets_evaluated"],
+            "signal_count": len(scan["signals"]),
+            "signals": scan["signals"][:max(0, limit)],
+            "fetch_seconds": round(scan["fetch_duration"], 3),
+            "evaluate_ms": round(scan["evaluate_duration"] * 1000, 2)
+        }
+    except Exception as e:
+        logger.error(f"KRW 전체 신호 스캔 오류: {str(e)}")
+        return {"error": str(e)}
+
 @router.get("/real-time-buy-conditions")
 async def real_time_buy_conditions(current_user: Dict[str, Any] = Depends(require_auth)):
     """실시간 매수 조건 상태 확인 - 상세 분석 포함 (API 호출 간격 최적화)"""
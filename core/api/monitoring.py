@@ -79,6 +79,9 @@ async def get_current_performance(current_user: Dict[str, Any] = Depends(require
                 "disk_percent": snapshot.disk_percent,
                 "network_sent": snapshot.network_sent,
                 "network_recv": snapshot.network_recv,
+                "network_sent_rate": round(snapshot.network_sent_rate, 1),
+                "network_recv_rate": round(snapshot.network_recv_rate, 1),
+                "event_loop_lag_ms": round(snapshot.event_loop_lag_max_ms, 3),
                 "active_positions": snapshot.active_positions,
                 "daily_trades": snapshot.daily_trades,
                 "daily_profit": snapshot.daily_profit,
@@ -259,17 +262,17 @@ async def get_available_metrics(current_user: Dict[str, Any] = Depends(require_a
     try:
         available_metrics = []
         
-        for name, metrics_list in monitoring_service.metrics.items():
-            if metrics_list:
-                latest = metrics_list[-1]
-                available_metrics.append({
-                    "name": name,
-                    "type": latest.metric_type.value,
-                    "unit": latest.unit,
-                    "last_updated": latest.timestamp.isoformat(),
-                    "data_points": len(metrics_list),
-                    "latest_value": latest.value
-                })
+        for name, latest in list(monitoring_service.metrics.items()):
+            series = monitoring_service.metric_store.get(name)
+            available_metrics.append({
+                "name": name,
+                "type": latest.metric_type.value,
+                "unit": latest.unit,
+                "last_updated": latest.timestamp.isoformat(),
+                "data_points": len(series.raw) if series else 0,
+                "total_recorded": series.total if series else 0,
+                "latest_value": latest.value
+            })
         
         return {
             "success": True,
@@ -457,8 +460,8 @@ async def get_dashboard_data(current_user: Dict[str, Any] = Depends(require_auth
         # 주요 메트릭 현재값
         key_metrics = {}
         for metric_name in ["system.cpu_percent", "system.memory_percent", "api.response_time", "trading.active_positions"]:
-            if metric_name in monitoring_service.metrics and monitoring_service.metrics[metric_name]:
-                latest = monitoring_service.metrics[metric_name][-1]
+            latest = monitoring_service.metrics.get(metric_name)
+            if latest is not None:
                 key_metrics[metric_name] = {
                     "value": latest.value,
                     "unit": latest.unit,
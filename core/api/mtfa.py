@@ -64,26 +64,39 @@ async def get_performance_expectations():
 
 @router.get("/api/mtfa-confidence/{market}")
 async def get_mtfa_confidence(market: str):
-    """특정 코인의 실시간 MTFA 신뢰도 반환 (향후 구현)"""
+    """특정 코인의 실시간 MTFA 신뢰도 반환 (1/5/15분 정렬 엔진의 메모리 값)"""
+    from ..services.mtfa_engine import mtfa_engine
     
     if market not in MTFA_OPTIMIZED_CONFIG:
         raise HTTPException(status_code=404, detail=f"Market {market} not found in MTFA config")
     
     config = MTFA_OPTIMIZED_CONFIG[market]
     
-    # TODO: 실제 MTFA 신뢰도 계산 로직 구현 필요
-    # 현재는 시뮬레이션 값 반환
-    import random
-    current_confidence = random.uniform(0.7, 1.0)  # 70-100% 랜덤
+    # 신호 분석이 아직 돌지 않은 마켓은 저장된 1분봉으로 한 번 초기화
+    await mtfa_engine.ensure_seeded(market)
+    snapshot = mtfa_engine.snapshot(market) or {"ready": False, "confidence": None,
+                                                "aligned_timeframes": 0, "timeframes": {}, "last_ts": None}
+    current_confidence = snapshot["confidence"]
+    
+    if current_confidence is None:
+        signal_status = "WARMING_UP"
+        signal_strength = "UNKNOWN"
+    else:
+        signal_status = "BUY_READY" if current_confidence >= config["mtfa_threshold"] else "WAITING"
+        signal_strength = "HIGH" if current_confidence >= 0.9 else "MEDIUM" if current_confidence >= 0.8 else "LOW"
     
     return {
         "success": True,
         "market": market,
         "coin": market.split('-')[1],
-        "current_confidence": round(current_confidence, 3),
+        "current_confidence": round(current_confidence, 3) if current_confidence is not None else None,
         "threshold": config["mtfa_threshold"],
-        "signal_status": "BUY_READY" if current_confidence >= config["mtfa_threshold"] else "WAITING",
-        "signal_strength": "HIGH" if current_confidence >= 0.9 else "MEDIUM" if current_confidence >= 0.8 else "LOW",
+        "signal_status": signal_status,
+        "signal_strength": signal_strength,
+        "ready": snapshot["ready"],
+        "aligned_timeframes": snapshot["aligned_timeframes"],
+        "timeframes": snapshot["timeframes"],
+        "last_candle_ts": snapshot["last_ts"],
         "strategy": {
             "profit_target": config["profit_target"],
             "stop_loss": config["stop_loss"],
@@ -101,6 +114,7 @@ async def get_mtfa_dashboard_data():
     try:
         # 실제 신호 분석 시스템 연동
         from ..services.signal_analyzer import signal_analyzer
+        from ..services.mtfa_engine import mtfa_engine
         from ..utils.api_manager import api_manager
         
         dashboard_data = []
@@ -146,8 +160,12 @@ async def get_mtfa_dashboard_data():
                     current_confidence = signal_result.get("signal_strength", 0) / 100.0  # 0-1로 정규화
                     is_buy_ready = True
                     buy_ready_count += 1
+                elif mtfa_engine.confidence(market) is not None:
+                    # 신호가 없는 경우 다중 시간대 정렬 엔진의 현재 신뢰도 사용
+                    current_confidence = mtfa_engine.confidence(market)
+                    is_buy_ready = False
                 else:
-                    # 신호가 없는 경우 배치에서 가져온 ticker 데이터 사용
+                    # 엔진 준비 전에는 배치에서 가져온 ticker 데이터 사용
                     ticker_data = batch_ticker_data.get(market)
                     
                     if ticker_data:
@@ -6,12 +6,11 @@
 import json
 import asyncio
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, AsyncGenerator
+from typing import Dict, Any, AsyncGenerator
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, BackgroundTasks
 from fastapi.responses import StreamingResponse
-from sse_starlette.sse import EventSourceResponse
 
-from ..services.trading_engine import trading_state
+from ..services.realtime_broadcaster import realtime_broadcaster
 from ..services.notification_service import notification_service
 from ..utils.datetime_utils import utc_now
 from ..auth.middleware import require_auth
@@ -19,9 +18,6 @@
 
 router = APIRouter(tags=["실시간"])
 
-# 활성 SSE 클라이언트 관리
-active_connections: Dict[str, Dict] = {}
-
 @router.get("/stream")
 async def stream_trading_data(
     request: Request,
@@ -29,95 +25,48 @@ async def stream_trading_data(
     interval: int = Query(default=5, ge=1, le=60, description="업데이트 간격 (초)"),
     current_user: Dict[str, Any] = Depends(require_auth)
 ):
-    """실시간 거래 데이터 스트리밍 (Server-Sent Events)"""
+    """실시간 거래 데이터 스트리밍 (Server-Sent Events)
+
+    공유 브로드캐스터가 같은 사용자/마켓/간격 구독 그룹의 데이터를 한 번만 생성·인코딩하여 전달한다.
+    첫 메시지는 전체 스냅샷(type=snapshot), 이후에는 바뀐 필드만 담은 델타(type=delta)이며,
+    처리가 밀린 클라이언트는 대기 중인 델타 대신 최신 스냅샷을 받는다.
+    """
     
     client_id = f"{current_user.get('session_id', 'unknown')}_{datetime.now().timestamp()}"
+    target_markets = [market for market in markets.split(",") if market] if markets else list(DEFAULT_MARKETS)
+    client = realtime_broadcaster.subscribe(client_id, current_user.get("id"), target_markets, interval)
     
-    # 클라이언트 설정
-    client_config = {
-        "user_id": current_user.get("session_id"),
-        "markets": markets.split(",") if markets else DEFAULT_MARKETS,
-        "interval": interval,
-        "last_update": None,
-        "connected_at": utc_now(),
-    }
-    
-    async def event_generator() -> AsyncGenerator[str, None]:
-        """SSE 이벤트 생성기"""
+    async def event_generator() -> AsyncGenerator[bytes, None]:
+        """SSE 이벤트 생성기 - 브로드캐스터가 인코딩한 프레임을 그대로 전달"""
         try:
-            # 클라이언트 등록
-            active_connections[client_id] = client_config
-            
             # 연결 확인 이벤트
-            yield f"data: {json.dumps({'type': 'connected', 'client_id': client_id, 'timestamp': utc_now().isoformat()})}\n\n"
+            yield f"data: {json.dumps({'type': 'connected', 'client_id': client_id, 'timestamp': utc_now().isoformat()})}\n\n".encode("utf-8")
             
             while True:
-                # 클라이언트 연결 확인
-                if await request.is_disconnected():
-                    break
-                
                 try:
-                    # 실시간 데이터 수집
-                    trading_data = _get_current_trading_data(client_config["markets"])
-                    market_data = _get_current_market_data(client_config["markets"])
-                    
-                    # 데이터 변화 감지
-                    current_time = utc_now()
-                    last_update = client_config.get("last_update")
-                    
-                    # 이벤트 데이터 구성
-                    event_data = {
-                        "type": "update",
-                        "timestamp": current_time.isoformat(),
-                        "trading_status": {
-                            "status": trading_data["status"],
-                            "active_positions": trading_data["active_positions"],
-                            "total_profit_loss": trading_data["total_profit_loss"],
-                            "available_krw": trading_data["available_krw"],
-                        },
-                        "positions": trading_data["positions"],
-                        "market_prices": market_data,
-                        "alerts": _get_recent_alerts(last_update),
-                    }
-                    
-                    # 클라이언트에 데이터 전송
-                    yield f"data: {json.dumps(event_data, ensure_ascii=False)}\n\n"
-                    
-                    # 마지막 업데이트 시간 갱신
-                    client_config["last_update"] = current_time
-                    
-                    # 간격 대기
-                    await asyncio.sleep(interval)
-                    
-                except Exception as e:
-                    # 오류 이벤트 전송
-                    error_event = {
-                        "type": "error",
-                        "message": str(e),
-                        "timestamp": utc_now().isoformat(),
-                    }
-                    yield f"data: {json.dumps(error_event)}\n\n"
-                    break
-                    
-        except Exception as e:
-            # 연결 오류 처리
-            error_event = {
-                "type": "connection_error",
-                "message": str(e),
-                "timestamp": utc_now().isoformat(),
-            }
-            yield f"data: {json.dumps(error_event)}\n\n"
-            
+                    frame = await asyncio.wait_for(client.queue.get(), timeout=realtime_broadcaster.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    # 클라이언트 연결 확인
+                    if await request.is_disconnected():
+                        break
+                    continue
+                
+                client.sent += 1
+                yield frame
+                
+        except asyncio.CancelledError:
+            pass
         finally:
             # 클라이언트 정리
-            if client_id in active_connections:
-                del active_connections[client_id]
+            realtime_broadcaster.unsubscribe(client_id)
     
-    return EventSourceResponse(
+    return StreamingResponse(
         event_generator(),
+        media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Headers": "Cache-Control",
         }
@@ -129,17 +78,19 @@ async def get_stream_status(
 ):
     """실시간 스트림 상태 조회"""
     try:
-        user_id = current_user.get("session_id")
+        user_id = current_user.get("id")
         user_connections = [
             {
-                "client_id": client_id,
-                "connected_at": config["connected_at"].isoformat(),
-                "markets": config["markets"],
-                "interval": config["interval"],
-                "last_update": config["last_update"].isoformat() if config["last_update"] else None,
+                "client_id": client.client_id,
+                "connected_at": client.connected_at.isoformat(),
+                "markets": list(client.group_key[1]),
+                "interval": client.group_key[2],
+                "frames_sent": client.sent,
+                "frames_dropped": client.dropped,
+                "queue_depth": client.queue.qsize(),
             }
-            for client_id, config in active_connections.items()
-            if config["user_id"] == user_id
+            for client in list(realtime_broadcaster.clients.values())
+            if client.group_key[0] == user_id
         ]
         
         return {
@@ -147,7 +98,8 @@ async def get_stream_status(
             "data": {
                 "active_connections": len(user_connections),
                 "connections": user_connections,
-                "total_system_connections": len(active_connections),
+                "total_system_connections": len(realtime_broadcaster.clients),
+                "broadcaster": realtime_broadcaster.get_status(),
                 "server_time": utc_now().isoformat(),
             }
         }
@@ -326,103 +278,6 @@ async def send_test_notification(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"테스트 알림 전송 실패: {str(e)}")
 
-# 헬퍼 함수들
-
-def _get_current_trading_data(markets: List[str]) -> Dict[str, Any]:
-    """현재 거래 데이터 조회"""
-    try:
-        positions = trading_state.positions.copy()
-        
-        # 마켓 필터링
-        if markets and markets != DEFAULT_MARKETS:
-            positions = [p for p in positions if p.market in markets]
-        
-        return {
-            "status": trading_state.is_active,
-            "active_positions": len([p for p in positions if not p.is_closed]),
-            "total_profit_loss": sum(p.profit_loss for p in positions),
-            "available_krw": getattr(trading_state, 'available_krw', 0),
-            "positions": [
-                {
-                    "market": p.market,
-                    "symbol": p.market.split('-')[1],
-                    "amount": p.amount,
-                    "buy_price": p.buy_price,
-                    "current_price": p.current_price,
-                    "profit_loss": p.profit_loss,
-                    "profit_loss_rate": p.profit_loss_rate,
-                    "is_closed": p.is_closed,
-                    "created_at": p.created_at.isoformat(),
-                }
-                for p in positions
-            ]
-        }
-        
-    except Exception as e:
-        return {
-            "status": False,
-            "active_positions": 0,
-            "total_profit_loss": 0,
-            "available_krw": 0,
-            "positions": [],
-            "error": str(e),
-        }
-
-def _get_current_market_data(markets: List[str]) -> Dict[str, Any]:
-    """현재 시장 데이터 조회"""
-    try:
-        # 실제 구현에서는 업비트 API나 캐시된 가격 데이터를 사용
-        market_data = {}
-        
-        target_markets = markets if markets else DEFAULT_MARKETS
-        
-        for market in target_markets:
-            # 여기서는 trading_state의 현재가 정보를 사용
-            # 실제로는 별도의 가격 서비스에서 가져와야 함
-            market_data[market] = {
-                "market": market,
-                "symbol": market.split('-')[1],
-                "trade_price": 0,  # 실제 현재가
-                "change": "EVEN",
-                "change_price": 0,
-                "change_rate": 0,
-                "timestamp": utc_now().isoformat(),
-            }
-        
-        return market_data
-        
-    except Exception as e:
-        return {"error": str(e)}
-
-def _get_recent_alerts(since: Optional[datetime] = None) -> List[Dict[str, Any]]:
-    """최근 알림 조회"""
-    try:
-        # 최근 알림 조회 (실제로는 알림 서비스나 데이터베이스에서)
-        alerts = []
-        
-        # 예시 알림들
-        current_time = utc_now()
-        
-        # 거래 신호 알림
-        if trading_state.positions:
-            recent_position = trading_state.positions[-1]
-            if recent_position.profit_loss > 10000:  # 1만원 이상 수익
-                alerts.append({
-                    "type": "profit_alert",
-                    "title": "수익 달성",
-                    "message": f"{recent_position.market.split('-')[1]} 포지션에서 {recent_position.profit_loss:,.0f}원 수익 달성",
-                    "timestamp": current_time.isoformat(),
-                    "data": {
-                        "market": recent_position.market,
-                        "profit_loss": recent_position.profit_loss,
-                    }
-                })
-        
-        return alerts
-        
-    except Exception as e:
-        return []
-
 # 인증 미들웨어
 try:
     from ..auth.middleware import get_current_user
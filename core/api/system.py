@@ -1,17 +1,20 @@
 """시스템 관련 API 라우터"""
 
 from fastapi import APIRouter, Request, Depends
-from typing import Dict, Optional
+from fastapi.responses import PlainTextResponse
+from typing import Dict, List, Optional
 import logging
 import time
 from datetime import datetime
 
-from ..services.optimizer import auto_scheduler
+from ..services.optimizer import auto_scheduler, weekly_optimizer
 from ..services.trading_engine import trading_state
 from ..services.resilience_config import resilience_configurator
 from ..auth.middleware import get_current_user, require_auth
 from ..session import session_manager
 from api_client import UpbitAPI
+from ..utils.price_cache import price_cache
+from ..utils.instrumentation import metrics_registry
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +50,10 @@ def __init__(self):
         # 캔들 데이터 캐시 (1분간 유효)
         self.candle_cache = {}
         self.cache_ttl = 60  # 1분
+        
+        # 마켓 목록 캐시 (1시간 유효)
+        self.market_list_cache = None
+        self.market_list_ttl = 3600
     
     async def _get_session(self):
         if self.session is None or self.session.closed:
@@ -81,15 +88,15 @@ async def _get_session(self):
             )
         return self.session
     
-    async def get_minute_candles(self, market: str, count: int = 20):
+    async def get_minute_candles(self, market: str, count: int = 20, use_cache: bool = True):
         """1분봉 캔들 데이터 조회 (공개 API) - 레이트 리밋 및 캐싱 적용"""
         import time
         
-        # 캐시 확인
+        # 캐시 확인 (시장 데이터 버스의 틱 갱신은 캐시를 우회)
         cache_key = f"{market}_{count}"
         current_time = time.time()
         
-        if cache_key in self.candle_cache:
+        if use_cache and cache_key in self.candle_cache:
             cached_data, cache_time = self.candle_cache[cache_key]
             if current_time - cache_time < self.cache_ttl:
                 logger.debug(f"📊 {market} 캔들 데이터 캐시에서 반환 ({len(cached_data)}개)")
@@ -107,19 +114,20 @@ async def get_minute_candles(self, market: str, count: int = 20):
         session = await self._get_session()
         try:
             async with session.get(url, params=params) as response:
-                # 요청 기록
-                self.rate_limiter.record_rest_request()
+                # 잔여 요청 수로 스케줄러 보정 (슬롯은 대기 시점에 이미 기록됨)
+                self.rate_limiter.update_from_headers(response.headers)
                 
                 if response.status == 200:
                     data = await response.json()
-                    # 캐시에 저장
+                    # 캐시에 저장 (최신 종가는 공유 가격 캐시에도 기록)
                     self.candle_cache[cache_key] = (data, current_time)
+                    price_cache.update_from_candles(market, data)
                     logger.debug(f"📊 {market} 캔들 데이터 {len(data)}개 조회 성공 (캐시 저장)")
                     return data
                 elif response.status == 429:
                     error_text = await response.text()
                     logger.warning(f"⚠️ {market} API 레이트 리밋 초과 429: {error_text}")
-                    # 429 에러시 exponential backoff
+                    # 429 에러시 시세 그룹 슬롯 발급 일시 중단 (handle_rate_limited)
                     await self._handle_rate_limit_error(market)
                     return []
                 else:
@@ -130,22 +138,75 @@ async def get_minute_candles(self, market: str, count: int = 20):
             logger.error(f"⚠️ {market} 캔들 데이터 조회 오류: {str(e)}")
             return []
     
-    async def _handle_rate_limit_error(self, market: str):
-        """429 에러 처리 - exponential backoff"""
-        import asyncio
-        backoff_time = 2.0  # 2초부터 시작
-        max_backoff = 16.0  # 최대 16초
-        
-        while backoff_time <= max_backoff:
-            logger.warning(f"⏳ {market} API 레이트 리밋 대기 중... ({backoff_time}초)")
-            await asyncio.sleep(backoff_time)
-            
-            # 다시 시도 가능한지 확인
-            if await self.rate_limiter.can_make_rest_request():
-                logger.info(f"✅ {market} API 요청 재개 가능")
-                break
+    async def get_tickers(self, markets: List[str]) -> List[Dict]:
+        """다중 마켓 현재가 일괄 조회 (공개 API) - 요청 1회로 여러 마켓 처리"""
+        if not markets:
+            return []
+        
+        # 레이트 리밋 대기
+        await self.rate_limiter.wait_for_rest_slot()
+        
+        url = f"{self.base_url}/v1/ticker"
+        params = {'markets': ','.join(markets)}
+        
+        session = await self._get_session()
+        try:
+            async with session.get(url, params=params) as response:
+                # 잔여 요청 수로 스케줄러 보정 (슬롯은 대기 시점에 이미 기록됨)
+                self.rate_limiter.update_from_headers(response.headers)
                 
-            backoff_time = min(backoff_time * 2, max_backoff)
+                if response.status == 200:
+                    data = await response.json()
+                    price_cache.update_from_tickers(data)
+                    logger.debug(f"📊 현재가 {len(data)}개 마켓 일괄 조회 성공")
+                    return data
+                elif response.status == 429:
+                    error_text = await response.text()
+                    logger.warning(f"⚠️ 현재가 API 레이트 리밋 초과 429: {error_text}")
+                    await self._handle_rate_limit_error(markets[0])
+                    return []
+                else:
+                    error_text = await response.text()
+                    logger.error(f"⚠️ 현재가 일괄 조회 실패 {response.status}: {error_text}")
+                    return []
+        except Exception as e:
+            logger.error(f"⚠️ 현재가 일괄 조회 오류: {str(e)}")
+            return []
+    
+    async def get_krw_markets(self) -> List[str]:
+        """KRW 마켓 전체 목록 조회 (공개 API) - 1시간 캐싱"""
+        import time
+        
+        current_time = time.time()
+        if self.market_list_cache and current_time - self.market_list_cache[1] < self.market_list_ttl:
+            return self.market_list_cache[0]
+        
+        await self.rate_limiter.wait_for_rest_slot()
+        
+        url = f"{self.base_url}/v1/market/all"
+        session = await self._get_session()
+        try:
+            async with session.get(url) as response:
+                self.rate_limiter.update_from_headers(response.headers)
+                
+                if response.status == 200:
+                    data = await response.json()
+                    markets = [item["market"] for item in data if item.get("market", "").startswith("KRW-")]
+                    self.market_list_cache = (markets, current_time)
+                    logger.info(f"📋 KRW 마켓 목록 {len(markets)}개 조회 성공")
+                    return markets
+                else:
+                    error_text = await response.text()
+                    logger.error(f"⚠️ 마켓 목록 조회 실패 {response.status}: {error_text}")
+                    return self.market_list_cache[0] if self.market_list_cache else []
+        except Exception as e:
+            logger.error(f"⚠️ 마켓 목록 조회 오류: {str(e)}")
+            return self.market_list_cache[0] if self.market_list_cache else []
+    
+    async def _handle_rate_limit_error(self, market: str):
+        """429 에러 처리 - 시세 그룹 슬롯 발급을 잠시 중단 (대기 중인 요청은 재개 시각에 자동으로 깨어남)"""
+        logger.warning(f"⏳ {market} API 레이트 리밋 초과 - 시세 요청 일시 중단")
+        self.rate_limiter.handle_rate_limited("market", retry_after=2.0)
     
     async def close(self):
         if self.session and not self.session.closed:
@@ -186,6 +247,61 @@ async def get_system_status():
         logger.error(f"시스템 상태 조회 오류: {str(e)}")
         return {"error": str(e)}
 
+@router.get("/api/api-metrics")
+async def get_api_metrics():
+    """API 호출 관리자/레이트 리미터 지표 조회 (큐 깊이, 우선순위별 대기 시간, 그룹별 잔여량)"""
+    try:
+        from ..utils.api_manager import api_manager
+        from api_client import rate_limiter
+        
+        return {
+            "timestamp": time.time(),
+            "api_manager": api_manager.get_metrics(),
+            "rate_limiter": rate_limiter.get_remaining_capacity(),
+            "latency": metrics_registry.snapshot()
+        }
+    except Exception as e:
+        logger.error(f"API 지표 조회 오류: {str(e)}")
+        return {"error": str(e)}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """Prometheus 수집용 지연 히스토그램/카운터 (텍스트 노출 형식)"""
+    return PlainTextResponse(
+        metrics_registry.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@router.post("/api/backfill")
+async def run_candle_backfill(markets: Optional[str] = None, units: Optional[str] = None,
+                              years: Optional[int] = None, current_user: Dict = Depends(require_auth)):
+    """과거 캔들 수집 시작 (비어 있는 구간만, 백그라운드 실행)"""
+    try:
+        from ..services.candle_backfill import candle_backfill
+        from config import DEFAULT_YEARS
+
+        started = candle_backfill.start(
+            markets=markets.split(",") if markets else None,
+            units=[int(unit) for unit in units.split(",")] if units else None,
+            years=years or DEFAULT_YEARS
+        )
+        if not started:
+            return {"success": False, "message": "과거 캔들 수집이 이미 진행 중입니다"}
+        return {"success": True, "message": "과거 캔들 수집을 시작했습니다"}
+    except Exception as e:
+        logger.error(f"과거 캔들 수집 시작 오류: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+@router.get("/api/backfill-status")
+async def get_candle_backfill_status():
+    """과거 캔들 수집 진행 상황 (작업별 누락 구간/요청 수)"""
+    try:
+        from ..services.candle_backfill import candle_backfill
+        return candle_backfill.get_status()
+    except Exception as e:
+        logger.error(f"과거 캔들 수집 상태 조회 오류: {str(e)}")
+        return {"error": str(e)}
+
 @router.get("/api/data-quality")
 async def get_data_quality():
     """데이터 품질 조회"""
@@ -235,8 +351,10 @@ async def get_optimization_status():
         return {
             "scheduler_running": auto_scheduler.is_running,
             "next_run_time": auto_scheduler.get_next_run_time(),
-            "last_optimization": "구현 예정",
-            "optimization_history": []
+            "analysis_running": weekly_optimizer.analysis_running,
+            "last_optimization": datetime.fromtimestamp(weekly_optimizer.last_analysis_date).strftime("%Y-%m-%d %H:%M:%S")
+            if weekly_optimizer.last_analysis_date else None,
+            "optimization_history": weekly_optimizer.get_candidates()[:20]
         }
     except Exception as e:
         logger.error(f"최적화 상태 조회 오류: {str(e)}")
@@ -1,14 +1,14 @@
 """거래 관련 API 라우터"""
 
-from fastapi import APIRouter, Query, Depends
+from fastapi import APIRouter, Query, Depends, Request, Response
 from typing import Dict, List, Any
 import logging
-import asyncio
 import time
 from datetime import datetime
 
 from ..services.trading_engine import trading_engine, trading_state
 from ..services.optimizer import auto_scheduler
+from ..services.dashboard_snapshot import dashboard_snapshot_service
 from core.api.system import get_upbit_client
 from ..auth.middleware import require_auth
 from ..session import session_manager
@@ -747,11 +747,9 @@ async def get_account_balances(current_user: Dict[str, Any] = Depends(require_au
         return {"success": False, "error": str(e)}
 
 @router.get("/dashboard-data")
-async def get_dashboard_data(current_user: Dict[str, Any] = Depends(require_auth)):
-    """대시보드용 통합 데이터 조회 - 세션별 사용자 데이터 제공"""
+async def get_dashboard_data(request: Request, current_user: Dict[str, Any] = Depends(require_auth)):
+    """대시보드용 통합 데이터 조회 - 백그라운드에서 갱신한 사용자별 스냅샷 반환 (If-None-Match 지원)"""
     try:
-        from config import DEFAULT_MARKETS
-        
         user_id = current_user.get("id")
         username = current_user.get("username")
         
@@ -761,122 +759,17 @@ async def get_dashboard_data(current_user: Dict[str, Any] = Depends(require_auth
             logger.error(f"⚠️ 대시보드 데이터 조회 - 사용자 {username} 세션이 존재하지 않습니다")
             return {"success": False, "message": "세션이 만료되었습니다. 다시 로그인해주세요."}
         
-        dashboard_data = {
-            "success": True,
-            "timestamp": time.time(),
-            "user": {"username": username, "user_id": user_id},
-            "account_info": {"success": False},
-            "trading_status": {},
-            "current_prices": {},
-            "buy_conditions": [],
-            "system_status": "running"
-        }
+        snapshot = await dashboard_snapshot_service.get_snapshot(user_id, username)
+        if not snapshot.body:
+            return {"success": False, "message": "대시보드 데이터를 준비 중입니다"}
         
-        # 1. 계좌 정보 조회 (최적화된 헬퍼 메서드 사용)
-        try:
-            upbit_client = user_session.upbit_client if user_session.upbit_client else get_upbit_client()
-            if upbit_client:
-                account_info = await _get_optimized_account_info(upbit_client, batch_tickers=True)
-                if account_info:
-                    dashboard_data["account_info"] = {
-                        "success": True,
-                        **account_info
-                    }
-                else:
-                    dashboard_data["account_info"] = {"success": False, "message": "계좌 정보 조회에 실패했습니다"}
-            else:
-                dashboard_data["account_info"] = {"success": False, "message": "업비트 로그인이 필요합니다"}
-        except Exception as e:
-            logger.warning(f"계좌 정보 조회 실패: {str(e)}")
-            dashboard_data["account_info"] = {"success": False, "error": str(e)}
-        
-        # 2. 거래 상태 조회 (사용자별 세션 데이터)
-        try:
-            dashboard_data["trading_status"] = {
-                "is_running": user_session.trading_engine.is_running,
-                "positions_count": len(user_session.trading_state.positions),
-                "available_budget": user_session.trading_state.available_budget,
-                "daily_trades": user_session.trading_state.daily_trades,
-                "daily_loss": user_session.trading_state.daily_loss,
-                "uptime_seconds": time.time() - user_session.trading_engine.session_start_time if user_session.trading_engine.session_start_time else 0,
-                "positions": {}
-            }
-            
-            # 포지션 정보 추가 (사용자별)
-            for coin, position in user_session.trading_state.positions.items():
-                dashboard_data["trading_status"]["positions"][coin] = {
-                    "buy_price": position.buy_price,
-                    "amount": position.amount,
-                    "current_price": position.current_price,
-                    "unrealized_pnl": position.unrealized_pnl,
-                    "profit_target": position.profit_target,
-                    "stop_loss": position.stop_loss,
-                    "timestamp": position.timestamp.isoformat()
-                }
-                
-        except Exception as e:
-            logger.warning(f"거래 상태 조회 실패: {str(e)}")
-            dashboard_data["trading_status"] = {"error": str(e)}
-        
-        # 3. 주요 코인 현재가 조회 (사용자별 클라이언트 사용)
-        try:
-            upbit_client = user_session.upbit_client if user_session.upbit_client else get_upbit_client()
-            if upbit_client:
-                market_list = list(DEFAULT_MARKETS)[:5]  # 처음 5개만
-                ticker_data = await upbit_client.get_ticker(market_list)
-                
-                prices = {}
-                for ticker in ticker_data:
-                    market = ticker["market"]
-                    prices[market] = {
-                        "trade_price": float(ticker["trade_price"]),
-                        "change_rate": float(ticker["change_rate"]) * 100,
-                        "coin_symbol": market.split('-')[1]
-                    }
-                
-                dashboard_data["current_prices"] = prices
-                
-        except Exception as e:
-            logger.warning(f"현재가 조회 실패: {str(e)}")
-            dashboard_data["current_prices"] = {}
-        
-        # 4. 매수 조건 간단 요약 (처음 3개 코인만)
-        try:
-            from ..services.signal_analyzer import signal_analyzer
-            
-            conditions = []
-            for market in list(DEFAULT_MARKETS)[:3]:  # 처음 3개만
-                coin_symbol = market.split('-')[1]
-                config = MTFA_OPTIMIZED_CONFIG.get(market, MTFA_OPTIMIZED_CONFIG.get("KRW-BTC", {}))
-                
-                # MTFA 최적화된 파라미터 사용
-                params = {
-                    "volume_surge": 2.0,
-                    "price_change": 0.5,
-                    "mtfa_threshold": config.get("mtfa_threshold", 0.80),
-                    "rsi_period": 14,
-                    "ema_periods": [5, 20],
-                    "volume_window": 24
-                }
-                signal = await signal_analyzer.check_buy_signal(market, params)
-                
-                conditions.append({
-                    "market": market,
-                    "coin": coin_symbol,
-                    "status": "가능o" if signal else "조건x",
-                    "signal_strength": signal.get("signal_strength", 0) if signal else 0
-                })
-                
-                # API 과부하 방지를 위해 짧은 대기
-                await asyncio.sleep(0.5)
-            
-            dashboard_data["buy_conditions"] = conditions
-            
-        except Exception as e:
-            logger.warning(f"매수 조건 조회 실패: {str(e)}")
-            dashboard_data["buy_conditions"] = []
+        headers = {"ETag": snapshot.etag, "X-Snapshot-Version": str(snapshot.version), "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == snapshot.etag:
+            dashboard_snapshot_service.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
         
-        return dashboard_data
+        dashboard_snapshot_service.stats["served"] += 1
+        return Response(content=snapshot.body, media_type="application/json", headers=headers)
         
     except Exception as e:
         logger.error(f"대시보드 데이터 조회 오류: {str(e)}")
@@ -17,88 +17,92 @@
 
 router = APIRouter(tags=["거래내역"])
 
+def _ledger_user(current_user: Dict[str, Any]) -> int:
+    """원장 조회 사용자 - 인증 사용자 ID"""
+    return int(current_user.get("id", 0))
+
+def _open_positions(user_id: int) -> Dict[str, Any]:
+    """현재 보유 포지션 (세션이 있으면 세션 거래 상태, 없으면 전역 상태)"""
+    from ..session import session_manager
+    
+    user_session = session_manager.get_session(user_id)
+    state = user_session.trading_state if user_session else trading_state
+    return dict(state.positions)
+
 @router.get("/trading-logs")
 async def get_trading_logs(
     days: int = Query(default=7, ge=1, le=365, description="조회 기간 (일)"),
     market: Optional[str] = Query(default=None, description="특정 마켓 필터"),
-    status: Optional[str] = Query(default=None, description="거래 상태 필터 (completed, failed, active)"),
+    event: Optional[str] = Query(default=None, description="기록 종류 필터 (fill: 체결, close: 청산 완료)"),
     limit: int = Query(default=100, ge=1, le=1000, description="최대 조회 건수"),
-    offset: int = Query(default=0, ge=0, description="시작 오프셋"),
+    cursor: Optional[str] = Query(default=None, description="다음 페이지 커서 (이전 응답의 next_cursor)"),
     current_user: Dict[str, Any] = Depends(require_auth)
 ):
-    """거래 내역 조회"""
+    """거래 내역 조회 - 거래 원장 키셋 페이지네이션 (최신순)"""
     try:
+        from ..services.trade_ledger import trade_ledger, decode_cursor
+        
+        if event and event not in ("fill", "close"):
+            raise HTTPException(status_code=400, detail=f"지원하지 않는 기록 종류: {event}")
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"잘못된 페이지 커서: {cursor}")
+        
         # 기간 설정
         end_date = utc_now()
         start_date = end_date - timedelta(days=days)
         
-        # 실제 거래 내역 (현재는 trading_state의 positions 사용)
-        positions = trading_state.positions.copy()
-        
-        # 필터링
-        filtered_positions = []
-        for position in positions:
-            # 마켓 필터
-            if market and position.market != market:
-                continue
-            
-            # 상태 필터  
-            if status:
-                if status == "completed" and not position.is_closed:
-                    continue
-                elif status == "active" and position.is_closed:
-                    continue
-            
-            filtered_positions.append(position)
-        
-        # 정렬 (최신순)
-        filtered_positions.sort(key=lambda x: x.created_at, reverse=True)
-        
-        # 페이지네이션
-        total_count = len(filtered_positions)
-        paginated_positions = filtered_positions[offset:offset + limit]
+        page = await trade_ledger.get_entries(
+            _ledger_user(current_user), int(start_date.timestamp()),
+            market=market, event=event, limit=limit, cursor=cursor
+        )
         
         # 응답 데이터 구성
         trading_logs = []
-        for position in paginated_positions:
-            log_entry = {
-                "id": f"pos_{position.market}_{int(position.created_at.timestamp())}",
-                "market": position.market,
-                "symbol": position.market.split('-')[1],
-                "type": "buy" if position.amount > 0 else "sell",
-                "amount": abs(position.amount),
-                "buy_price": position.buy_price,
-                "current_price": position.current_price,
-                "profit_loss": position.profit_loss,
-                "profit_loss_rate": position.profit_loss_rate,
-                "status": "completed" if position.is_closed else "active",
-                "created_at": position.created_at.isoformat(),
-                "updated_at": position.updated_at.isoformat() if hasattr(position, 'updated_at') else position.created_at.isoformat(),
-                "closed_at": position.closed_at.isoformat() if hasattr(position, 'closed_at') and position.closed_at else None,
-                "duration": position.holding_time_minutes if hasattr(position, 'holding_time_minutes') else 0,
-                "fees": 0.05,  # 업비트 수수료 (0.05%)
-            }
-            trading_logs.append(log_entry)
+        for entry in page["entries"]:
+            created_at = datetime.fromtimestamp(entry["ts"], tz=end_date.tzinfo)
+            trading_logs.append({
+                "id": entry["id"],
+                "market": entry["market"],
+                "symbol": entry["market"].split('-')[1],
+                "type": "buy" if entry["side"] == "bid" else "sell",
+                "event": entry["event"],
+                "price": entry["price"],
+                "amount": entry["amount"],
+                "total": round(entry["total"], 2),
+                "fee": round(entry["fee"], 2),
+                "profit_loss": round(entry["profit_loss"], 2) if entry["profit_loss"] is not None else None,
+                "profit_loss_rate": round(entry["profit_rate"], 4) if entry["profit_rate"] is not None else None,
+                "duration": round(entry["hold_seconds"] / 60, 1) if entry["hold_seconds"] is not None else None,
+                "reason": entry["reason"],
+                "order_id": entry["order_id"],
+                "status": "completed" if entry["event"] == "close" else "filled",
+                "created_at": created_at.isoformat()
+            })
         
         return {
             "success": True,
             "data": {
                 "logs": trading_logs,
                 "pagination": {
-                    "total": total_count,
                     "limit": limit,
-                    "offset": offset,
-                    "has_next": offset + limit < total_count,
-                    "has_prev": offset > 0
+                    "cursor": cursor,
+                    "next_cursor": page["next_cursor"],
+                    "has_next": page["has_next"],
+                    "has_prev": cursor is not None
                 },
                 "filters": {
                     "days": days,
                     "market": market,
-                    "status": status
+                    "event": event
                 }
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"거래 내역 조회 실패: {str(e)}")
 
@@ -108,78 +112,24 @@ async def get_trading_statistics(
     market: Optional[str] = Query(default=None, description="특정 마켓 필터"),
     current_user: Dict[str, Any] = Depends(require_auth)
 ):
-    """거래 통계 조회"""
+    """거래 통계 조회 - 원장 기록 시 누적한 (마켓, 일, 시) 집계 합산"""
     try:
+        from ..services.trade_ledger import trade_ledger
+        
         # 기간 설정
         end_date = utc_now()
         start_date = end_date - timedelta(days=days)
         
-        # 현재 포지션들에서 통계 계산
-        positions = trading_state.positions.copy()
+        user_id = _ledger_user(current_user)
+        stats = await trade_ledger.get_statistics(user_id, int(start_date.timestamp()), market=market)
+        summary = stats["summary"]
         
-        # 필터링
+        open_positions = _open_positions(user_id)
         if market:
-            positions = [p for p in positions if p.market == market]
-        
-        # 기본 통계
-        total_trades = len(positions)
-        completed_trades = len([p for p in positions if p.is_closed])
-        active_trades = total_trades - completed_trades
-        
-        # 손익 통계
-        total_profit_loss = sum(p.profit_loss for p in positions)
-        profitable_trades = len([p for p in positions if p.profit_loss > 0])
-        loss_trades = len([p for p in positions if p.profit_loss < 0])
+            open_positions = {coin: p for coin, p in open_positions.items() if f"KRW-{coin}" == market}
         
-        win_rate = (profitable_trades / total_trades * 100) if total_trades > 0 else 0
-        
-        # 거래량 통계
-        total_volume = sum(p.amount * p.buy_price for p in positions)
-        avg_position_size = total_volume / total_trades if total_trades > 0 else 0
-        
-        # 수수료 계산
-        total_fees = total_volume * 0.0005  # 업비트 수수료 0.05%
-        
-        # 마켓별 통계
-        market_stats = {}
-        for position in positions:
-            market_key = position.market
-            if market_key not in market_stats:
-                market_stats[market_key] = {
-                    "symbol": market_key.split('-')[1],
-                    "trades": 0,
-                    "profit_loss": 0,
-                    "volume": 0,
-                    "win_rate": 0
-                }
-            
-            market_stats[market_key]["trades"] += 1
-            market_stats[market_key]["profit_loss"] += position.profit_loss
-            market_stats[market_key]["volume"] += position.amount * position.buy_price
-        
-        # 마켓별 승률 계산
-        for market_key in market_stats:
-            market_positions = [p for p in positions if p.market == market_key]
-            profitable_count = len([p for p in market_positions if p.profit_loss > 0])
-            market_stats[market_key]["win_rate"] = (profitable_count / len(market_positions) * 100) if market_positions else 0
-        
-        # 시간별 통계 (24시간 구간)
-        hourly_stats = {}
-        for i in range(24):
-            hourly_stats[i] = {
-                "hour": i,
-                "trades": 0,
-                "profit_loss": 0,
-                "volume": 0
-            }
-        
-        # 포지션들을 시간대별로 분류
-        for position in positions:
-            hour = position.created_at.hour
-            if hour in hourly_stats:
-                hourly_stats[hour]["trades"] += 1
-                hourly_stats[hour]["profit_loss"] += position.profit_loss
-                hourly_stats[hour]["volume"] += position.amount * position.buy_price
+        completed_trades = int(summary["trades"])
+        total_volume = summary["volume"]  # 청산 완료 거래의 매수 금액 합 (fill_volume은 매수+매도 체결 금액)
         
         return {
             "success": True,
@@ -188,43 +138,48 @@ async def get_trading_statistics(
                     "days": days,
                     "start_date": start_date.isoformat(),
                     "end_date": end_date.isoformat(),
+                    "aggregated_from": datetime.fromtimestamp(stats["since_day_ts"], tz=end_date.tzinfo).isoformat(),
                     "market_filter": market
                 },
                 "summary": {
-                    "total_trades": total_trades,
+                    "total_trades": completed_trades + len(open_positions),
                     "completed_trades": completed_trades,
-                    "active_trades": active_trades,
-                    "profitable_trades": profitable_trades,
-                    "loss_trades": loss_trades,
-                    "win_rate": round(win_rate, 2),
-                    "total_profit_loss": round(total_profit_loss, 2),
+                    "active_trades": len(open_positions),
+                    "profitable_trades": int(summary["wins"]),
+                    "loss_trades": int(summary["losses"]),
+                    "win_rate": round(summary["win_rate"], 2),
+                    "total_profit_loss": round(summary["profit_loss"], 2),
                     "total_volume": round(total_volume, 2),
-                    "avg_position_size": round(avg_position_size, 2),
-                    "total_fees": round(total_fees, 2),
-                    "net_profit": round(total_profit_loss - total_fees, 2)
+                    "avg_position_size": round(summary["volume"] / completed_trades, 2) if completed_trades else 0,
+                    "total_fees": round(summary["fees"], 2),
+                    "net_profit": round(summary["profit_loss"], 2),  # 청산 손익이 이미 매수/매도 수수료 차감 후 값
+                    "profit_factor": round(summary["profit_factor"], 2) if summary["profit_factor"] is not None else None,
+                    "avg_hold_minutes": round(summary["avg_hold_minutes"], 1)
                 },
                 "market_breakdown": [
                     {
                         "market": market_key,
-                        "symbol": stats["symbol"],
-                        "trades": stats["trades"],
-                        "profit_loss": round(stats["profit_loss"], 2),
-                        "volume": round(stats["volume"], 2),
-                        "win_rate": round(stats["win_rate"], 2),
-                        "percentage": round((stats["trades"] / total_trades * 100), 2) if total_trades > 0 else 0
+                        "symbol": market_key.split('-')[1],
+                        "trades": int(values["trades"]),
+                        "profit_loss": round(values["profit_loss"], 2),
+                        "volume": round(values["volume"], 2),
+                        "win_rate": round(values["win_rate"], 2),
+                        "percentage": round(values["trades"] / completed_trades * 100, 2) if completed_trades else 0
                     }
-                    for market_key, stats in market_stats.items()
+                    for market_key, values in sorted(stats["markets"].items(),
+                                                     key=lambda item: item[1]["profit_loss"], reverse=True)
                 ],
                 "hourly_breakdown": [
                     {
                         "hour": hour,
-                        "trades": stats["trades"],
-                        "profit_loss": round(stats["profit_loss"], 2),
-                        "volume": round(stats["volume"], 2),
-                        "avg_profit_per_trade": round(stats["profit_loss"] / stats["trades"], 2) if stats["trades"] > 0 else 0
+                        "trades": int(values["trades"]),
+                        "profit_loss": round(values["profit_loss"], 2),
+                        "volume": round(values["volume"], 2),
+                        "win_rate": round(values["win_rate"], 2),
+                        "avg_profit_per_trade": round(values["profit_loss"] / values["trades"], 2) if values["trades"] else 0
                     }
-                    for hour, stats in hourly_stats.items()
-                    if stats["trades"] > 0
+                    for hour, values in stats["hours"].items()
+                    if values["trades"] > 0
                 ]
             }
         }
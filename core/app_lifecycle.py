@@ -176,6 +176,13 @@ async def shutdown(self):
         # 비즈니스 서비스 중지
         self.service_manager.stop_services()
 
+        # 대기 중인 거래 원장 기록 마무리
+        try:
+            from core.services.trade_ledger import trade_ledger
+            await trade_ledger.flush()
+        except Exception as e:
+            logger.warning(f"⚠️ 거래 원장 기록 마무리 실패: {str(e)}")
+
         # 시스템 서비스 중지
         self.system_manager.stop_sleep_prevention()
 
@@ -15,6 +15,8 @@
 from sqlalchemy.orm import DeclarativeBase
 from dotenv import load_dotenv
 
+from ..utils.instrumentation import instrument_sqlalchemy
+
 # 설정 로드
 load_dotenv()
 
@@ -44,6 +46,7 @@ class Base(DeclarativeBase):
     pool_recycle=3600,  # 연결 재활용 시간 (1시간)
     pool_pre_ping=True,  # 연결 상태 확인
 )
+instrument_sqlalchemy(mysql_engine, "mysql")
 
 # 세션 팩토리 생성
 AsyncSessionLocal = async_sessionmaker(
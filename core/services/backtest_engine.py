@@ -0,0 +1,339 @@
+"""
+이벤트 기반 백테스트 엔진
+- 저장된 1분봉(열 아카이브 우선, 없으면 candles 테이블)으로 SignalAnalyzer 진입 로직과 Position 청산 규칙을 재현
+- 진입: 거래량 급증/가격 변동 조건은 전체 구간을 누적합으로 한 번에 거르고, 통과한 후보 봉만 20개 캔들 윈도우를 배열로 평가
+- 6단계 MTFA 게이트: 1분봉을 실시간과 같은 MTFA 엔진에 흘려 후보 봉 시점 신뢰도가 mtfa_threshold 이상인지 확인
+- 청산: 거래마다 최대 보유 구간만 잘라 손절/트레일링 스탑/익절/최대 보유 시간을 배열 연산으로 판정 (수수료/슬리피지 반영)
+- 계산은 이벤트 루프 밖(executor)에서 실행
+"""
+
+import asyncio
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import MTFA_OPTIMIZED_CONFIG, get_risk_reward_from_confidence
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 20          # SignalAnalyzer.min_candles
+UPBIT_FEE = 0.0005   # 업비트 KRW 마켓 거래 수수료 (매수/매도 각각)
+
+def default_params(market: str) -> Dict[str, Any]:
+    """엔진과 같은 진입 파라미터 + MTFA 최적화 청산 설정"""
+    market_config = MTFA_OPTIMIZED_CONFIG.get(market, MTFA_OPTIMIZED_CONFIG["KRW-BTC"])
+    return {
+        # 진입 (MultiCoinTradingEngine._build_signal_params와 동일)
+        "volume_mult": 1.5,
+        "price_change": 0.3,
+        "candle_pos": 0.6,
+        "mtfa_threshold": market_config.get("mtfa_threshold", 0.80),
+        # 청산
+        "profit_target": market_config.get("profit_target", 2.5),
+        "stop_loss": market_config.get("stop_loss", -1.0),
+        "max_hold_minutes": market_config.get("max_hold_minutes", 60),
+        "trailing_activation": 0.2,  # Position: 0.2% 수익에서 트레일링 스탑 활성화
+        "trailing_percent": 0.1,     # Position: 최고가 대비 0.1% 하락 시 청산
+        # 비용
+        "fee": UPBIT_FEE,
+        "slippage": 0.0005
+    }
+
+
+def _windows(values: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """후보 봉별 직전 WINDOW개 값 (K, WINDOW)"""
+    return values[index[:, None] + np.arange(-WINDOW + 1, 1)]
+
+def _sequential_sum(matrix: np.ndarray) -> np.ndarray:
+    """열 순서대로 누적 (파이썬 sum과 같은 순서)"""
+    total = np.zeros(matrix.shape[0])
+    for column in range(matrix.shape[1]):
+        total = total + matrix[:, column]
+    return total
+
+def _clean_outliers(matrix: np.ndarray, threshold: float = 3.0) -> np.ndarray:
+    """SignalAnalyzer._handle_outliers 행 단위 적용 (중앙값/MAD 기반 modified z-score)"""
+    median = np.median(matrix, axis=1)
+    mad = np.median(np.abs(matrix - median[:, None]), axis=1)
+    safe_mad = np.where(mad == 0, 1.0, mad)
+    modified_z = 0.6745 * (matrix - median[:, None]) / safe_mad[:, None]
+    outlier = (np.abs(modified_z) > threshold) & (mad != 0)[:, None]
+    return np.where(outlier, median[:, None], matrix)
+
+def _ema(matrix: np.ndarray, period: int) -> np.ndarray:
+    multiplier = 2 / (period + 1)
+    ema = matrix[:, 0]
+    for column in range(1, matrix.shape[1]):
+        ema = (matrix[:, column] * multiplier) + (ema * (1 - multiplier))
+    return ema
+
+def _rsi(matrix: np.ndarray, period: int = 14) -> np.ndarray:
+    changes = np.diff(matrix, axis=1)[:, -period:]
+    avg_gain = _sequential_sum(np.where(changes > 0, changes, 0.0)) / period
+    avg_loss = _sequential_sum(np.where(changes > 0, 0.0, np.abs(changes))) / period
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    return np.where(avg_loss == 0, 100.0, rsi)
+
+
+def entry_signals(data: Dict[str, np.ndarray], params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """모든 봉에 대해 SignalAnalyzer.evaluate_buy_signal(지표 엔진 미사용 경로)과 같은 판정
+
+    반환: 신호 봉 인덱스와 신호 강도/기술 점수(신뢰도)/MTFA 신뢰도 (MTFA 준비 전 봉은 NaN - 실시간과 같이 게이트 생략)
+    """
+    from .mtfa_engine import confidence_at
+
+    opens, highs, lows, closes, volumes = (data[column] for column in ("open", "high", "low", "close", "volume"))
+    count = len(closes)
+    empty = {"index": np.empty(0, dtype=np.int64), "strength": np.empty(0), "confidence": np.empty(0),
+             "surge_ratio": np.empty(0), "price_change": np.empty(0), "mtfa_confidence": np.empty(0)}
+    if count < WINDOW:
+        return empty
+
+    # 1) 거래량 급증 / 가격 변동 - 누적합으로 전체 봉 사전 필터
+    prefix = np.concatenate(([0.0], np.cumsum(volumes)))
+    index = np.arange(WINDOW - 1, count)
+    recent = (prefix[index + 1] - prefix[index - 2]) / 3
+    historical = (prefix[index - 2] - prefix[index - WINDOW + 1]) / (WINDOW - 3)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(historical > 0, recent / historical, 0.0)
+        price_change = (closes[index] - closes[index - 4]) / closes[index - 4] * 100
+    candidate = (ratio >= params["volume_mult"] * (1 - 1e-9)) & (price_change >= params["price_change"])
+    index = index[candidate]
+    if not len(index):
+        return empty
+
+    # 2) 후보 봉 윈도우 정밀 평가
+    window_volumes = _windows(volumes, index)
+    recent = _sequential_sum(window_volumes[:, -3:]) / 3
+    historical = _sequential_sum(window_volumes[:, :-3]) / (WINDOW - 3)
+    ratio = np.where(historical > 0, recent / np.where(historical > 0, historical, 1.0), 0.0)
+    is_surge = (historical > 0) & (ratio >= params["volume_mult"])
+    price_change = (closes[index] - closes[index - 4]) / closes[index - 4] * 100
+
+    window_closes = _windows(closes, index)
+    clean_closes = _clean_outliers(window_closes)
+    clean_volumes = _clean_outliers(window_volumes)
+    ema5, ema10, rsi = _ema(clean_closes, 5), _ema(clean_closes, 10), _rsi(clean_closes, 14)
+
+    typical = (_windows(highs, index) + _windows(lows, index) + window_closes) / 3
+    total_volume = _sequential_sum(window_volumes)
+    vwap = np.where(total_volume > 0,
+                    _sequential_sum(typical * window_volumes) / np.where(total_volume > 0, total_volume, 1.0), 0.0)
+
+    technical = (
+        np.where(ema5 > ema10, 25, 0)
+        + np.where((rsi > 30) & (rsi < 70), 20, 0)
+        + np.where(clean_closes[:, -1] > vwap, 25, 0)
+        + np.where(clean_closes[:, -1] > clean_closes[:, -3], 15, 0)
+        + np.where(clean_volumes[:, -1] > clean_volumes[:, -2], 15, 0)
+    )
+
+    latest_open, latest_high, latest_low, latest_close = opens[index], highs[index], lows[index], closes[index]
+    prev_close, prev_volume = closes[index - 1], volumes[index - 1]
+    candle_range = latest_high - latest_low
+    position = np.where(candle_range > 0, (latest_close - latest_low) / np.where(candle_range > 0, candle_range, 1.0), 0.0)
+    pattern = (
+        np.where(latest_close > latest_open, 30, 0)
+        + np.where(latest_close > prev_close, 25, 0)
+        + np.where((candle_range > 0) & (position >= params.get("candle_pos", 0.6)), 25, 0)
+        + np.where((volumes[index] > prev_volume) & (latest_close > prev_close), 20, 0)
+    )
+
+    # 3) 종합 신호 강도 (SignalAnalyzer._calculate_signal_strength)
+    strength = (
+        np.select([ratio >= 3.0, ratio >= 2.0, ratio >= 1.5], [30, 20, 15], 0)
+        + np.minimum(technical * 0.3, 30)
+        + np.minimum(pattern * 0.2, 20)
+        + np.select([price_change >= 1.0, price_change >= 0.5, price_change >= 0.3, price_change >= 0.1],
+                    [20, 15, 10, 5], 0)
+    )
+    strength = np.minimum(strength.astype(np.int64), 100)
+
+    passed = (is_surge & (price_change >= params["price_change"]) & (technical >= 50) & (pattern >= 50)
+              & (strength >= params["mtfa_threshold"] * 100))
+
+    # 4) 6단계 MTFA 게이트 (SignalAnalyzer와 동일 - 신뢰도가 있으면 임계값 이상이어야 통과)
+    mtfa_confidence = confidence_at(data, index[passed])
+    gate = mtfa_gate(mtfa_confidence, params["mtfa_threshold"])
+    return {
+        "index": index[passed][gate],
+        "strength": strength[passed][gate],
+        "confidence": np.minimum(technical[passed][gate], 100) / 100,
+        "surge_ratio": ratio[passed][gate],
+        "price_change": price_change[passed][gate],
+        "mtfa_confidence": mtfa_confidence[gate]
+    }
+
+def mtfa_gate(mtfa_confidence: np.ndarray, mtfa_threshold: float) -> np.ndarray:
+    """MTFA 신뢰도 통과 여부 (NaN = 준비 전이므로 통과)"""
+    with np.errstate(invalid="ignore"):
+        return np.isnan(mtfa_confidence) | (mtfa_confidence * 100 >= mtfa_threshold * 100)
+
+
+def simulate_trades(data: Dict[str, np.ndarray], signals: Dict[str, np.ndarray],
+                    params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """신호 다음 봉 시가 진입 → 보유 구간에서 첫 청산 조건 판정 (마켓당 동시 포지션 1개)"""
+    ts, opens, highs, lows, closes = (data[column] for column in ("ts", "open", "high", "low", "close"))
+    count = len(ts)
+    fee, slippage = params["fee"], params["slippage"]
+    hold_seconds = params["max_hold_minutes"] * 60
+    static_tp, static_sl = params["profit_target"], abs(params["stop_loss"])
+    activation = 1 + params["trailing_activation"] / 100
+    trailing = 1 - params["trailing_percent"] / 100
+
+    trades = []
+    free_from = 0  # 이 봉 이후 신호부터 진입 가능
+    for signal_index, confidence, strength in zip(signals["index"], signals["confidence"], signals["strength"]):
+        entry = int(signal_index) + 1
+        if entry < free_from or entry >= count:
+            continue
+
+        # 엔진과 같은 TP/SL 결정 - 신뢰도 정책과 MTFA 설정 중 보수적인 값
+        dynamic_tp, dynamic_sl = get_risk_reward_from_confidence(float(confidence))
+        tp_pct = min(dynamic_tp, static_tp)
+        sl_pct = max(dynamic_sl, -static_sl)
+
+        buy_price = opens[entry] * (1 + slippage)
+        tp_price = buy_price * (1 + tp_pct / 100)
+        sl_price = buy_price * (1 + sl_pct / 100)
+
+        end = int(np.searchsorted(ts, ts[entry] + hold_seconds, side="left"))
+        bar_low, bar_high, bar_open = lows[entry:end], highs[entry:end], opens[entry:end]
+
+        # 각 봉 시작 시점까지의 최고가 (진입가에서 시작)
+        peak = np.maximum.accumulate(np.concatenate(([buy_price], bar_high)))[:-1]
+        trail_price = peak * trailing
+        trail_hit = (peak > buy_price * activation) & (bar_low <= trail_price)
+        sl_hit = bar_low <= sl_price
+        tp_hit = bar_high >= tp_price
+        hit = np.flatnonzero(trail_hit | sl_hit | tp_hit)
+
+        if len(hit):
+            offset = int(hit[0])
+            exit_index = entry + offset
+            # 같은 봉 안의 순서는 알 수 없으므로 보수적으로 트레일링 → 손절 → 익절 순
+            if trail_hit[offset]:
+                reason, price = "trailing_stop", min(bar_open[offset], trail_price[offset])
+            elif sl_hit[offset]:
+                reason, price = "stop_loss", min(bar_open[offset], sl_price)
+            else:
+                reason, price = "profit_target", max(bar_open[offset], tp_price)
+        elif end < count:
+            exit_index, reason, price = end, "max_time", opens[end]
+        else:
+            exit_index, reason, price = count - 1, "end_of_data", closes[count - 1]
+
+        sell_price = price * (1 - slippage)
+        return_pct = (sell_price * (1 - fee)) / (buy_price * (1 + fee)) * 100 - 100
+        trades.append({
+            "entry_ts": int(ts[entry]),
+            "exit_ts": int(ts[exit_index]),
+            "buy_price": float(buy_price),
+            "sell_price": float(sell_price),
+            "return_pct": float(return_pct),
+            "hold_minutes": float((ts[exit_index] - ts[entry]) / 60),
+            "exit_reason": reason,
+            "signal_strength": int(strength),
+            "confidence": float(confidence)
+        })
+        free_from = exit_index + 1
+    return trades
+
+
+def summarize(trades: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """거래 목록 성과 요약 (전액 재투자 복리 기준)"""
+    if not trades:
+        return {"total_return": 0.0, "win_rate": 0.0, "total_trades": 0, "profit_factor": 0.0,
+                "average_return": 0.0, "max_drawdown": 0.0, "average_hold_minutes": 0.0, "exit_reasons": {}}
+
+    returns = np.array([trade["return_pct"] for trade in trades]) / 100
+    equity = np.cumprod(1 + returns)
+    peak = np.maximum.accumulate(np.concatenate(([1.0], equity)))[1:]
+    gross_profit = returns[returns > 0].sum()
+    gross_loss = -returns[returns < 0].sum()
+
+    exit_reasons: Dict[str, int] = {}
+    for trade in trades:
+        exit_reasons[trade["exit_reason"]] = exit_reasons.get(trade["exit_reason"], 0) + 1
+
+    return {
+        "total_return": round(float(equity[-1] - 1) * 100, 4),
+        "win_rate": round(float((returns > 0).mean()) * 100, 2),
+        "total_trades": len(trades),
+        "profit_factor": round(float(gross_profit / gross_loss), 4) if gross_loss > 0 else None,
+        "average_return": round(float(returns.mean()) * 100, 4),
+        "max_drawdown": round(float(((equity - peak) / peak).min()) * 100, 4),
+        "average_hold_minutes": round(float(np.mean([trade["hold_minutes"] for trade in trades])), 2),
+        "exit_reasons": exit_reasons
+    }
+
+
+class BacktestEngine:
+    """저장된 1분봉 기반 백테스트 실행기"""
+
+    def __init__(self):
+        self.stats = {"runs": 0, "bars": 0, "last_run_seconds": 0.0}
+
+    async def load_candles(self, market: str, start_ts: int, end_ts: int) -> Dict[str, np.ndarray]:
+        """1분봉 열 배열 - 열 아카이브에 구간이 있으면 memmap, 아니면 candles 테이블 조회"""
+        from ..utils.candle_archive import candle_archive, COLUMNS
+
+        index = candle_archive.index(market, 1)
+        archived = [summary for summary in index.values() if summary["rows"]]
+        if archived and min(s["ts_min"] for s in archived) <= start_ts + 86400 \
+                and max(s["ts_max"] for s in archived) >= end_ts - 3600:
+            return candle_archive.read(market, 1, start_ts, end_ts)
+
+        from database import async_engine
+        sql = ("SELECT ts, open, high, low, close, volume FROM candles "
+               "WHERE market = ? AND unit = 1 AND ts BETWEEN ? AND ? ORDER BY ts")
+        if async_engine.dialect.paramstyle != "qmark":
+            sql = sql.replace("?", "%s")
+        async with async_engine.connect() as conn:
+            rows = (await conn.exec_driver_sql(sql, (market, start_ts, end_ts))).fetchall()
+
+        array = np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+        data = {column: np.ascontiguousarray(array[:, position]) for position, column in enumerate(COLUMNS)}
+        data["ts"] = array[:, 0].astype(np.int64)
+        return data
+
+    def run_on_data(self, market: str, data: Dict[str, np.ndarray],
+                    params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """배열 데이터 백테스트 (동기, CPU 전용)"""
+        params = {**default_params(market), **(params or {})}
+        started = time.perf_counter()
+        signals = entry_signals(data, params)
+        trades = simulate_trades(data, signals, params)
+        elapsed = time.perf_counter() - started
+
+        self.stats["runs"] += 1
+        self.stats["bars"] += len(data["ts"])
+        self.stats["last_run_seconds"] = round(elapsed, 3)
+        return {
+            "market": market,
+            "params": params,
+            "bars": int(len(data["ts"])),
+            "signals": int(len(signals["index"])),
+            "performance": summarize(trades),
+            "trades": trades,
+            "seconds": round(elapsed, 3)
+        }
+
+    async def run(self, market: str, days: int = 30, params: Optional[Dict[str, Any]] = None,
+                  end_ts: Optional[int] = None) -> Dict[str, Any]:
+        end_ts = int(time.time()) if end_ts is None else end_ts
+        start_ts = end_ts - days * 86400
+        data = await self.load_candles(market, start_ts, end_ts)
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, self.run_on_data, market, data, params)
+        result["period"] = {"start_ts": start_ts, "end_ts": end_ts, "days": days}
+        logger.info(f"📈 {market} 백테스트 완료 - {result['bars']:,}봉, 거래 {result['performance']['total_trades']}회, "
+                    f"수익률 {result['performance']['total_return']:.2f}% ({result['seconds']:.2f}초)")
+        return result
+
+# 전역 백테스트 엔진 인스턴스
+backtest_engine = BacktestEngine()
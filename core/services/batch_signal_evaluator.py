@@ -0,0 +1,336 @@
+"""
+벡터화 배치 신호 평가기
+- M개 마켓의 캔들을 연속 (M × T × OHLCV) 배열로 보관
+- EMA, RSI, VWAP, 가격 변동률, 캔들 포지션, 종합 신호 강도를 전 마켓 동시 계산
+- 실시간 경로(SignalAnalyzer.check_buy_signal)와 같은 규칙: 증분 지표 엔진이 준비된 마켓은 엔진 값을 사용하고,
+  6단계에서 MTFA 신뢰도 게이트 적용
+- 계산 순서를 SignalAnalyzer 스칼라 경로와 동일하게 유지하여 결과 일치
+"""
+
+import asyncio
+import time
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .signal_analyzer import signal_analyzer
+from .market_data_service import market_data_service
+from .indicator_engine import indicator_engine, MarketIndicators
+from .mtfa_engine import mtfa_engine
+
+logger = logging.getLogger(__name__)
+
+# OHLCV 축 인덱스
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+
+@dataclass
+class CandleBatch:
+    """M개 마켓 × T개 캔들 × OHLCV 연속 배열 (시간순, 최신 캔들이 마지막)"""
+    markets: List[str]
+    data: np.ndarray  # shape (M, T, 5), float64
+
+    @classmethod
+    def from_candle_windows(cls, windows: Dict[str, List[Dict]], length: int = 20) -> "CandleBatch":
+        """SignalAnalyzer 형식 캔들 윈도우에서 배치 생성 (length개 미만 마켓은 제외)"""
+        markets = [market for market, candles in windows.items() if candles and len(candles) >= length]
+        data = np.empty((len(markets), length, 5), dtype=np.float64)
+        for i, market in enumerate(markets):
+            window = windows[market][-length:]
+            data[i] = [[c["open"], c["high"], c["low"], c["close"], c["volume"]] for c in window]
+        return cls(markets=markets, data=np.ascontiguousarray(data))
+
+    def __len__(self) -> int:
+        return len(self.markets)
+
+
+class BatchSignalEvaluator:
+    """전 마켓 매수 신호 일괄 평가 (SignalAnalyzer.evaluate_buy_signal의 벡터화 버전)"""
+
+    def __init__(self, window: int = 20):
+        self.window = window
+        self.outlier_threshold = 3.0
+
+    # ----- 벡터화 지표 (SignalAnalyzer 스칼라 구현과 연산 순서 동일) -----
+
+    @staticmethod
+    def _sequential_sum(values: np.ndarray) -> np.ndarray:
+        """마지막 축을 왼쪽부터 순차 누적 (파이썬 sum()과 동일한 부동소수점 결과)"""
+        total = np.zeros(values.shape[:-1], dtype=np.float64)
+        for j in range(values.shape[-1]):
+            total = total + values[..., j]
+        return total
+
+    def _handle_outliers(self, values: np.ndarray) -> np.ndarray:
+        """행별 robust z-score 이상값을 중앙값으로 대체"""
+        if values.shape[1] < 5:
+            return values
+        median = np.median(values, axis=1, keepdims=True)
+        mad = np.median(np.abs(values - median), axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            modified_z = 0.6745 * (values - median) / mad
+        outliers = (mad != 0) & (np.abs(modified_z) > self.outlier_threshold)
+        return np.where(outliers, median, values)
+
+    @staticmethod
+    def _ema(prices: np.ndarray, period: int) -> np.ndarray:
+        if prices.shape[1] < period:
+            return prices.mean(axis=1)
+        multiplier = 2 / (period + 1)
+        ema = prices[:, 0]
+        for j in range(1, prices.shape[1]):
+            ema = (prices[:, j] * multiplier) + (ema * (1 - multiplier))
+        return ema
+
+    def _rsi(self, prices: np.ndarray, period: int = 14) -> np.ndarray:
+        if prices.shape[1] < period + 1:
+            return np.full(prices.shape[0], 50.0)
+        changes = np.diff(prices, axis=1)
+        gains = np.where(changes > 0, changes, 0.0)
+        losses = np.where(changes > 0, 0.0, np.abs(changes))
+        avg_gain = self._sequential_sum(gains[:, -period:]) / period
+        avg_loss = self._sequential_sum(losses[:, -period:]) / period
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+        return np.where(avg_loss == 0, 100.0, rsi)
+
+    def _vwap(self, data: np.ndarray) -> np.ndarray:
+        typical_price = (data[:, :, HIGH] + data[:, :, LOW] + data[:, :, CLOSE]) / 3
+        total_price_volume = self._sequential_sum(typical_price * data[:, :, VOLUME])
+        total_volume = self._sequential_sum(data[:, :, VOLUME])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = total_price_volume / total_volume
+        return np.where(total_volume == 0, 0.0, vwap)
+
+    # ----- 평가 -----
+
+    def _valid_rows(self, data: np.ndarray) -> np.ndarray:
+        """스칼라 경로의 NaN/무한대/0 가격 필터가 아무것도 걸러내지 않는 행만 True"""
+        closes = data[:, :, CLOSE]
+        volumes = data[:, :, VOLUME]
+        finite = np.isfinite(data).all(axis=(1, 2))
+        return finite & (closes > 0).all(axis=1) & (volumes >= 0).all(axis=1)
+
+    @staticmethod
+    def _engine_values(batch: CandleBatch, indicators: Dict[str, MarketIndicators]) -> Dict[str, np.ndarray]:
+        """증분 지표 엔진 값 (마켓당 조회 O(1)) - 엔진이 없는 마켓은 NaN, 준비 전 마켓은 거래량 평균만"""
+        values = {name: np.full(len(batch), np.nan) for name in (
+            "recent_volume", "historical_volume", "ema5", "ema10", "rsi", "vwap",
+            "close_last", "close_third", "volume_last", "volume_prev")}
+        for i, market in enumerate(batch.markets):
+            state = indicators.get(market)
+            if state is None:
+                continue
+            values["recent_volume"][i] = state.recent_volume_mean()
+            values["historical_volume"][i] = state.historical_volume_mean()
+            if state.is_ready:
+                row = batch.data[i]
+                values["ema5"][i], values["ema10"][i] = state.ema(5), state.ema(10)
+                values["rsi"][i], values["vwap"][i] = state.rsi(), state.vwap()
+                values["close_last"][i] = state.close_median.clip(row[-1, CLOSE])
+                values["close_third"][i] = state.close_median.clip(row[-3, CLOSE])
+                values["volume_last"][i] = state.volume_median.clip(row[-1, VOLUME])
+                values["volume_prev"][i] = state.volume_median.clip(row[-2, VOLUME])
+        return values
+
+    def evaluate(self, batch: CandleBatch, params: Dict,
+                 mtfa_thresholds: Optional[Dict[str, float]] = None,
+                 indicators: Optional[Dict[str, MarketIndicators]] = None,
+                 mtfa_confidences: Optional[Dict[str, Optional[float]]] = None) -> Dict[str, Dict]:
+        """배치 전체 평가 - 마켓별 단계 결과와 최종 매수 여부 반환
+
+        indicators: 마켓별 증분 지표 상태 (있으면 실시간 경로처럼 엔진 값 사용)
+        mtfa_confidences: 마켓별 MTFA 신뢰도 (0~1, None은 준비 전 - 게이트 생략)
+        """
+        if len(batch) == 0:
+            return {}
+        indicators = indicators or {}
+        mtfa_confidences = mtfa_confidences or {}
+
+        data = batch.data
+        closes_raw = data[:, :, CLOSE]
+        volumes_raw = data[:, :, VOLUME]
+        length = data.shape[1]
+        engine = self._engine_values(batch, indicators)
+        has_engine = ~np.isnan(engine["recent_volume"])
+        engine_ready = ~np.isnan(engine["ema5"])
+
+        # 2. 거래량 급증 (엔진 롤링 평균 또는 원본 거래량)
+        recent_volume = np.where(has_engine, engine["recent_volume"],
+                                 self._sequential_sum(volumes_raw[:, -3:]) / 3)
+        historical_volume = np.where(has_engine, engine["historical_volume"],
+                                     self._sequential_sum(volumes_raw[:, :-3]) / (length - 3))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            surge_ratio = np.where(historical_volume == 0, 0.0, recent_volume / historical_volume)
+        is_surge = (historical_volume != 0) & (surge_ratio >= params.get("volume_mult", 1.5))
+
+        # 3. 가격 변동률 (최근 5분, 원본 종가)
+        past_price = closes_raw[:, -5]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price_change = np.where(past_price == 0, 0.0, ((closes_raw[:, -1] - past_price) / past_price) * 100)
+
+        # 4. 기술적 지표 (엔진 준비 마켓은 엔진 조회값, 나머지는 이상값 처리된 윈도우로 계산)
+        closes = self._handle_outliers(closes_raw)
+        volumes = self._handle_outliers(volumes_raw)
+        ema5 = np.where(engine_ready, engine["ema5"], self._ema(closes, 5))
+        ema10 = np.where(engine_ready, engine["ema10"], self._ema(closes, 10))
+        rsi = np.where(engine_ready, engine["rsi"], self._rsi(closes, 14))
+        vwap = np.where(engine_ready, engine["vwap"], self._vwap(data))
+        close_last = np.where(engine_ready, engine["close_last"], closes[:, -1])
+        close_third = np.where(engine_ready, engine["close_third"], closes[:, -3])
+        volume_last = np.where(engine_ready, engine["volume_last"], volumes[:, -1])
+        volume_prev = np.where(engine_ready, engine["volume_prev"], volumes[:, -2])
+
+        technical_score = (
+            np.where(ema5 > ema10, 25, 0)
+            + np.where((rsi > 30) & (rsi < 70), 20, 0)
+            + np.where(close_last > vwap, 25, 0)
+            + np.where(close_last > close_third, 15, 0)
+            + np.where(volume_last > volume_prev, 15, 0)
+        )
+
+        # 5. 캔들 패턴 (원본 캔들)
+        latest = data[:, -1]
+        prev = data[:, -2]
+        price_up = latest[:, CLOSE] > prev[:, CLOSE]
+        candle_range = latest[:, HIGH] - latest[:, LOW]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            candle_position = np.where(candle_range > 0, (latest[:, CLOSE] - latest[:, LOW]) / candle_range, 0.0)
+        candle_score = (
+            np.where(latest[:, CLOSE] > latest[:, OPEN], 30, 0)
+            + np.where(price_up, 25, 0)
+            + np.where((candle_range > 0) & (candle_position >= params.get("candle_pos", 0.6)), 25, 0)
+            + np.where((latest[:, VOLUME] > prev[:, VOLUME]) & price_up, 20, 0)
+        )
+
+        # 6. 종합 신호 강도 (_calculate_signal_strength와 동일 가중치)
+        strength = np.select(
+            [is_surge & (surge_ratio >= 3.0), is_surge & (surge_ratio >= 2.0), is_surge & (surge_ratio >= 1.5)],
+            [30.0, 20.0, 15.0], default=0.0
+        )
+        strength = strength + np.minimum(technical_score * 0.3, 30)
+        strength = strength + np.minimum(candle_score * 0.2, 20)
+        strength = strength + np.select(
+            [price_change >= 1.0, price_change >= 0.5, price_change >= 0.3, price_change >= 0.1],
+            [20, 15, 10, 5], default=0
+        )
+        signal_strength = np.minimum(strength.astype(np.int64), 100)
+
+        default_threshold = params.get("mtfa_threshold", 0.80)
+        thresholds = np.array([
+            (mtfa_thresholds or {}).get(market, default_threshold) * 100 for market in batch.markets
+        ])
+        # 6단계 MTFA 게이트 - 신뢰도가 있으면 임계값 이상이어야 통과
+        mtfa_confidence = np.array([
+            np.nan if mtfa_confidences.get(market) is None else mtfa_confidences[market] for market in batch.markets
+        ])
+        with np.errstate(invalid="ignore"):
+            mtfa_aligned = np.isnan(mtfa_confidence) | (mtfa_confidence * 100 >= thresholds)
+        should_buy = (
+            is_surge
+            & (price_change >= params.get("price_change", 0.3))
+            & (technical_score >= 50)
+            & (candle_score >= 50)
+            & (signal_strength >= thresholds)
+            & mtfa_aligned
+        )
+
+        valid = self._valid_rows(data)
+        results: Dict[str, Dict] = {}
+        for i, market in enumerate(batch.markets):
+            if not valid[i]:
+                # 유효하지 않은 값이 섞인 마켓은 스칼라 경로로 평가 (필터링 결과가 행마다 달라 벡터화 불가)
+                results[market] = self._evaluate_scalar(market, data[i], params, thresholds[i] / 100,
+                                                        indicators.get(market), mtfa_confidences.get(market))
+                continue
+
+            results[market] = {
+                "market": market,
+                "should_buy": bool(should_buy[i]),
+                "signal_strength": int(signal_strength[i]),
+                "confidence": int(technical_score[i]),
+                "mtfa_confidence": None if np.isnan(mtfa_confidence[i]) else float(mtfa_confidence[i]),
+                "indicator_source": "engine" if engine_ready[i] else "window",
+                "volume_surge_ratio": float(surge_ratio[i]),
+                "price_change": float(price_change[i]),
+                "technical_score": int(technical_score[i]),
+                "candle_score": int(candle_score[i]),
+                "candle_position": float(candle_position[i]),
+                "ema5": float(ema5[i]),
+                "ema10": float(ema10[i]),
+                "rsi": float(rsi[i]),
+                "vwap": float(vwap[i])
+            }
+        return results
+
+    def _evaluate_scalar(self, market: str, rows: np.ndarray, params: Dict, threshold: float,
+                         indicators: Optional[MarketIndicators] = None,
+                         mtfa_confidence: Optional[float] = None) -> Dict:
+        candle_data = [
+            {"timestamp": j, "open": r[OPEN], "high": r[HIGH], "low": r[LOW], "close": r[CLOSE], "volume": r[VOLUME]}
+            for j, r in enumerate(rows.tolist())
+        ]
+        signal = signal_analyzer.evaluate_buy_signal(market, candle_data, {**params, "mtfa_threshold": threshold},
+                                                     indicators=indicators, mtfa_confidence=mtfa_confidence)
+        result = {"market": market, "should_buy": bool(signal and signal["should_buy"])}
+        if signal:
+            result.update({key: signal[key] for key in (
+                "signal_strength", "confidence", "volume_surge_ratio", "price_change", "technical_score", "candle_score"
+            )})
+        return result
+
+    # ----- 전체 KRW 마켓 스캔 -----
+
+    async def scan_krw_markets(self, params: Dict, mtfa_thresholds: Optional[Dict[str, float]] = None,
+                               markets: Optional[List[str]] = None) -> Dict:
+        """KRW 마켓 전체 캔들을 공유 시장 데이터 버스로 수집한 뒤 한 번에 평가
+
+        실시간 경로와 같이 새 캔들을 증분 지표/MTFA 엔진에 반영한 뒤 그 상태로 평가
+        """
+        scan_start = time.time()
+        try:
+            if markets is None:
+                from ..api.system import public_upbit_client
+                markets = await public_upbit_client.get_krw_markets()
+
+            candle_lists = await asyncio.gather(
+                *(market_data_service.get_candles(market, self.window) for market in markets)
+            )
+            windows = {
+                market: [signal_analyzer._normalize_candle(candle) for candle in reversed(candles)]
+                for market, candles in zip(markets, candle_lists) if candles
+            }
+
+            # 증분 엔진 갱신 (새 캔들만 반영, 처음 보는 마켓의 MTFA 상태는 저장된 1분봉으로 초기화)
+            indicators = {market: indicator_engine.update_from_candles(market, window)
+                          for market, window in windows.items()}
+            await asyncio.gather(*(mtfa_engine.ensure_seeded(market) for market in windows))
+            mtfa_confidences = {market: mtfa_engine.update_from_candles(market, window).snapshot()["confidence"]
+                                for market, window in windows.items()}
+
+            fetch_duration = time.time() - scan_start
+            batch = CandleBatch.from_candle_windows(windows, self.window)
+            results = self.evaluate(batch, params, mtfa_thresholds, indicators, mtfa_confidences)
+            evaluate_duration = time.time() - scan_start - fetch_duration
+
+            signals = sorted(
+                (result for result in results.values() if result["should_buy"]),
+                key=lambda result: result["signal_strength"], reverse=True
+            )
+            logger.info(f"📊 KRW 전체 스캔 완료: {len(batch)}/{len(markets)}개 마켓 평가, 매수 신호 {len(signals)}개 (수집 {fetch_duration:.2f}초, 평가 {evaluate_duration * 1000:.1f}ms)")
+
+            return {
+                "markets_requested": len(markets),
+                "markets_evaluated": len(batch),
+                "signals": signals,
+                "results": results,
+                "fetch_duration": fetch_duration,
+                "evaluate_duration": evaluate_duration
+            }
+        except Exception as e:
+            logger.error(f"❌ KRW 전체 스캔 오류: {str(e)}")
+            return {"markets_requested": len(markets or []), "markets_evaluated": 0, "signals": [], "results": {}, "error": str(e)}
+
+# 전역 배치 신호 평가기 인스턴스
+batch_signal_evaluator = BatchSignalEvaluator()
@@ -0,0 +1,395 @@
+"""
+과거 캔들 병렬 수집 (재시작 가능)
+- (market, unit)별로 candles 테이블과 수집 진행 기록을 비교하여 비어 있는 ts 구간 계산
+- 비어 있는 구간을 200개 단위 창으로 나누고, 창마다 독립 요청(to = 창 끝 다음 캔들)으로 동시에 수집
+- 모든 요청은 공유 레이트 리미터(market 그룹, 낮은 우선순위)를 거치므로 실시간 거래 요청을 밀어내지 않음
+- 창을 적재할 때마다 창 안에서 캔들이 없다고 확인된 구간만 진행 기록에 남겨 중단 후 다시 실행하면 남은 구간만 수집
+- 중간 구멍(내부 누락 구간)도 같은 방식으로 감지하여 보충 (거래가 없어 캔들이 없는 구간은 진행 기록으로 구분,
+  수집 후 candles에서 지워진 행은 진행 기록에 없으므로 다시 구멍으로 잡힘)
+"""
+
+import asyncio
+import time
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import aiohttp
+from sqlalchemy import text
+
+from api_client import rate_limiter
+from config import DEFAULT_MARKETS, DEFAULT_YEARS, UNITS, BATCH, CONCURRENCY
+from database import (
+    async_engine, backfill_progress_table, upsert_candles, parse_minutes_payload,
+    iso_utc, UPBIT_BASE, UTC
+)
+from ..utils.instrumentation import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+Interval = Tuple[int, int]  # [시작 ts, 끝 ts] (양끝 포함, 캔들 시작 시각)
+
+def merge_intervals(intervals: Iterable[Interval], step: int) -> List[Interval]:
+    """겹치거나 바로 이어지는 구간 병합"""
+    merged: List[List[int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + step:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+def subtract_intervals(span: Interval, covered: Sequence[Interval], step: int) -> List[Interval]:
+    """span에서 covered(병합된 구간 목록)를 뺀 나머지 구간"""
+    holes = []
+    cursor, end = span
+    for covered_start, covered_end in covered:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            holes.append((cursor, covered_start - step))
+        cursor = max(cursor, covered_end + step)
+        if cursor > end:
+            break
+    if cursor <= end:
+        holes.append((cursor, end))
+    return holes
+
+def split_windows(holes: Iterable[Interval], step: int, size: int = BATCH) -> List[Interval]:
+    """구간을 요청 1회 분량(size개 캔들) 창으로 분할 - 최근 구간부터
+
+    가까운 작은 구멍들은 한 창으로 묶어 요청 1회로 처리 (창 안의 기존 캔들은 업서트에서 건너뜀)
+    """
+    windows: List[Interval] = []
+    window_start: Optional[int] = None
+    window_end: Optional[int] = None
+    for start, end in sorted(holes, reverse=True):
+        while True:
+            if window_end is None:
+                window_end = end
+            limit = window_end - (size - 1) * step
+            if end < limit:
+                windows.append((window_start, window_end))
+                window_end = end
+                continue
+            window_start = max(start, limit)
+            if start >= limit:
+                break
+            windows.append((window_start, window_end))
+            window_end = end = window_start - step
+    if window_end is not None:
+        windows.append((window_start, window_end))
+    return windows
+
+def _progress_upsert_sql(dialect_name: str) -> str:
+    """DB별 진행 기록 업서트 SQL (같은 시작 시각이면 더 긴 쪽으로 갱신)"""
+    columns = "market, unit, start_ts, end_ts, updated_at"
+    values = ":market, :unit, :start_ts, :end_ts, :updated_at"
+    if dialect_name == "mysql":
+        return (f"INSERT INTO backfill_progress ({columns}) VALUES ({values}) "
+                f"ON DUPLICATE KEY UPDATE end_ts = GREATEST(end_ts, VALUES(end_ts)), updated_at = VALUES(updated_at)")
+    greatest = "MAX" if dialect_name == "sqlite" else "GREATEST"
+    return (f"INSERT INTO backfill_progress ({columns}) VALUES ({values}) "
+            f"ON CONFLICT(market, unit, start_ts) DO UPDATE SET "
+            f"end_ts = {greatest}(backfill_progress.end_ts, excluded.end_ts), updated_at = excluded.updated_at")
+
+
+@dataclass
+class BackfillJob:
+    """(market, unit) 수집 작업 상태"""
+    market: str
+    unit: int
+    span: Interval
+    holes: List[Interval] = field(default_factory=list)
+    windows_total: int = 0
+    windows_done: int = 0
+    windows_failed: int = 0
+    candles: int = 0
+    write_seconds: float = 0.0  # candles 테이블 적재 소요 시간 합
+    history_start: Optional[int] = None  # 이 시각 이전에는 캔들이 없음 (상장 전)
+    oldest_fetched: Optional[int] = None  # 이번 실행에서 채운 가장 이른 캔들 (상위 봉 재집계 시작점)
+
+    @property
+    def step(self) -> int:
+        return self.unit * 60
+
+
+class CandleBackfillService:
+    """공유 레이트 리미터 아래에서 창 단위로 동시에 수집하는 과거 캔들 백필"""
+
+    def __init__(self, base_url: str = UPBIT_BASE, concurrency: int = CONCURRENCY,
+                 max_retries: int = 5, priority: int = 5):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = max(1, concurrency)  # 동시 요청 수 (초당 요청 수는 레이트 리미터가 제한)
+        self.max_retries = max_retries
+        self.priority = priority                # 레이트 리미터 우선순위 (숫자가 클수록 뒤로)
+
+        self.jobs: Dict[Tuple[str, int], BackfillJob] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0, "candles": 0, "windows": 0,
+                      "started_at": None, "finished_at": None}
+
+    # ----- 구간 계산 -----
+
+    @staticmethod
+    def target_span(unit: int, years: int = DEFAULT_YEARS, now: Optional[float] = None) -> Interval:
+        """수집 대상 구간 - years년 전부터 마지막으로 마감된 캔들까지"""
+        step = unit * 60
+        now = int(time.time() if now is None else now)
+        end = now - now % step - step
+        start = end - int(years * 365 * 86400)
+        return start - start % step, end
+
+    @staticmethod
+    async def candle_runs(conn, market: str, unit: int, span: Interval) -> List[Interval]:
+        """span 안의 연속된 캔들 구간 목록 (LAG 윈도 함수로 끊긴 지점만 조회)"""
+        step = unit * 60
+        params = {"market": market, "unit": unit, "start": span[0], "end": span[1], "step": step}
+        bounds = (await conn.execute(text(
+            "SELECT MIN(ts), MAX(ts) FROM candles "
+            "WHERE market = :market AND unit = :unit AND ts BETWEEN :start AND :end"
+        ), params)).fetchone()
+        if not bounds or bounds[0] is None:
+            return []
+
+        breaks = (await conn.execute(text(
+            "SELECT prev_ts, ts FROM ("
+            "  SELECT ts, LAG(ts) OVER (ORDER BY ts) AS prev_ts FROM candles"
+            "  WHERE market = :market AND unit = :unit AND ts BETWEEN :start AND :end"
+            ") gaps WHERE ts - prev_ts > :step ORDER BY ts"
+        ), params)).fetchall()
+
+        runs, run_start = [], bounds[0]
+        for prev_ts, ts in breaks:
+            runs.append((run_start, prev_ts))
+            run_start = ts
+        runs.append((run_start, bounds[1]))
+        return runs
+
+    @staticmethod
+    async def load_progress(conn, market: str, unit: int) -> List[Interval]:
+        rows = (await conn.execute(text(
+            "SELECT start_ts, end_ts FROM backfill_progress WHERE market = :market AND unit = :unit"
+        ), {"market": market, "unit": unit})).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    async def detect_gaps(self, market: str, unit: int, years: int = DEFAULT_YEARS,
+                          now: Optional[float] = None) -> BackfillJob:
+        """비어 있는 구간 계산 - 대상 구간 - (캔들이 있는 구간 ∪ 캔들이 없다고 확인된 구간)"""
+        step = unit * 60
+        span = self.target_span(unit, years, now)
+        async with async_engine.connect() as conn:
+            runs = await self.candle_runs(conn, market, unit, span)
+            progress = await self.load_progress(conn, market, unit)
+
+        covered = merge_intervals(runs + progress, step)
+        return BackfillJob(market=market, unit=unit, span=span, holes=subtract_intervals(span, covered, step))
+
+    # ----- 진행 기록 -----
+
+    async def _checkpoint(self, market: str, unit: int, window: Interval, fetched: Sequence[int]):
+        """조회를 마친 창에서 캔들이 없다고 확인된 구간만 기록 (거래 없는 구간을 재시작 시 다시 요청하지 않음)
+
+        응답에 있던 캔들 구간은 기록하지 않는다 - 캔들이 있는지는 항상 candles 테이블로 판단하므로
+        나중에 지워진 행은 다시 구멍으로 잡힌다.
+        """
+        step = unit * 60
+        fetched_runs = merge_intervals(((ts, ts) for ts in fetched), step)
+        empty = subtract_intervals(window, fetched_runs, step)
+        if not empty:
+            return
+        now = int(time.time())
+        async with async_engine.begin() as conn:
+            await conn.execute(text(_progress_upsert_sql(async_engine.dialect.name)), [
+                {"market": market, "unit": unit, "start_ts": start, "end_ts": end, "updated_at": now}
+                for start, end in empty
+            ])
+
+    async def compact_progress(self, market: str, unit: int):
+        """진행 기록 병합 - 창 단위 행을 연속 구간 단위로 합침"""
+        step = unit * 60
+        async with async_engine.begin() as conn:
+            progress = await self.load_progress(conn, market, unit)
+            merged = merge_intervals(progress, step)
+            if len(merged) == len(progress):
+                return
+            await conn.execute(backfill_progress_table.delete().where(
+                (backfill_progress_table.c.market == market) & (backfill_progress_table.c.unit == unit)
+            ))
+            now = int(time.time())
+            await conn.execute(backfill_progress_table.insert(), [
+                {"market": market, "unit": unit, "start_ts": start, "end_ts": end, "updated_at": now}
+                for start, end in merged
+            ])
+
+    # ----- 수집 -----
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=15),
+                connector=aiohttp.TCPConnector(limit=self.concurrency)
+            )
+        return self._session
+
+    async def fetch_window(self, market: str, unit: int, window: Interval) -> Tuple[List[tuple], bool]:
+        """창 하나 조회 - to는 배타적이므로 창 끝 다음 캔들 시각을 전달
+
+        반환: (창 안의 캔들, 창 끝 이전 캔들이 하나도 없는지 여부)
+        """
+        step = unit * 60
+        params = {
+            "market": market,
+            "count": str((window[1] - window[0]) // step + 1),
+            "to": iso_utc(datetime.fromtimestamp(window[1] + step, tz=UTC))
+        }
+        url = f"{self.base_url}/v1/candles/minutes/{unit}"
+        session = await self._get_session()
+
+        for attempt in range(self.max_retries):
+            await rate_limiter.wait_for_slot("market", priority=self.priority)
+            self.stats["requests"] += 1
+            try:
+                with metrics_registry.timer("candle_fetch", market=market, source="backfill"):
+                    async with session.get(url, params=params) as resp:
+                        rate_limiter.update_from_headers(resp.headers)
+                        if resp.status == 429:
+                            self.stats["rate_limited"] += 1
+                            rate_limiter.handle_rate_limited("market", float(resp.headers.get("Retry-After", 1.0)))
+                            continue
+                        if resp.status != 200:
+                            raise RuntimeError(f"HTTP {resp.status}: {(await resp.text())[:200]}")
+                        payload = await resp.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError) as e:
+                self.stats["errors"] += 1
+                if attempt == self.max_retries - 1:
+                    raise RuntimeError(f"{market} {unit}분봉 {window} 조회 실패: {str(e)}")
+                await asyncio.sleep(min(8.0, 0.5 * 2 ** attempt))
+                continue
+
+            rows = (parse_minutes_payload(item) for item in payload)
+            return [row for row in rows if window[0] <= row[0] <= window[1]], not payload
+
+        raise RuntimeError(f"{market} {unit}분봉 {window} 조회 실패: 레이트 리밋 재시도 초과")
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            try:
+                job, window = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if job.history_start is not None and window[1] < job.history_start:
+                job.windows_done += 1  # 상장 전 구간 - 아래에서 한 번에 기록됨
+                continue
+            try:
+                rows, exhausted = await self.fetch_window(job.market, job.unit, window)
+                if rows:
+                    job.write_seconds += (await upsert_candles(rows, job.market, job.unit))["seconds"]
+                    oldest = min(row[0] for row in rows)
+                    job.oldest_fetched = oldest if job.oldest_fetched is None else min(job.oldest_fetched, oldest)
+                if exhausted:
+                    # 이전 캔들이 없으면 대상 구간 시작부터 여기까지 전부 빈 구간으로 기록
+                    job.history_start = max(job.history_start or window[1], window[1])
+                    window = (job.span[0], window[1])
+                await self._checkpoint(job.market, job.unit, window, [row[0] for row in rows])
+                job.windows_done += 1
+                job.candles += len(rows)
+                self.stats["windows"] += 1
+                self.stats["candles"] += len(rows)
+            except Exception as e:
+                job.windows_failed += 1
+                logger.warning(f"⚠️ 과거 캔들 수집 실패 - 다음 실행 시 재시도: {str(e)}")
+
+    async def run(self, markets: Optional[List[str]] = None, units: Optional[List[int]] = None,
+                  years: int = DEFAULT_YEARS, now: Optional[float] = None) -> Dict[str, Any]:
+        """대상 (market, unit) 전체의 비어 있는 구간을 동시에 수집 (now: 대상 구간 기준 시각, 기본 현재)"""
+        markets = markets or list(DEFAULT_MARKETS)
+        units = units or list(UNITS)
+        started = time.time()
+        self.stats["started_at"], self.stats["finished_at"] = started, None
+
+        queue: asyncio.Queue = asyncio.Queue()
+        self.jobs = {}
+        now = started if now is None else now
+        for market in markets:
+            for unit in units:
+                job = await self.detect_gaps(market, unit, years, now)
+                windows = split_windows(job.holes, job.step)
+                job.windows_total = len(windows)
+                self.jobs[(market, unit)] = job
+                for window in windows:
+                    queue.put_nowait((job, window))
+
+        total_windows = queue.qsize()
+        logger.info(f"📥 과거 캔들 수집 시작 - {len(self.jobs)}개 작업, {total_windows}개 요청 (동시 {self.concurrency})")
+
+        try:
+            await asyncio.gather(*(self._worker(queue) for _ in range(min(self.concurrency, total_windows))))
+        finally:
+            for job in self.jobs.values():
+                if job.windows_done:
+                    await self.compact_progress(job.market, job.unit)
+            await self.close()
+
+        # 새로 채운 1분봉 구간부터 상위 봉 재집계
+        from .candle_rollup import candle_rollup
+        for job in self.jobs.values():
+            if job.unit == 1 and job.oldest_fetched is not None:
+                try:
+                    await candle_rollup.update(job.market, since=job.oldest_fetched)
+                except Exception as e:
+                    logger.error(f"❌ {job.market} 상위 봉 집계 실패: {str(e)}")
+
+        self.stats["finished_at"] = time.time()
+        elapsed = self.stats["finished_at"] - started
+        candles = sum(job.candles for job in self.jobs.values())
+        failed = sum(job.windows_failed for job in self.jobs.values())
+        write_seconds = sum(job.write_seconds for job in self.jobs.values())
+        logger.info(f"✅ 과거 캔들 수집 완료 - {candles:,}개 캔들, 실패 {failed}개 요청 ({elapsed:.1f}초, "
+                    f"{candles / elapsed if elapsed > 0 else 0:,.0f}개/초, "
+                    f"적재 {write_seconds:.2f}초 {candles / write_seconds if write_seconds > 0 else 0:,.0f}행/초)")
+        return {"candles": candles, "windows": total_windows, "failed_windows": failed,
+                "seconds": round(elapsed, 2), "jobs": self.get_status()["jobs"]}
+
+    def start(self, **kwargs) -> bool:
+        """백그라운드 실행 (이미 실행 중이면 False)"""
+        if self.is_running:
+            return False
+        self._task = asyncio.create_task(self.run(**kwargs))
+        return True
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running,
+            "concurrency": self.concurrency,
+            "stats": self.stats.copy(),
+            "jobs": [
+                {
+                    "market": job.market,
+                    "unit": job.unit,
+                    "holes": len(job.holes),
+                    "missing_candles": sum((end - start) // job.step + 1 for start, end in job.holes),
+                    "windows_total": job.windows_total,
+                    "windows_done": job.windows_done,
+                    "windows_failed": job.windows_failed,
+                    "candles": job.candles
+                }
+                for job in self.jobs.values()
+            ]
+        }
+
+# 전역 과거 캔들 수집 서비스 인스턴스
+candle_backfill = CandleBackfillService()
@@ -0,0 +1,198 @@
+"""
+상위 봉 증분 집계
+- 1분봉을 시간순으로 한 번만 읽으면서 5/15/60/240/1440분봉을 동시에 집계 (시가는 첫 행, 종가는 마지막 행)
+- (market, unit)별 마지막 완성 구간을 기록하여 다음 실행은 그 이후 1분봉만 읽음 - 비용은 테이블 크기가 아니라 새 데이터에 비례
+- 1분봉은 키셋 페이지 단위로 읽고 완성된 구간만 대량 업서트 (since로 다시 집계한 구간은 기존 행을 새 값으로 갱신)
+"""
+
+import time
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from config import DEFAULT_MARKETS, ROLLUP_UNITS
+from database import async_engine, candle_rollup_state_table, upsert_candles
+
+logger = logging.getLogger(__name__)
+
+# 구간 생성에 필요한 최소 1분봉 수 (없는 단위는 1개 이상)
+MIN_MINUTES = {5: 4, 15: 10}
+
+@dataclass
+class _Bucket:
+    """집계 중인 구간"""
+    ts: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    count: int = 1
+
+    def add(self, high: float, low: float, close: float, volume: float):
+        if high > self.high:
+            self.high = high
+        if low < self.low:
+            self.low = low
+        self.close = close
+        self.volume += volume
+        self.count += 1
+
+    def row(self) -> tuple:
+        return (self.ts, self.open, self.high, self.low, self.close, self.volume)
+
+
+class CandleRollupService:
+    """1분봉 → 상위 봉 단일 패스 증분 집계"""
+
+    def __init__(self, units: Optional[List[int]] = None, page_size: int = 20000, flush_rows: int = 50000):
+        self.units = sorted(units or ROLLUP_UNITS)
+        self.page_size = page_size    # 1분봉 한 번에 읽는 행 수
+        self.flush_rows = flush_rows  # 단위별 적재 대기 행 수 한도
+        self.stats = {"runs": 0, "minutes_read": 0, "candles_written": 0, "last_run_seconds": 0.0}
+
+    # ----- 진행 기록 -----
+
+    @staticmethod
+    async def load_watermarks(conn, market: str) -> Dict[int, int]:
+        rows = (await conn.execute(text(
+            "SELECT unit, last_bucket_ts FROM candle_rollup_state WHERE market = :market"
+        ), {"market": market})).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    @staticmethod
+    async def save_watermarks(market: str, watermarks: Dict[int, int]):
+        table = candle_rollup_state_table
+        now = int(time.time())
+        async with async_engine.begin() as conn:
+            await conn.execute(table.delete().where(
+                (table.c.market == market) & table.c.unit.in_(list(watermarks))
+            ))
+            await conn.execute(table.insert(), [
+                {"market": market, "unit": unit, "last_bucket_ts": bucket_ts, "updated_at": now}
+                for unit, bucket_ts in watermarks.items()
+            ])
+
+    # ----- 집계 -----
+
+    async def update(self, market: str, units: Optional[List[int]] = None, since: Optional[int] = None,
+                     now: Optional[float] = None) -> Dict[str, Any]:
+        """마지막 완성 구간 이후 1분봉만 읽어 상위 봉 생성
+
+        since: 이 시각 이후 구간을 다시 집계 (과거 1분봉을 새로 채운 경우)
+        """
+        units = sorted(units or self.units)
+        started = time.perf_counter()
+
+        async with async_engine.connect() as conn:
+            watermarks = await self.load_watermarks(conn, market)
+            bounds = (await conn.execute(text(
+                "SELECT MIN(ts), MAX(ts) FROM candles WHERE market = :market AND unit = 1"
+            ), {"market": market})).fetchone()
+        if not bounds or bounds[0] is None:
+            return {"market": market, "minutes_read": 0, "written": {}}
+
+        # 완성 기준 - 현재 분 시작과 마지막 1분봉 다음 분 중 이른 시각까지 마감된 구간만 생성
+        now = int(time.time() if now is None else now)
+        cutoff = min(now - now % 60, bounds[1] + 60)
+
+        next_bucket: Dict[int, int] = {}
+        for unit in units:
+            step = unit * 60
+            start = watermarks[unit] + step if unit in watermarks else bounds[0] - bounds[0] % step
+            if since is not None:
+                start = min(start, since - since % step)
+            next_bucket[unit] = start
+
+        open_buckets: Dict[int, Optional[_Bucket]] = {unit: None for unit in units}
+        pending: Dict[int, List[tuple]] = {unit: [] for unit in units}
+        written = {unit: 0 for unit in units}
+        minutes_read = 0
+        write_seconds = 0.0
+
+        async def flush(unit: int):
+            nonlocal write_seconds
+            rows = pending[unit]
+            if rows:
+                write_seconds += (await upsert_candles(rows, market, unit, replace=True))["seconds"]
+                written[unit] += len(rows)
+                pending[unit] = []
+
+        async def close_bucket(unit: int, bucket: _Bucket):
+            if bucket.count >= MIN_MINUTES.get(unit, 1):
+                pending[unit].append(bucket.row())
+                if len(pending[unit]) >= self.flush_rows:
+                    await flush(unit)
+
+        cursor = min(next_bucket.values()) - 1
+        while True:
+            async with async_engine.connect() as conn:
+                page = (await conn.execute(text(
+                    "SELECT ts, open, high, low, close, volume FROM candles "
+                    "WHERE market = :market AND unit = 1 AND ts > :cursor AND ts < :cutoff "
+                    "ORDER BY ts LIMIT :limit"
+                ), {"market": market, "cursor": cursor, "cutoff": cutoff, "limit": self.page_size})).fetchall()
+            if not page:
+                break
+
+            for ts, open_, high, low, close, volume in page:
+                for unit in units:
+                    if ts < next_bucket[unit]:
+                        continue
+                    bucket_ts = ts - ts % (unit * 60)
+                    bucket = open_buckets[unit]
+                    if bucket is not None and bucket.ts == bucket_ts:
+                        bucket.add(high, low, close, volume)
+                        continue
+                    if bucket is not None:
+                        await close_bucket(unit, bucket)
+                    open_buckets[unit] = _Bucket(bucket_ts, open_, high, low, close, volume)
+
+            minutes_read += len(page)
+            cursor = page[-1][0]
+            if len(page) < self.page_size:
+                break
+
+        # 마지막 구간은 끝 시각이 cutoff 이전일 때만 완성
+        new_watermarks = {}
+        for unit in units:
+            step = unit * 60
+            bucket = open_buckets[unit]
+            if bucket is not None and bucket.ts + step <= cutoff:
+                await close_bucket(unit, bucket)
+            await flush(unit)
+            last_complete = cutoff - cutoff % step - step
+            if last_complete >= next_bucket[unit] - step:
+                new_watermarks[unit] = last_complete
+        if new_watermarks:
+            await self.save_watermarks(market, new_watermarks)
+
+        elapsed = time.perf_counter() - started
+        total_written = sum(written.values())
+        self.stats["runs"] += 1
+        self.stats["minutes_read"] += minutes_read
+        self.stats["candles_written"] += total_written
+        self.stats["last_run_seconds"] = round(elapsed, 3)
+        logger.info(f"🧮 {market} 상위 봉 집계 - 1분봉 {minutes_read:,}개 → "
+                    f"{', '.join(f'{unit}분 {count}' for unit, count in written.items())} ({elapsed:.2f}초, "
+                    f"{minutes_read / elapsed if elapsed > 0 else 0:,.0f}분봉/초, "
+                    f"적재 {write_seconds:.2f}초 {total_written / write_seconds if write_seconds > 0 else 0:,.0f}행/초)")
+        return {"market": market, "minutes_read": minutes_read, "written": written, "seconds": round(elapsed, 3)}
+
+    async def update_all(self, markets: Optional[List[str]] = None, **kwargs) -> List[Dict[str, Any]]:
+        results = []
+        for market in markets or DEFAULT_MARKETS:
+            try:
+                results.append(await self.update(market, **kwargs))
+            except Exception as e:
+                logger.error(f"❌ {market} 상위 봉 집계 실패: {str(e)}")
+                results.append({"market": market, "error": str(e)})
+        return results
+
+    def get_status(self) -> Dict[str, Any]:
+        return {"units": self.units, "stats": self.stats.copy()}
+
+# 전역 상위 봉 집계 서비스 인스턴스
+candle_rollup = CandleRollupService()
@@ -0,0 +1,278 @@
+"""
+대시보드 스냅샷 빌더
+- 대시보드를 보고 있는 사용자별로 계좌/포지션/현재가/매수 조건 문서를 백그라운드에서 갱신
+- 요청 시에는 미리 직렬화한 문서를 그대로 반환 (ETag/버전으로 변경 없는 응답 생략)
+- 현재가/매수 조건은 사용자와 무관하므로 주기마다 한 번만 만들어 모든 스냅샷이 공유
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .market_data_service import market_data_service
+from .signal_analyzer import signal_analyzer
+from ..utils.price_cache import price_cache
+from config import DEFAULT_MARKETS, MTFA_OPTIMIZED_CONFIG
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class DashboardSnapshot:
+    """사용자별 대시보드 문서 (직렬화 결과 포함)"""
+    user_id: int
+    username: str
+    version: int = 0
+    etag: str = ""
+    body: bytes = b""
+    content_hash: str = ""
+    built_at: float = 0.0
+    last_access: float = field(default_factory=time.time)
+
+    # 계좌 섹션 최근 결과 (거래 상태보다 갱신 주기가 김)
+    account_info: Dict = field(default_factory=lambda: {"success": False})
+    account_updated_at: float = 0.0
+
+
+class DashboardSnapshotService:
+    """사용자별 대시보드 스냅샷 백그라운드 갱신"""
+
+    def __init__(self, interval: float = 2.0, account_interval: float = 15.0,
+                 conditions_interval: float = 30.0, idle_timeout: float = 300.0):
+        self.interval = interval                        # 거래 상태/현재가 갱신 주기
+        self.account_interval = account_interval        # 계좌 조회 주기
+        self.conditions_interval = conditions_interval  # 매수 조건 평가 주기
+        self.idle_timeout = idle_timeout                # 이 시간 동안 요청이 없으면 갱신 중단
+
+        self.price_markets = list(DEFAULT_MARKETS)[:5]      # 현재가 표시 코인
+        self.condition_markets = list(DEFAULT_MARKETS)[:3]  # 매수 조건 표시 코인
+
+        self._snapshots: Dict[int, DashboardSnapshot] = {}
+        self._initial_builds: Dict[int, asyncio.Task] = {}    # 사용자별 첫 생성 (동시 첫 요청이 함께 대기)
+        self._shared: Dict[str, Tuple[float, Any]] = {}       # 사용자 공통 섹션 (생성 시각, 결과)
+        self._shared_builds: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"builds": 0, "changes": 0, "build_errors": 0, "served": 0, "not_modified": 0,
+                      "shared_builds": 0}
+
+    # ----- 조회 -----
+
+    async def get_snapshot(self, user_id: int, username: str) -> DashboardSnapshot:
+        """스냅샷 조회 - 처음 요청한 사용자는 한 번 즉시 생성 후 백그라운드 갱신 대상에 등록"""
+        snapshot = self._snapshots.get(user_id)
+        if snapshot is None:
+            snapshot = self._snapshots[user_id] = DashboardSnapshot(user_id=user_id, username=username)
+            self._initial_builds[user_id] = asyncio.create_task(self.build(snapshot))
+
+        # 첫 생성이 끝나기 전에 들어온 요청도 빈 문서 대신 생성 결과를 기다림
+        initial = self._initial_builds.get(user_id)
+        if initial is not None:
+            await asyncio.shield(initial)
+            if self._initial_builds.get(user_id) is initial:
+                del self._initial_builds[user_id]
+
+        snapshot.last_access = time.time()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("🚀 대시보드 스냅샷 빌더 시작")
+        return snapshot
+
+    def remove(self, user_id: int):
+        self._snapshots.pop(user_id, None)
+        self._initial_builds.pop(user_id, None)
+
+    # ----- 생성 -----
+
+    async def build(self, snapshot: DashboardSnapshot):
+        """문서 재구성 - 내용이 바뀐 경우에만 버전/ETag/본문 갱신"""
+        from ..session import session_manager
+
+        user_session = session_manager.get_all_sessions().get(snapshot.user_id)
+        if user_session is None:
+            self.remove(snapshot.user_id)
+            return
+
+        now = time.time()
+        try:
+            refresh_account = now - snapshot.account_updated_at >= self.account_interval
+            # 현재가는 한 갱신 주기 안에서만 공유 (다음 주기에는 새로 조회)
+            results = await asyncio.gather(
+                self._build_account_info(user_session) if refresh_account else asyncio.sleep(0),
+                self._shared_section("buy_conditions", self.conditions_interval, self._build_buy_conditions),
+                self._shared_section("current_prices", self.interval / 2, self._build_current_prices)
+            )
+            if refresh_account:
+                snapshot.account_info, snapshot.account_updated_at = results[0], now
+
+            document = {
+                "success": True,
+                "user": {"username": snapshot.username, "user_id": snapshot.user_id},
+                "account_info": snapshot.account_info,
+                "trading_status": self._build_trading_status(user_session),
+                "current_prices": results[2],
+                "buy_conditions": results[1],
+                "system_status": "running"
+            }
+            self.stats["builds"] += 1
+            self._publish(snapshot, document)
+        except Exception as e:
+            self.stats["build_errors"] += 1
+            logger.warning(f"⚠️ 대시보드 스냅샷 생성 실패 ({snapshot.username}): {str(e)}")
+
+    def _publish(self, snapshot: DashboardSnapshot, document: Dict[str, Any]):
+        # 매초 바뀌는 가동 시간은 변경 판단에서 제외 (다른 값이 바뀔 때 함께 갱신)
+        trading_status = {key: value for key, value in document["trading_status"].items() if key != "uptime_seconds"}
+        content = json.dumps({**document, "trading_status": trading_status}, ensure_ascii=False, sort_keys=True, default=str)
+        content_hash = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        if content_hash == snapshot.content_hash:
+            return
+
+        now = time.time()
+        snapshot.version += 1
+        snapshot.content_hash = content_hash
+        snapshot.etag = f'"{snapshot.version}-{content_hash[:16]}"'
+        snapshot.built_at = now
+        snapshot.body = json.dumps(
+            {**document, "timestamp": now, "version": snapshot.version},
+            ensure_ascii=False, default=str
+        ).encode("utf-8")
+        self.stats["changes"] += 1
+
+    async def _shared_section(self, name: str, max_age: float, builder: Callable[[], Awaitable[Any]]) -> Any:
+        """사용자 공통 섹션 - max_age 안의 결과는 재사용, 생성 중이면 같은 결과를 기다림"""
+        cached = self._shared.get(name)
+        if cached and time.time() - cached[0] < max_age:
+            return cached[1]
+
+        task = self._shared_builds.get(name)
+        if task is None:
+            task = self._shared_builds[name] = asyncio.create_task(builder())
+            task.add_done_callback(lambda done: self._store_shared(name, done))
+            self.stats["shared_builds"] += 1
+        return await asyncio.shield(task)
+
+    def _store_shared(self, name: str, task: asyncio.Task):
+        if self._shared_builds.get(name) is task:
+            del self._shared_builds[name]
+        if not task.cancelled() and task.exception() is None:
+            self._shared[name] = (time.time(), task.result())
+
+    async def _build_account_info(self, user_session) -> Dict:
+        from ..api.trading import _get_optimized_account_info
+        from ..api.system import get_upbit_client
+
+        try:
+            upbit_client = user_session.upbit_client if user_session.upbit_client else get_upbit_client()
+            if not upbit_client:
+                return {"success": False, "message": "업비트 로그인이 필요합니다"}
+
+            account_info = await _get_optimized_account_info(upbit_client, batch_tickers=True)
+            if account_info:
+                return {"success": True, **account_info}
+            return {"success": False, "message": "계좌 정보 조회에 실패했습니다"}
+        except Exception as e:
+            logger.warning(f"계좌 정보 조회 실패: {str(e)}")
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def _build_trading_status(user_session) -> Dict:
+        engine = user_session.trading_engine
+        state = user_session.trading_state
+        return {
+            "is_running": engine.is_running,
+            "positions_count": len(state.positions),
+            "available_budget": state.available_budget,
+            "daily_trades": state.daily_trades,
+            "daily_loss": state.daily_loss,
+            "uptime_seconds": int(time.time() - engine.session_start_time) if engine.session_start_time else 0,
+            "positions": {
+                coin: {
+                    "buy_price": position.buy_price,
+                    "amount": position.amount,
+                    "current_price": position.current_price,
+                    "unrealized_pnl": position.unrealized_pnl,
+                    "profit_target": position.profit_target,
+                    "stop_loss": position.stop_loss,
+                    "timestamp": position.timestamp.isoformat()
+                }
+                for coin, position in state.positions.items()
+            }
+        }
+
+    async def _build_current_prices(self) -> Dict:
+        try:
+            tickers = await market_data_service.get_tickers(self.price_markets, max_age=self.interval * 2)
+        except Exception as e:
+            logger.warning(f"현재가 조회 실패: {str(e)}")
+            tickers = {}
+
+        prices = {}
+        for market in self.price_markets:
+            ticker = tickers.get(market)
+            quote = price_cache.get(market, max_age_ms=self.interval * 2000)
+            if not ticker and not quote:
+                continue
+            prices[market] = {
+                "trade_price": quote.price if quote else float(ticker["trade_price"]),
+                "change_rate": float(ticker.get("change_rate", 0)) * 100 if ticker else 0.0,
+                "coin_symbol": market.split('-')[1]
+            }
+        return prices
+
+    async def _build_buy_conditions(self) -> List[Dict]:
+        async def evaluate(market: str) -> Dict:
+            config = MTFA_OPTIMIZED_CONFIG.get(market, MTFA_OPTIMIZED_CONFIG.get("KRW-BTC", {}))
+            params = {
+                "volume_surge": 2.0,
+                "price_change": 0.5,
+                "mtfa_threshold": config.get("mtfa_threshold", 0.80),
+                "rsi_period": 14,
+                "ema_periods": [5, 20],
+                "volume_window": 24
+            }
+            signal = await signal_analyzer.check_buy_signal(market, params)
+            return {
+                "market": market,
+                "coin": market.split('-')[1],
+                "status": "가능o" if signal else "조건x",
+                "signal_strength": signal.get("signal_strength", 0) if signal else 0
+            }
+
+        try:
+            return list(await asyncio.gather(*(evaluate(market) for market in self.condition_markets)))
+        except Exception as e:
+            logger.warning(f"매수 조건 조회 실패: {str(e)}")
+            return []
+
+    # ----- 백그라운드 루프 -----
+
+    async def _run(self):
+        try:
+            while self._snapshots:
+                loop_start = time.time()
+                for user_id, snapshot in list(self._snapshots.items()):
+                    if loop_start - snapshot.last_access > self.idle_timeout:
+                        self.remove(user_id)
+
+                snapshots = list(self._snapshots.values())
+                if snapshots:
+                    await asyncio.gather(*(self.build(snapshot) for snapshot in snapshots))
+
+                await asyncio.sleep(max(0.0, self.interval - (time.time() - loop_start)))
+        except asyncio.CancelledError:
+            pass
+        finally:
+            logger.info("⏹️ 대시보드 스냅샷 빌더 종료")
+
+    def get_status(self) -> Dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "users": len(self._snapshots),
+            "stats": self.stats.copy()
+        }
+
+# 전역 대시보드 스냅샷 서비스 인스턴스
+dashboard_snapshot_service = DashboardSnapshotService()
@@ -0,0 +1,327 @@
+"""
+증분 지표 엔진 - 마켓별 상태를 유지하며 캔들 1개당 상수 시간으로 지표 갱신
+- EMA5/10, Wilder RSI, 롤링 VWAP, 롤링 거래량 평균, 롤링 중앙값/MAD
+- 신호 확인 시 전체 재계산 대신 현재 값을 조회
+"""
+
+import logging
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def candle_time(candle: Dict) -> int:
+    """캔들 식별 시각 - 시작 시각(candle_ts)이 있으면 우선 사용"""
+    return candle.get("candle_ts", candle["timestamp"])
+
+class RollingMedian:
+    """고정 윈도우 롤링 중앙값/MAD (정렬 윈도우 유지, 비용은 윈도우 크기에만 비례)"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values: deque = deque()
+        self._sorted: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def append(self, value: float):
+        if len(self._values) == self.window:
+            self._remove_sorted(self._values.popleft())
+        self._values.append(value)
+        insort(self._sorted, value)
+
+    def pop_last(self):
+        if self._values:
+            self._remove_sorted(self._values.pop())
+
+    def _remove_sorted(self, value: float):
+        del self._sorted[bisect_left(self._sorted, value)]
+
+    @staticmethod
+    def _kth_median(values: List[float]) -> float:
+        n = len(values)
+        mid = n // 2
+        return values[mid] if n % 2 else (values[mid - 1] + values[mid]) / 2
+
+    def median(self) -> float:
+        return self._kth_median(self._sorted) if self._sorted else 0.0
+
+    def mad(self) -> float:
+        """중앙값 절대 편차 - 중앙값 좌/우의 정렬된 편차열을 병합하여 계산"""
+        n = len(self._sorted)
+        if n == 0:
+            return 0.0
+
+        median = self.median()
+        split = bisect_left(self._sorted, median)
+        left = split - 1   # 왼쪽 편차는 인덱스가 작아질수록 증가
+        right = split      # 오른쪽 편차는 인덱스가 커질수록 증가
+
+        deviations: List[float] = []
+        target = n // 2 + 1
+        while len(deviations) < target:
+            left_dev = median - self._sorted[left] if left >= 0 else None
+            right_dev = self._sorted[right] - median if right < n else None
+            if right_dev is None or (left_dev is not None and left_dev <= right_dev):
+                deviations.append(left_dev)
+                left -= 1
+            else:
+                deviations.append(right_dev)
+                right += 1
+
+        mid = n // 2
+        return deviations[mid] if n % 2 else (deviations[mid - 1] + deviations[mid]) / 2
+
+    def clip(self, value: float, threshold: float = 3.0) -> float:
+        """Modified Z-score 기준 이상값이면 중앙값으로 대체 (SignalAnalyzer._handle_outliers와 동일 규칙)"""
+        if len(self._sorted) < 5:
+            return value
+        mad = self.mad()
+        if mad == 0:
+            return value
+        median = self.median()
+        return median if abs(0.6745 * (value - median) / mad) > threshold else value
+
+
+class MarketIndicators:
+    """단일 마켓 증분 지표 상태"""
+
+    def __init__(self, market: str, window: int = 20, ema_periods: Tuple[int, ...] = (5, 10),
+                 rsi_period: int = 14, recent_volume_count: int = 3):
+        self.market = market
+        self.window = window
+        self.ema_periods = ema_periods
+        self.rsi_period = rsi_period
+        self.recent_volume_count = recent_volume_count
+
+        self.last_ts: Optional[int] = None
+        self.candle_count = 0
+
+        # 롤링 윈도우 (VWAP/거래량 합계용)
+        self._candles: deque = deque()
+        self._pv_sum = 0.0
+        self._volume_sum = 0.0
+        self._recent_volume_sum = 0.0
+
+        # 이상값 판단용 롤링 중앙값 (종가/거래량)
+        self.close_median = RollingMedian(window)
+        self.volume_median = RollingMedian(window)
+
+        # 재귀 지표 상태: 마지막 캔들 적용 전(_base) / 적용 후(_state)
+        # 진행 중인 최신 캔들이 갱신되면 _base에서 다시 계산
+        self._base: Optional[Dict] = None
+        self._state: Optional[Dict] = None
+
+    # ----- 갱신 -----
+
+    def update(self, candle: Dict):
+        """캔들 1개 반영 - 같은 시각이면 진행 중 캔들 갱신, 새 시각이면 추가"""
+        ts = candle_time(candle)
+        if self.last_ts is not None and ts < self.last_ts:
+            return  # 과거 캔들은 무시
+
+        if ts == self.last_ts:
+            self._replace_last(candle)
+        else:
+            self._append(candle)
+            self.last_ts = ts
+            self.candle_count += 1
+
+    def _append(self, candle: Dict):
+        if len(self._candles) == self.window:
+            self._remove_from_sums(self._candles.popleft())
+        self._candles.append(candle)
+        self._add_to_sums(candle)
+
+        # 최근 거래량 구간에서 밀려난 캔들 정리
+        if len(self._candles) > self.recent_volume_count:
+            self._recent_volume_sum -= self._candles[-1 - self.recent_volume_count]["volume"]
+        self._recent_volume_sum += candle["volume"]
+
+        # 부동소수점 누적 오차 방지: 윈도우 한 바퀴마다 합계 재계산 (분할 상환 O(1))
+        if (self.candle_count + 1) % self.window == 0:
+            self._resum()
+
+        # 이상값 판단은 배치 방식과 같이 새 값을 포함한 윈도우 기준
+        self.close_median.append(candle["close"])
+        self.volume_median.append(candle["volume"])
+        close = self.close_median.clip(candle["close"])
+
+        self._base = self._state
+        self._state = self._step(self._base, close)
+
+    def _replace_last(self, candle: Dict):
+        previous = self._candles[-1]
+        self._remove_from_sums(previous)
+        self._recent_volume_sum -= previous["volume"]
+        self._candles[-1] = candle
+        self._add_to_sums(candle)
+        self._recent_volume_sum += candle["volume"]
+
+        self.close_median.pop_last()
+        self.volume_median.pop_last()
+        self.close_median.append(candle["close"])
+        self.volume_median.append(candle["volume"])
+        close = self.close_median.clip(candle["close"])
+
+        self._state = self._step(self._base, close)
+
+    def _resum(self):
+        self._pv_sum = 0.0
+        self._volume_sum = 0.0
+        for candle in self._candles:
+            self._add_to_sums(candle)
+        recent = list(self._candles)[-self.recent_volume_count:]
+        self._recent_volume_sum = sum(candle["volume"] for candle in recent)
+
+    def _add_to_sums(self, candle: Dict):
+        typical_price = (candle["high"] + candle["low"] + candle["close"]) / 3
+        self._pv_sum += typical_price * candle["volume"]
+        self._volume_sum += candle["volume"]
+
+    def _remove_from_sums(self, candle: Dict):
+        typical_price = (candle["high"] + candle["low"] + candle["close"]) / 3
+        self._pv_sum -= typical_price * candle["volume"]
+        self._volume_sum -= candle["volume"]
+
+    def _step(self, base: Optional[Dict], close: float) -> Dict:
+        """EMA/Wilder RSI 한 단계 전이 (상수 시간)"""
+        if base is None:
+            return {
+                "close": close,
+                "ema": {period: close for period in self.ema_periods},
+                "changes": 0,
+                "gain_sum": 0.0,
+                "loss_sum": 0.0,
+                "avg_gain": 0.0,
+                "avg_loss": 0.0
+            }
+
+        ema = {}
+        for period in self.ema_periods:
+            multiplier = 2 / (period + 1)
+            ema[period] = (close * multiplier) + (base["ema"][period] * (1 - multiplier))
+
+        change = close - base["close"]
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        changes = base["changes"] + 1
+        period = self.rsi_period
+
+        gain_sum, loss_sum = base["gain_sum"], base["loss_sum"]
+        if changes <= period:
+            # 초기 구간: 단순 평균으로 시드
+            gain_sum += gain
+            loss_sum += loss
+            avg_gain = gain_sum / changes
+            avg_loss = loss_sum / changes
+        else:
+            # Wilder 평활
+            avg_gain = (base["avg_gain"] * (period - 1) + gain) / period
+            avg_loss = (base["avg_loss"] * (period - 1) + loss) / period
+
+        return {
+            "close": close,
+            "ema": ema,
+            "changes": changes,
+            "gain_sum": gain_sum,
+            "loss_sum": loss_sum,
+            "avg_gain": avg_gain,
+            "avg_loss": avg_loss
+        }
+
+    # ----- 조회 -----
+
+    @property
+    def is_ready(self) -> bool:
+        """RSI 시드가 완료될 만큼 캔들이 쌓였는지"""
+        return self._state is not None and self._state["changes"] >= self.rsi_period
+
+    def ema(self, period: int) -> float:
+        return self._state["ema"][period] if self._state else 0.0
+
+    def rsi(self) -> float:
+        if not self.is_ready:
+            return 50.0
+        avg_gain, avg_loss = self._state["avg_gain"], self._state["avg_loss"]
+        if avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def vwap(self) -> float:
+        return self._pv_sum / self._volume_sum if self._volume_sum > 0 else 0.0
+
+    def recent_volume_mean(self) -> float:
+        count = min(self.recent_volume_count, len(self._candles))
+        return self._recent_volume_sum / count if count else 0.0
+
+    def historical_volume_mean(self) -> float:
+        count = len(self._candles) - self.recent_volume_count
+        if count <= 0:
+            return 0.0
+        return (self._volume_sum - self._recent_volume_sum) / count
+
+    def snapshot(self) -> Dict:
+        """현재 지표 값 조회"""
+        return {
+            "market": self.market,
+            "last_ts": self.last_ts,
+            "candle_count": self.candle_count,
+            "ready": self.is_ready,
+            "ema": {period: self.ema(period) for period in self.ema_periods},
+            "rsi": self.rsi(),
+            "vwap": self.vwap(),
+            "recent_volume": self.recent_volume_mean(),
+            "historical_volume": self.historical_volume_mean(),
+            "close_median": self.close_median.median(),
+            "close_mad": self.close_median.mad()
+        }
+
+
+class IndicatorEngine:
+    """마켓별 증분 지표 레지스트리"""
+
+    def __init__(self, window: int = 20):
+        self.window = window
+        self._markets: Dict[str, MarketIndicators] = {}
+
+    def get(self, market: str) -> Optional[MarketIndicators]:
+        return self._markets.get(market)
+
+    def update(self, market: str, candle: Dict) -> MarketIndicators:
+        """새 캔들 1개 반영"""
+        indicators = self._markets.get(market)
+        if indicators is None:
+            indicators = self._markets[market] = MarketIndicators(market, window=self.window)
+        indicators.update(candle)
+        return indicators
+
+    def update_from_candles(self, market: str, candle_data: List[Dict]) -> MarketIndicators:
+        """시간순 캔들 윈도우에서 아직 반영하지 않은 캔들만 적용
+
+        마지막 반영 시각이 윈도우보다 오래됐다면 (공백 발생) 윈도우로 상태를 다시 만든다.
+        """
+        indicators = self._markets.get(market)
+        if indicators is not None and candle_data and indicators.last_ts is not None:
+            if indicators.last_ts < candle_time(candle_data[0]):
+                logger.debug(f"🔄 {market} 지표 상태 공백 감지 - 재구성")
+                indicators = None
+
+        if indicators is None:
+            indicators = self._markets[market] = MarketIndicators(market, window=self.window)
+
+        for candle in candle_data:
+            if indicators.last_ts is None or candle_time(candle) >= indicators.last_ts:
+                indicators.update(candle)
+        return indicators
+
+    def reset(self, market: Optional[str] = None):
+        if market is None:
+            self._markets.clear()
+        else:
+            self._markets.pop(market, None)
+
+# 전역 지표 엔진 인스턴스
+indicator_engine = IndicatorEngine()
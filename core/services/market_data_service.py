@@ -0,0 +1,444 @@
+"""
+공유 시장 데이터 버스
+- 프로세스 전역에서 마켓별 캔들/현재가를 틱당 1회만 조회
+- 구독 중인 모든 사용자 거래 엔진에 결과를 팬아웃
+- 사용자 수가 늘어도 공개 REST 호출량은 마켓 수에만 비례
+- 전 세션 보유 포지션 현재가를 포지션 틱당 1회 일괄 조회
+- 스트리밍 모드: WebSocket 체결로 만든 1분봉/체결가를 우선 사용하고 끊기면 REST로 대체
+"""
+
+import asyncio
+import time
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from ..utils.price_cache import price_cache
+from ..utils.instrumentation import metrics_registry
+from .websocket_feed import UpbitWebSocketFeed
+from config import UPBIT_WEBSOCKET_URL
+
+logger = logging.getLogger(__name__)
+
+class MarketDataService:
+    """마켓별 캔들/현재가 공유 버스 (단일 조회 + 다중 구독)"""
+
+    def __init__(self, tick_interval: float = 60.0, candle_count: int = 20, position_tick_interval: float = 5.0):
+        self.tick_interval = tick_interval  # 틱 주기 (엔진 신호 확인 주기와 동일)
+        self.candle_count = candle_count    # 틱마다 갱신하는 캔들 수
+        self.position_tick_interval = position_tick_interval  # 포지션 현재가 틱 주기
+        self.fetch_timeout = 20.0           # 틱당 REST 갱신 최대 대기 (초)
+
+        # 구독자별 관심 마켓
+        self._subscribers: Dict[str, Set[str]] = {}
+
+        # 최신 데이터 스냅샷: market -> (업비트 원본 응답, 조회 시각)
+        self._candles: Dict[str, Tuple[List[Dict], float]] = {}
+        self._tickers: Dict[str, Tuple[Dict, float]] = {}
+
+        # 동일 마켓 동시 조회 병합용 (single-flight)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._ticker_inflight: Optional[Tuple[Set[str], asyncio.Future]] = None
+
+        # 구독자별 보유 포지션 마켓 (포지션 현재가 틱 대상)
+        self._position_watchers: Dict[str, Set[str]] = {}
+
+        # 틱 팬아웃
+        self._tick_version = 0
+        self._tick_condition: Optional[asyncio.Condition] = None  # 이벤트 루프 안에서 지연 생성
+        self._task: Optional[asyncio.Task] = None
+
+        # 포지션 현재가 틱 팬아웃
+        self._position_version = 0
+        self._position_condition: Optional[asyncio.Condition] = None
+        self._position_task: Optional[asyncio.Task] = None
+
+        # 스트리밍 피드 (enable_streaming 호출 시 생성)
+        self.feed: Optional[UpbitWebSocketFeed] = None
+        self.min_position_notify_interval = 0.2  # 체결 기반 포지션 알림 최소 간격 (초)
+        self._last_position_notify = 0.0
+        self._last_closed_minute = 0
+
+        self.stats = {
+            "stream_hits": 0,
+            "ticks": 0,
+            "position_ticks": 0,
+            "candle_requests": 0,
+            "ticker_requests": 0,
+            "cache_hits": 0,
+            "coalesced_requests": 0
+        }
+
+    # ----- 구독 관리 -----
+
+    def subscribe(self, subscriber_id: str, markets: List[str]):
+        """구독 등록 - 첫 구독 시 틱 루프 시작 (이벤트 루프 안에서 호출)"""
+        self._subscribers[subscriber_id] = set(markets)
+        logger.info(f"📡 시장 데이터 버스 구독: {subscriber_id} ({len(markets)}개 마켓, 총 {len(self._subscribers)}명)")
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("🚀 시장 데이터 버스 틱 루프 시작")
+
+        if self.feed is not None:
+            self._sync_feed_markets()
+
+    def unsubscribe(self, subscriber_id: str):
+        """구독 해제 - 구독자가 없으면 틱 루프는 다음 틱에서 스스로 종료"""
+        if self._subscribers.pop(subscriber_id, None) is not None:
+            logger.info(f"📴 시장 데이터 버스 구독 해제: {subscriber_id} (남은 구독자 {len(self._subscribers)}명)")
+        self._position_watchers.pop(subscriber_id, None)
+
+        # 마지막 구독자가 나가면 스트리밍 피드도 종료 (이벤트 루프 밖에서 호출된 경우는 피드가 다음 구독까지 유지)
+        if self.feed is not None and not self._subscribers and not self._position_watchers:
+            try:
+                asyncio.get_running_loop().create_task(self.disable_streaming())
+            except RuntimeError:
+                pass
+
+    # ----- 스트리밍 모드 -----
+
+    def enable_streaming(self, url: Optional[str] = None):
+        """WebSocket 스트리밍 피드 활성화 (이미 활성화돼 있으면 무시)"""
+        if self.feed is not None:
+            return
+
+        self.feed = UpbitWebSocketFeed(url or UPBIT_WEBSOCKET_URL)
+        self.feed.on_connect = self._on_feed_connect
+        self.feed.on_trade = self._on_feed_trade
+        self.feed.on_candle_close = self._on_feed_candle_close
+        self.feed.start(self._feed_markets())
+        logger.info("📶 시장 데이터 버스 스트리밍 모드 활성화")
+
+    async def disable_streaming(self):
+        if self.feed is None:
+            return
+        feed, self.feed = self.feed, None
+        await feed.stop()
+        logger.info("📴 시장 데이터 버스 스트리밍 모드 비활성화 - REST 조회로 전환")
+
+    def _feed_markets(self) -> List[str]:
+        return sorted(set(self.get_subscribed_markets()) | set(self.get_position_markets()))
+
+    def _sync_feed_markets(self):
+        markets = self._feed_markets()
+        if markets:
+            asyncio.create_task(self.feed.set_markets(markets))
+
+    def _is_stream_live(self, market: str, count: int = 1) -> bool:
+        return self.feed is not None and self.feed.is_live(market, count)
+
+    def _on_feed_connect(self):
+        """(재)연결 직후 구독 마켓 이력을 REST로 한 번 받아 로컬 캔들 시드"""
+        async def seed_all():
+            await asyncio.gather(*(
+                self._fetch_candles(market, self.candle_count) for market in self.get_subscribed_markets()
+            ))
+        asyncio.create_task(seed_all())
+
+    def _on_feed_trade(self, market: str, price: float, ts_ms: int):
+        """보유 포지션 마켓 체결 시 포지션 틱 즉시 게시 (최소 간격 제한)"""
+        if market not in self.get_position_markets():
+            return
+        now = time.time()
+        if now - self._last_position_notify >= self.min_position_notify_interval:
+            self._last_position_notify = now
+            asyncio.create_task(self._publish_position_tick())
+
+    def _on_feed_candle_close(self, market: str):
+        """1분봉 마감 시 틱 게시 - 분당 1회만 (여러 마켓 동시 마감 병합)"""
+        minute = int(time.time() // 60)
+        if minute != self._last_closed_minute:
+            self._last_closed_minute = minute
+            asyncio.create_task(self._publish_tick())
+
+    def get_subscribed_markets(self) -> List[str]:
+        """전체 구독 마켓 (중복 제거, 순서 유지)"""
+        markets: List[str] = []
+        for subscribed in self._subscribers.values():
+            for market in sorted(subscribed):
+                if market not in markets:
+                    markets.append(market)
+        return markets
+
+    def watch_positions(self, subscriber_id: str, markets: List[str]):
+        """구독자의 보유 포지션 마켓 갱신 - 감시 마켓이 생기면 포지션 틱 루프 시작"""
+        if markets:
+            self._position_watchers[subscriber_id] = set(markets)
+        else:
+            self._position_watchers.pop(subscriber_id, None)
+
+        if self._position_watchers and (self._position_task is None or self._position_task.done()):
+            self._position_task = asyncio.create_task(self._run_positions())
+            logger.info("🚀 포지션 현재가 틱 루프 시작")
+
+        if self.feed is not None and not set(markets) <= self.feed.markets:
+            self._sync_feed_markets()
+
+    def get_position_markets(self) -> List[str]:
+        """전 세션 보유 포지션 마켓 (중복 제거)"""
+        markets: Set[str] = set()
+        for watched in self._position_watchers.values():
+            markets.update(watched)
+        return sorted(markets)
+
+    def _get_tick_condition(self) -> asyncio.Condition:
+        if self._tick_condition is None:
+            self._tick_condition = asyncio.Condition()
+        return self._tick_condition
+
+    @property
+    def tick_version(self) -> int:
+        return self._tick_version
+
+    async def wait_for_tick(self, last_version: int, timeout: Optional[float] = None) -> int:
+        """last_version 이후의 새 틱이 게시될 때까지 대기 후 현재 버전 반환"""
+        condition = self._get_tick_condition()
+        try:
+            async with condition:
+                await asyncio.wait_for(
+                    condition.wait_for(lambda: self._tick_version > last_version),
+                    timeout=timeout
+                )
+        except asyncio.TimeoutError:
+            pass
+        return self._tick_version
+
+    def _get_position_condition(self) -> asyncio.Condition:
+        if self._position_condition is None:
+            self._position_condition = asyncio.Condition()
+        return self._position_condition
+
+    @property
+    def position_version(self) -> int:
+        return self._position_version
+
+    async def wait_for_position_tick(self, last_version: int, timeout: Optional[float] = None) -> int:
+        """last_version 이후의 새 포지션 틱이 게시될 때까지 대기 후 현재 버전 반환"""
+        condition = self._get_position_condition()
+        try:
+            async with condition:
+                await asyncio.wait_for(
+                    condition.wait_for(lambda: self._position_version > last_version),
+                    timeout=timeout
+                )
+        except asyncio.TimeoutError:
+            pass
+        return self._position_version
+
+    # ----- 데이터 조회 -----
+
+    async def get_candles(self, market: str, count: int = 20, max_age: Optional[float] = None) -> List[Dict]:
+        """1분봉 캔들 조회 (업비트 원본 형식, 최신순) - 신선한 스냅샷이 있으면 재사용"""
+        max_age = self.tick_interval if max_age is None else max_age
+
+        # 스트리밍 피드가 살아 있으면 로컬 생성 캔들 사용 (진행 중 캔들까지 실시간)
+        if self._is_stream_live(market, count):
+            self.stats["stream_hits"] += 1
+            return self.feed.get_candles(market, count)
+
+        cached = self._candles.get(market)
+        if cached:
+            data, fetched_at = cached
+            if time.time() - fetched_at < max_age and len(data) >= count:
+                self.stats["cache_hits"] += 1
+                return data[:count]
+
+        with metrics_registry.timer("candle_fetch", market=market, source="rest"):
+            data = await self._fetch_candles(market, max(count, self.candle_count))
+        return data[:count]
+
+    async def get_tickers(self, markets: List[str], max_age: Optional[float] = None) -> Dict[str, Dict]:
+        """현재가 조회 - 신선하지 않은 마켓만 모아서 1회 일괄 요청"""
+        max_age = self.tick_interval if max_age is None else max_age
+        current_time = time.time()
+
+        result: Dict[str, Dict] = {}
+        stale: List[str] = []
+        for market in markets:
+            cached = self._tickers.get(market)
+            if cached and current_time - cached[1] < max_age:
+                result[market] = cached[0]
+            else:
+                stale.append(market)
+
+        if stale:
+            result.update(await self._fetch_tickers(stale))
+        else:
+            self.stats["cache_hits"] += 1
+
+        return result
+
+    async def get_position_prices(self, subscriber_id: str, markets: List[str]) -> Dict[str, float]:
+        """보유 포지션 현재가 조회 - 감시 등록 후 공유 가격 캐시 사용 (신선한 가격이 없을 때만 일괄 조회)"""
+        self.watch_positions(subscriber_id, markets)
+        if not markets:
+            return {}
+
+        max_age_ms = self.position_tick_interval * 2 * 1000
+        prices = {market: quote.price for market, quote in price_cache.get_many(markets, max_age_ms).items()}
+        if len(prices) < len(markets):
+            # 다른 세션의 보유 마켓까지 함께 조회하여 동시 요청을 한 번으로 병합
+            stale = [market for market in self.get_position_markets() if price_cache.get(market, max_age_ms) is None]
+            tickers = await self._fetch_tickers(stale)
+            for market in markets:
+                ticker = tickers.get(market)
+                if market not in prices and ticker and ticker.get("trade_price"):
+                    prices[market] = float(ticker["trade_price"])
+        return prices
+
+    async def _fetch_candles(self, market: str, count: int) -> List[Dict]:
+        """캔들 REST 조회 - 동일 마켓 동시 요청은 하나로 병합"""
+        inflight = self._inflight.get(market)
+        if inflight is not None:
+            self.stats["coalesced_requests"] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[market] = future
+        data: List[Dict] = []
+        try:
+            # 공개 업비트 클라이언트 (순환 import 방지를 위해 지연 import)
+            from ..api.system import public_upbit_client
+
+            self.stats["candle_requests"] += 1
+            response = await public_upbit_client.get_minute_candles(market, count, use_cache=False)
+            if response and isinstance(response, list):
+                data = response
+                self._candles[market] = (data, time.time())
+                if self.feed is not None:
+                    self.feed.seed(market, data)
+            return data
+        except Exception as e:
+            logger.error(f"⚠️ {market} 시장 데이터 버스 캔들 조회 오류: {str(e)}")
+            return data
+        finally:
+            # 조회 태스크가 취소되어도 병합 대기자는 빈 결과로 깨움
+            future.set_result(data)
+            if self._inflight.get(market) is future:
+                del self._inflight[market]
+
+    async def _fetch_tickers(self, markets: List[str]) -> Dict[str, Dict]:
+        """현재가 REST 일괄 조회 후 스냅샷 갱신 - 진행 중인 일괄 조회가 요청 마켓을 모두 포함하면 병합"""
+        result: Dict[str, Dict] = {}
+        if self._ticker_inflight is not None:
+            inflight_markets, inflight = self._ticker_inflight
+            self.stats["coalesced_requests"] += 1
+            data = await asyncio.shield(inflight)
+            result = {market: data[market] for market in markets if market in data}
+            if inflight_markets.issuperset(markets):
+                return result
+            # 진행 중 조회에 없던 마켓만 이어서 조회 (그 사이 다른 요청이 시작했다면 다시 병합)
+            markets = [market for market in markets if market not in inflight_markets]
+            return {**result, **await self._fetch_tickers(markets)}
+
+        future = asyncio.get_running_loop().create_future()
+        self._ticker_inflight = (set(markets), future)
+        try:
+            from ..api.system import public_upbit_client
+
+            self.stats["ticker_requests"] += 1
+            data = await public_upbit_client.get_tickers(markets)
+            fetched_at = time.time()
+
+            for ticker in data or []:
+                market = ticker.get("market")
+                if market:
+                    self._tickers[market] = (ticker, fetched_at)
+                    result[market] = ticker
+            return result
+        except Exception as e:
+            logger.error(f"⚠️ 시장 데이터 버스 현재가 조회 오류: {str(e)}")
+            return result
+        finally:
+            future.set_result(result)
+            if self._ticker_inflight is not None and self._ticker_inflight[1] is future:
+                self._ticker_inflight = None
+
+    # ----- 틱 루프 -----
+
+    async def _refresh(self, markets: List[str]):
+        await self._fetch_tickers(markets)
+        await asyncio.gather(*(self._fetch_candles(market, self.candle_count) for market in markets))
+
+    async def _run(self):
+        """구독 마켓 전체를 틱당 한 번씩 갱신하고 구독자에게 알림"""
+        try:
+            while self._subscribers:
+                tick_start = time.time()
+                # 스트리밍으로 갱신되는 마켓은 REST 조회 생략 (피드가 끊기면 자동으로 다시 포함)
+                markets = [market for market in self.get_subscribed_markets()
+                           if not self._is_stream_live(market, self.candle_count)]
+
+                if markets or self.feed is None:
+                    try:
+                        await asyncio.wait_for(self._refresh(markets), timeout=self.fetch_timeout)
+                    except asyncio.TimeoutError:
+                        logger.warning(f"⏰ 시장 데이터 버스 틱 조회 시간 초과 ({self.fetch_timeout}초)")
+                    except Exception as e:
+                        logger.error(f"⚠️ 시장 데이터 버스 틱 처리 오류: {str(e)}")
+
+                    # 전 마켓 스트리밍 중이면 틱은 1분봉 마감 시 피드가 게시
+                    await self._publish_tick()
+
+                logger.debug(f"📡 시장 데이터 틱 #{self._tick_version}: REST {len(markets)}개 마켓 ({time.time() - tick_start:.2f}초)")
+                await asyncio.sleep(max(0.0, self.tick_interval - (time.time() - tick_start)))
+        except asyncio.CancelledError:
+            pass
+        finally:
+            logger.info("⏹️ 시장 데이터 버스 틱 루프 종료")
+
+    async def _run_positions(self):
+        """전 세션 보유 포지션 현재가를 포지션 틱당 1회 일괄 조회하고 알림"""
+        try:
+            while self._position_watchers:
+                tick_start = time.time()
+                markets = self.get_position_markets()
+
+                # 스트리밍 체결 등으로 이미 신선한 가격이 있는 마켓은 조회 생략
+                stale = [market for market in markets
+                         if price_cache.get(market, max_age_ms=self.position_tick_interval * 1000) is None]
+
+                try:
+                    if stale:
+                        await self._fetch_tickers(stale)
+                except Exception as e:
+                    logger.error(f"⚠️ 포지션 현재가 틱 처리 오류: {str(e)}")
+
+                await self._publish_position_tick()
+
+                await asyncio.sleep(max(0.0, self.position_tick_interval - (time.time() - tick_start)))
+        except asyncio.CancelledError:
+            pass
+        finally:
+            logger.info("⏹️ 포지션 현재가 틱 루프 종료")
+
+    async def _publish_tick(self):
+        condition = self._get_tick_condition()
+        async with condition:
+            self._tick_version += 1
+            self.stats["ticks"] += 1
+            condition.notify_all()
+
+    async def _publish_position_tick(self):
+        condition = self._get_position_condition()
+        async with condition:
+            self._position_version += 1
+            self.stats["position_ticks"] += 1
+            condition.notify_all()
+
+    def get_status(self) -> Dict:
+        """버스 상태 조회"""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "subscribers": len(self._subscribers),
+            "markets": self.get_subscribed_markets(),
+            "position_markets": self.get_position_markets(),
+            "tick_version": self._tick_version,
+            "position_version": self._position_version,
+            "tick_interval": self.tick_interval,
+            "streaming": self.feed.get_status() if self.feed else None,
+            "stats": self.stats.copy()
+        }
+
+# 전역 시장 데이터 버스 인스턴스
+market_data_service = MarketDataService()
@@ -8,6 +8,7 @@
 import time
 import json
 import os
+from collections import deque
 from typing import Dict, List, Optional, Any, Callable, Union
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
@@ -15,6 +16,8 @@
 import psutil
 import aiofiles
 
+from ..utils.timeseries import TimeSeriesStore
+
 logger = logging.getLogger(__name__)
 
 class AlertSeverity(Enum):
@@ -82,13 +85,22 @@ class PerformanceSnapshot:
     # 시스템 상태
     uptime_seconds: float = 0.0
     error_rate: float = 0.0
+    
+    # 네트워크 처리량 (직전 수집 대비 초당 바이트)
+    network_sent_rate: float = 0.0
+    network_recv_rate: float = 0.0
+    
+    # 이벤트 루프 지연 (수집 주기 동안 최대/최근, ms)
+    event_loop_lag_ms: float = 0.0
+    event_loop_lag_max_ms: float = 0.0
 
 class MonitoringService:
     """모니터링 및 알림 서비스"""
     
     def __init__(self):
         self.alerts: Dict[str, Alert] = {}
-        self.metrics: Dict[str, List[Metric]] = {}
+        self.metrics: Dict[str, Metric] = {}  # 메트릭별 최신 값/메타데이터
+        self.metric_store = TimeSeriesStore()  # 메트릭별 링 버퍼 시계열 + 롤업
         self.performance_history: List[PerformanceSnapshot] = []
         self.alert_channels: Dict[AlertChannel, List[Callable]] = {
             AlertChannel.LOG: [],
@@ -110,7 +122,8 @@ def __init__(self):
             "memory_percent": 85.0,
             "disk_percent": 90.0,
             "api_response_time": 5.0,
-            "error_rate": 5.0
+            "error_rate": 5.0,
+            "event_loop_lag_ms": 200.0
         }
         
         # 알림 제한 (중복 방지)
@@ -120,6 +133,20 @@ def __init__(self):
         # 성능 모니터링 시작 시간
         self.start_time = datetime.now()
         
+        # 호스트 지표 수집 상태 (CPU/네트워크는 직전 샘플 대비 변화량으로 계산)
+        self.api_probe_url = "https://api.upbit.com/v1/market/all"
+        self._http_session = None  # 지연 응답 측정용 재사용 세션
+        self._process = psutil.Process(os.getpid())
+        self._last_network: Optional[tuple] = None  # (monotonic 시각, bytes_sent, bytes_recv)
+        self._host_sample_lock = asyncio.Lock()     # API 요청과 모니터링 루프의 동시 샘플링 직렬화
+        psutil.cpu_percent(interval=None)  # 첫 호출은 기준점만 설정
+        
+        # 이벤트 루프 지연 측정
+        self.loop_lag_interval = 0.25  # 0.25초마다 예약 지연 측정
+        self._loop_lag_samples: deque = deque(maxlen=1200)
+        self._loop_lag_window_max = 0.0
+        self._loop_lag_task: Optional[asyncio.Task] = None
+        
         logger.info("✅ 모니터링 서비스 초기화 완료")
     
     def register_alert_handler(self, channel: AlertChannel, handler: Callable):
@@ -208,42 +235,124 @@ def add_metric(
         tags: Optional[Dict[str, str]] = None,
         unit: str = ""
     ):
-        """메트릭 추가"""
+        """메트릭 추가 (고정 크기 시계열에 O(1) 기록, 보관 기간은 링 버퍼/롤업 크기로 제한)"""
         try:
-            metric = Metric(
+            now = time.time()
+            self.metric_store.record(name, value, now)
+            self.metrics[name] = Metric(
                 name=name,
                 value=value,
                 metric_type=metric_type,
-                timestamp=datetime.now(),
+                timestamp=datetime.fromtimestamp(now),
                 tags=tags or {},
                 unit=unit
             )
             
-            if name not in self.metrics:
-                self.metrics[name] = []
-            
-            self.metrics[name].append(metric)
-            
-            # 메트릭 보관 기간 관리
-            cutoff_time = datetime.now() - timedelta(hours=self.metric_retention_hours)
-            self.metrics[name] = [
-                m for m in self.metrics[name] 
-                if m.timestamp >= cutoff_time
-            ]
-            
             logger.debug(f"📊 메트릭 추가: {name} = {value} {unit}")
             
         except Exception as e:
             logger.error(f"❌ 메트릭 추가 오류: {str(e)}")
     
+    async def _sample_host(self) -> Dict[str, Any]:
+        """호스트 지표 샘플링 - 직전 샘플 상태(_last_network, CPU 기준점)를 한 번에 한 호출만 갱신"""
+        async with self._host_sample_lock:
+            return await asyncio.get_running_loop().run_in_executor(None, self._sample_host_metrics)
+    
+    def _sample_host_metrics(self) -> Dict[str, Any]:
+        """호스트 지표 샘플링 (스레드 풀에서 실행, 대기 없이 직전 호출 대비 변화량 사용)"""
+        memory = psutil.virtual_memory()
+        network = psutil.net_io_counters()
+        now = time.monotonic()
+        
+        sent_rate = recv_rate = 0.0
+        if self._last_network is not None:
+            elapsed = now - self._last_network[0]
+            if elapsed > 0:
+                sent_rate = max(0.0, (network.bytes_sent - self._last_network[1]) / elapsed)
+                recv_rate = max(0.0, (network.bytes_recv - self._last_network[2]) / elapsed)
+        self._last_network = (now, network.bytes_sent, network.bytes_recv)
+        
+        return {
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "process_cpu_percent": self._process.cpu_percent(interval=None),
+            "process_memory_mb": self._process.memory_info().rss / 1024 / 1024,
+            "memory": memory,
+            "disk": psutil.disk_usage('/'),
+            "network": network,
+            "network_sent_rate": sent_rate,
+            "network_recv_rate": recv_rate
+        }
+    
+    async def _get_http_session(self):
+        """지연 측정용 HTTP 세션 (연결 재사용)"""
+        if self._http_session is None or self._http_session.closed:
+            import aiohttp
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=2, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=5)
+            )
+        return self._http_session
+    
+    async def _probe_api_latency(self) -> float:
+        """업비트 API 응답 시간 측정 (ms, 실패 시 9999)"""
+        try:
+            session = await self._get_http_session()
+            start_time = time.perf_counter()
+            async with session.get(self.api_probe_url) as response:
+                await response.read()
+                if response.status == 200:
+                    return (time.perf_counter() - start_time) * 1000
+        except Exception:
+            pass
+        return 9999.0  # 연결 실패 표시
+    
+    async def _loop_lag_monitor(self):
+        """이벤트 루프 지연 측정 - 예약한 깨어남 시각과 실제 깨어난 시각의 차이"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                expected = loop.time() + self.loop_lag_interval
+                await asyncio.sleep(self.loop_lag_interval)
+                lag_ms = max(0.0, (loop.time() - expected) * 1000)
+                self._loop_lag_samples.append(lag_ms)
+                self._loop_lag_window_max = max(self._loop_lag_window_max, lag_ms)
+        except asyncio.CancelledError:
+            pass
+    
+    def get_event_loop_lag(self) -> Dict[str, float]:
+        """최근 이벤트 루프 지연 통계 (ms)"""
+        samples = sorted(self._loop_lag_samples)
+        if not samples:
+            return {"latest": 0.0, "avg": 0.0, "p99": 0.0, "max": 0.0, "samples": 0}
+        return {
+            "latest": round(self._loop_lag_samples[-1], 3),
+            "avg": round(sum(samples) / len(samples), 3),
+            "p99": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3),
+            "max": round(samples[-1], 3),
+            "samples": len(samples)
+        }
+    
     async def collect_system_performance(self) -> PerformanceSnapshot:
         """시스템 성능 수집"""
         try:
-            # 기본 시스템 메트릭
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
-            network = psutil.net_io_counters()
+            # 루프 지연 측정이 아직 시작되지 않았다면 시작 (API에서 직접 호출한 경우 포함)
+            if self._loop_lag_task is None or self._loop_lag_task.done():
+                self._loop_lag_task = asyncio.create_task(self._loop_lag_monitor())
+            
+            # 기본 시스템 메트릭 (이벤트 루프를 막지 않도록 스레드 풀에서 수집) + API 응답 시간 동시 측정
+            host, api_response_time = await asyncio.gather(
+                self._sample_host(),
+                self._probe_api_latency()
+            )
+            cpu_percent = host["cpu_percent"]
+            memory = host["memory"]
+            disk = host["disk"]
+            network = host["network"]
+            
+            # 이번 수집 주기 동안의 최대 루프 지연
+            loop_lag_latest = self._loop_lag_samples[-1] if self._loop_lag_samples else 0.0
+            loop_lag_max = self._loop_lag_window_max
+            self._loop_lag_window_max = 0.0
             
             # 거래 관련 메트릭 수집
             active_positions = 0
@@ -258,18 +367,6 @@ async def collect_system_performance(self) -> PerformanceSnapshot:
             except Exception:
                 pass  # 거래 엔진 연결 실패시 기본값 사용
             
-            # API 응답 시간 측정
-            api_response_time = 0.0
-            try:
-                start_time = time.time()
-                import aiohttp
-                async with aiohttp.ClientSession() as session:
-                    async with session.get("https://api.upbit.com/v1/market/all", timeout=5) as response:
-                        if response.status == 200:
-                            api_response_time = (time.time() - start_time) * 1000  # ms
-            except Exception:
-                api_response_time = 9999.0  # 연결 실패 표시
-            
             # 성능 스냅샷 생성
             snapshot = PerformanceSnapshot(
                 timestamp=datetime.now(),
@@ -284,13 +381,22 @@ async def collect_system_performance(self) -> PerformanceSnapshot:
                 daily_profit=daily_profit,
                 api_response_time=api_response_time,
                 uptime_seconds=(datetime.now() - self.start_time).total_seconds(),
-                error_rate=0.0  # TODO: 실제 오류율 계산
+                error_rate=0.0,  # TODO: 실제 오류율 계산
+                network_sent_rate=host["network_sent_rate"],
+                network_recv_rate=host["network_recv_rate"],
+                event_loop_lag_ms=loop_lag_latest,
+                event_loop_lag_max_ms=loop_lag_max
             )
             
             # 메트릭으로 추가
             self.add_metric("system.cpu_percent", cpu_percent, MetricType.GAUGE, unit="%")
             self.add_metric("system.memory_percent", memory.percent, MetricType.GAUGE, unit="%")
             self.add_metric("system.disk_percent", disk.percent, MetricType.GAUGE, unit="%")
+            self.add_metric("system.process_cpu_percent", host["process_cpu_percent"], MetricType.GAUGE, unit="%")
+            self.add_metric("system.process_memory_mb", host["process_memory_mb"], MetricType.GAUGE, unit="MB")
+            self.add_metric("system.network_sent_rate", host["network_sent_rate"], MetricType.GAUGE, unit="B/s")
+            self.add_metric("system.network_recv_rate", host["network_recv_rate"], MetricType.GAUGE, unit="B/s")
+            self.add_metric("system.event_loop_lag", loop_lag_max, MetricType.HISTOGRAM, unit="ms")
             self.add_metric("trading.active_positions", active_positions, MetricType.GAUGE)
             self.add_metric("trading.daily_trades", daily_trades, MetricType.COUNTER)
             self.add_metric("trading.daily_profit", daily_profit, MetricType.GAUGE, unit="KRW")
@@ -359,6 +465,15 @@ async def _check_performance_thresholds(self, snapshot: PerformanceSnapshot):
                     AlertSeverity.WARNING,
                     "upbit_api"
                 )
+            
+            # 이벤트 루프 지연 확인 (주문/손절 처리 지연 원인)
+            if snapshot.event_loop_lag_max_ms > self.thresholds["event_loop_lag_ms"]:
+                await self.send_alert(
+                    "이벤트 루프 지연",
+                    f"이벤트 루프가 최대 {snapshot.event_loop_lag_max_ms:.0f}ms 지연되어 임계값 {self.thresholds['event_loop_lag_ms']:.0f}ms를 초과했습니다",
+                    AlertSeverity.WARNING,
+                    "system"
+                )
                 
         except Exception as e:
             logger.error(f"❌ 임계값 확인 오류: {str(e)}")
@@ -428,23 +543,16 @@ async def _cleanup_old_alerts(self):
     async def _cleanup_old_metrics(self):
         """오래된 메트릭 정리"""
         try:
+            # 시계열 자체는 고정 크기이므로 보관 기간 동안 갱신되지 않은 메트릭만 제거
             cutoff_time = datetime.now() - timedelta(hours=self.metric_retention_hours)
-            cleaned_count = 0
+            stale = [name for name, metric in self.metrics.items() if metric.timestamp < cutoff_time]
             
-            for name in list(self.metrics.keys()):
-                old_count = len(self.metrics[name])
-                self.metrics[name] = [
-                    m for m in self.metrics[name]
-                    if m.timestamp >= cutoff_time
-                ]
-                cleaned_count += old_count - len(self.metrics[name])
-                
-                # 빈 메트릭 제거
-                if not self.metrics[name]:
-                    del self.metrics[name]
+            for name in stale:
+                del self.metrics[name]
+                self.metric_store.remove(name)
             
-            if cleaned_count > 0:
-                logger.info(f"🗑️ 오래된 메트릭 {cleaned_count}개 정리 완료")
+            if stale:
+                logger.info(f"🗑️ 오래된 메트릭 {len(stale)}개 정리 완료")
                 
         except Exception as e:
             logger.error(f"❌ 메트릭 정리 오류: {str(e)}")
@@ -559,8 +667,12 @@ def get_performance_summary(self, hours: int = 24) -> Dict[str, Any]:
                     "daily_trades": latest.daily_trades,
                     "daily_profit": latest.daily_profit,
                     "api_response_time": latest.api_response_time,
+                    "network_sent_rate": round(latest.network_sent_rate, 1),
+                    "network_recv_rate": round(latest.network_recv_rate, 1),
+                    "event_loop_lag_ms": round(latest.event_loop_lag_max_ms, 3),
                     "uptime_hours": round(latest.uptime_seconds / 3600, 2)
-                }
+                },
+                "event_loop_lag": self.get_event_loop_lag()
             }
             
         except Exception as e:
@@ -570,39 +682,41 @@ def get_performance_summary(self, hours: int = 24) -> Dict[str, Any]:
     def get_metrics_data(self, metric_name: str, hours: int = 24) -> Dict[str, Any]:
         """특정 메트릭 데이터 조회"""
         try:
-            if metric_name not in self.metrics:
+            series = self.metric_store.get(metric_name)
+            if metric_name not in self.metrics or series is None:
                 return {"error": f"메트릭을 찾을 수 없습니다: {metric_name}"}
             
-            cutoff_time = datetime.now() - timedelta(hours=hours)
-            recent_metrics = [
-                metric for metric in self.metrics[metric_name]
-                if metric.timestamp >= cutoff_time
-            ]
-            
-            if not recent_metrics:
+            start_ts = time.time() - hours * 3600
+            statistics = series.summary(start_ts)
+            if not statistics.get("count"):
                 return {"error": "메트릭 데이터가 없습니다"}
             
-            # 통계 계산
-            values = [m.value for m in recent_metrics]
+            # 원본이 기간 전체를 보관하면 최근 원본 100개, 아니면 해당 롤업의 최근 100개 구간 평균
+            latest = self.metrics[metric_name]
+            resolution = statistics.pop("source")
+            if resolution == "raw":
+                timestamps, values = series.raw_range(start_ts)
+            else:
+                rollup = series.rollup_range(resolution, start_ts)
+                timestamps, values = rollup["ts"], rollup["sum"] / rollup["count"]
             
             return {
                 "metric_name": metric_name,
                 "period_hours": hours,
-                "data_points": len(recent_metrics),
+                "data_points": statistics.pop("count"),
+                "resolution": resolution,
                 "statistics": {
-                    "min": min(values),
-                    "max": max(values),
-                    "avg": sum(values) / len(values),
-                    "latest": values[-1]
+                    **{key: round(value, 6) for key, value in statistics.items()},
+                    "latest": latest.value
                 },
-                "unit": recent_metrics[-1].unit if recent_metrics else "",
+                "unit": latest.unit,
+                "tags": latest.tags,
                 "data": [
                     {
-                        "timestamp": m.timestamp.isoformat(),
-                        "value": m.value,
-                        "tags": m.tags
+                        "timestamp": datetime.fromtimestamp(ts).isoformat(),
+                        "value": float(value)
                     }
-                    for m in recent_metrics[-100:]  # 최근 100개만
+                    for ts, value in zip(timestamps[-100:], values[-100:])  # 최근 100개만
                 ]
             }
             
@@ -613,6 +727,12 @@ def get_metrics_data(self, metric_name: str, hours: int = 24) -> Dict[str, Any]:
     async def stop_monitoring(self):
         """모니터링 중지"""
         self.monitoring_active = False
+        if self._loop_lag_task is not None:
+            self._loop_lag_task.cancel()
+            self._loop_lag_task = None
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
         logger.info("🛑 성능 모니터링 중지")
     
     def update_thresholds(self, new_thresholds: Dict[str, float]):
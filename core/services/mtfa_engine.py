@@ -0,0 +1,245 @@
+"""
+다중 시간대(MTFA) 정렬 엔진 - 1분봉 스트림에서 config.UNITS(1/5/15분) 봉 윈도우를 마켓별로 유지
+- 상위 봉은 1분봉을 구간별로 모아 만들고, 구간이 닫힐 때 EMA 상태를 상수 시간으로 갱신
+- 시간대별 추세(EMA 단기/장기 괴리)와 모멘텀(최근 N봉 변화율)을 [-1, 1] 점수로 계산
+- 신뢰도 = 0.5 + 0.5 × 시간대 점수 가중합 (상위 시간대일수록 가중치 큼), 갱신 시 계산해 두고 조회는 메모리에서
+"""
+
+import math
+import time
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import UNITS
+from .indicator_engine import candle_time
+
+logger = logging.getLogger(__name__)
+
+TREND_WEIGHT = 0.6      # 시간대 점수 중 추세 비중 (나머지는 모멘텀)
+SCALE_PCT = 0.1         # 1분봉 기준 점수 포화 구간 (%) - 상위 봉은 sqrt(unit)배
+
+class TimeframeState:
+    """단일 시간대 봉 윈도우 + EMA 상태 (진행 중 구간은 구성 1분봉을 보관하여 재계산)"""
+
+    def __init__(self, unit: int, window: int = 30, fast: int = 5, slow: int = 20, momentum_bars: int = 3):
+        self.unit = unit
+        self.step = unit * 60
+        self.fast = fast
+        self.slow = slow
+        self.momentum_bars = momentum_bars
+        self.scale = SCALE_PCT * math.sqrt(unit)
+
+        self.closes: deque = deque(maxlen=max(window, momentum_bars + 1))  # 닫힌 봉 종가
+        self.closed_count = 0
+        self.ema_fast: Optional[float] = None
+        self.ema_slow: Optional[float] = None
+
+        self.bucket_ts: Optional[int] = None
+        self._minutes: Dict[int, Dict] = {}  # 진행 중 구간의 1분봉 (시각 → 캔들)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.closed_count >= self.slow
+
+    def add(self, minute_ts: int, candle: Dict):
+        """1분봉 1개 반영 - 같은 분이면 덮어쓰고, 다음 구간이면 현재 구간을 닫음"""
+        bucket_ts = minute_ts - minute_ts % self.step
+        if self.bucket_ts is not None and bucket_ts > self.bucket_ts:
+            self._close_bucket()
+        if self.bucket_ts is None or bucket_ts > self.bucket_ts:
+            self.bucket_ts = bucket_ts
+            self._minutes = {}
+        if bucket_ts == self.bucket_ts:
+            self._minutes[minute_ts] = candle
+
+    def _close_bucket(self):
+        close = self._minutes[max(self._minutes)]["close"]
+        self.closes.append(close)
+        self.closed_count += 1
+        self.ema_fast = self._ema(self.ema_fast, close, self.fast)
+        self.ema_slow = self._ema(self.ema_slow, close, self.slow)
+
+    @staticmethod
+    def _ema(previous: Optional[float], close: float, period: int) -> float:
+        if previous is None:
+            return close
+        multiplier = 2 / (period + 1)
+        return (close * multiplier) + (previous * (1 - multiplier))
+
+    def score(self) -> Optional[Dict]:
+        """진행 중 구간 종가를 잠정 반영한 추세/모멘텀 점수"""
+        if not self.is_ready:
+            return None
+        close = self._minutes[max(self._minutes)]["close"] if self._minutes else self.closes[-1]
+        ema_fast = self._ema(self.ema_fast, close, self.fast)
+        ema_slow = self._ema(self.ema_slow, close, self.slow)
+
+        trend_pct = (ema_fast - ema_slow) / ema_slow * 100 if ema_slow else 0.0
+        reference = self.closes[-self.momentum_bars]
+        momentum_pct = (close - reference) / reference * 100 if reference else 0.0
+
+        trend = math.tanh(trend_pct / self.scale)
+        momentum = math.tanh(momentum_pct / self.scale)
+        return {
+            "unit": self.unit,
+            "score": round(TREND_WEIGHT * trend + (1 - TREND_WEIGHT) * momentum, 4),
+            "trend": round(trend, 4),
+            "momentum": round(momentum, 4),
+            "trend_pct": round(trend_pct, 4),
+            "momentum_pct": round(momentum_pct, 4),
+            "bars": self.closed_count
+        }
+
+
+class MarketMTFA:
+    """단일 마켓 시간대별 상태 + 캐시된 신뢰도"""
+
+    def __init__(self, market: str, units: List[int]):
+        self.market = market
+        self.timeframes = {unit: TimeframeState(unit) for unit in sorted(units)}
+        total = sum(math.sqrt(unit) for unit in units)
+        self.weights = {unit: math.sqrt(unit) / total for unit in units}
+        self.last_ts: Optional[int] = None
+        self.updated_at = 0.0
+        self._snapshot: Optional[Dict] = None
+
+    def update(self, candle: Dict):
+        ts = candle_time(candle)
+        if self.last_ts is not None and ts < self.last_ts:
+            return  # 과거 캔들은 무시
+        for state in self.timeframes.values():
+            state.add(ts, candle)
+        self.last_ts = ts
+        self._snapshot = None
+
+    @property
+    def is_ready(self) -> bool:
+        return all(state.is_ready for state in self.timeframes.values())
+
+    def snapshot(self) -> Dict:
+        """시간대별 점수와 신뢰도 (다음 갱신 전까지 캐시)"""
+        if self._snapshot is None:
+            scores = {unit: state.score() for unit, state in self.timeframes.items()}
+            ready = all(score is not None for score in scores.values())
+            confidence = None
+            aligned = 0
+            if ready:
+                confidence = 0.5 + 0.5 * sum(self.weights[unit] * score["score"] for unit, score in scores.items())
+                aligned = sum(1 for score in scores.values() if score["score"] > 0)
+            self._snapshot = {
+                "market": self.market,
+                "ready": ready,
+                "confidence": round(confidence, 4) if confidence is not None else None,
+                "aligned_timeframes": aligned,
+                "timeframes": {f"{unit}m": score for unit, score in scores.items()},
+                "last_ts": self.last_ts
+            }
+            self.updated_at = time.time()
+        return self._snapshot
+
+
+def confidence_at(data: Dict[str, np.ndarray], index: np.ndarray, units: Optional[List[int]] = None) -> np.ndarray:
+    """저장된 1분봉 열을 시간순으로 MarketMTFA에 반영하며 index 봉(오름차순) 시점의 신뢰도 계산 - 백테스트용
+
+    실시간 경로와 같은 상태 갱신을 거치므로 같은 캔들이면 같은 값, 준비 전 봉은 NaN
+    """
+    result = np.full(len(index), np.nan)
+    if not len(index):
+        return result
+
+    state = MarketMTFA("backtest", sorted(units or UNITS))
+    ts, closes = data["ts"], data["close"]
+    target = 0
+    for bar in range(int(index[-1]) + 1):
+        state.update({"timestamp": int(ts[bar]), "close": float(closes[bar])})
+        while target < len(index) and index[target] == bar:
+            confidence = state.snapshot()["confidence"]
+            if confidence is not None:
+                result[target] = confidence
+            target += 1
+    return result
+
+
+class MTFAEngine:
+    """마켓별 MTFA 상태 레지스트리"""
+
+    def __init__(self, units: Optional[List[int]] = None):
+        self.units = sorted(units or UNITS)
+        self._markets: Dict[str, MarketMTFA] = {}
+        self._seeded: set = set()
+
+    @property
+    def seed_minutes(self) -> int:
+        """모든 시간대가 준비되는 데 필요한 1분봉 수 (최상위 봉 slow+2개 구간)"""
+        return max(self.units) * (TimeframeState(max(self.units)).slow + 2)
+
+    def get(self, market: str) -> Optional[MarketMTFA]:
+        return self._markets.get(market)
+
+    def update_from_candles(self, market: str, candle_data: List[Dict]) -> MarketMTFA:
+        """시간순 1분봉 윈도우에서 아직 반영하지 않은 캔들만 적용
+
+        마지막 반영 시각과 윈도우 사이에 최상위 봉 한 구간 이상 공백이 있으면 상태를 다시 만든다.
+        """
+        state = self._markets.get(market)
+        if state is not None and candle_data and state.last_ts is not None:
+            if candle_time(candle_data[0]) - state.last_ts > max(self.units) * 60:
+                logger.debug(f"🔄 {market} MTFA 상태 공백 감지 - 재구성")
+                state = None
+
+        if state is None:
+            state = self._markets[market] = MarketMTFA(market, self.units)
+
+        for candle in candle_data:
+            if state.last_ts is None or candle_time(candle) >= state.last_ts:
+                state.update(candle)
+        return state
+
+    async def ensure_seeded(self, market: str):
+        """처음 보는 마켓은 candles 테이블의 최근 1분봉으로 상태를 채움 (마켓당 1회, 실시간 캔들 반영 전에 호출)"""
+        if market in self._markets or market in self._seeded:
+            return
+        self._seeded.add(market)
+
+        from sqlalchemy import text
+        from database import async_engine
+
+        try:
+            async with async_engine.connect() as conn:
+                rows = (await conn.execute(text(
+                    "SELECT ts, open, high, low, close, volume FROM candles "
+                    "WHERE market = :market AND unit = 1 ORDER BY ts DESC LIMIT :limit"
+                ), {"market": market, "limit": self.seed_minutes})).fetchall()
+        except Exception as e:
+            logger.warning(f"⚠️ {market} MTFA 초기 1분봉 로드 실패: {str(e)}")
+            return
+
+        state = self.update_from_candles(market, [
+            {"timestamp": row[0], "candle_ts": row[0], "open": row[1], "high": row[2],
+             "low": row[3], "close": row[4], "volume": row[5]}
+            for row in reversed(rows)
+        ])
+        logger.info(f"📐 {market} MTFA 초기화 - 1분봉 {len(rows)}개 (준비: {state.is_ready})")
+
+    def confidence(self, market: str) -> Optional[float]:
+        """현재 신뢰도 (0~1) - 준비되지 않았으면 None"""
+        state = self._markets.get(market)
+        return state.snapshot()["confidence"] if state is not None else None
+
+    def snapshot(self, market: str) -> Optional[Dict]:
+        state = self._markets.get(market)
+        return state.snapshot() if state is not None else None
+
+    def reset(self, market: Optional[str] = None):
+        if market is None:
+            self._markets.clear()
+            self._seeded.clear()
+        else:
+            self._markets.pop(market, None)
+            self._seeded.discard(market)
+
+# 전역 MTFA 엔진 인스턴스
+mtfa_engine = MTFAEngine()
@@ -1,6 +1,7 @@
 """최적화 관련 서비스"""
 
-import asyncio
+import json
+import os
 import time
 import logging
 from datetime import datetime, timedelta
@@ -9,15 +10,44 @@
 from apscheduler.triggers.cron import CronTrigger
 import atexit
 
+from config import DEFAULT_MARKETS, MTFA_OPTIMIZED_CONFIG
+
 logger = logging.getLogger(__name__)
 
+MIN_BARS = 7 * 1440  # 최적화에 필요한 최소 1분봉 수 (약 1주)
+
 class WeeklyOptimizer:
-    """수익률 최우선 주간 자동 최적화 엔진"""
+    """수익률 최우선 주간 자동 최적화 엔진
+    - 마켓별 최근 1분봉으로 익절/손절/최대 보유/MTFA 임계값을 워크포워드 탐색 (ParameterSweep)
+    - 결과는 MTFA_OPTIMIZED_CONFIG 형식의 버전별 후보로 기록 (설정 자동 교체 없음)
+    """
     
-    def __init__(self):
+    def __init__(self, history_path: Optional[str] = None):
         self.analysis_running = False
         self.last_analysis_date = 0
-        self.version_counter = {"BTC": 1, "XRP": 1, "ETH": 1, "DOGE": 1, "BTT": 1}
+        self.version_counter = {market.split("-")[1]: 1 for market in DEFAULT_MARKETS}
+        self.history_path = history_path or os.getenv("OPTIMIZER_HISTORY", "./data/optimizer/candidates.json")
+        self.history: List[Dict] = self._load_history()
+        for candidate in self.history:
+            coin = candidate["market"].split("-")[1]
+            self.version_counter[coin] = max(self.version_counter.get(coin, 1), candidate["version"] + 1)
+    
+    def _load_history(self) -> List[Dict]:
+        try:
+            with open(self.history_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            logger.warning(f"⚠️ 최적화 이력 로드 실패: {str(e)}")
+            return []
+    
+    def _save_history(self):
+        os.makedirs(os.path.dirname(self.history_path) or ".", exist_ok=True)
+        tmp_path = f"{self.history_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.history, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.history_path)
         
     async def log_optimization(self, coin: str, operation: str, old_params: dict = None, 
                               new_params: dict = None, test_result: str = None, 
@@ -46,8 +76,49 @@ async def log_optimization(self, coin: str, operation: str, old_params: dict = N
         except Exception as e:
             logger.error(f"최적화 로그 기록 실패: {str(e)}")
     
-    async def run_weekly_analysis(self) -> Dict:
-        """주간 최적화 분석 실행"""
+    def _build_candidate(self, market: str, result: Dict) -> Dict:
+        """탐색 결과 → 버전이 붙은 MTFA_OPTIMIZED_CONFIG 후보"""
+        coin = market.split("-")[1]
+        version = self.version_counter.get(coin, 1)
+        self.version_counter[coin] = version + 1
+        
+        out_of_sample = result["out_of_sample"]
+        config = {
+            "profit_target": float(result["params"]["profit_target"]),
+            "stop_loss": float(result["params"]["stop_loss"]),
+            "max_hold_minutes": int(result["params"]["max_hold_minutes"]),
+            "mtfa_threshold": float(result["params"]["mtfa_threshold"]),
+            "expected_return": out_of_sample["total_return"],   # 검증 구간 성과
+            "expected_win_rate": out_of_sample["win_rate"]
+        }
+        return {
+            "market": market,
+            "version": version,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "config": config,
+            "previous_config": MTFA_OPTIMIZED_CONFIG.get(market),
+            "accepted": result["accepted"],
+            "out_of_sample": out_of_sample,
+            "baseline_out_of_sample": result["baseline_out_of_sample"],
+            "walk_forward": [
+                {key: fold[key] for key in ("fold", "train", "test", "params")}
+                | {"test_return": fold["test_performance"]["total_return"],
+                   "baseline_return": fold["baseline_performance"]["total_return"]}
+                for fold in result["walk_forward"]
+            ]
+        }
+    
+    def get_candidates(self, market: Optional[str] = None, accepted_only: bool = False) -> List[Dict]:
+        """저장된 후보 목록 (최신순)"""
+        return [
+            candidate for candidate in reversed(self.history)
+            if (market is None or candidate["market"] == market)
+            and (not accepted_only or candidate["accepted"])
+        ]
+    
+    async def run_weekly_analysis(self, markets: Optional[List[str]] = None, days: int = 90,
+                                  method: str = "bayesian") -> Dict:
+        """주간 최적화 분석 실행 - 캔들 로드 후 탐색은 프로세스 풀에서 진행 (이벤트 루프 비차단)"""
         if self.analysis_running:
             return {"success": False, "error": "이미 분석이 실행 중입니다"}
         
@@ -55,6 +126,9 @@ async def run_weekly_analysis(self) -> Dict:
         start_time = time.time()
         
         try:
+            from .backtest_engine import backtest_engine
+            from .param_sweep import ParameterSweep
+            
             result = {
                 "success": True,
                 "coins_optimized": 0,
@@ -63,9 +137,43 @@ async def run_weekly_analysis(self) -> Dict:
                 "optimization_results": {}
             }
             
-            # 실제 최적화 로직은 구현 예정 - 현재는 스텁
-            await asyncio.sleep(1)  # 시뮬레이션
+            end_ts = int(time.time())
+            data_by_market = {}
+            for market in markets or DEFAULT_MARKETS:
+                data = await backtest_engine.load_candles(market, end_ts - days * 86400, end_ts)
+                if len(data["ts"]) < MIN_BARS:
+                    await self.log_optimization(market.split("-")[1], "skip",
+                                                action_taken=f"1분봉 부족 ({len(data['ts'])}개)",
+                                                log_level="WARNING")
+                    continue
+                data_by_market[market] = data
+            
+            sweep_results = await ParameterSweep(method=method).optimize(data_by_market) if data_by_market else {}
+            
+            candidates = []
+            for market, sweep_result in sweep_results.items():
+                candidate = self._build_candidate(market, sweep_result)
+                candidates.append(candidate)
+                coin = market.split("-")[1]
+                await self.log_optimization(
+                    coin, "walk_forward",
+                    old_params=candidate["previous_config"], new_params=candidate["config"],
+                    test_result=f"검증 수익률 {candidate['out_of_sample']['total_return']:+.2f}% "
+                                f"(기존 {candidate['baseline_out_of_sample']['total_return']:+.2f}%)",
+                    action_taken=f"v{candidate['version']} 후보 {'채택' if candidate['accepted'] else '보류'}"
+                )
+                result["optimization_results"][market] = candidate
+            
+            if candidates:
+                self.history.extend(candidates)
+                self._save_history()
+                accepted = [candidate for candidate in candidates if candidate["accepted"]]
+                result["coins_optimized"] = len(accepted)
+                result["total_return"] = round(
+                    sum(candidate["out_of_sample"]["total_return"] for candidate in candidates) / len(candidates), 4
+                )
             
+            self.last_analysis_date = int(time.time())
             result["execution_time"] = time.time() - start_time
             return result
             
@@ -82,7 +190,7 @@ class AutoOptimizationScheduler:
     def __init__(self):
         self.scheduler = AsyncIOScheduler(timezone='Asia/Seoul')
         self.is_running = False
-        self.weekly_optimizer = WeeklyOptimizer()
+        self.weekly_optimizer = weekly_optimizer
         
     async def weekly_optimization_job(self):
         """주간 최적화 작업 (매주 일요일 실행)"""
@@ -96,7 +204,7 @@ async def weekly_optimization_job(self):
                 execution_time = result.get("execution_time", 0.0)
                 
                 logger.info(f"✅ [스케줄러] 주간 최적화 완료!")
-                logger.info(f"📊 분석 결과: {optimized_coins}개 코인 최적화, 수익: {total_return:+,.0f}원")
+                logger.info(f"📊 분석 결과: {optimized_coins}개 코인 최적화, 평균 검증 수익률: {total_return:+.2f}%")
                 logger.info(f"⏱️ 실행 시간: {execution_time:.1f}초")
                 
             else:
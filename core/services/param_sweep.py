@@ -0,0 +1,305 @@
+"""
+파라미터 탐색 엔진 (프로세스 풀)
+- 마켓별 1분봉 열을 공유 메모리 블록에 한 번 올리고, 작업 프로세스는 복사 없이 배열 뷰로 연결
+- 진입 신호는 작업 프로세스마다 마켓당 한 번 계산 (mtfa_threshold는 신호 강도 + MTFA 신뢰도 게이트로 후보별 적용)
+- profit_target / stop_loss / max_hold_minutes / mtfa_threshold를 격자/무작위/베이지안(TPE 방식) 탐색
+- 워크포워드 검증: 누적 학습 구간에서 최적값을 고르고 바로 다음 구간에서 검증
+"""
+
+import asyncio
+import itertools
+import math
+import os
+import random
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .backtest_engine import default_params, entry_signals, mtfa_gate, simulate_trades, summarize
+
+logger = logging.getLogger(__name__)
+
+SEARCH_SPACE: Dict[str, List[float]] = {
+    "profit_target": [0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0],
+    "stop_loss": [-0.2, -0.3, -0.5, -0.7, -1.0, -1.5],
+    "max_hold_minutes": [5, 10, 15, 20, 30, 45, 60],
+    "mtfa_threshold": [0.70, 0.75, 0.80, 0.82, 0.85, 0.90]
+}
+
+COLUMNS = ("ts", "open", "high", "low", "close", "volume")
+NO_SCORE = -1e9  # 최소 거래 수 미달
+
+# ----- 공유 메모리 -----
+
+class SharedCandles:
+    """캔들 열 6개를 공유 메모리 블록 하나에 연속 배치 (ts는 int64, 나머지는 float64)"""
+
+    def __init__(self, data: Dict[str, np.ndarray]):
+        self.rows = len(data["ts"])
+        self.shm = shared_memory.SharedMemory(create=True, size=max(8, self.rows * 8 * len(COLUMNS)))
+        for column, view in attach_views(self.shm, self.rows).items():
+            view[:] = data[column]
+
+    @property
+    def spec(self) -> Tuple[str, int]:
+        return self.shm.name, self.rows
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+def attach_views(shm: shared_memory.SharedMemory, rows: int) -> Dict[str, np.ndarray]:
+    return {
+        column: np.ndarray((rows,), dtype=np.int64 if column == "ts" else np.float64,
+                           buffer=shm.buf, offset=position * rows * 8)
+        for position, column in enumerate(COLUMNS)
+    }
+
+# ----- 작업 프로세스 -----
+
+_worker_blocks: Dict[str, shared_memory.SharedMemory] = {}
+_worker_data: Dict[str, Dict[str, np.ndarray]] = {}
+_worker_signals: Dict[str, Dict[str, np.ndarray]] = {}
+
+def _init_worker(specs: Dict[str, Tuple[str, int]]):
+    """작업 프로세스 시작 시 공유 블록 연결 (spawn 자식은 부모의 resource tracker를 공유 - 해제는 부모가 unlink로 한 번만)"""
+    for market, (name, rows) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_blocks[market] = shm
+        _worker_data[market] = attach_views(shm, rows)
+
+def _market_signals(market: str, base_params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    if market not in _worker_signals:
+        _worker_signals[market] = entry_signals(_worker_data[market], {**base_params, "mtfa_threshold": 0.0})
+    return _worker_signals[market]
+
+def evaluate_batch(market: str, segment: Tuple[int, int], candidates: List[Dict[str, Any]],
+                   base_params: Dict[str, Any], min_trades: int) -> List[Tuple[Dict[str, Any], Dict[str, Any], float]]:
+    """구간 [start, end) 봉에서 발생한 신호로 후보 파라미터 평가"""
+    data = _worker_data[market]
+    signals = _market_signals(market, base_params)
+    in_segment = (signals["index"] >= segment[0]) & (signals["index"] < segment[1])
+
+    results = []
+    for candidate in candidates:
+        params = {**base_params, **candidate}
+        mask = (in_segment & (signals["strength"] >= params["mtfa_threshold"] * 100)
+                & mtfa_gate(signals["mtfa_confidence"], params["mtfa_threshold"]))
+        selected = {key: values[mask] for key, values in signals.items()}
+        summary = summarize(simulate_trades(data, selected, params))
+        results.append((candidate, summary, score(summary, min_trades)))
+    return results
+
+def score(summary: Dict[str, Any], min_trades: int) -> float:
+    """목표 함수 - 복리 수익률 (거래 수 미달 시 제외)"""
+    if summary["total_trades"] < min_trades:
+        return NO_SCORE
+    return summary["total_return"]
+
+# ----- 탐색 전략 -----
+
+def _key(candidate: Dict[str, Any]) -> Tuple:
+    return tuple(candidate[name] for name in sorted(candidate))
+
+class SearchStrategy:
+    """탐색 공간에서 평가할 후보 묶음 생성 - grid / random / bayesian"""
+
+    def __init__(self, space: Dict[str, List[float]], method: str = "bayesian", budget: int = 120,
+                 initial: int = 24, seed: Optional[int] = None):
+        if method not in ("grid", "random", "bayesian"):
+            raise ValueError(f"지원하지 않는 탐색 방식: {method}")
+        self.space = space
+        self.method = method
+        self.rng = random.Random(seed)
+        grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+        self.budget = len(grid) if method == "grid" else min(budget, len(grid))
+        self.initial = min(initial, self.budget)
+        self.queue = grid if method == "grid" else self.rng.sample(grid, len(grid))
+        self.seen: set = set()
+        self.history: List[Tuple[Dict[str, Any], float]] = []
+
+    @property
+    def done(self) -> bool:
+        return len(self.seen) >= self.budget
+
+    def observe(self, results: List[Tuple[Dict[str, Any], Dict[str, Any], float]]):
+        self.history.extend((candidate, value) for candidate, _, value in results)
+
+    def next_batch(self, size: int) -> List[Dict[str, Any]]:
+        size = min(size, self.budget - len(self.seen))
+        if self.method == "bayesian" and len(self.history) >= self.initial:
+            batch = self._tpe_batch(size)
+        else:
+            batch = []
+            while self.queue and len(batch) < size:
+                candidate = self.queue.pop()
+                if _key(candidate) not in self.seen:
+                    batch.append(candidate)
+        self.seen.update(_key(candidate) for candidate in batch)
+        return batch
+
+    def _tpe_batch(self, size: int, gamma: float = 0.25, samples: int = 64) -> List[Dict[str, Any]]:
+        """TPE 방식 - 상위 gamma 관측의 값 분포 l(x)와 나머지 g(x)의 비가 큰 후보 선택 (차원별 독립 범주 분포)"""
+        ranked = sorted(self.history, key=lambda item: item[1], reverse=True)
+        cut = max(1, int(math.ceil(len(ranked) * gamma)))
+        good, bad = [item[0] for item in ranked[:cut]], [item[0] for item in ranked[cut:]]
+
+        def density(group: List[Dict[str, Any]], name: str) -> Dict[Any, float]:
+            values = self.space[name]
+            counts = {value: 1.0 for value in values}  # 라플라스 평활
+            for candidate in group:
+                counts[candidate[name]] += 1
+            total = sum(counts.values())
+            return {value: count / total for value, count in counts.items()}
+
+        good_density = {name: density(good, name) for name in self.space}
+        bad_density = {name: density(bad, name) for name in self.space}
+
+        pool = {}
+        for _ in range(samples * size):
+            candidate = {
+                name: self.rng.choices(list(good_density[name]), weights=list(good_density[name].values()))[0]
+                for name in self.space
+            }
+            key = _key(candidate)
+            if key in self.seen or key in pool:
+                continue
+            ratio = sum(math.log(good_density[name][candidate[name]] / bad_density[name][candidate[name]])
+                        for name in self.space)
+            pool[key] = (ratio, candidate)
+
+        batch = [candidate for _, candidate in sorted(pool.values(), key=lambda item: item[0], reverse=True)[:size]]
+        # 후보가 부족하면 무작위로 채움
+        while len(batch) < size and self.queue:
+            candidate = self.queue.pop()
+            if _key(candidate) not in self.seen and _key(candidate) not in pool:
+                batch.append(candidate)
+        return batch
+
+    def best(self) -> Optional[Tuple[Dict[str, Any], float]]:
+        return max(self.history, key=lambda item: item[1]) if self.history else None
+
+# ----- 탐색 실행 -----
+
+class ParameterSweep:
+    """프로세스 풀 + 공유 메모리 기반 마켓별 워크포워드 파라미터 탐색"""
+
+    def __init__(self, space: Optional[Dict[str, List[float]]] = None, method: str = "bayesian",
+                 budget: int = 120, folds: int = 3, min_trades: int = 5, max_workers: Optional[int] = None):
+        self.space = space or SEARCH_SPACE
+        self.method = method
+        self.budget = budget            # 구간당 평가 후보 수 (grid는 전체)
+        self.folds = folds              # 워크포워드 검증 구간 수
+        self.min_trades = min_trades
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    @staticmethod
+    def fold_segments(rows: int, folds: int) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """누적(anchored) 워크포워드 구간 - 전체를 folds+1 등분, k번째 검증 구간 앞 전부가 학습 구간"""
+        bounds = np.linspace(0, rows, folds + 2).astype(int)
+        return [((0, int(bounds[k])), (int(bounds[k]), int(bounds[k + 1]))) for k in range(1, folds + 1)]
+
+    async def _evaluate(self, pool: ProcessPoolExecutor, market: str, segment: Tuple[int, int],
+                        candidates: List[Dict[str, Any]], base_params: Dict[str, Any]):
+        """후보를 작업 프로세스 수만큼 나누어 동시에 평가"""
+        loop = asyncio.get_running_loop()
+        chunk = max(1, math.ceil(len(candidates) / self.max_workers))
+        futures = [
+            loop.run_in_executor(pool, evaluate_batch, market, segment, candidates[i:i + chunk],
+                                 base_params, self.min_trades)
+            for i in range(0, len(candidates), chunk)
+        ]
+        return [result for batch in await asyncio.gather(*futures) for result in batch]
+
+    async def _search(self, pool: ProcessPoolExecutor, market: str, segment: Tuple[int, int],
+                      base_params: Dict[str, Any], seed: int) -> Tuple[Dict[str, Any], float, int]:
+        strategy = SearchStrategy(self.space, self.method, self.budget, seed=seed)
+        batch_size = max(self.max_workers * 4, 16)
+        while not strategy.done:
+            batch = strategy.next_batch(batch_size)
+            if not batch:
+                break
+            strategy.observe(await self._evaluate(pool, market, segment, batch, base_params))
+        best_params, best_score = strategy.best()
+        return best_params, best_score, len(strategy.history)
+
+    async def _optimize_market(self, pool: ProcessPoolExecutor, market: str, data: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        ts = data["ts"]
+        base_params = default_params(market)
+        baseline = {name: base_params[name] for name in self.space}
+
+        walk_forward = []
+        for fold, (train, test) in enumerate(self.fold_segments(len(ts), self.folds), start=1):
+            best_params, best_score, evaluated = await self._search(pool, market, train, base_params, seed=fold)
+            (_, test_summary, _), (_, baseline_summary, _) = await self._evaluate(
+                pool, market, test, [best_params, baseline], base_params)
+            walk_forward.append({
+                "fold": fold,
+                "train": {"start_ts": int(ts[train[0]]), "end_ts": int(ts[train[1] - 1]),
+                          "score": best_score, "evaluated": evaluated},
+                "test": {"start_ts": int(ts[test[0]]), "end_ts": int(ts[test[1] - 1])},
+                "params": best_params,
+                "test_performance": test_summary,
+                "baseline_performance": baseline_summary
+            })
+
+        out_of_sample = _combine([fold["test_performance"] for fold in walk_forward])
+        baseline_oos = _combine([fold["baseline_performance"] for fold in walk_forward])
+        return {
+            "market": market,
+            "params": walk_forward[-1]["params"],  # 가장 최근 학습 구간의 최적값
+            "walk_forward": walk_forward,
+            "out_of_sample": out_of_sample,
+            "baseline_out_of_sample": baseline_oos,
+            "accepted": out_of_sample["total_trades"] >= self.min_trades
+                        and out_of_sample["total_return"] > max(0.0, baseline_oos["total_return"])
+        }
+
+    async def optimize(self, data_by_market: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, Dict[str, Any]]:
+        """마켓별 워크포워드 탐색 - 모든 마켓을 같은 프로세스 풀에서 동시에 진행"""
+        started = time.time()
+        blocks = {market: SharedCandles(data) for market, data in data_by_market.items()}
+        try:
+            pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),  # 이벤트 루프/스레드 상태를 물려받지 않도록
+                initializer=_init_worker,
+                initargs=({market: block.spec for market, block in blocks.items()},)
+            )
+            with pool:
+                results = await asyncio.gather(
+                    *(self._optimize_market(pool, market, data) for market, data in data_by_market.items()),
+                    return_exceptions=True
+                )
+        finally:
+            for block in blocks.values():
+                block.release()
+
+        output = {}
+        for market, result in zip(data_by_market, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ {market} 파라미터 탐색 실패: {str(result)}")
+                continue
+            output[market] = result
+        logger.info(f"🔬 파라미터 탐색 완료 - {len(output)}/{len(data_by_market)}개 마켓, "
+                    f"{self.method}, 작업 프로세스 {self.max_workers}개 ({time.time() - started:.1f}초)")
+        return output
+
+def _combine(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """구간별 성과 연결 (복리 수익률, 거래 수 가중 승률)"""
+    trades = sum(summary["total_trades"] for summary in summaries)
+    growth = 1.0
+    for summary in summaries:
+        growth *= 1 + summary["total_return"] / 100
+    return {
+        "total_return": round((growth - 1) * 100, 4),
+        "win_rate": round(sum(summary["win_rate"] * summary["total_trades"] for summary in summaries) / trades, 2)
+        if trades else 0.0,
+        "total_trades": trades,
+        "max_drawdown": min((summary["max_drawdown"] for summary in summaries), default=0.0)
+    }
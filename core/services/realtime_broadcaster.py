@@ -0,0 +1,307 @@
+"""
+실시간 스트림 공유 브로드캐스터 (SSE)
+- 단일 생산자가 구독 그룹(사용자 × 마켓 × 간격)별 상태를 틱마다 한 번만 만들고 한 번만 인코딩
+- 첫 메시지는 전체 스냅샷, 이후에는 바뀐 필드만 담은 델타 전송
+- 클라이언트별 큐는 크기가 제한되며, 밀린 클라이언트는 큐를 비우고 최신 스냅샷으로 재동기화
+"""
+
+import asyncio
+import json
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .market_data_service import market_data_service
+from ..utils.price_cache import price_cache
+from ..utils.datetime_utils import utc_now
+
+logger = logging.getLogger(__name__)
+
+def encode_event(payload: Dict[str, Any]) -> bytes:
+    """SSE data 프레임 인코딩"""
+    return f"data: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n".encode("utf-8")
+
+def diff_fields(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """current 중 previous와 다른 필드만 반환"""
+    return {key: value for key, value in current.items() if previous.get(key) != value}
+
+def diff_collection(previous: Dict[str, Dict], current: Dict[str, Dict]) -> Tuple[Dict[str, Dict], List[str]]:
+    """키별 항목 비교 - (추가/변경 항목의 바뀐 필드, 제거된 키)"""
+    changed = {}
+    for key, item in current.items():
+        delta = diff_fields(previous.get(key, {}), item)
+        if delta:
+            changed[key] = delta
+    removed = [key for key in previous if key not in current]
+    return changed, removed
+
+
+@dataclass
+class StreamClient:
+    """SSE 구독 클라이언트"""
+    client_id: str
+    group_key: Tuple
+    queue: asyncio.Queue
+    connected_at: Any = field(default_factory=utc_now)
+    last_sent: Optional[float] = None
+    sent: int = 0
+    dropped: int = 0
+
+
+@dataclass
+class StreamGroup:
+    """같은 데이터를 받는 구독 그룹 - 상태/인코딩 결과를 공유"""
+    user_id: Any
+    markets: Tuple[str, ...]
+    interval: int
+    clients: Dict[str, StreamClient] = field(default_factory=dict)
+    state: Optional[Dict[str, Any]] = None
+    seq: int = 0
+    snapshot_frame: Optional[bytes] = None
+    last_emit: float = 0.0
+    alert_cursor: float = field(default_factory=time.time)  # 이 그룹에 마지막으로 알림을 모은 시각
+
+
+class RealtimeBroadcaster:
+    """SSE 공유 생산자 + 클라이언트별 제한 큐 팬아웃"""
+
+    def __init__(self, tick: float = 1.0, queue_size: int = 16, heartbeat_interval: float = 15.0):
+        self.tick = tick                              # 생산자 기본 틱 (그룹 간격의 최소 단위)
+        self.queue_size = queue_size                  # 클라이언트별 최대 대기 프레임 수
+        self.heartbeat_interval = heartbeat_interval  # 변경이 없을 때 연결 유지용 주석 프레임 간격
+
+        self.groups: Dict[Tuple, StreamGroup] = {}
+        self.clients: Dict[str, StreamClient] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {"ticks": 0, "encoded": 0, "frames_sent": 0, "frames_dropped": 0, "resyncs": 0}
+
+    # ----- 구독 관리 -----
+
+    def subscribe(self, client_id: str, user_id: Any, markets: List[str], interval: int) -> StreamClient:
+        group_key = (user_id, tuple(sorted(markets)), interval)
+        group = self.groups.get(group_key)
+        if group is None:
+            group = self.groups[group_key] = StreamGroup(user_id=user_id, markets=group_key[1], interval=interval)
+
+        client = StreamClient(client_id=client_id, group_key=group_key, queue=asyncio.Queue(maxsize=self.queue_size))
+        group.clients[client_id] = client
+        self.clients[client_id] = client
+
+        # 그룹 상태가 이미 있으면 공유 스냅샷으로 바로 시작
+        if group.state is not None:
+            self._put(client, self._snapshot_frame(group))
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("📡 실시간 스트림 브로드캐스터 시작")
+        return client
+
+    def unsubscribe(self, client_id: str):
+        client = self.clients.pop(client_id, None)
+        if client is None:
+            return
+        group = self.groups.get(client.group_key)
+        if group is not None:
+            group.clients.pop(client_id, None)
+            if not group.clients:
+                del self.groups[client.group_key]
+
+    # ----- 팬아웃 -----
+
+    def _put(self, client: StreamClient, frame: bytes):
+        """제한 큐에 프레임 적재 - 가득 차면 밀린 델타를 버리고 최신 스냅샷 하나로 대체"""
+        try:
+            client.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            dropped = client.queue.qsize()
+            while not client.queue.empty():
+                client.queue.get_nowait()
+            group = self.groups.get(client.group_key)
+            if group is not None and group.state is not None:
+                client.queue.put_nowait(self._snapshot_frame(group))
+            client.dropped += dropped
+            self.stats["frames_dropped"] += dropped
+            self.stats["resyncs"] += 1
+
+    def _snapshot_frame(self, group: StreamGroup) -> bytes:
+        """그룹 현재 상태의 전체 스냅샷 프레임 (seq당 한 번만 인코딩)"""
+        if group.snapshot_frame is None:
+            group.snapshot_frame = encode_event({
+                "type": "snapshot",
+                "seq": group.seq,
+                "timestamp": utc_now().isoformat(),
+                **group.state
+            })
+            self.stats["encoded"] += 1
+        return group.snapshot_frame
+
+    # ----- 생산자 -----
+
+    async def _run(self):
+        try:
+            while self.groups:
+                loop_start = time.time()
+                try:
+                    await self._produce(loop_start)
+                except Exception as e:
+                    logger.error(f"⚠️ 실시간 스트림 생성 오류: {str(e)}")
+                self.stats["ticks"] += 1
+                await asyncio.sleep(max(0.0, self.tick - (time.time() - loop_start)))
+        except asyncio.CancelledError:
+            pass
+        finally:
+            logger.info("⏹️ 실시간 스트림 브로드캐스터 종료")
+
+    async def _produce(self, now: float):
+        due = [group for group in self.groups.values() if now - group.last_emit >= group.interval]
+        if not due:
+            return
+
+        # 모든 그룹의 마켓 현재가는 한 번에 조회 (공유 버스/가격 캐시)
+        markets = sorted({market for group in due for market in group.markets})
+        tickers = await market_data_service.get_tickers(markets, max_age=self.tick * 2) if markets else {}
+        prices = {market: self._price_entry(market, tickers.get(market)) for market in markets}
+        collected_at = time.time()
+        pending = self._collect_alerts()
+
+        for group in due:
+            group.last_emit = now
+            # 그룹마다 자기 커서 이후 알림만 - 간격이 긴 그룹도 다른 그룹의 틱에 알림을 빼앗기지 않음
+            alerts = [alert for alert_ts, alert in pending if alert_ts > group.alert_cursor]
+            group.alert_cursor = collected_at
+            state = {
+                **self._trading_state(group.user_id),
+                "market_prices": {market: prices[market] for market in group.markets if prices.get(market)}
+            }
+            self._emit(group, state, alerts)
+
+    def _emit(self, group: StreamGroup, state: Dict[str, Any], alerts: List[Dict]):
+        if group.state is None:
+            group.state = state
+            group.seq += 1
+            group.snapshot_frame = None
+            frame = self._snapshot_frame(group)
+        else:
+            status_delta = diff_fields(group.state["trading_status"], state["trading_status"])
+            positions_changed, positions_removed = diff_collection(group.state["positions"], state["positions"])
+            prices_changed, _ = diff_collection(group.state["market_prices"], state["market_prices"])
+
+            if not (status_delta or positions_changed or positions_removed or prices_changed or alerts):
+                self._heartbeat(group)
+                return
+
+            group.state = state
+            group.seq += 1
+            group.snapshot_frame = None
+
+            delta: Dict[str, Any] = {"type": "delta", "seq": group.seq, "timestamp": utc_now().isoformat()}
+            if status_delta:
+                delta["trading_status"] = status_delta
+            if positions_changed:
+                delta["positions"] = positions_changed
+            if positions_removed:
+                delta["positions_removed"] = positions_removed
+            if prices_changed:
+                delta["market_prices"] = prices_changed
+            if alerts:
+                delta["alerts"] = alerts
+            frame = encode_event(delta)
+            self.stats["encoded"] += 1
+
+        self._broadcast(group, frame)
+
+    def _heartbeat(self, group: StreamGroup):
+        for client in group.clients.values():
+            if client.last_sent is None or time.time() - client.last_sent >= self.heartbeat_interval:
+                self._put(client, b": keep-alive\n\n")
+                client.last_sent = time.time()
+
+    def _broadcast(self, group: StreamGroup, frame: bytes):
+        sent_at = time.time()
+        for client in list(group.clients.values()):
+            self._put(client, frame)
+            client.last_sent = sent_at
+        self.stats["frames_sent"] += len(group.clients)
+
+    # ----- 상태 수집 -----
+
+    @staticmethod
+    def _trading_state(user_id: Any) -> Dict[str, Any]:
+        """사용자 세션 거래 상태 (세션이 없으면 전역 상태)"""
+        from ..session import session_manager
+        from .trading_engine import trading_engine, trading_state
+
+        user_session = session_manager.get_all_sessions().get(user_id) if user_id is not None else None
+        state = user_session.trading_state if user_session else trading_state
+        engine = user_session.trading_engine if user_session else trading_engine
+
+        positions = {
+            coin: {
+                "market": f"KRW-{coin}",
+                "symbol": coin,
+                "amount": position.amount,
+                "buy_price": position.buy_price,
+                "current_price": position.current_price,
+                "profit_loss": position.unrealized_pnl,
+                "profit_loss_rate": round((position.current_price - position.buy_price) / position.buy_price * 100, 4)
+                if position.buy_price and position.current_price else 0.0,
+                "profit_target": position.profit_target,
+                "stop_loss": position.stop_loss,
+                "created_at": position.timestamp.isoformat()
+            }
+            for coin, position in state.positions.items()
+        }
+        return {
+            "trading_status": {
+                "status": engine.is_running,
+                "active_positions": len(positions),
+                "total_profit_loss": sum(position["profit_loss"] for position in positions.values()),
+                "available_krw": state.available_budget
+            },
+            "positions": positions
+        }
+
+    @staticmethod
+    def _price_entry(market: str, ticker: Optional[Dict]) -> Optional[Dict[str, Any]]:
+        quote = price_cache.get(market)
+        if ticker is None and quote is None:
+            return None
+        return {
+            "market": market,
+            "symbol": market.split('-')[1],
+            "trade_price": quote.price if quote else ticker.get("trade_price", 0),
+            "change": ticker.get("change", "EVEN") if ticker else "EVEN",
+            "change_price": ticker.get("change_price", 0) if ticker else 0,
+            "change_rate": ticker.get("change_rate", 0) if ticker else 0
+        }
+
+    def _collect_alerts(self) -> List[Tuple[float, Dict[str, Any]]]:
+        """해결되지 않은 모니터링 알림 (발생 시각, 프레임 항목) - 그룹별 커서로 걸러 사용"""
+        try:
+            from .monitoring_service import monitoring_service
+
+            return [
+                (alert.timestamp.timestamp(), {
+                    "type": alert.severity.value if hasattr(alert.severity, "value") else str(alert.severity),
+                    "title": alert.title,
+                    "message": alert.message,
+                    "timestamp": alert.timestamp.isoformat()
+                })
+                for alert in list(monitoring_service.alerts.values())
+                if not alert.resolved
+            ]
+        except Exception:
+            return []
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "groups": len(self.groups),
+            "clients": len(self.clients),
+            "stats": self.stats.copy()
+        }
+
+# 전역 실시간 브로드캐스터 인스턴스
+realtime_broadcaster = RealtimeBroadcaster()
@@ -1,4 +1,4 @@
-"""신호 분석 시스템 - 거래량 급증 및 기술적 지표 분석 (실시간 API 기반)"""
+"""신호 분석 시스템 - 거래량 급증 및 기술적 지표 분석 (실시간 API 기반, 평가당 캔들 1회 조회)"""
 
 import asyncio
 import time
@@ -6,6 +6,12 @@
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+from .market_data_service import market_data_service
+from .indicator_engine import indicator_engine, MarketIndicators
+from .mtfa_engine import mtfa_engine
+from ..utils.datetime_utils import dt_to_epoch_s
+from ..utils.instrumentation import metrics_registry
+
 logger = logging.getLogger(__name__)
 
 class SignalAnalyzer:
@@ -14,95 +20,125 @@ class SignalAnalyzer:
     def __init__(self):
         self.min_candles = 20  # 최소 캔들 수 (실시간 API 최적화)
         
+    @metrics_registry.timed("signal_analysis", labels=lambda self, market, params: {"market": market})
     async def check_buy_signal(self, market: str, params: Dict) -> Optional[Dict]:
-        """종합 매수 신호 확인 (상세 로깅 강화)"""
+        """종합 매수 신호 확인 (상세 로깅 강화) - 캔들은 평가당 1회만 조회"""
         coin_symbol = market.split('-')[1]
         analysis_start_time = time.time()
 
         try:
             logger.info(f"🔍 {coin_symbol} 신호 분석 시작 (MTFA 임계값: {params.get('mtfa_threshold', 0.80)*100:.0f}%)")
 
-            # 1. 기본 데이터 조회
+            # 1. 기본 데이터 조회 (이후 모든 단계는 이 캔들 윈도우만 사용)
             candle_data = await self._get_candle_data(market, self.min_candles)
-            if not candle_data or len(candle_data) < self.min_candles:
-                logger.warning(f"❌ {coin_symbol} 1단계 실패: 캔들 데이터 부족 ({len(candle_data) if candle_data else 0}개)")
-                return None
+            
+            # 증분 지표 상태에 새 캔들만 반영
+            indicators = indicator_engine.update_from_candles(market, candle_data) if candle_data else None
 
-            logger.info(f"✅ {coin_symbol} 1단계 통과: 캔들 데이터 {len(candle_data)}개 확보")
+            # 같은 1분봉으로 다중 시간대 상태 갱신 (처음 보는 마켓은 저장된 1분봉으로 초기화)
+            mtfa_confidence = None
+            if candle_data:
+                await mtfa_engine.ensure_seeded(market)
+                mtfa_confidence = mtfa_engine.update_from_candles(market, candle_data).snapshot()["confidence"]
+            return self.evaluate_buy_signal(market, candle_data, params, analysis_start_time, indicators,
+                                            mtfa_confidence)
+            
+        except (KeyError, IndexError) as e:
+            logger.error(f"❌ {market} 데이터 구조 오류: {str(e)}")
+            return None
+        except (ValueError, TypeError) as e:
+            logger.error(f"❌ {market} 데이터 타입 오류: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"❌ {market} 예상치 못한 신호 분석 오류: {str(e)}")
+            return None
 
-            # 2. 거래량 급증 확인
-            volume_signal = await self._check_volume_surge(market, params)
-            if not volume_signal["is_surge"]:
-                logger.info(f"❌ {coin_symbol} 2단계 실패: 거래량 급증 없음 (현재: {volume_signal.get('surge_ratio', 0):.1f}배, 요구: {params['volume_mult']:.1f}배)")
-                return None
+    def evaluate_buy_signal(self, market: str, candle_data: List[Dict], params: Dict,
+                            analysis_start_time: Optional[float] = None,
+                            indicators: Optional[MarketIndicators] = None,
+                            mtfa_confidence: Optional[float] = None) -> Optional[Dict]:
+        """메모리 캔들 윈도우에 대한 매수 신호 평가 파이프라인 (API 호출 없음)
 
-            logger.info(f"✅ {coin_symbol} 2단계 통과: 거래량 급증 {volume_signal['surge_ratio']:.1f}배 감지")
+        mtfa_confidence: 다중 시간대 정렬 신뢰도 (0~1) - 주어지면 신호 강도와 함께 mtfa_threshold 이상이어야 통과
+        """
+        coin_symbol = market.split('-')[1]
+        if analysis_start_time is None:
+            analysis_start_time = time.time()
 
-            # 3. 가격 변동률 확인
-            price_change = self._calculate_price_change(candle_data)
-            if price_change < params["price_change"]:
-                logger.info(f"❌ {coin_symbol} 3단계 실패: 가격변동 부족 (현재: {price_change:.2f}%, 요구: {params['price_change']:.2f}%)")
-                return None
+        if not candle_data or len(candle_data) < self.min_candles:
+            logger.warning(f"❌ {coin_symbol} 1단계 실패: 캔들 데이터 부족 ({len(candle_data) if candle_data else 0}개)")
+            return None
 
-            logger.info(f"✅ {coin_symbol} 3단계 통과: 가격상승 {price_change:.2f}%")
+        logger.info(f"✅ {coin_symbol} 1단계 통과: 캔들 데이터 {len(candle_data)}개 확보")
 
-            # 4. 기술적 지표 확인
-            technical_signals = self._calculate_technical_indicators(candle_data, params)
-            if not technical_signals["bullish"]:
-                logger.info(f"❌ {coin_symbol} 4단계 실패: 기술적 지표 점수 부족 (현재: {technical_signals.get('score', 0):.0f}점, 요구: 50점)")
-                return None
+        # 2. 거래량 급증 확인
+        volume_signal = self._check_volume_surge(candle_data, params, indicators)
+        if not volume_signal["is_surge"]:
+            logger.info(f"❌ {coin_symbol} 2단계 실패: 거래량 급증 없음 (현재: {volume_signal.get('surge_ratio', 0):.1f}배, 요구: {params['volume_mult']:.1f}배)")
+            return None
 
-            logger.info(f"✅ {coin_symbol} 4단계 통과: 기술적 지표 {technical_signals['score']:.0f}점 (RSI: {technical_signals.get('rsi', 0):.1f})")
+        logger.info(f"✅ {coin_symbol} 2단계 통과: 거래량 급증 {volume_signal['surge_ratio']:.1f}배 감지")
 
-            # 5. 캔들 패턴 확인
-            candle_pattern = self._analyze_candle_pattern(candle_data, params)
-            if not candle_pattern["bullish"]:
-                logger.info(f"❌ {coin_symbol} 5단계 실패: 캔들 패턴 점수 부족 (현재: {candle_pattern.get('score', 0):.0f}점, 요구: 50점)")
-                return None
+        # 3. 가격 변동률 확인
+        price_change = self._calculate_price_change(candle_data)
+        if price_change < params["price_change"]:
+            logger.info(f"❌ {coin_symbol} 3단계 실패: 가격변동 부족 (현재: {price_change:.2f}%, 요구: {params['price_change']:.2f}%)")
+            return None
 
-            logger.info(f"✅ {coin_symbol} 5단계 통과: 캔들 패턴 {candle_pattern['score']:.0f}점")
+        logger.info(f"✅ {coin_symbol} 3단계 통과: 가격상승 {price_change:.2f}%")
 
-            # 6. 종합 신호 강도 계산
-            signal_strength = self._calculate_signal_strength(
-                volume_signal, technical_signals, candle_pattern, price_change
-            )
-            
-            # MTFA 최적화된 코인별 신뢰도 임계값 사용
-            mtfa_threshold = params.get("mtfa_threshold", 0.80) * 100  # 퍼센트로 변환
+        # 4. 기술적 지표 확인
+        technical_signals = self._calculate_technical_indicators(candle_data, params, indicators)
+        if not technical_signals["bullish"]:
+            logger.info(f"❌ {coin_symbol} 4단계 실패: 기술적 지표 점수 부족 (현재: {technical_signals.get('score', 0):.0f}점, 요구: 50점)")
+            return None
 
-            analysis_duration = time.time() - analysis_start_time
+        logger.info(f"✅ {coin_symbol} 4단계 통과: 기술적 지표 {technical_signals['score']:.0f}점 (RSI: {technical_signals.get('rsi', 0):.1f})")
 
-            if signal_strength >= mtfa_threshold:
-                logger.info(f"🎯 {coin_symbol} 6단계 통과: 최종 신호 강도 {signal_strength:.0f}점 (임계값: {mtfa_threshold:.0f}점)")
-                logger.info(f"🚀 {coin_symbol} 매수 신호 생성 완료! (분석시간: {analysis_duration:.2f}초)")
-                logger.info(f"   📊 세부 점수 - 거래량: {volume_signal['surge_ratio']:.1f}배, 가격: {price_change:.2f}%, 기술적: {technical_signals['score']:.0f}점, 캔들: {candle_pattern['score']:.0f}점")
+        # 5. 캔들 패턴 확인
+        candle_pattern = self._analyze_candle_pattern(candle_data, params)
+        if not candle_pattern["bullish"]:
+            logger.info(f"❌ {coin_symbol} 5단계 실패: 캔들 패턴 점수 부족 (현재: {candle_pattern.get('score', 0):.0f}점, 요구: 50점)")
+            return None
 
-                return {
-                    "should_buy": True,
-                    "signal_strength": signal_strength,
-                    "confidence": technical_signals["confidence"],
-                    "reason": f"거래량 급증 {volume_signal['surge_ratio']:.1f}배, 가격상승 {price_change:.2f}%",
-                    "volume_surge_ratio": volume_signal["surge_ratio"],
-                    "price_change": price_change,
-                    "technical_score": technical_signals["score"],
-                    "candle_score": candle_pattern["score"],
-                    "analysis_duration": analysis_duration
-                }
-            else:
-                logger.info(f"❌ {coin_symbol} 6단계 실패: 신호 강도 부족 (현재: {signal_strength:.0f}점, 요구: {mtfa_threshold:.0f}점)")
-                logger.info(f"   🔍 상세 분석 - 거래량: {volume_signal['surge_ratio']:.1f}배, 가격: {price_change:.2f}%, 기술적: {technical_signals['score']:.0f}점, 캔들: {candle_pattern['score']:.0f}점 (분석시간: {analysis_duration:.2f}초)")
+        logger.info(f"✅ {coin_symbol} 5단계 통과: 캔들 패턴 {candle_pattern['score']:.0f}점")
 
+        # 6. 종합 신호 강도 계산
+        signal_strength = self._calculate_signal_strength(
+            volume_signal, technical_signals, candle_pattern, price_change
+        )
+        
+        # MTFA 최적화된 코인별 신뢰도 임계값 사용
+        mtfa_threshold = params.get("mtfa_threshold", 0.80) * 100  # 퍼센트로 변환
+
+        analysis_duration = time.time() - analysis_start_time
+
+        if signal_strength >= mtfa_threshold and mtfa_confidence is not None and mtfa_confidence * 100 < mtfa_threshold:
+            logger.info(f"❌ {coin_symbol} 6단계 실패: 다중 시간대 정렬 부족 (신뢰도: {mtfa_confidence * 100:.0f}%, 요구: {mtfa_threshold:.0f}%)")
             return None
-            
-        except (KeyError, IndexError) as e:
-            logger.error(f"❌ {market} 데이터 구조 오류: {str(e)}")
-            return None
-        except (ValueError, TypeError) as e:
-            logger.error(f"❌ {market} 데이터 타입 오류: {str(e)}")
-            return None
-        except Exception as e:
-            logger.error(f"❌ {market} 예상치 못한 신호 분석 오류: {str(e)}")
-            return None
+
+        if signal_strength >= mtfa_threshold:
+            logger.info(f"🎯 {coin_symbol} 6단계 통과: 최종 신호 강도 {signal_strength:.0f}점 (임계값: {mtfa_threshold:.0f}점)")
+            logger.info(f"🚀 {coin_symbol} 매수 신호 생성 완료! (분석시간: {analysis_duration:.2f}초)")
+            logger.info(f"   📊 세부 점수 - 거래량: {volume_signal['surge_ratio']:.1f}배, 가격: {price_change:.2f}%, 기술적: {technical_signals['score']:.0f}점, 캔들: {candle_pattern['score']:.0f}점")
+
+            return {
+                "should_buy": True,
+                "signal_strength": signal_strength,
+                "confidence": technical_signals["confidence"],
+                "mtfa_confidence": mtfa_confidence,
+                "reason": f"거래량 급증 {volume_signal['surge_ratio']:.1f}배, 가격상승 {price_change:.2f}%",
+                "volume_surge_ratio": volume_signal["surge_ratio"],
+                "price_change": price_change,
+                "technical_score": technical_signals["score"],
+                "candle_score": candle_pattern["score"],
+                "analysis_duration": analysis_duration
+            }
+        else:
+            logger.info(f"❌ {coin_symbol} 6단계 실패: 신호 강도 부족 (현재: {signal_strength:.0f}점, 요구: {mtfa_threshold:.0f}점)")
+            logger.info(f"   🔍 상세 분석 - 거래량: {volume_signal['surge_ratio']:.1f}배, 가격: {price_change:.2f}%, 기술적: {technical_signals['score']:.0f}점, 캔들: {candle_pattern['score']:.0f}점 (분석시간: {analysis_duration:.2f}초)")
+
+        return None
 
     async def analyze_buy_conditions_detailed(self, market: str, params: Dict) -> Dict:
         """실시간 매수 조건 세부 분석 - 개별 조건별 상태 확인"""
@@ -132,9 +168,10 @@ async def analyze_buy_conditions_detailed(self, market: str, params: Dict) -> Di
                 return result
             
             result["current_price"] = candle_data[-1]["close"]
+            indicators = indicator_engine.update_from_candles(market, candle_data)
             
-            # 2. 거래량 급증 분석
-            volume_signal = await self._check_volume_surge(market, params)
+            # 2. 거래량 급증 분석 (1단계에서 조회한 캔들 재사용)
+            volume_signal = self._check_volume_surge(candle_data, params, indicators)
             volume_threshold = params.get("volume_mult", 1.5)
             result["conditions"]["volume_surge"] = {
                 "status": "✅" if volume_signal["is_surge"] else "❌",
@@ -154,7 +191,7 @@ async def analyze_buy_conditions_detailed(self, market: str, params: Dict) -> Di
             }
             
             # 4. 기술적 지표 분석
-            technical_signals = self._calculate_technical_indicators(candle_data, params)
+            technical_signals = self._calculate_technical_indicators(candle_data, params, indicators)
             result["conditions"]["technical_signals"] = {
                 "status": "✅" if technical_signals["bullish"] else "❌",
                 "value": f"{technical_signals['score']}점",
@@ -215,18 +252,11 @@ async def _get_candle_data(self, market: str, limit: int = 20) -> List[Dict]:
         
         for attempt in range(max_retries):
             try:
-                # 공개 업비트 클라이언트 가져오기 (인증 불필요)
-                from ..api.system import public_upbit_client
-                
-                if not public_upbit_client:
-                    logger.error(f"⚠️ {market} 업비트 클라이언트가 연결되지 않았습니다")
-                    return []
-                
                 logger.debug(f"🔍 {market} 캔들 데이터 요청 시작... (시도 {attempt + 1}/{max_retries})")
                 
-                # 업비트 API에서 직접 캔들 데이터 가져오기
+                # 공유 시장 데이터 버스에서 캔들 조회 (같은 틱 안에서는 모든 엔진이 한 번의 조회 결과 공유)
                 response = await asyncio.wait_for(
-                    public_upbit_client.get_minute_candles(market, limit),
+                    market_data_service.get_candles(market, limit),
                     timeout=10.0  # 10초 타임아웃
                 )
                 
@@ -248,14 +278,7 @@ async def _get_candle_data(self, market: str, limit: int = 20) -> List[Dict]:
                 candle_data = []
                 for candle in reversed(response):  # API는 최신순이므로 뒤집기
                     try:
-                        candle_data.append({
-                            "timestamp": int(candle.get("timestamp", 0) / 1000),  # 밀리초 → 초
-                            "open": float(candle.get("opening_price", 0)),
-                            "high": float(candle.get("high_price", 0)),
-                            "low": float(candle.get("low_price", 0)),
-                            "close": float(candle.get("trade_price", 0)),
-                            "volume": float(candle.get("candle_acc_trade_volume", 0))
-                        })
+                        candle_data.append(self._normalize_candle(candle))
                     except (ValueError, TypeError, KeyError) as e:
                         logger.warning(f"⚠️ {market} 캔들 데이터 변환 오류: {str(e)}")
                         continue
@@ -275,9 +298,6 @@ async def _get_candle_data(self, market: str, limit: int = 20) -> List[Dict]:
                 if attempt < max_retries - 1:
                     await asyncio.sleep(retry_delay * 2)  # 타임아웃시 더 길게 대기
                     continue
-            except ImportError as e:
-                logger.error(f"❌ {market} 업비트 클라이언트 import 오류: {str(e)}")
-                return []
             except (ConnectionError, OSError) as e:
                 logger.warning(f"⚠️ {market} 네트워크 연결 오류 (시도 {attempt + 1}): {str(e)}")
                 if attempt < max_retries - 1:
@@ -292,24 +312,44 @@ async def _get_candle_data(self, market: str, limit: int = 20) -> List[Dict]:
         logger.error(f"❌ {market} {max_retries}번 시도 모두 실패 - 캔들 데이터 조회 불가")
         return []
     
-    async def _check_volume_surge(self, market: str, params: Dict) -> Dict:
-        """거래량 급증 확인 - 실시간 캔들 데이터 기반"""
+    @staticmethod
+    def _normalize_candle(candle: Dict) -> Dict:
+        """업비트 분봉 응답 1개를 분석용 형식으로 변환"""
+        normalized = {
+            "timestamp": int(candle.get("timestamp", 0) / 1000),  # 밀리초 → 초 (마지막 체결 시각)
+            "open": float(candle.get("opening_price", 0)),
+            "high": float(candle.get("high_price", 0)),
+            "low": float(candle.get("low_price", 0)),
+            "close": float(candle.get("trade_price", 0)),
+            "volume": float(candle.get("candle_acc_trade_volume", 0))
+        }
+        
+        # 캔들 시작 시각 (진행 중인 캔들은 체결마다 timestamp가 바뀌므로 캔들 식별에는 시작 시각 사용)
+        candle_time = candle.get("candle_date_time_utc")
+        if candle_time:
+            normalized["candle_ts"] = dt_to_epoch_s(datetime.fromisoformat(candle_time.rstrip("Z")))
+        return normalized
+    
+    def _check_volume_surge(self, candle_data: List[Dict], params: Dict,
+                            indicators: Optional[MarketIndicators] = None) -> Dict:
+        """거래량 급증 확인 - 이미 조회된 캔들 윈도우 기반 (추가 API 호출 없음)"""
         try:
-            # 실시간 캔들 데이터에서 거래량 정보 추출 (20개면 충분)
-            # _get_candle_data가 이미 public_upbit_client를 사용하므로 그대로 호출
-            candle_data = await self._get_candle_data(market, 20)
-            
             if len(candle_data) < 10:
                 return {"is_surge": False, "surge_ratio": 0}
             
-            # 거래량만 추출
-            volumes = [candle["volume"] for candle in candle_data]
-            
-            # 최근 3개 캔들의 평균 거래량
-            recent_volume = sum(volumes[-3:]) / 3
-            
-            # 과거 평균 거래량 (최근 3개 제외)
-            historical_volume = sum(volumes[:-3]) / (len(volumes) - 3)
+            if indicators is not None:
+                # 증분 지표 엔진의 롤링 거래량 평균 조회
+                recent_volume = indicators.recent_volume_mean()
+                historical_volume = indicators.historical_volume_mean()
+            else:
+                # 거래량만 추출
+                volumes = [candle["volume"] for candle in candle_data]
+                
+                # 최근 3개 캔들의 평균 거래량
+                recent_volume = sum(volumes[-3:]) / 3
+                
+                # 과거 평균 거래량 (최근 3개 제외)
+                historical_volume = sum(volumes[:-3]) / (len(volumes) - 3)
             
             if historical_volume == 0:
                 return {"is_surge": False, "surge_ratio": 0}
@@ -325,7 +365,7 @@ async def _check_volume_surge(self, market: str, params: Dict) -> Dict:
             }
             
         except Exception as e:
-            logger.error(f"⚠️ {market} 거래량 급증 확인 오류: {str(e)}")
+            logger.error(f"⚠️ 거래량 급증 확인 오류: {str(e)}")
             return {"is_surge": False, "surge_ratio": 0}
     
     def _calculate_price_change(self, candle_data: List[Dict]) -> float:
@@ -342,44 +382,55 @@ def _calculate_price_change(self, candle_data: List[Dict]) -> float:
         
         return ((recent_price - past_price) / past_price) * 100
     
-    def _calculate_technical_indicators(self, candle_data: List[Dict], params: Dict) -> Dict:
-        """기술적 지표 계산 - PDF 리뷰 적용: 데이터 검증 강화"""
+    def _calculate_technical_indicators(self, candle_data: List[Dict], params: Dict,
+                                        indicators: Optional[MarketIndicators] = None) -> Dict:
+        """기술적 지표 계산 - PDF 리뷰 적용: 데이터 검증 강화 (증분 지표가 준비되어 있으면 조회만 수행)"""
         try:
-            # PDF 가이드: 데이터 유효성 검증 및 이상값 처리
-            closes = []
-            volumes = []
-            
-            for candle in candle_data:
-                close_price = candle.get("close", 0)
-                volume = candle.get("volume", 0)
+            if indicators is not None and indicators.is_ready:
+                # 증분 지표 엔진 조회 (윈도우 재계산 없음, 이상값은 롤링 중앙값/MAD 기준으로 대체)
+                ema5 = indicators.ema(5)
+                ema10 = indicators.ema(10)
+                rsi = indicators.rsi()
+                vwap = indicators.vwap()
+                closes = [indicators.close_median.clip(candle["close"]) for candle in candle_data[-3:]]
+                volumes = [indicators.volume_median.clip(candle["volume"]) for candle in candle_data[-2:]]
+                current_price = closes[-1]
+            else:
+                # PDF 가이드: 데이터 유효성 검증 및 이상값 처리
+                closes = []
+                volumes = []
+                
+                for candle in candle_data:
+                    close_price = candle.get("close", 0)
+                    volume = candle.get("volume", 0)
+                    
+                    # NaN/무한대 값 검증
+                    if (isinstance(close_price, (int, float)) and 
+                        isinstance(volume, (int, float)) and
+                        not (close_price != close_price or volume != volume) and  # NaN 체크
+                        close_price > 0 and volume >= 0 and  # 음수/0 가격 제외
+                        close_price < float('inf') and volume < float('inf')):  # 무한대 체크
+                        closes.append(float(close_price))
+                        volumes.append(float(volume))
+                
+                if len(closes) < 14:
+                    logger.warning(f"유효한 캔들 데이터 부족: {len(closes)}개 (최소 14개 필요)")
+                    return {"bullish": False, "confidence": 0, "score": 0}
+                
+                # 이상값 감지 및 처리 (PDF 권장: robust z-score 방식)
+                closes = self._handle_outliers(closes)
+                volumes = self._handle_outliers(volumes)
+                
+                # EMA 계산
+                ema5 = self._calculate_ema(closes, 5)
+                ema10 = self._calculate_ema(closes, 10)
+                
+                # RSI 계산
+                rsi = self._calculate_rsi(closes, 14)
                 
-                # NaN/무한대 값 검증
-                if (isinstance(close_price, (int, float)) and 
-                    isinstance(volume, (int, float)) and
-                    not (close_price != close_price or volume != volume) and  # NaN 체크
-                    close_price > 0 and volume >= 0 and  # 음수/0 가격 제외
-                    close_price < float('inf') and volume < float('inf')):  # 무한대 체크
-                    closes.append(float(close_price))
-                    volumes.append(float(volume))
-            
-            if len(closes) < 14:
-                logger.warning(f"유효한 캔들 데이터 부족: {len(closes)}개 (최소 14개 필요)")
-                return {"bullish": False, "confidence": 0, "score": 0}
-            
-            # 이상값 감지 및 처리 (PDF 권장: robust z-score 방식)
-            closes = self._handle_outliers(closes)
-            volumes = self._handle_outliers(volumes)
-            
-            # EMA 계산
-            ema5 = self._calculate_ema(closes, 5)
-            ema10 = self._calculate_ema(closes, 10)
-            
-            # RSI 계산
-            rsi = self._calculate_rsi(closes, 14)
-            
-            # VWAP 계산
-            vwap = self._calculate_vwap(candle_data)
-            current_price = closes[-1]
+                # VWAP 계산
+                vwap = self._calculate_vwap(candle_data)
+                current_price = closes[-1]
             
             # 신호 점수 계산
             score = 0
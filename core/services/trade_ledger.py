@@ -0,0 +1,224 @@
+"""
+거래 원장 서비스
+- 체결(fill)/청산 완료(close)를 trade_ledger에 추가 전용으로 기록하고, 같은 트랜잭션에서 trade_stats 집계를 누적
+- 기록 요청은 큐에 넣고 바로 반환 - 백그라운드 작성 태스크가 쌓인 요청을 한 트랜잭션으로 모아 기록 (매매 경로는 DB를 기다리지 않음)
+- 청산 손익은 매수/매도 수수료를 뺀 순손익
+- 내역 조회는 (user, market, ts, id) 인덱스 키셋 페이지네이션 - 오프셋 스캔 없음
+- 통계 조회는 (user, market, KST 일자, 시) 집계 행만 합산 - 비용은 거래 건수가 아니라 조회 기간에 비례
+"""
+
+import asyncio
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from database import async_engine, trade_ledger_table
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_USER_ID = 0       # 세션 없는 전역 엔진
+UPBIT_FEE = 0.0005       # 업비트 KRW 마켓 거래 수수료
+KST_OFFSET = 9 * 3600
+
+STAT_COLUMNS = ("fills", "fill_volume", "fees", "trades", "wins", "losses", "volume",
+                "profit_loss", "gross_profit", "gross_loss", "hold_seconds")
+
+def kst_bucket(ts: int) -> Tuple[int, int]:
+    """epoch 초 → (KST 자정 epoch, KST 시)"""
+    local = ts + KST_OFFSET
+    return ts - local % 86400, (local % 86400) // 3600
+
+def encode_cursor(ts: int, row_id: int) -> str:
+    return f"{ts}:{row_id}"
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    ts, row_id = cursor.split(":", 1)
+    return int(ts), int(row_id)
+
+def _stats_upsert_sql(dialect_name: str) -> str:
+    """DB별 집계 누적 SQL (없으면 생성, 있으면 더함)"""
+    columns = ", ".join(("user_id", "market", "day_ts", "hour") + STAT_COLUMNS)
+    values = ", ".join(f":{name}" for name in ("user_id", "market", "day_ts", "hour") + STAT_COLUMNS)
+    if dialect_name == "mysql":
+        updates = ", ".join(f"{name} = {name} + VALUES({name})" for name in STAT_COLUMNS)
+        return f"INSERT INTO trade_stats ({columns}) VALUES ({values}) ON DUPLICATE KEY UPDATE {updates}"
+    updates = ", ".join(f"{name} = trade_stats.{name} + excluded.{name}" for name in STAT_COLUMNS)
+    return (f"INSERT INTO trade_stats ({columns}) VALUES ({values}) "
+            f"ON CONFLICT(user_id, market, day_ts, hour) DO UPDATE SET {updates}")
+
+
+class TradeLedger:
+    """추가 전용 거래 원장 + 증분 통계 집계"""
+
+    def __init__(self):
+        self._stats_sql = text(_stats_upsert_sql(async_engine.dialect.name))
+        self._queue: List[Dict[str, Any]] = []
+        self._writer: Optional[asyncio.Task] = None
+        self.stats = {"queued": 0, "written": 0, "failed": 0, "batches": 0}
+
+    # ----- 기록 -----
+
+    async def _append(self, entries: List[Dict[str, Any]]) -> bool:
+        """원장 행과 집계 증분을 한 트랜잭션으로 기록 (실패해도 거래 흐름은 유지)"""
+        try:
+            increments: Dict[Tuple, Dict[str, float]] = {}
+            for entry in entries:
+                day_ts, hour = kst_bucket(entry["ts"])
+                key = (entry["user_id"], entry["market"], day_ts, hour)
+                delta = increments.setdefault(key, {name: 0 for name in STAT_COLUMNS})
+                if entry["event"] == "fill":
+                    delta["fills"] += 1
+                    delta["fill_volume"] += entry["total"]
+                    delta["fees"] += entry["fee"]
+                else:
+                    profit_loss = entry["profit_loss"]
+                    delta["trades"] += 1
+                    delta["wins"] += profit_loss > 0
+                    delta["losses"] += profit_loss < 0
+                    delta["volume"] += entry["total"]
+                    delta["profit_loss"] += profit_loss
+                    delta["gross_profit"] += max(profit_loss, 0.0)
+                    delta["gross_loss"] += max(-profit_loss, 0.0)
+                    delta["hold_seconds"] += entry["hold_seconds"] or 0
+
+            async with async_engine.begin() as conn:
+                await conn.execute(trade_ledger_table.insert(), entries)
+                await conn.execute(self._stats_sql, [
+                    {"user_id": user_id, "market": market, "day_ts": day_ts, "hour": hour, **delta}
+                    for (user_id, market, day_ts, hour), delta in increments.items()
+                ])
+            return True
+        except Exception as e:
+            logger.error(f"❌ 거래 원장 기록 실패: {str(e)}")
+            return False
+
+    def _enqueue(self, entries: List[Dict[str, Any]]):
+        """기록 요청 적재 후 즉시 반환 - 작성 태스크가 없으면 시작"""
+        self._queue.extend(entries)
+        self.stats["queued"] += len(entries)
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        """큐가 빌 때까지 쌓인 요청을 한 번에 기록"""
+        while self._queue:
+            entries, self._queue = self._queue, []
+            self.stats["batches"] += 1
+            if await self._append(entries):
+                self.stats["written"] += len(entries)
+            else:
+                self.stats["failed"] += len(entries)
+
+    async def flush(self, timeout: float = 5.0):
+        """대기 중인 기록 완료까지 대기 (종료 시/조회 전 사용)"""
+        writer = self._writer
+        if writer is None or writer.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(writer), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏰ 거래 원장 기록 대기 시간 초과 - 미기록 {len(self._queue)}건")
+
+    @staticmethod
+    def _fill(user_id: int, market: str, side: str, price: float, amount: float, total: float,
+              ts: int, reason: Optional[str], order_id: Optional[str]) -> Dict[str, Any]:
+        return {
+            "user_id": user_id, "market": market, "ts": ts, "event": "fill", "side": side,
+            "price": price, "amount": amount, "total": total, "fee": total * UPBIT_FEE,
+            "profit_loss": None, "profit_rate": None, "hold_seconds": None,
+            "reason": reason, "order_id": order_id
+        }
+
+    def record_buy(self, user_id: int, market: str, price: float, amount: float, total: float,
+                   reason: Optional[str] = None, order_id: Optional[str] = None):
+        """매수 체결 기록 (백그라운드)"""
+        self._enqueue([
+            self._fill(user_id, market, "bid", price, amount, total, int(time.time()), reason, order_id)
+        ])
+
+    def record_sell(self, user_id: int, market: str, price: float, amount: float, buy_price: float,
+                    opened_at: Optional[datetime] = None, reason: Optional[str] = None,
+                    order_id: Optional[str] = None):
+        """매도 체결 + 청산 완료 기록 (백그라운드, 부분 매도는 매도 수량만큼의 청산)
+
+        청산 행의 fee는 해당 수량의 매수+매도 수수료(집계 fees에는 체결 행만 합산), profit_loss/profit_rate는 수수료 차감 후 값
+        """
+        ts = int(time.time())
+        cost = buy_price * amount
+        fees = (cost + price * amount) * UPBIT_FEE
+        profit_loss = (price - buy_price) * amount - fees
+        self._enqueue([
+            self._fill(user_id, market, "ask", price, amount, price * amount, ts, reason, order_id),
+            {
+                "user_id": user_id, "market": market, "ts": ts, "event": "close", "side": "ask",
+                "price": price, "amount": amount, "total": cost, "fee": fees,
+                "profit_loss": profit_loss,
+                "profit_rate": profit_loss / cost * 100 if cost else 0.0,
+                "hold_seconds": int((datetime.now() - opened_at).total_seconds()) if opened_at else None,
+                "reason": reason, "order_id": order_id
+            }
+        ])
+
+    # ----- 조회 -----
+
+    async def get_entries(self, user_id: int, since_ts: int, market: Optional[str] = None,
+                          event: Optional[str] = None, limit: int = 100,
+                          cursor: Optional[str] = None) -> Dict[str, Any]:
+        """최신순 원장 조회 - cursor는 이전 페이지 마지막 행의 "ts:id" """
+        table = trade_ledger_table
+        condition = (table.c.user_id == user_id) & (table.c.ts >= since_ts)
+        if market:
+            condition &= table.c.market == market
+        if event:
+            condition &= table.c.event == event
+        if cursor:
+            cursor_ts, cursor_id = decode_cursor(cursor)
+            condition &= (table.c.ts < cursor_ts) | ((table.c.ts == cursor_ts) & (table.c.id < cursor_id))
+
+        query = table.select().where(condition).order_by(table.c.ts.desc(), table.c.id.desc()).limit(limit + 1)
+        async with async_engine.connect() as conn:
+            rows = [dict(row._mapping) for row in (await conn.execute(query)).fetchall()]
+
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "entries": rows,
+            "has_next": has_next,
+            "next_cursor": encode_cursor(rows[-1]["ts"], rows[-1]["id"]) if has_next else None
+        }
+
+    async def get_statistics(self, user_id: int, since_ts: int, market: Optional[str] = None) -> Dict[str, Any]:
+        """집계 행 합산 - 전체/마켓별/시간대별 (기간 시작은 KST 일 단위로 내림)"""
+        day_ts, _ = kst_bucket(since_ts)
+        where = "user_id = :user_id AND day_ts >= :day_ts" + (" AND market = :market" if market else "")
+        params = {"user_id": user_id, "day_ts": day_ts, "market": market}
+        sums = ", ".join(f"SUM({name}) AS {name}" for name in STAT_COLUMNS)
+
+        async with async_engine.connect() as conn:
+            total = (await conn.execute(text(f"SELECT {sums} FROM trade_stats WHERE {where}"), params)).fetchone()
+            by_market = (await conn.execute(text(
+                f"SELECT market, {sums} FROM trade_stats WHERE {where} GROUP BY market"), params)).fetchall()
+            by_hour = (await conn.execute(text(
+                f"SELECT hour, {sums} FROM trade_stats WHERE {where} GROUP BY hour ORDER BY hour"), params)).fetchall()
+
+        def summary(row) -> Dict[str, float]:
+            values = {name: (row._mapping[name] or 0) for name in STAT_COLUMNS}
+            trades = values["trades"]
+            values["win_rate"] = values["wins"] / trades * 100 if trades else 0.0
+            values["profit_factor"] = (values["gross_profit"] / values["gross_loss"]
+                                       if values["gross_loss"] > 0 else None)
+            values["avg_hold_minutes"] = values["hold_seconds"] / trades / 60 if trades else 0.0
+            return values
+
+        return {
+            "since_day_ts": day_ts,
+            "summary": summary(total),
+            "markets": {row._mapping["market"]: summary(row) for row in by_market},
+            "hours": {row._mapping["hour"]: summary(row) for row in by_hour}
+        }
+
+# 전역 거래 원장 인스턴스
+trade_ledger = TradeLedger()
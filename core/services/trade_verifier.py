@@ -10,6 +10,7 @@
 from datetime import datetime, timedelta
 
 from ..models.trading import TradeVerification, TradingMetrics
+from ..utils.price_cache import price_cache
 from api_client import UpbitAPI
 
 logger = logging.getLogger(__name__)
@@ -159,6 +160,10 @@ async def verify_order_with_client(self, order_id: str, upbit_client: UpbitAPI)
             verification.average_price = float(order_info.get("avg_price", 0))
             verification.total_fee = float(order_info.get("paid_fee", 0))
             
+            # 체결가는 공유 가격 캐시에 기록
+            if verification.filled_amount > 0 and verification.average_price > 0:
+                price_cache.update(verification.market, verification.average_price, "fill")
+            
             logger.info(f"📊 주문 상태 업데이트: {order_id}")
             logger.info(f"   상태: {verification.status}")
             logger.info(f"   체결량: {verification.filled_amount:.8f}")
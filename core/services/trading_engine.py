@@ -11,8 +11,12 @@
 from .trade_verifier import trade_verifier
 from .resilience_service import resilience_service
 from .monitoring_service import monitoring_service, AlertSeverity, MetricType
+from .market_data_service import market_data_service
 from ..utils.api_manager import api_manager, APIPriority
-from config import DEFAULT_MARKETS, MTFA_OPTIMIZED_CONFIG, get_risk_reward_from_confidence
+from ..utils.price_cache import price_cache
+from ..utils.instrumentation import metrics_registry
+from api_client import rate_limiter
+from config import DEFAULT_MARKETS, MTFA_OPTIMIZED_CONFIG, MARKET_DATA_MODE, get_risk_reward_from_confidence
 
 logger = logging.getLogger(__name__)
 
@@ -44,9 +48,16 @@ def __init__(self, user_session=None):
         self.user_session = user_session
         
         # REST API 기반 데이터 관리
-        self.rest_api_mode = True  # REST API 안정성 모드
+        self.rest_api_mode = MARKET_DATA_MODE != "stream"  # False면 WebSocket 스트리밍 (끊기면 REST 자동 대체)
+        self.scan_mode = "concurrent"  # concurrent: 공유 레이트 리미터 기준 동시 분석, serial: 코인별 순차 분석 (레거시)
         self.last_signal_check = {}   # 코인별 마지막 신호 확인 시간
         
+        # 공유 시장 데이터 버스 구독 (엔진별 식별자)
+        self.market_data_subscriber_id = f"engine_{user_session.user_id}" if user_session else "engine_global"
+        self.last_market_tick = 0
+        self.last_position_tick = 0
+        self.position_check_interval = 5  # 포지션 체크 주기 (초)
+        
         # 사이클 상태 추적
         self.cycle_info = {
             "cycle_number": 0,
@@ -121,7 +132,12 @@ async def start_trading(self):
         logger.info("🚀 멀티 코인 거래 엔진 시작")
         
         # API 매니저 워커 시작
-        await api_manager.start_worker()
+        await api_manager.start_worker(self)
+        
+        # 공유 시장 데이터 버스 구독 (공개 캔들/현재가는 프로세스 전체에서 틱당 1회만 조회)
+        market_data_service.subscribe(self.market_data_subscriber_id, DEFAULT_MARKETS)
+        if not self.rest_api_mode:
+            market_data_service.enable_streaming()
         
         # 신호 감지 태스크 시작
         self.signal_task = asyncio.create_task(self._signal_monitoring_loop())
@@ -150,8 +166,11 @@ async def stop_trading(self, manual_stop: bool = True):
         if self.monitoring_task:
             self.monitoring_task.cancel()
         
+        # 시장 데이터 버스 구독 해제
+        market_data_service.unsubscribe(self.market_data_subscriber_id)
+        
         # API 매니저 워커 중지
-        await api_manager.stop_worker()
+        await api_manager.stop_worker(self)
         
         logger.info("⏹️ 자동거래 중단")
     
@@ -178,8 +197,9 @@ async def emergency_stop(self):
                 except asyncio.CancelledError:
                     pass
             
-            # 3. API 매니저 즉시 중지
-            await api_manager.stop_worker()
+            # 3. API 매니저 즉시 중지 및 시장 데이터 버스 구독 해제
+            await api_manager.stop_worker(self)
+            market_data_service.unsubscribe(self.market_data_subscriber_id)
             
             # 4. 모든 활성 포지션 강제 청산
             # 사용자 세션 거래 상태 참조
@@ -264,7 +284,8 @@ async def _emergency_close_position(self, coin_symbol: str, session_trading_stat
             logger.critical(f"🚨 {coin_symbol} 시장가 매도 실행 (수량: {position.amount:.8f})")
             
             # 시장가 매도 주문
-            sell_result = await upbit_client.place_market_sell_order(market, position.amount)
+            with metrics_registry.timer("order_placement", market=market, side="ask"):
+                sell_result = await upbit_client.place_market_sell_order(market, position.amount)
             
             if sell_result.get("success", False):
                 # 실제 매도 가격 및 손익 계산
@@ -278,6 +299,10 @@ async def _emergency_close_position(self, coin_symbol: str, session_trading_stat
                 # 포지션 제거
                 del session_trading_state.positions[coin_symbol]
                 
+                self._record_ledger("sell", market, price=sell_price, amount=position.amount,
+                                    buy_price=position.buy_price, opened_at=position.timestamp,
+                                    reason="emergency", order_id=sell_result.get("uuid"))
+                
                 # 거래 기록 업데이트
                 session_trading_state.daily_trades += 1
                 if realized_pnl < 0:
@@ -352,7 +377,10 @@ async def _signal_monitoring_loop(self):
         while self.is_running:
             try:
                 await self._detect_signals()
-                await asyncio.sleep(self.signal_check_interval)
+                # 다음 시장 데이터 틱까지 대기 (버스가 갱신한 캔들을 모든 엔진이 공유)
+                self.last_market_tick = await market_data_service.wait_for_tick(
+                    self.last_market_tick, timeout=self.signal_check_interval
+                )
             except asyncio.CancelledError:
                 break
             except Exception as e:
@@ -369,15 +397,110 @@ async def _position_monitoring_loop(self):
                     break  # 비상정지가 실행되면 루프 중단
                 
                 await self._monitor_positions()
-                await asyncio.sleep(5)  # 5초마다 포지션 체크 (강화)
+                # 다음 포지션 현재가 틱까지 대기 (전 세션 보유 마켓을 틱당 1회 일괄 조회)
+                self.last_position_tick = await market_data_service.wait_for_position_tick(
+                    self.last_position_tick, timeout=self.position_check_interval
+                )
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"⚠️ 포지션 모니터링 오류: {str(e)}")
                 await asyncio.sleep(30)  # 오류 시 30초 대기
     
+    def _build_signal_params(self, market: str) -> Dict:
+        """SignalAnalyzer가 기대하는 파라미터 형식으로 변환 (MTFA 최적화 설정 사용)"""
+        market_config = MTFA_OPTIMIZED_CONFIG.get(market, MTFA_OPTIMIZED_CONFIG["KRW-BTC"])
+        
+        # PDF 분석 기반 최적화
+        return {
+            "volume_mult": 1.5,  # 200% → 150% 거래량 급증 요구조건 완화
+            "price_change": 0.3,  # 0.5% → 0.3% 가격변동 요구조건 완화
+            "mtfa_threshold": market_config.get("mtfa_threshold", 0.80),
+            "rsi_period": 14,
+            "ema_periods": [5, 20],
+            "volume_window": 24
+        }
+    
     async def _detect_signals(self):
-        """REST API 기반 신호 감지"""
+        """REST API 기반 신호 감지 - 스캔 모드에 따라 동시/순차 분석"""
+        if self.scan_mode == "concurrent":
+            await self._detect_signals_concurrent()
+        else:
+            await self._detect_signals_serial()
+    
+    async def _detect_signals_concurrent(self):
+        """동시 신호 감지 - 캔들 REST 조회가 공유 레이트 리미터(market 그룹) 슬롯을 받는 속도로 사이클 시간이 결정"""
+        all_markets = list(DEFAULT_MARKETS)
+        total_coins = len(all_markets)
+        
+        # 캔들 조회는 시장 데이터 버스 → 공개 클라이언트에서 공유 리미터 슬롯을 대기 (캐시/스트림 적중 시 슬롯 소모 없음)
+        current_time = time.time()
+        self._start_new_cycle(current_time, estimated_duration=max(1.0, total_coins / rate_limiter.rest_per_second))
+        
+        # 사용자 세션 거래 상태 참조
+        session_trading_state = self.user_session.trading_state if self.user_session else trading_state
+        
+        # 로그인 상태 및 거래 가능 여부 확인
+        if session_trading_state.available_budget <= 0:
+            logger.warning("⚠️ 업비트 로그인이 필요합니다. 거래를 중단합니다.")
+            return
+        
+        investment_amount = min(200000, session_trading_state.available_budget * 0.2)
+        
+        async def analyze_market(index: int, market: str) -> Optional[Dict]:
+            coin_symbol = market.split('-')[1]
+            try:
+                self._start_coin_processing(coin_symbol, index, total_coins)
+                
+                if not session_trading_state.can_trade_coin(coin_symbol, investment_amount):
+                    self._complete_coin_processing(coin_symbol, "skipped", "거래 불가")
+                    return None
+                
+                signal = await signal_analyzer.check_buy_signal(market, self._build_signal_params(market))
+                self.update_activity_monitor("analysis", time.time())
+                
+                if signal and signal["should_buy"]:
+                    return signal
+                self._complete_coin_processing(coin_symbol, "success", "신호 없음")
+                return None
+                
+            except Exception as e:
+                logger.error(f"⚠️ {market} 신호 감지 오류: {str(e)}")
+                self._complete_coin_processing(coin_symbol, "error", str(e))
+                return None
+        
+        results = await asyncio.gather(*(analyze_market(i, market) for i, market in enumerate(all_markets)))
+        
+        # 매수는 예산 경합을 피하기 위해 신호 강도 순으로 순차 실행
+        signals = [(market, signal) for market, signal in zip(all_markets, results) if signal]
+        signals.sort(key=lambda item: item[1]["signal_strength"], reverse=True)
+        
+        for market, signal in signals:
+            coin_symbol = market.split('-')[1]
+            try:
+                logger.info(f"📈 {coin_symbol} 매수 신호 감지!")
+                logger.info(f"   신호 강도: {signal['signal_strength']}")
+                logger.info(f"   사유: {signal['reason']}")
+                self.update_activity_monitor("signal", time.time())
+                
+                # 앞선 매수로 예산/포지션이 바뀌었을 수 있으므로 재확인
+                if not session_trading_state.can_trade_coin(coin_symbol, investment_amount):
+                    self._complete_coin_processing(coin_symbol, "skipped", "거래 불가")
+                    continue
+                
+                await self._execute_buy_order(market, coin_symbol, investment_amount, signal, session_trading_state)
+                self.update_activity_monitor("trade", time.time())
+                self._complete_coin_processing(coin_symbol, "success", "매수 신호 감지")
+                
+            except Exception as e:
+                logger.error(f"⚠️ {market} 매수 처리 오류: {str(e)}")
+                self._complete_coin_processing(coin_symbol, "error", str(e))
+        
+        # 사이클 완료 처리
+        self._complete_cycle()
+    
+    async def _detect_signals_serial(self):
+        """코인별 순차 신호 감지 (레거시 모드)"""
         current_time = time.time()
         
         # 사이클 시작 처리
@@ -427,19 +550,7 @@ async def _detect_signals(self):
                     continue
                 
                 # 신호 분석 실행 (MTFA 최적화 설정 사용)
-                market_config = MTFA_OPTIMIZED_CONFIG.get(market, MTFA_OPTIMIZED_CONFIG["KRW-BTC"])
-                
-                # SignalAnalyzer가 기대하는 파라미터 형식으로 변환 (PDF 분석 기반 최적화)
-                signal_params = {
-                    "volume_mult": 1.5,  # 200% → 150% 거래량 급증 요구조건 완화
-                    "price_change": 0.3,  # 0.5% → 0.3% 가격변동 요구조건 완화
-                    "mtfa_threshold": market_config.get("mtfa_threshold", 0.80),
-                    "rsi_period": 14,
-                    "ema_periods": [5, 20],
-                    "volume_window": 24
-                }
-                
-                signal = await signal_analyzer.check_buy_signal(market, signal_params)
+                signal = await signal_analyzer.check_buy_signal(market, self._build_signal_params(market))
 
                 # 활동 모니터링 업데이트
                 self.update_activity_monitor("analysis", current_time)
@@ -487,21 +598,21 @@ async def _monitor_positions(self):
         # 사용자 세션 거래 상태 참조
         session_trading_state = self.user_session.trading_state if self.user_session else trading_state
         
-        for coin, position in session_trading_state.positions.items():
+        # 보유 마켓 현재가 일괄 조회 (시장 데이터 버스 포지션 틱 공유)
+        position_markets = [f"KRW-{coin}" for coin in session_trading_state.positions]
+        batch_prices = await market_data_service.get_position_prices(self.market_data_subscriber_id, position_markets)
+        
+        for coin, position in list(session_trading_state.positions.items()):
             try:
                 market = f"KRW-{coin}"
                 
-                # 현재 가격 업데이트
-                current_price = await self._get_current_price(market)
+                # 현재 가격 업데이트 (일괄 조회 누락 시에만 개별 Fallback)
+                current_price = batch_prices.get(market) or await self._get_current_price(market)
                 if not current_price:
                     continue
                     
                 position.update_current_price(current_price)
                 
-                # 가격 캐시 저장 (성공시)
-                setattr(self, f'_cached_price_{market.replace("-", "_")}', current_price)
-                setattr(self, f'_cached_time_{market.replace("-", "_")}', time.time())
-                
                 # 수익률 및 보유시간 계산
                 profit_percent = ((current_price - position.buy_price) / position.buy_price) * 100
                 holding_time = (datetime.now() - position.timestamp).total_seconds()
@@ -650,7 +761,8 @@ async def _execute_partial_sale(self, coin: str, sell_ratio: float = 0.5):
             logger.info(f"   잔여 수량: {remaining_amount:.8f}")
             
             # 시장가 매도 주문 실행
-            sell_result = await upbit_client.place_market_sell_order(market, sell_amount)
+            with metrics_registry.timer("order_placement", market=market, side="ask"):
+                sell_result = await upbit_client.place_market_sell_order(market, sell_amount)
             
             if sell_result.get("success", False):
                 # 거래 검증 생성
@@ -673,6 +785,10 @@ async def _execute_partial_sale(self, coin: str, sell_ratio: float = 0.5):
                 logger.info(f"   매도 가격: {sell_price:,.0f} KRW")
                 logger.info(f"   실현 수익: {realized_pnl:+,.0f} KRW")
                 
+                self._record_ledger("sell", market, price=sell_price, amount=sell_amount,
+                                    buy_price=position.buy_price, opened_at=position.timestamp,
+                                    reason="partial_profit", order_id=order_id)
+                
                 # 포지션 수량 업데이트
                 position.amount = remaining_amount
                 position.partial_profit_taken = True
@@ -723,7 +839,8 @@ async def _execute_buy_order(self, market: str, coin_symbol: str, investment_amo
             logger.info(f"   매수 수량: {buy_amount:.8f}")
             
             # 실제 매수 주문 (시장가)
-            order_result = await upbit_client.place_market_buy_order(market, investment_amount)
+            with metrics_registry.timer("order_placement", market=market, side="bid"):
+                order_result = await upbit_client.place_market_buy_order(market, investment_amount)
             
             if order_result.get("success", False):
                 # 거래 검증 생성
@@ -782,6 +899,9 @@ async def _execute_buy_order(self, market: str, coin_symbol: str, investment_amo
                 session_trading_state.daily_trades += 1
                 session_trading_state.last_trade_time[coin_symbol] = datetime.now()
                 
+                self._record_ledger("buy", market, price=current_price, amount=buy_amount,
+                                    total=investment_amount, reason=signal.get("reason"), order_id=order_id)
+                
                 logger.info(f"✅ {coin_symbol} 매수 주문 실행!")
                 logger.info(f"   주문 ID: {order_id}")
                 logger.info(f"   익절가: {profit_target_price:,.0f} KRW")
@@ -796,10 +916,16 @@ async def _execute_buy_order(self, market: str, coin_symbol: str, investment_amo
         except Exception as e:
             logger.error(f"⚠️ {coin_symbol} 매수 주문 오류: {str(e)}")
     
-    async def _get_current_price(self, market: str) -> Optional[float]:
-        """현재 가격 조회 (3단계 Fallback 시스템 - PDF 가이드 개선 적용)"""
+    @metrics_registry.timed("price_lookup", labels=lambda self, market, *args, **kwargs: {"market": market})
+    async def _get_current_price(self, market: str, max_age_ms: float = 2000) -> Optional[float]:
+        """현재 가격 조회 (공유 가격 캐시 + 3단계 Fallback 시스템 - PDF 가이드 개선 적용)"""
         max_retries = 2
         
+        # 0단계: 공유 가격 캐시에 충분히 신선한 가격이 있으면 API 호출 없이 사용
+        quote = price_cache.get(market, max_age_ms=max_age_ms)
+        if quote:
+            return quote.price
+        
         # 1단계: API 매니저를 통한 조회 (재시도 포함)
         for attempt in range(max_retries):
             try:
@@ -890,19 +1016,11 @@ async def _get_current_price(self, market: str) -> Optional[float]:
                     await asyncio.sleep(0.5)
                     continue
         
-        # 3단계: 캐시된 가격 사용 (최대 2분, 가격 유효성 검증 포함)
-        try:
-            cached_price = getattr(self, f'_cached_price_{market.replace("-", "_")}', None)
-            cached_time = getattr(self, f'_cached_time_{market.replace("-", "_")}', 0)
-            
-            if cached_price and cached_price > 0 and (time.time() - cached_time) < 120:  # 2분 이내 + 가격 유효성
-                logger.info(f"💾 {market} 캐시된 가격 사용: {cached_price:,.0f}원 (캐시 나이: {time.time() - cached_time:.0f}초)")
-                return cached_price
-                
-        except (AttributeError, ValueError, TypeError) as e:
-            logger.warning(f"⚠️ {market} 캐시 가격 조회 오류: {str(e)}")
-        except Exception as e:
-            logger.error(f"❌ {market} 캐시 가격 예상치 못한 오류: {str(e)}")
+        # 3단계: 공유 가격 캐시의 최근 가격 사용 (최대 2분 - 다른 세션/신호 스캔/체결가 포함)
+        quote = price_cache.get(market, max_age_ms=120_000)
+        if quote:
+            logger.info(f"💾 {market} 캐시된 가격 사용: {quote.price:,.0f}원 (출처: {quote.source}, 캐시 나이: {quote.age_ms / 1000:.0f}초)")
+            return quote.price
         
         logger.error(f"❌ {market} 모든 가격 조회 방법 실패 - 매수/매도 신호 무시 권장")
         return None
@@ -958,7 +1076,8 @@ async def _close_position(self, coin: str, reason: str = "manual"):
                 logger.info(f"   트레일링가: {trailing_price:,.0f} KRW (최고가: {position.highest_price_seen:,.0f})")
             
             # 실제 매도 주문 (시장가)
-            order_result = await upbit_client.place_market_sell_order(market, position.amount)
+            with metrics_registry.timer("order_placement", market=market, side="ask"):
+                order_result = await upbit_client.place_market_sell_order(market, position.amount)
             
             if order_result.get("success", False):
                 # 거래 검증 생성
@@ -991,6 +1110,10 @@ async def _close_position(self, coin: str, reason: str = "manual"):
                 del session_trading_state.positions[coin]
                 session_trading_state.daily_trades += 1
                 
+                self._record_ledger("sell", market, price=actual_sell_price, amount=position.amount,
+                                    buy_price=position.buy_price, opened_at=position.timestamp,
+                                    reason=reason, order_id=order_id)
+                
                 # 성과 분석 로깅
                 result_icon = "💚" if realized_pnl > 0 else "❤️" if realized_pnl < 0 else "💛"
                 logger.info(f"✅ {coin} 매도 주문 실행! {result_icon}")
@@ -1019,6 +1142,16 @@ async def _close_position(self, coin: str, reason: str = "manual"):
         except Exception as e:
             logger.error(f"⚠️ {coin} 포지션 청산 오류 (사유: {reason}): {str(e)}")
     
+    def _record_ledger(self, side: str, market: str, **fields):
+        """거래 원장 기록 요청 (세션 사용자 기준, 전역 엔진은 0번 사용자) - 큐에 넣고 바로 반환"""
+        from .trade_ledger import trade_ledger, GLOBAL_USER_ID
+        
+        user_id = self.user_session.user_id if self.user_session else GLOBAL_USER_ID
+        if side == "buy":
+            trade_ledger.record_buy(user_id, market, **fields)
+        else:
+            trade_ledger.record_sell(user_id, market, **fields)
+    
     async def _verify_order_after_delay(self, order_id: str, upbit_client, delay: int):
         """지연 후 주문 검증"""
         try:
@@ -1026,7 +1159,8 @@ async def _verify_order_after_delay(self, order_id: str, upbit_client, delay: in
             
             # 최대 3회까지 검증 시도
             for attempt in range(3):
-                success = await trade_verifier.verify_order_with_client(order_id, upbit_client)
+                with metrics_registry.timer("order_verification", attempt=attempt + 1):
+                    success = await trade_verifier.verify_order_with_client(order_id, upbit_client)
                 if success:
                     logger.debug(f"✅ 주문 검증 완료: {order_id}")
                     break
@@ -1067,15 +1201,14 @@ def get_coin_api_status(self) -> dict:
             "recent_completed": self.recent_completed.copy()
         }
     
-    def _start_new_cycle(self, current_time: float):
-        """새 사이클 시작"""
+    def _start_new_cycle(self, current_time: float, estimated_duration: float = 75):
+        """새 사이클 시작 (순차 모드 기본 예상 소요: API 호출 + 대기시간 약 75초)"""
         self.cycle_info["cycle_number"] += 1
         self.cycle_info["cycle_start_time"] = current_time
         self.cycle_info["current_phase"] = "processing"
         self.cycle_info["total_progress"] = 0.0
         
-        # 예상 완료 시간 계산 (대략 75초 예상)
-        estimated_duration = 75  # API 호출 + 대기시간
+        # 예상 완료 시간 계산
         self.cycle_info["estimated_completion"] = current_time + estimated_duration
         
         # 초기화
@@ -1103,8 +1236,7 @@ def _start_coin_processing(self, coin_symbol: str, coin_index: int, total_coins:
         """코인 처리 시작"""
         current_time = time.time()
         
-        # 사이클 진행률 업데이트
-        self.cycle_info["total_progress"] = coin_index / total_coins
+        # 사이클 진행률은 완료 수 기준으로만 갱신 (_complete_coin_processing) - 동시 스캔에서 시작 순서로 되돌아가지 않음
         self.cycle_info["phase_details"]["current_coin"] = coin_symbol
         self.cycle_info["phase_details"]["coin_progress"] = 0.0
         self.cycle_info["phase_details"]["processing_start_time"] = current_time
@@ -0,0 +1,219 @@
+"""
+저장 캔들 기반 거래량 급증 스캐너
+- candles 테이블의 1분봉을 마켓별로 메모리에 적재하고 거래량/거래량²/급증 봉 수/급증 거래량 누적합을 유지
+- 봉별 롤링 z-score(직전 LOOKBACK봉 대비)는 적재 시 한 번만 계산하고 새 봉은 뒷부분만 추가
+- 임의 구간(수 시간 ~ 수 개월)의 평균/표준편차/급증 비율/급증 강도는 누적합 차이로 O(1) 조회
+- 여러 마켓을 한 번에 분석하여 순위 산출
+"""
+
+import asyncio
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import DEFAULT_MARKETS
+
+logger = logging.getLogger(__name__)
+
+LOOKBACK = 20        # 롤링 z-score 기준 봉 수 (SignalAnalyzer.min_candles)
+RECENT = 3           # 급증 비율의 최근 봉 수 (SignalAnalyzer._check_volume_surge와 동일)
+Z_THRESHOLD = 3.0    # 급증 봉 판정 z-score
+SURGE_RATIO = 1.5    # 급증 감지 배수 (엔진 기본 volume_mult)
+MAX_HOURS = 24 * 180
+MIN_CACHE_HOURS = 24 * 7  # 첫 적재 시 최소 보관 기간 (짧은 구간 조회가 반복 재적재하지 않도록)
+
+class _VolumeSeries:
+    """단일 마켓 1분봉 열 + 누적합 (원소 0은 0으로 두어 구간 합 = P[b] - P[a])"""
+
+    def __init__(self, start_ts: int):
+        self.start_ts = start_ts
+        self.ts = np.empty(0, dtype=np.int64)
+        self.close = np.empty(0)
+        self.volume = np.empty(0)
+        self.zscore = np.empty(0)
+        self.p_volume = np.zeros(1)
+        self.p_volume_sq = np.zeros(1)
+        self.p_surges = np.zeros(1)
+        self.p_surge_volume = np.zeros(1)
+        self.refreshed_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def extend(self, rows: List[tuple]):
+        """ts 이상 행 반영 - 마지막 봉(진행 중일 수 있음)부터 다시 받은 행으로 꼬리를 교체"""
+        if not rows:
+            return
+        array = np.array(rows, dtype=np.float64).reshape(-1, 3)
+        new_ts = array[:, 0].astype(np.int64)
+        keep = int(np.searchsorted(self.ts, new_ts[0], side="left"))
+
+        self.ts = np.concatenate([self.ts[:keep], new_ts])
+        self.close = np.concatenate([self.close[:keep], array[:, 1]])
+        self.volume = np.concatenate([self.volume[:keep], array[:, 2]])
+
+        # 교체된 봉부터 누적합/z-score 다시 계산 (z-score는 직전 LOOKBACK봉만 참조)
+        tail = self.volume[keep:]
+        self.p_volume = np.concatenate([self.p_volume[:keep + 1], self.p_volume[keep] + np.cumsum(tail)])
+        self.p_volume_sq = np.concatenate([self.p_volume_sq[:keep + 1], self.p_volume_sq[keep] + np.cumsum(tail * tail)])
+
+        index = np.arange(keep, len(self.ts))
+        lo = np.maximum(index - LOOKBACK, 0)
+        count = index - lo
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = (self.p_volume[index] - self.p_volume[lo]) / count
+            var = (self.p_volume_sq[index] - self.p_volume_sq[lo]) / count - mean * mean
+            std = np.sqrt(np.maximum(var, 0.0))
+            z = np.where((count >= LOOKBACK) & (std > 0), (self.volume[index] - mean) / std, 0.0)
+        self.zscore = np.concatenate([self.zscore[:keep], z])
+
+        surge = z >= Z_THRESHOLD
+        self.p_surges = np.concatenate([self.p_surges[:keep + 1], self.p_surges[keep] + np.cumsum(surge)])
+        self.p_surge_volume = np.concatenate([self.p_surge_volume[:keep + 1],
+                                              self.p_surge_volume[keep] + np.cumsum(np.where(surge, tail, 0.0))])
+
+    def window_stats(self, a: int, b: int) -> Dict[str, Any]:
+        """[a, b) 봉 구간 지표 - 최대 z-score 외에는 모두 누적합 차이 (O(1))"""
+        n = b - a
+        total = self.p_volume[b] - self.p_volume[a]
+        mean = total / n
+        var = max((self.p_volume_sq[b] - self.p_volume_sq[a]) / n - mean * mean, 0.0)
+        std = var ** 0.5
+
+        # 최근 RECENT봉 평균 / 그 앞 LOOKBACK봉 평균
+        recent_lo = max(b - RECENT, a)
+        history_lo = max(recent_lo - LOOKBACK, 0)
+        recent_mean = (self.p_volume[b] - self.p_volume[recent_lo]) / (b - recent_lo)
+        history_mean = ((self.p_volume[recent_lo] - self.p_volume[history_lo]) / (recent_lo - history_lo)
+                        if recent_lo > history_lo else 0.0)
+        surge_ratio = recent_mean / history_mean if history_mean > 0 else 0.0
+
+        # 거래량 추세 - 후반부/전반부 거래량
+        mid = a + n // 2
+        first_half = self.p_volume[mid] - self.p_volume[a]
+        volume_momentum = (self.p_volume[b] - self.p_volume[mid]) / first_half if first_half > 0 else 1.0
+
+        base_price = self.close[a - 1] if a > 0 else self.close[a]
+        price_change = (self.close[b - 1] - base_price) / base_price * 100 if base_price else 0.0
+
+        surges = int(self.p_surges[b] - self.p_surges[a])
+        surge_volume = self.p_surge_volume[b] - self.p_surge_volume[a]
+        peak = a + int(np.argmax(self.zscore[a:b]))
+        return {
+            "bars": n,
+            "start_ts": int(self.ts[a]),
+            "end_ts": int(self.ts[b - 1]),
+            "total_volume": round(float(total), 4),
+            "mean_volume": round(float(mean), 6),
+            "volume_std": round(float(std), 6),
+            "current_volume": round(float(self.volume[b - 1]), 6),
+            "current_zscore": round(float(self.zscore[b - 1]), 3),
+            "surge_ratio": round(float(surge_ratio), 3),
+            "surge_detected": bool(surge_ratio >= SURGE_RATIO),
+            "surge_count": surges,
+            "surge_frequency": round(surges / n * 100, 3),               # 급증 봉 비율 (%)
+            "surge_intensity": round(float(surge_volume / total * 100), 3) if total > 0 else 0.0,  # 급증 봉 거래량 비중 (%)
+            "max_zscore": round(float(self.zscore[peak]), 3),
+            "max_zscore_ts": int(self.ts[peak]),
+            "volume_momentum": round(float(volume_momentum), 3),
+            "volume_trend": "increasing" if volume_momentum > 1.2 else "decreasing" if volume_momentum < 0.8 else "stable",
+            "price_change": round(float(price_change), 4),
+            "momentum_score": round(float(price_change * volume_momentum), 4)
+        }
+
+
+class VolumeSurgeScanner:
+    """마켓별 누적합 캐시 + 구간 거래량 급증 분석"""
+
+    def __init__(self, refresh_seconds: float = 15.0):
+        self.refresh_seconds = refresh_seconds  # 새 1분봉 확인 최소 간격
+        self._series: Dict[str, _VolumeSeries] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {"queries": 0, "loads": 0, "rows_loaded": 0}
+
+    async def _fetch(self, market: str, from_ts: int) -> List[tuple]:
+        from database import async_engine
+
+        sql = ("SELECT ts, close, volume FROM candles "
+               "WHERE market = ? AND unit = 1 AND ts >= ? ORDER BY ts")
+        if async_engine.dialect.paramstyle != "qmark":
+            sql = sql.replace("?", "%s")
+        async with async_engine.connect() as conn:
+            rows = (await conn.exec_driver_sql(sql, (market, from_ts))).fetchall()
+        self.stats["loads"] += 1
+        self.stats["rows_loaded"] += len(rows)
+        return rows
+
+    async def _series_for(self, market: str, start_ts: int) -> _VolumeSeries:
+        """start_ts 이후를 담은 캐시 - 더 과거가 필요하면 다시 적재, 아니면 마지막 봉 이후만 조회"""
+        lock = self._locks.setdefault(market, asyncio.Lock())
+        async with lock:
+            series = self._series.get(market)
+            if series is None or start_ts - LOOKBACK * 60 < series.start_ts:
+                warmup_start = min(start_ts, int(time.time()) - MIN_CACHE_HOURS * 3600) - LOOKBACK * 60
+                series = _VolumeSeries(warmup_start)
+                series.extend(await self._fetch(market, warmup_start))
+                series.refreshed_at = time.time()
+                self._series[market] = series
+            elif time.time() - series.refreshed_at >= self.refresh_seconds:
+                series.extend(await self._fetch(market, int(series.ts[-1]) if len(series) else series.start_ts))
+                series.refreshed_at = time.time()
+            return series
+
+    async def analyze(self, market: str, hours: int = 24, end_ts: Optional[int] = None) -> Dict[str, Any]:
+        """단일 마켓 구간 분석"""
+        hours = max(1, min(hours, MAX_HOURS))
+        end_ts = int(time.time()) if end_ts is None else end_ts
+        start_ts = end_ts - hours * 3600
+
+        series = await self._series_for(market, start_ts)
+        self.stats["queries"] += 1
+        a = int(np.searchsorted(series.ts, start_ts, side="left"))
+        b = int(np.searchsorted(series.ts, end_ts, side="right"))
+        result = {"market": market, "hours": hours}
+        if b <= a:
+            result.update({"bars": 0, "surge_detected": False, "surge_ratio": 0.0})
+            return result
+        result.update(series.window_stats(a, b))
+        return result
+
+    async def scan(self, markets: Optional[List[str]] = None, hours: int = 24,
+                   sort_by: str = "surge_ratio") -> Dict[str, Any]:
+        """여러 마켓 동시 분석 + sort_by 기준 내림차순 순위"""
+        markets = markets or list(DEFAULT_MARKETS)
+        results = await asyncio.gather(*(self.analyze(market, hours) for market in markets), return_exceptions=True)
+
+        analyzed: Dict[str, Dict[str, Any]] = {}
+        for market, result in zip(markets, results):
+            if isinstance(result, Exception):
+                logger.warning(f"⚠️ {market} 거래량 분석 실패: {str(result)}")
+                continue
+            analyzed[market] = result
+
+        ranked = sorted((result for result in analyzed.values() if result["bars"]),
+                        key=lambda result: result.get(sort_by, 0.0), reverse=True)
+        return {
+            "results": analyzed,
+            "ranking": [
+                {"rank": position, "market": result["market"], sort_by: result.get(sort_by)}
+                for position, result in enumerate(ranked, start=1)
+            ],
+            "ranked": ranked
+        }
+
+    def invalidate(self, market: Optional[str] = None):
+        if market is None:
+            self._series.clear()
+        else:
+            self._series.pop(market, None)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "cached_markets": {market: len(series) for market, series in self._series.items()},
+            "stats": self.stats.copy()
+        }
+
+# 전역 거래량 급증 스캐너 인스턴스
+volume_scanner = VolumeSurgeScanner()
@@ -0,0 +1,321 @@
+"""
+업비트 WebSocket 실시간 시장 데이터 피드
+- trade/ticker 스트림을 구독하여 체결이 들어올 때마다 1분봉을 로컬에서 생성
+- 생성한 캔들은 REST 응답과 같은 형식으로 제공 (SignalAnalyzer 등 기존 경로 그대로 사용)
+- 연결이 끊기면 자동 재연결하며, 그동안 시장 데이터 버스는 REST 조회로 대체
+"""
+
+import asyncio
+import json
+import time
+import uuid
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+import aiohttp
+
+from ..utils.datetime_utils import UTC
+from ..utils.price_cache import price_cache
+from config import UPBIT_WEBSOCKET_URL
+
+logger = logging.getLogger(__name__)
+
+KST_OFFSET = timedelta(hours=9)
+
+class MinuteCandleBuilder:
+    """단일 마켓 체결 → 1분봉 생성기 (업비트 REST 캔들 형식 유지)"""
+
+    def __init__(self, market: str, history: int = 200):
+        self.market = market
+        self._candles: deque = deque(maxlen=history)  # 시간순, 마지막이 진행 중 캔들
+        self._current_trades: List[tuple] = []        # 진행 중 분의 체결 (REST 시드 병합용)
+        self.seeded = False                           # REST 이력으로 과거 캔들이 채워졌는지
+
+    def __len__(self) -> int:
+        return len(self._candles)
+
+    @staticmethod
+    def _minute_start(ts_ms: int) -> int:
+        return ts_ms - ts_ms % 60000
+
+    def _new_candle(self, start_ms: int, price: float) -> Dict:
+        start = datetime.fromtimestamp(start_ms / 1000, tz=UTC)
+        return {
+            "market": self.market,
+            "candle_date_time_utc": start.strftime("%Y-%m-%dT%H:%M:%S"),
+            "candle_date_time_kst": (start + KST_OFFSET).strftime("%Y-%m-%dT%H:%M:%S"),
+            "opening_price": price,
+            "high_price": price,
+            "low_price": price,
+            "trade_price": price,
+            "timestamp": start_ms,
+            "candle_acc_trade_price": 0.0,
+            "candle_acc_trade_volume": 0.0,
+            "unit": 1,
+            "_start_ms": start_ms
+        }
+
+    @staticmethod
+    def _apply(candle: Dict, price: float, volume: float, ts_ms: int):
+        candle["high_price"] = max(candle["high_price"], price)
+        candle["low_price"] = min(candle["low_price"], price)
+        if ts_ms >= candle["timestamp"]:
+            candle["trade_price"] = price
+            candle["timestamp"] = ts_ms
+        candle["candle_acc_trade_price"] += price * volume
+        candle["candle_acc_trade_volume"] += volume
+
+    def add_trade(self, price: float, volume: float, ts_ms: int) -> bool:
+        """체결 1건 반영 - 새 분이 시작되어 직전 캔들이 마감되면 True"""
+        start_ms = self._minute_start(ts_ms)
+        current = self._candles[-1] if self._candles else None
+
+        if current is not None and start_ms < current["_start_ms"]:
+            return False  # 이미 지난 분의 지연 체결은 무시
+
+        closed = False
+        if current is None or start_ms > current["_start_ms"]:
+            closed = current is not None
+            current = self._new_candle(start_ms, price)
+            self._candles.append(current)
+            self._current_trades = []
+
+        self._apply(current, price, volume, ts_ms)
+        self._current_trades.append((ts_ms, price, volume))
+        return closed
+
+    def seed(self, rest_candles: List[Dict]):
+        """REST 캔들(최신순)로 과거 이력 채우기 - 진행 중 분은 REST 스냅샷 이후 체결만 더해 병합"""
+        if not rest_candles:
+            return
+
+        merged: Dict[int, Dict] = {}
+        for item in reversed(rest_candles):
+            start = datetime.fromisoformat(item["candle_date_time_utc"].rstrip("Z")).replace(tzinfo=UTC)
+            start_ms = int(start.timestamp() * 1000)
+            merged[start_ms] = {**item, "_start_ms": start_ms}
+
+        for candle in self._candles:
+            base = merged.get(candle["_start_ms"])
+            if base is None:
+                merged[candle["_start_ms"]] = candle
+            elif candle is self._candles[-1]:
+                # 진행 중 캔들: REST 스냅샷 이후 체결만 추가 반영
+                for ts_ms, price, volume in self._current_trades:
+                    if ts_ms > base["timestamp"]:
+                        self._apply(base, price, volume, ts_ms)
+
+        self._candles.clear()
+        for start_ms in sorted(merged):
+            self._candles.append(merged[start_ms])
+        self.seeded = True
+
+    def reset(self):
+        """연결 공백 발생 시 이력 무효화 (다음 REST 시드 전까지 사용하지 않음)"""
+        self._candles.clear()
+        self._current_trades = []
+        self.seeded = False
+
+    def get_candles(self, count: int) -> List[Dict]:
+        """최근 count개 캔들 (업비트 REST와 같이 최신순)"""
+        candles = list(self._candles)[-count:]
+        return [{key: value for key, value in candle.items() if key != "_start_ms"} for candle in reversed(candles)]
+
+
+class UpbitWebSocketFeed:
+    """업비트 trade/ticker WebSocket 구독 + 1분봉 로컬 생성"""
+
+    def __init__(self, url: str = UPBIT_WEBSOCKET_URL, history: int = 200,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        self.url = url
+        self.history = history
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.markets: Set[str] = set()
+        self.builders: Dict[str, MinuteCandleBuilder] = {}
+        self.connected = False
+
+        # 콜백 (시장 데이터 버스가 등록)
+        self.on_trade: Optional[Callable[[str, float, int], None]] = None
+        self.on_candle_close: Optional[Callable[[str], None]] = None
+        self.on_connect: Optional[Callable[[], None]] = None
+        self.on_disconnect: Optional[Callable[[], None]] = None
+
+        self._task: Optional[asyncio.Task] = None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._last_sequential_id: Dict[str, int] = {}
+
+        self.stats = {
+            "connects": 0,
+            "disconnects": 0,
+            "trades": 0,
+            "tickers": 0,
+            "duplicates": 0,
+            "candles_closed": 0,
+            "last_message_at": None
+        }
+
+    # ----- 제어 -----
+
+    def start(self, markets: List[str]):
+        self.markets = set(markets)
+        for market in markets:
+            self.builders.setdefault(market, MinuteCandleBuilder(market, self.history))
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"🔌 WebSocket 시장 데이터 피드 시작 ({len(markets)}개 마켓)")
+
+    async def set_markets(self, markets: List[str]):
+        """구독 마켓 변경 - 연결 중이면 재구독"""
+        if set(markets) == self.markets:
+            return
+        self.markets = set(markets)
+        for market in markets:
+            self.builders.setdefault(market, MinuteCandleBuilder(market, self.history))
+        if self._ws is not None and not self._ws.closed:
+            # 같은 연결에 새 구독 요청을 보내면 기존 구독이 대체됨 (새 마켓은 REST 시드 후 실시간 사용)
+            await self._ws.send_str(self._subscription())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        logger.info("⏹️ WebSocket 시장 데이터 피드 종료")
+
+    # ----- 조회 -----
+
+    def is_live(self, market: str, count: int = 1) -> bool:
+        """실시간 캔들로 REST를 대체할 수 있는지 (연결 + 시드 완료 + 충분한 캔들)"""
+        builder = self.builders.get(market)
+        return self.connected and builder is not None and builder.seeded and len(builder) >= count
+
+    def get_candles(self, market: str, count: int = 20) -> List[Dict]:
+        builder = self.builders.get(market)
+        return builder.get_candles(count) if builder else []
+
+    def seed(self, market: str, rest_candles: List[Dict]):
+        builder = self.builders.get(market)
+        if builder is not None and self.connected:
+            builder.seed(rest_candles)
+
+    # ----- 수신 루프 -----
+
+    def _subscription(self) -> str:
+        codes = sorted(self.markets)
+        return json.dumps([
+            {"ticket": f"teamprime-{uuid.uuid4()}"},
+            {"type": "trade", "codes": codes},
+            {"type": "ticker", "codes": codes}
+        ])
+
+    async def _run(self):
+        delay = self.reconnect_delay
+        try:
+            while True:
+                try:
+                    async with aiohttp.ClientSession() as session:
+                        async with session.ws_connect(self.url, heartbeat=30) as ws:
+                            self._ws = ws
+                            await ws.send_str(self._subscription())
+                            self.connected = True
+                            self.stats["connects"] += 1
+                            delay = self.reconnect_delay
+                            logger.info(f"✅ WebSocket 연결 성공: {self.url}")
+                            if self.on_connect:
+                                self.on_connect()
+
+                            async for msg in ws:
+                                if msg.type in (aiohttp.WSMsgType.BINARY, aiohttp.WSMsgType.TEXT):
+                                    self._handle_message(msg.data)
+                                elif msg.type == aiohttp.WSMsgType.ERROR:
+                                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"⚠️ WebSocket 연결 오류: {str(e)}")
+                finally:
+                    self._on_disconnected()
+
+                logger.info(f"🔄 WebSocket {delay:.0f}초 후 재연결 (그동안 REST 조회로 대체)")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+        except asyncio.CancelledError:
+            pass
+
+    def _on_disconnected(self):
+        self._ws = None
+        if not self.connected:
+            return
+        self.connected = False
+        self.stats["disconnects"] += 1
+        # 끊긴 동안의 체결이 빠지므로 로컬 캔들은 다음 시드 전까지 사용하지 않음
+        for builder in self.builders.values():
+            builder.reset()
+        self._last_sequential_id.clear()
+        logger.warning("📴 WebSocket 연결 끊김 - REST 조회로 대체")
+        if self.on_disconnect:
+            self.on_disconnect()
+
+    def _handle_message(self, raw):
+        try:
+            data = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(data, dict):
+            return
+
+        self.stats["last_message_at"] = time.time()
+        message_type = data.get("type") or data.get("ty")
+        market = data.get("code") or data.get("cd")
+        if not market:
+            return
+
+        if message_type == "trade":
+            self._handle_trade(market, data)
+        elif message_type == "ticker":
+            self.stats["tickers"] += 1
+            price_cache.update(market, data.get("trade_price"), "ticker", trade_ts=data.get("trade_timestamp"))
+
+    def _handle_trade(self, market: str, data: Dict):
+        sequential_id = data.get("sequential_id")
+        if sequential_id is not None:
+            if sequential_id == self._last_sequential_id.get(market):
+                self.stats["duplicates"] += 1
+                return
+            self._last_sequential_id[market] = sequential_id
+
+        try:
+            price = float(data["trade_price"])
+            volume = float(data["trade_volume"])
+            ts_ms = int(data.get("trade_timestamp") or data.get("timestamp"))
+        except (KeyError, TypeError, ValueError):
+            return
+
+        self.stats["trades"] += 1
+        price_cache.update(market, price, "trade", trade_ts=ts_ms)
+
+        builder = self.builders.get(market)
+        if builder is not None and builder.add_trade(price, volume, ts_ms):
+            self.stats["candles_closed"] += 1
+            if self.on_candle_close:
+                self.on_candle_close(market)
+
+        if self.on_trade:
+            self.on_trade(market, price, ts_ms)
+
+    def get_status(self) -> Dict:
+        return {
+            "url": self.url,
+            "connected": self.connected,
+            "markets": sorted(self.markets),
+            "live_markets": sorted(market for market in self.markets if self.is_live(market)),
+            "stats": self.stats.copy()
+        }
@@ -8,6 +8,7 @@
 from datetime import datetime
 from ..models.trading import TradingState
 from ..services.trading_engine import MultiCoinTradingEngine
+from ..services.market_data_service import market_data_service
 
 logger = logging.getLogger(__name__)
 
@@ -80,6 +81,9 @@ def cleanup(self):
                 self.trading_engine.signal_task = None
             if hasattr(self.trading_engine, 'monitoring_task') and self.trading_engine.monitoring_task:
                 self.trading_engine.monitoring_task = None
+            
+            # 시장 데이터 버스 구독 해제
+            market_data_service.unsubscribe(self.trading_engine.market_data_subscriber_id)
         
         # 메모리 정리
         self.access_key = ""
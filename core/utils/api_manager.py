@@ -1,9 +1,13 @@
-"""업비트 API 호출 관리자 - 동시성 제어 및 60초 규정 준수"""
+"""업비트 API 호출 관리자 - 우선순위 디스패처 (동시성 제한, 중복 요청 병합, 조회 캐시)"""
 
 import asyncio
+import copy
+import heapq
+import itertools
 import time
 import logging
-from typing import Dict, Optional, Any
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Any, Tuple
 from enum import IntEnum
 
 logger = logging.getLogger(__name__)
@@ -16,17 +20,38 @@ class APIPriority(IntEnum):
     ACCOUNT_SYNC = 4        # 계좌 동기화 (최후순위)
 
 class UpbitAPIManager:
-    """업비트 API 호출 중앙 관리자"""
+    """업비트 API 호출 중앙 관리자
     
-    def __init__(self):
-        self._call_queue = asyncio.PriorityQueue()
-        self._last_call_times: Dict[str, float] = {}
-        self._processing_lock = asyncio.Lock()
+    - 조회 호출은 우선순위 큐를 거쳐 최대 max_concurrency개 워커가 동시에 실행
+    - 호출 간격은 클라이언트 내부의 그룹별 레이트 리미터가 정확히 맞춤 (고정 대기 없음)
+    - 같은 조회가 실행 중이면 결과를 공유하고, 최근 결과는 메서드별 TTL 동안 재사용
+      (공유 결과는 호출자마다 복사본으로 반환하므로 받은 쪽에서 수정해도 캐시에 영향 없음)
+    - 주문(TRADING_ORDERS)은 큐를 거치지 않고 즉시 실행되어 조회 작업에 밀리지 않음
+    """
+    
+    # 메서드별 조회 결과 캐시 유효 시간 (초) - 목록에 없는 메서드는 캐시하지 않음
+    CACHE_TTLS = {
+        "get_ticker": 1.0,
+        "get_single_ticker": 1.0,
+        "get_minute_candles": 5.0,
+        "get_accounts": 2.0,
+        "get_order": 0.5
+    }
+    CACHE_MAX_ENTRIES = 512  # 초과 시 가장 오래 사용되지 않은 항목부터 제거
+    
+    def __init__(self, max_concurrency: int = 8):
+        self.max_concurrency = max_concurrency
+        
+        self._queue: list = []  # (priority, seq, call_info) 힙
+        self._seq = itertools.count()
+        self._queue_event: Optional[asyncio.Event] = None  # 이벤트 루프 안에서 지연 생성
+        self._workers: list = []
         self._is_processing = False
-        self._worker_task: Optional[asyncio.Task] = None
+        self._holders: set = set()  # 워커를 사용 중인 엔진 (모두 중지해야 워커 종료)
         
-        # 60초 규정 준수
-        self.MIN_INTERVAL = 60  # 초
+        # 실행 중 조회 병합 / 최근 조회 캐시
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._cache: "OrderedDict[Tuple, Tuple[Any, float]]" = OrderedDict()
         
         # 우선순위별 타임아웃
         self.TIMEOUTS = {
@@ -35,22 +60,59 @@ def __init__(self):
             APIPriority.SIGNAL_ANALYSIS: 20,
             APIPriority.ACCOUNT_SYNC: 30
         }
+        
+        # 우선순위별 큐 대기 시간 (최근 200건)
+        self._wait_times: Dict[APIPriority, deque] = {priority: deque(maxlen=200) for priority in APIPriority}
+        self.stats = {
+            "calls": 0,
+            "executed": 0,
+            "direct_orders": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "errors": 0
+        }
     
-    async def start_worker(self):
-        """API 호출 워커 시작"""
-        if self._worker_task is None or self._worker_task.done():
-            self._worker_task = asyncio.create_task(self._process_queue())
-            logger.info("🚀 API 매니저 워커 시작됨")
+    def _get_queue_event(self) -> asyncio.Event:
+        if self._queue_event is None:
+            self._queue_event = asyncio.Event()
+        return self._queue_event
     
-    async def stop_worker(self):
-        """API 호출 워커 중지"""
-        if self._worker_task and not self._worker_task.done():
-            self._worker_task.cancel()
-            try:
-                await self._worker_task
-            except asyncio.CancelledError:
-                pass
+    async def start_worker(self, owner: Any = None):
+        """API 호출 워커 시작 (max_concurrency개) - owner는 stop_worker 전까지 워커를 유지"""
+        if owner is not None:
+            self._holders.add(id(owner))
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._process_queue()) for _ in range(self.max_concurrency)]
+        self._is_processing = True
+        logger.info(f"🚀 API 매니저 워커 시작됨 (동시 실행 {self.max_concurrency}개)")
+    
+    async def stop_worker(self, owner: Any = None):
+        """API 호출 워커 중지 - 워커를 사용 중인 다른 엔진이 남아 있으면 유지"""
+        if owner is not None:
+            self._holders.discard(id(owner))
+        if self._holders:
+            logger.debug(f"API 매니저 워커 유지 (사용 중인 엔진 {len(self._holders)}개)")
+            return
+        
+        workers = [worker for worker in self._workers if not worker.done()]
+        if workers:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
             logger.info("⏹️ API 매니저 워커 중지됨")
+        self._workers = []
+        self._is_processing = False
+        
+        # 큐에 남은 호출은 대기자가 타임아웃까지 기다리지 않도록 즉시 실패 처리
+        while self._queue:
+            _, _, call_info = heapq.heappop(self._queue)
+            self._fail(call_info, RuntimeError("API worker stopped"))
+    
+    @staticmethod
+    def _call_key(client, method_name: str, args: tuple, kwargs: dict) -> Tuple:
+        return (id(client), method_name, repr(args), repr(sorted(kwargs.items())))
     
     async def safe_api_call(
         self, 
@@ -60,62 +122,80 @@ async def safe_api_call(
         priority: APIPriority = APIPriority.ACCOUNT_SYNC,
         **kwargs
     ) -> Any:
-        """안전한 API 호출 (60초 규정 준수)"""
+        """안전한 API 호출 (캐시 → 실행 중 병합 → 우선순위 큐)"""
+        self.stats["calls"] += 1
+        timeout = self.TIMEOUTS.get(priority, 30)
+        
+        # 주문은 큐/캐시/병합 없이 즉시 실행 (레이트 리미터의 주문 그룹만 적용)
+        if priority == APIPriority.TRADING_ORDERS:
+            self.stats["direct_orders"] += 1
+            self._wait_times[priority].append(0.0)
+            method = getattr(client, method_name)
+            return await asyncio.wait_for(method(*args, **kwargs), timeout=timeout)
+        
+        key = self._call_key(client, method_name, args, kwargs)
+        ttl = self.CACHE_TTLS.get(method_name, 0)
+        
+        # 최근 동일 조회 결과 재사용
+        cached = self._cache.get(key)
+        if cached:
+            if time.time() - cached[1] < ttl:
+                self.stats["cache_hits"] += 1
+                self._cache.move_to_end(key)
+                return copy.deepcopy(cached[0])
+            del self._cache[key]
         
-        # 호출 요청을 큐에 추가
-        future = asyncio.Future()
+        # 실행 중인 동일 조회에 합류
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return copy.deepcopy(await asyncio.wait_for(asyncio.shield(inflight), timeout=timeout))
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
         call_info = {
             'client': client,
             'method_name': method_name,
             'args': args,
             'kwargs': kwargs,
             'future': future,
+            'key': key,
+            'ttl': ttl,
+            'priority': priority,
             'timestamp': time.time()
         }
-        
-        await self._call_queue.put((priority.value, call_info))
+        heapq.heappush(self._queue, (priority.value, next(self._seq), call_info))
+        self._get_queue_event().set()
         
         # 워커가 실행 중이 아니면 시작
         if not self._is_processing:
             await self.start_worker()
         
         # 결과 대기 (타임아웃 적용)
-        timeout = self.TIMEOUTS.get(priority, 30)
         try:
-            result = await asyncio.wait_for(future, timeout=timeout)
-            return result
+            return copy.deepcopy(await asyncio.wait_for(asyncio.shield(future), timeout=timeout))
         except asyncio.TimeoutError:
             logger.warning(f"⏰ API 호출 타임아웃: {method_name} (우선순위: {priority.name})")
             raise
     
     async def _process_queue(self):
-        """API 호출 큐 처리 워커"""
-        self._is_processing = True
-        
+        """API 호출 큐 처리 워커 - 가장 높은 우선순위 호출부터 실행"""
+        event = self._get_queue_event()
         try:
             while True:
+                if not self._queue:
+                    event.clear()
+                    await event.wait()
+                    continue
+                
+                _, _, call_info = heapq.heappop(self._queue)
                 try:
-                    # 큐에서 요청 가져오기 (1초 타임아웃)
-                    priority, call_info = await asyncio.wait_for(
-                        self._call_queue.get(), 
-                        timeout=1.0
-                    )
-                    
                     await self._execute_call(call_info)
-                    
-                except asyncio.TimeoutError:
-                    # 큐가 비어있으면 1초 대기 후 재시도
-                    await asyncio.sleep(1)
-                    continue
-                    
                 except Exception as e:
                     logger.error(f"⚠️ API 호출 처리 오류: {str(e)}")
-                    await asyncio.sleep(1)
                     
         except asyncio.CancelledError:
-            logger.info("🔄 API 호출 워커 취소됨")
-        finally:
-            self._is_processing = False
+            pass
     
     async def _execute_call(self, call_info: Dict[str, Any]):
         """실제 API 호출 실행"""
@@ -124,33 +204,72 @@ async def _execute_call(self, call_info: Dict[str, Any]):
         args = call_info['args']
         kwargs = call_info['kwargs']
         future = call_info['future']
+        key = call_info['key']
+        
+        self._wait_times[call_info['priority']].append(time.time() - call_info['timestamp'])
         
         try:
-            # 60초 규정 준수 체크
-            endpoint_key = f"{method_name}_{str(args)}"
-            current_time = time.time()
-            last_call = self._last_call_times.get(endpoint_key, 0)
-            
-            if current_time - last_call < self.MIN_INTERVAL:
-                wait_time = self.MIN_INTERVAL - (current_time - last_call)
-                logger.info(f"⏳ 60초 규정 준수 대기: {wait_time:.1f}초 ({method_name})")
-                await asyncio.sleep(wait_time)
-            
-            # API 호출 실행
+            # API 호출 실행 (간격 제어는 클라이언트의 레이트 리미터가 담당)
             method = getattr(client, method_name)
             result = await method(*args, **kwargs)
+            self.stats["executed"] += 1
             
-            # 호출 시간 기록
-            self._last_call_times[endpoint_key] = time.time()
+            # 성공한 조회 결과만 캐시 (에러 응답 제외)
+            if call_info['ttl'] > 0 and not (isinstance(result, dict) and "error" in result):
+                self._cache[key] = (result, time.time())
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.CACHE_MAX_ENTRIES:
+                    self._cache.popitem(last=False)
             
             # 결과 반환
             if not future.done():
                 future.set_result(result)
                 
+        except asyncio.CancelledError:
+            # 공유 future를 취소하면 대기자에게 CancelledError가 전파되므로 일반 예외로 실패 처리
+            self._fail(call_info, RuntimeError("API worker stopped"))
+            raise
         except Exception as e:
             # 에러 반환
-            if not future.done():
-                future.set_exception(e)
+            self.stats["errors"] += 1
+            self._fail(call_info, e)
+        finally:
+            self._inflight.pop(key, None)
+    
+    def _fail(self, call_info: Dict[str, Any], error: Exception):
+        """호출 대기자에게 예외 전달"""
+        future = call_info['future']
+        if not future.done():
+            future.set_exception(error)
+            future.exception()  # 대기자가 모두 타임아웃으로 떠난 경우 경고 방지
+        self._inflight.pop(call_info['key'], None)
+    
+    def get_metrics(self) -> Dict:
+        """큐 깊이 및 우선순위별 대기 시간 지표"""
+        depth = {priority.name: 0 for priority in APIPriority}
+        for priority_value, _, _ in self._queue:
+            depth[APIPriority(priority_value).name] += 1
+        
+        wait_times = {}
+        for priority, samples in self._wait_times.items():
+            ordered = sorted(samples)
+            wait_times[priority.name] = {
+                "samples": len(ordered),
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+                "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1 if len(ordered) > 1 else 0] * 1000, 2) if ordered else 0.0,
+                "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0
+            }
+        
+        return {
+            "queue_depth": len(self._queue),
+            "queue_depth_by_priority": depth,
+            "workers": sum(1 for worker in self._workers if not worker.done()),
+            "max_concurrency": self.max_concurrency,
+            "inflight": len(self._inflight),
+            "cache_entries": len(self._cache),
+            "wait_times": wait_times,
+            "stats": self.stats.copy()
+        }
     
     async def get_batch_ticker(self, markets: list) -> Optional[list]:
         """배치 ticker 요청 - PDF 제안사항: 10개 개별 호출을 1개 배치로 최적화"""
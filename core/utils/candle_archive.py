@@ -0,0 +1,259 @@
+"""
+열 지향 캔들 아카이브 (연구/백테스트용)
+- (market, unit, 월)마다 파일 하나: 고정 헤더 + ts(int64)/open/high/low/close/volume(float64) 연속 열
+- 헤더에 행 수/시각 범위/CRC32 기록, (market, unit) 디렉터리의 index.json이 월별 요약을 보관
+- np.memmap으로 열을 복사 없이 열고 ts 이진 탐색으로 구간 조회 (한 달 안의 조회는 뷰 반환)
+- candles 테이블과의 상호 변환 포함
+"""
+
+import json
+import os
+import struct
+import zlib
+import logging
+from calendar import monthrange
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("ts", "open", "high", "low", "close", "volume")
+DTYPES = {"ts": np.int64, "open": np.float64, "high": np.float64, "low": np.float64,
+          "close": np.float64, "volume": np.float64}
+
+MAGIC = b"TPCANDL1"
+# magic, version, unit, rows, ts_min, ts_max, crc32, market(16바이트)
+HEADER = struct.Struct("<8sHIqqqI16s")
+HEADER_SIZE = 64  # 열 시작 위치를 64바이트 경계에 맞춤
+VERSION = 1
+
+def month_key(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m")
+
+def month_bounds(key: str) -> Tuple[int, int]:
+    """월의 [시작 ts, 다음 달 시작 ts)"""
+    year, month = map(int, key.split("-"))
+    start = datetime(year, month, 1, tzinfo=timezone.utc)
+    return int(start.timestamp()), int(start.timestamp()) + monthrange(year, month)[1] * 86400
+
+def _month_range(start_ts: int, end_ts: int) -> Iterator[str]:
+    key = month_key(start_ts)
+    while True:
+        yield key
+        next_start = month_bounds(key)[1]
+        if next_start > end_ts:
+            return
+        key = month_key(next_start)
+
+def _empty() -> Dict[str, np.ndarray]:
+    return {column: np.empty(0, dtype=DTYPES[column]) for column in COLUMNS}
+
+
+class ArchiveError(Exception):
+    """아카이브 파일 손상/형식 오류"""
+
+
+class CandleArchive:
+    """월 단위 열 파일 + memmap 조회"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.getenv("CANDLE_ARCHIVE_DIR", "./data/candles")
+        self._index_cache: Dict[Tuple[str, int], Dict[str, Dict]] = {}
+
+    # ----- 경로/인덱스 -----
+
+    def _dir(self, market: str, unit: int) -> str:
+        return os.path.join(self.root, market, str(unit))
+
+    def _path(self, market: str, unit: int, month: str) -> str:
+        return os.path.join(self._dir(market, unit), f"{month}.col")
+
+    def index(self, market: str, unit: int) -> Dict[str, Dict]:
+        """월별 요약 {month: {rows, ts_min, ts_max, crc32}}"""
+        key = (market, unit)
+        if key not in self._index_cache:
+            path = os.path.join(self._dir(market, unit), "index.json")
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._index_cache[key] = json.load(f)
+            except FileNotFoundError:
+                self._index_cache[key] = {}
+        return self._index_cache[key]
+
+    def _save_index(self, market: str, unit: int, index: Dict[str, Dict]):
+        path = os.path.join(self._dir(market, unit), "index.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(index.items())), f, indent=1)
+        os.replace(tmp_path, path)
+        self._index_cache[(market, unit)] = index
+
+    def months(self, market: str, unit: int) -> List[str]:
+        return sorted(self.index(market, unit))
+
+    # ----- 쓰기 -----
+
+    def write_month(self, market: str, unit: int, month: str, data: Dict[str, np.ndarray]) -> Dict:
+        """한 달치 열 기록 (ts 정렬/중복 제거 후 임시 파일 → 교체)"""
+        ts = np.asarray(data["ts"], dtype=np.int64)
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        keep = np.ones(len(ts), dtype=bool)
+        keep[1:] = ts[1:] != ts[:-1]
+        columns = [ts[keep]] + [np.asarray(data[column], dtype=np.float64)[order][keep] for column in COLUMNS[1:]]
+        rows = len(columns[0])
+
+        start, end = month_bounds(month)
+        if rows and (columns[0][0] < start or columns[0][-1] >= end):
+            raise ArchiveError(f"{month} 범위를 벗어난 캔들 포함")
+
+        crc = 0
+        for column in columns:
+            crc = zlib.crc32(column.tobytes(), crc)
+        header = HEADER.pack(MAGIC, VERSION, unit, rows,
+                             int(columns[0][0]) if rows else 0, int(columns[0][-1]) if rows else 0,
+                             crc, market.encode("ascii")[:16])
+
+        os.makedirs(self._dir(market, unit), exist_ok=True)
+        path = self._path(market, unit, month)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            for column in columns:
+                f.write(column.tobytes())
+        os.replace(tmp_path, path)
+
+        summary = {"rows": rows, "ts_min": int(columns[0][0]) if rows else None,
+                   "ts_max": int(columns[0][-1]) if rows else None, "crc32": crc}
+        index = dict(self.index(market, unit))
+        index[month] = summary
+        self._save_index(market, unit, index)
+        return summary
+
+    # ----- 읽기 -----
+
+    def _read_header(self, path: str) -> Tuple[int, int, int, int, int]:
+        with open(path, "rb") as f:
+            raw = f.read(HEADER.size)
+        if len(raw) < HEADER.size:
+            raise ArchiveError(f"헤더 손상: {path}")
+        magic, version, unit, rows, ts_min, ts_max, crc, _ = HEADER.unpack(raw)
+        if magic != MAGIC or version != VERSION:
+            raise ArchiveError(f"지원하지 않는 아카이브 형식: {path}")
+        return unit, rows, ts_min, ts_max, crc
+
+    def open_month(self, market: str, unit: int, month: str) -> Dict[str, np.ndarray]:
+        """월 파일의 열을 memmap으로 열기 (복사 없음, 읽기 전용)"""
+        path = self._path(market, unit, month)
+        _, rows, _, _, _ = self._read_header(path)
+        if not rows:
+            return _empty()
+        if os.path.getsize(path) < HEADER_SIZE + rows * 8 * len(COLUMNS):
+            raise ArchiveError(f"열 데이터 손상: {path}")
+        return {
+            column: np.memmap(path, dtype=DTYPES[column], mode="r",
+                              offset=HEADER_SIZE + position * rows * 8, shape=(rows,))
+            for position, column in enumerate(COLUMNS)
+        }
+
+    def read(self, market: str, unit: int, start_ts: Optional[int] = None,
+             end_ts: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """[start_ts, end_ts] 구간 열 조회 - 한 달 안이면 memmap 뷰, 여러 달이면 이어 붙인 배열"""
+        index = self.index(market, unit)
+        months = [
+            month for month in sorted(index)
+            if index[month]["rows"]
+            and (start_ts is None or index[month]["ts_max"] >= start_ts)
+            and (end_ts is None or index[month]["ts_min"] <= end_ts)
+        ]
+        parts = []
+        for month in months:
+            columns = self.open_month(market, unit, month)
+            ts = columns["ts"]
+            lo = int(np.searchsorted(ts, start_ts, side="left")) if start_ts is not None else 0
+            hi = int(np.searchsorted(ts, end_ts, side="right")) if end_ts is not None else len(ts)
+            if lo < hi:
+                parts.append({column: values[lo:hi] for column, values in columns.items()})
+
+        if not parts:
+            return _empty()
+        if len(parts) == 1:
+            return parts[0]
+        return {column: np.concatenate([part[column] for part in parts]) for column in COLUMNS}
+
+    def verify(self, market: str, unit: int) -> Dict[str, bool]:
+        """월 파일별 CRC32/인덱스 일치 여부"""
+        results = {}
+        for month, summary in self.index(market, unit).items():
+            try:
+                _, rows, _, _, crc = self._read_header(self._path(market, unit, month))
+                columns = self.open_month(market, unit, month)
+                actual = 0
+                for column in COLUMNS:
+                    actual = zlib.crc32(np.ascontiguousarray(columns[column]).tobytes(), actual)
+                results[month] = actual == crc == summary["crc32"] and rows == summary["rows"]
+            except (OSError, ArchiveError):
+                results[month] = False
+        return results
+
+    # ----- candles 테이블 변환 -----
+
+    async def export_from_db(self, market: str, unit: int, start_ts: Optional[int] = None,
+                             end_ts: Optional[int] = None) -> Dict[str, int]:
+        """candles 테이블 → 월 파일 (기본: 마지막 아카이브 월부터 다시 기록)"""
+        from database import async_engine
+
+        async with async_engine.connect() as conn:
+            bounds = (await conn.exec_driver_sql(
+                _driver_sql(async_engine, "SELECT MIN(ts), MAX(ts) FROM candles WHERE market = ? AND unit = ?"),
+                (market, unit)
+            )).fetchone()
+        if not bounds or bounds[0] is None:
+            return {"months": 0, "rows": 0}
+
+        months = self.months(market, unit)
+        if start_ts is None:
+            start_ts = month_bounds(months[-1])[0] if months else bounds[0]
+        start_ts = max(start_ts, bounds[0])
+        end_ts = min(end_ts if end_ts is not None else bounds[1], bounds[1])
+
+        written = {"months": 0, "rows": 0}
+        sql = _driver_sql(async_engine, "SELECT ts, open, high, low, close, volume FROM candles "
+                                        "WHERE market = ? AND unit = ? AND ts >= ? AND ts < ? ORDER BY ts")
+        for month in _month_range(start_ts, end_ts):
+            month_start, month_end = month_bounds(month)
+            async with async_engine.connect() as conn:
+                rows = (await conn.exec_driver_sql(sql, (market, unit, month_start, month_end))).fetchall()
+            if not rows:
+                continue
+            array = np.array(rows, dtype=np.float64)
+            data = {column: array[:, position] for position, column in enumerate(COLUMNS)}
+            data["ts"] = array[:, 0].astype(np.int64)
+            self.write_month(market, unit, month, data)
+            written["months"] += 1
+            written["rows"] += len(rows)
+
+        logger.info(f"🗄️ {market} {unit}분봉 아카이브 기록 - {written['months']}개월, {written['rows']:,}행")
+        return written
+
+    async def import_to_db(self, market: str, unit: int, start_ts: Optional[int] = None,
+                           end_ts: Optional[int] = None) -> Dict[str, float]:
+        """월 파일 → candles 테이블 (이미 있는 캔들은 유지)"""
+        from database import upsert_candles
+
+        data = self.read(market, unit, start_ts, end_ts)
+        rows = list(zip(data["ts"].tolist(), data["open"].tolist(), data["high"].tolist(),
+                        data["low"].tolist(), data["close"].tolist(), data["volume"].tolist()))
+        result = await upsert_candles(rows, market, unit)
+        logger.info(f"💾 {market} {unit}분봉 아카이브 → DB {result['rows']:,}행 적재 "
+                    f"({result['seconds']:.2f}초, {result['rows_per_sec']:,.0f}행/초)")
+        return result
+
+def _driver_sql(engine, sql: str) -> str:
+    """'?' 자리표시자를 드라이버 형식으로 변환"""
+    return sql if engine.dialect.paramstyle == "qmark" else sql.replace("?", "%s")
+
+# 전역 캔들 아카이브 인스턴스
+candle_archive = CandleArchive()
@@ -0,0 +1,270 @@
+"""
+저비용 지연 계측 레이어
+- 로그 간격 버킷(HDR 방식, 상대 오차 약 5%) 지연 히스토그램과 카운터를 라벨(마켓/엔드포인트)별로 유지
+- 컨텍스트 매니저(timer)와 데코레이터(timed)로 엔진/분석기/API 클라이언트/DB 호출 측정
+- Prometheus 텍스트 형식 출력 (/metrics)
+"""
+
+import asyncio
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Prometheus 노출용 누적 버킷 경계 (초)
+EXPORT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in items) + "}"
+
+
+class LatencyHistogram:
+    """로그 간격 버킷 히스토그램 - 기록 O(1), 백분위는 버킷 누적으로 계산
+
+    min_value 이상 값은 (1 + precision) 배 간격 버킷에 기록되어 백분위 상대 오차가 precision 이내로 유지된다.
+    """
+
+    def __init__(self, min_value: float = 1e-5, max_value: float = 600.0, precision: float = 0.05):
+        self.min_value = min_value
+        self._log_base = math.log1p(precision)
+        self._size = int(math.log(max_value / min_value) / self._log_base) + 2
+        self._counts = [0] * self._size
+        self._export = [0] * (len(EXPORT_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        return min(self._size - 1, int(math.log(value / self.min_value) / self._log_base) + 1)
+
+    def _upper(self, index: int) -> float:
+        return self.min_value * math.exp(self._log_base * index)
+
+    def record(self, value: float):
+        value = max(0.0, value)
+        self._counts[self._index(value)] += 1
+        self._export[bisect_left(EXPORT_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(self._upper(index), self.max)
+        return self.max
+
+    def cumulative_buckets(self):
+        """(경계, 누적 개수) - 마지막은 +Inf"""
+        total = 0
+        for bound, bucket_count in zip(EXPORT_BUCKETS, self._export):
+            total += bucket_count
+            yield bound, total
+        yield float("inf"), self.count
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p90_ms": round(self.percentile(90) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3)
+        }
+
+
+class _Timer:
+    """동기/비동기 겸용 측정 컨텍스트 - 예외 발생 시 오류 카운터 증가"""
+
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labels: Dict[str, Any]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None and exc_type is not asyncio.CancelledError:
+            self.registry.inc(f"{self.name}_errors", **self.labels)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class MetricsRegistry:
+    """이름 + 라벨별 히스토그램/카운터 레지스트리"""
+
+    def __init__(self, namespace: str = "teamprime", max_series_per_metric: int = 500):
+        self.namespace = namespace
+        self.max_series_per_metric = max_series_per_metric  # 라벨 폭증 방지
+        self._histograms: Dict[str, Dict[LabelKey, LatencyHistogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()  # 주문 검증 스레드 경로에서도 기록
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def _series(self, store: Dict[str, Dict[LabelKey, Any]], name: str, labels: Dict[str, Any], factory):
+        series = store.setdefault(name, {})
+        key = _label_key(labels)
+        item = series.get(key)
+        if item is None:
+            if len(series) >= self.max_series_per_metric:
+                key = (("overflow", "true"),)
+                item = series.get(key)
+                if item is not None:
+                    return key, item
+            item = series[key] = factory()
+        return key, item
+
+    def observe(self, name: str, seconds: float, **labels):
+        """지연 시간(초) 기록"""
+        with self._lock:
+            _, histogram = self._series(self._histograms, name, labels, LatencyHistogram)
+            histogram.record(seconds)
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series and len(series) >= self.max_series_per_metric:
+                key = (("overflow", "true"),)
+            series[key] = series.get(key, 0.0) + amount
+
+    def timer(self, name: str, **labels) -> _Timer:
+        """with / async with 블록 실행 시간 기록"""
+        return _Timer(self, name, labels)
+
+    def timed(self, name: str, labels: Optional[Callable[..., Dict[str, Any]]] = None):
+        """함수 실행 시간 기록 데코레이터 - labels(*args, **kwargs)로 호출 인자에서 라벨 추출"""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(name, **(labels(*args, **kwargs) if labels else {})):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **(labels(*args, **kwargs) if labels else {})):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # ----- 조회 -----
+
+    def get_histogram(self, name: str, **labels) -> Optional[LatencyHistogram]:
+        return self._histograms.get(name, {}).get(_label_key(labels))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON 조회용 요약 (라벨별 p50/p90/p99)"""
+        with self._lock:
+            return {
+                "histograms": {
+                    name: [{"labels": dict(key), **histogram.summary()} for key, histogram in series.items()]
+                    for name, series in self._histograms.items()
+                },
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                }
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus 텍스트 노출 형식 (히스토그램 + 백분위 게이지 + 카운터)"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{self.namespace}_{name}_seconds"
+                lines.append(f"# HELP {metric} {self._help.get(name, name + ' latency')}")
+                lines.append(f"# TYPE {metric} histogram")
+                for key, histogram in series.items():
+                    for bound, cumulative in histogram.cumulative_buckets():
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{metric}_bucket{_format_labels(key, ('le', le))} {cumulative}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {histogram.sum:.9f}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {histogram.count}")
+
+                quantile_metric = f"{metric}_quantile"
+                lines.append(f"# HELP {quantile_metric} {name} latency quantiles (HDR buckets, ~5% relative error)")
+                lines.append(f"# TYPE {quantile_metric} gauge")
+                for key, histogram in series.items():
+                    for quantile in (0.5, 0.9, 0.99):
+                        value = histogram.percentile(quantile * 100)
+                        lines.append(f"{quantile_metric}{_format_labels(key, ('quantile', str(quantile)))} {value:.9f}")
+
+            for name, series in sorted(self._counters.items()):
+                metric = f"{self.namespace}_{name}_total"
+                lines.append(f"# HELP {metric} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in series.items():
+                    lines.append(f"{metric}{_format_labels(key)} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+# 전역 계측 레지스트리 인스턴스
+metrics_registry = MetricsRegistry()
+
+def instrument_sqlalchemy(engine, database: str):
+    """SQLAlchemy 엔진의 모든 SQL 실행 시간을 db_query 히스토그램에 기록 (operation/database 라벨)"""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_query_start")
+        if starts:
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+            metrics_registry.observe("db_query", time.perf_counter() - starts.pop(), operation=operation, database=database)
+
+metrics_registry.describe("candle_fetch", "Minute candle fetch latency (REST or live feed)")
+metrics_registry.describe("signal_analysis", "SignalAnalyzer.check_buy_signal latency")
+metrics_registry.describe("order_placement", "Order placement latency (engine call to exchange response)")
+metrics_registry.describe("order_verification", "Order fill verification latency")
+metrics_registry.describe("price_lookup", "Engine current price lookup latency")
+metrics_registry.describe("upbit_request", "Upbit REST request latency by endpoint")
+metrics_registry.describe("rate_limit_wait", "Time spent waiting for an Upbit rate limit slot")
+metrics_registry.describe("db_query", "Database operation latency")
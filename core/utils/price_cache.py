@@ -0,0 +1,107 @@
+"""
+공유 최종 체결가 캐시
+- 현재가 응답, 캔들 종가, 주문 체결가를 관측 시각과 함께 프로세스 전역에 기록
+- "X ms 이내의 가장 신선한 가격" 조회 시 가격 나이(age_ms)를 함께 반환
+"""
+
+import time
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+@dataclass(frozen=True)
+class PriceQuote:
+    """마켓 최종 체결가 관측값"""
+    market: str
+    price: float
+    source: str                     # ticker / candle / fill
+    observed_at: float              # 가격을 알게 된 시각 (epoch 초)
+    trade_ts: Optional[int] = None  # 거래소가 보고한 체결 시각 (epoch ms, 있을 때만)
+
+    @property
+    def age_ms(self) -> float:
+        return max(0.0, (time.time() - self.observed_at) * 1000)
+
+    def to_dict(self) -> Dict:
+        return {
+            "market": self.market,
+            "price": self.price,
+            "source": self.source,
+            "observed_at": self.observed_at,
+            "trade_ts": self.trade_ts,
+            "age_ms": round(self.age_ms, 1)
+        }
+
+
+class PriceCache:
+    """마켓별 최신 체결가 저장소 (더 최근에 관측한 값만 덮어씀)"""
+
+    def __init__(self):
+        self._quotes: Dict[str, PriceQuote] = {}
+        self._lock = threading.Lock()  # 동기 주문 경로와 이벤트 루프 양쪽에서 기록
+        self.stats = {"updates": 0, "hits": 0, "misses": 0}
+
+    def update(self, market: str, price: float, source: str,
+               observed_at: Optional[float] = None, trade_ts: Optional[int] = None) -> bool:
+        """가격 기록 - 유효하지 않은 가격이나 기존보다 오래된 관측은 무시"""
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            return False
+        if not market or price <= 0:
+            return False
+
+        quote = PriceQuote(market, price, source, observed_at or time.time(), trade_ts)
+        with self._lock:
+            current = self._quotes.get(market)
+            if current is not None and current.observed_at > quote.observed_at:
+                return False
+            self._quotes[market] = quote
+            self.stats["updates"] += 1
+        return True
+
+    def update_from_tickers(self, tickers: Iterable[Dict], observed_at: Optional[float] = None):
+        """업비트 현재가 응답 목록 기록"""
+        observed_at = observed_at or time.time()
+        for ticker in tickers or []:
+            if isinstance(ticker, dict) and ticker.get("market"):
+                self.update(ticker["market"], ticker.get("trade_price"), "ticker",
+                            observed_at, ticker.get("trade_timestamp"))
+
+    def update_from_candles(self, market: str, candles: List[Dict], observed_at: Optional[float] = None):
+        """업비트 캔들 응답(최신순)의 최신 종가 기록"""
+        if candles and isinstance(candles[0], dict):
+            latest = candles[0]
+            self.update(market, latest.get("trade_price"), "candle",
+                        observed_at or time.time(), latest.get("timestamp"))
+
+    def get(self, market: str, max_age_ms: Optional[float] = None) -> Optional[PriceQuote]:
+        """max_age_ms 이내의 최신 가격 (없으면 None)"""
+        quote = self._quotes.get(market)
+        if quote is None or (max_age_ms is not None and quote.age_ms > max_age_ms):
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return quote
+
+    def get_price(self, market: str, max_age_ms: Optional[float] = None) -> Optional[float]:
+        quote = self.get(market, max_age_ms)
+        return quote.price if quote else None
+
+    def get_many(self, markets: Iterable[str], max_age_ms: Optional[float] = None) -> Dict[str, PriceQuote]:
+        """여러 마켓 조회 - 신선한 가격이 있는 마켓만 반환"""
+        result: Dict[str, PriceQuote] = {}
+        for market in markets:
+            quote = self.get(market, max_age_ms)
+            if quote is not None:
+                result[market] = quote
+        return result
+
+    def get_status(self) -> Dict:
+        return {
+            "markets": len(self._quotes),
+            "stats": self.stats.copy()
+        }
+
+# 전역 가격 캐시 인스턴스
+price_cache = PriceCache()
@@ -0,0 +1,300 @@
+"""
+고정 크기 시계열 저장소
+- 메트릭별 원본 샘플을 배열 기반 링 버퍼(시각/값)에 O(1)로 기록
+- 1초 → 1분 → 1시간 롤업을 기록 시점에 함께 갱신 (count/sum/min/max/p50/p95/p99 + 병합 가능한 분위 표본)
+- 링 버퍼는 시간순이므로 구간 조회는 이진 탐색으로 처리
+"""
+
+import random
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+class RingBuffer:
+    """시각 + 여러 값 열을 가진 고정 크기 링 버퍼 (시각은 단조 증가로 유지)"""
+
+    def __init__(self, capacity: int, columns: Iterable[str] = ("value",)):
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self.ts = np.zeros(capacity, dtype=np.float64)
+        self.data = {column: np.zeros(capacity, dtype=np.float64) for column in self.columns}
+        self.head = 0   # 다음 기록 위치
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, ts: float, *values: float):
+        index = self.head
+        self.ts[index] = ts
+        for column, value in zip(self.columns, values):
+            self.data[column][index] = value
+        self.head = (index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    @property
+    def last_ts(self) -> Optional[float]:
+        return float(self.ts[self.head - 1]) if self.count else None
+
+    @property
+    def first_ts(self) -> Optional[float]:
+        return float(self.ts[self._start]) if self.count else None
+
+    @property
+    def _start(self) -> int:
+        return (self.head - self.count) % self.capacity
+
+    def _segments(self) -> List[Tuple[int, int]]:
+        """시간순 물리 구간 목록 (최대 2개)"""
+        if not self.count:
+            return []
+        start = self._start
+        end = start + self.count
+        if end <= self.capacity:
+            return [(start, end)]
+        return [(start, self.capacity), (0, end - self.capacity)]
+
+    def indices(self, start_ts: Optional[float] = None, end_ts: Optional[float] = None) -> np.ndarray:
+        """[start_ts, end_ts] 구간의 물리 위치 (시간순, 각 물리 구간에서 이진 탐색)"""
+        parts = []
+        for seg_start, seg_end in self._segments():
+            segment = self.ts[seg_start:seg_end]
+            lo = int(np.searchsorted(segment, start_ts, side="left")) if start_ts is not None else 0
+            hi = int(np.searchsorted(segment, end_ts, side="right")) if end_ts is not None else len(segment)
+            if lo < hi:
+                parts.append(np.arange(seg_start + lo, seg_start + hi))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def range(self, start_ts: Optional[float] = None, end_ts: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """[start_ts, end_ts] 구간 데이터 (시간순)"""
+        index = self.indices(start_ts, end_ts)
+        result = {"ts": self.ts[index]}
+        for column in self.columns:
+            result[column] = self.data[column][index]
+        return result
+
+    def tail(self, n: int) -> Dict[str, np.ndarray]:
+        """최근 n개 (시간순)"""
+        n = min(n, self.count)
+        indices = (np.arange(self.head - n, self.head)) % self.capacity
+        result = {"ts": self.ts[indices]}
+        for column in self.columns:
+            result[column] = self.data[column][indices]
+        return result
+
+
+ROLLUP_COLUMNS = ("count", "sum", "min", "max", "p50", "p95", "p99")
+SKETCH_POINTS = 32  # 롤업 구간별 분위 표본 수 - 구간마다 같은 간격 분위값을 저장해 여러 구간 병합 시 백분위 계산
+SKETCH_QUANTILES = (np.arange(SKETCH_POINTS) + 0.5) / SKETCH_POINTS * 100
+
+def weighted_percentiles(values: np.ndarray, weights: np.ndarray, percentiles: Iterable[float]) -> np.ndarray:
+    """가중 표본의 백분위 (각 표본을 누적 가중치 중앙에 두고 선형 보간)"""
+    order = np.argsort(values, kind="stable")
+    values, weights = values[order], weights[order]
+    cumulative = np.cumsum(weights)
+    positions = cumulative - weights / 2
+    return np.interp(np.asarray(percentiles, dtype=np.float64) / 100 * cumulative[-1], positions, values)
+
+class RollupLevel:
+    """고정 해상도 롤업 - 진행 중 구간은 누적값 + 표본(저장소 샘플링)으로 유지하고 마감 시 링 버퍼에 기록
+
+    마감한 구간마다 분위 표본(SKETCH_POINTS개)을 같은 위치에 저장 - 각 표본은 구간 표본 수의 1/SKETCH_POINTS를 대표
+    """
+
+    def __init__(self, resolution: float, capacity: int, reservoir_size: int = 256):
+        self.resolution = resolution
+        self.buffer = RingBuffer(capacity, ROLLUP_COLUMNS)
+        self.sketch = np.zeros((capacity, SKETCH_POINTS), dtype=np.float32)
+        self.reservoir_size = reservoir_size
+        self._bucket: Optional[float] = None
+        self._count = 0
+        self._sum = 0.0
+        self._min = 0.0
+        self._max = 0.0
+        self._reservoir: List[float] = []
+
+    @property
+    def retention(self) -> float:
+        return self.resolution * self.buffer.capacity
+
+    def add(self, ts: float, value: float):
+        bucket = ts - ts % self.resolution
+        if bucket != self._bucket:
+            self.flush()
+            self._bucket = bucket
+            self._count, self._sum, self._min, self._max = 0, 0.0, value, value
+            self._reservoir = []
+
+        self._count += 1
+        self._sum += value
+        if value < self._min:
+            self._min = value
+        if value > self._max:
+            self._max = value
+        if len(self._reservoir) < self.reservoir_size:
+            self._reservoir.append(value)
+        else:
+            slot = random.randrange(self._count)
+            if slot < self.reservoir_size:
+                self._reservoir[slot] = value
+
+    def flush(self):
+        """진행 중 구간 마감"""
+        if self._bucket is None or not self._count:
+            return
+        p50, p95, p99 = np.percentile(self._reservoir, (50, 95, 99))
+        self.sketch[self.buffer.head] = np.percentile(self._reservoir, SKETCH_QUANTILES)
+        self.buffer.append(self._bucket, self._count, self._sum, self._min, self._max, p50, p95, p99)
+        self._bucket = None
+        self._count = 0
+
+    def open_bucket(self) -> Optional[Dict[str, float]]:
+        """아직 마감되지 않은 구간 (조회 시 포함용)"""
+        if self._bucket is None or not self._count:
+            return None
+        p50, p95, p99 = np.percentile(self._reservoir, (50, 95, 99))
+        return {"ts": self._bucket, "count": self._count, "sum": self._sum, "min": self._min,
+                "max": self._max, "p50": p50, "p95": p95, "p99": p99,
+                "sketch": np.percentile(self._reservoir, SKETCH_QUANTILES)}
+
+    def range(self, start_ts: Optional[float] = None, end_ts: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """[start_ts, end_ts]와 겹치는 구간 (시작 시각이 start_ts보다 이른 첫 구간과 진행 중 구간 포함)"""
+        index = self.buffer.indices(start_ts - self.resolution if start_ts is not None else None, end_ts)
+        data = {"ts": self.buffer.ts[index], "sketch": self.sketch[index]}
+        for column in ROLLUP_COLUMNS:
+            data[column] = self.buffer.data[column][index]
+
+        current = self.open_bucket()
+        if current and (start_ts is None or current["ts"] > start_ts - self.resolution) \
+                and (end_ts is None or current["ts"] <= end_ts):
+            for column in ("ts",) + ROLLUP_COLUMNS:
+                data[column] = np.append(data[column], current[column])
+            data["sketch"] = np.vstack([data["sketch"], current["sketch"]])
+        return data
+
+
+class MetricSeries:
+    """단일 메트릭 시계열 - 원본 링 버퍼 + 1초/1분/1시간 롤업"""
+
+    LEVELS = (("1s", 1.0, 900), ("1m", 60.0, 1440), ("1h", 3600.0, 720))  # 15분 / 24시간 / 30일 보관
+
+    def __init__(self, raw_capacity: int = 4096):
+        self.raw = RingBuffer(raw_capacity)
+        self.levels = {name: RollupLevel(resolution, capacity) for name, resolution, capacity in self.LEVELS}
+        self.total = 0
+
+    def append(self, value: float, ts: Optional[float] = None):
+        ts = time.time() if ts is None else ts
+        last_ts = self.raw.last_ts
+        if last_ts is not None and ts < last_ts:
+            ts = last_ts  # 시간순 유지 (이진 탐색 전제)
+        self.raw.append(ts, value)
+        for level in self.levels.values():
+            level.add(ts, value)
+        self.total += 1
+
+    @property
+    def last(self) -> Optional[Tuple[float, float]]:
+        if not self.raw.count:
+            return None
+        index = self.raw.head - 1
+        return float(self.raw.ts[index]), float(self.raw.data["value"][index])
+
+    def raw_range(self, start_ts: Optional[float] = None, end_ts: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        data = self.raw.range(start_ts, end_ts)
+        return data["ts"], data["value"]
+
+    def _covers_raw(self, start_ts: float) -> bool:
+        """원본 버퍼가 start_ts 이후 샘플을 모두 가지고 있는지"""
+        return self.raw.count < self.raw.capacity or (self.raw.first_ts is not None and self.raw.first_ts <= start_ts)
+
+    def choose_level(self, start_ts: float) -> str:
+        """구간 시작을 보관하고 있는 가장 세밀한 롤업"""
+        now = time.time()
+        for name, level in self.levels.items():
+            if now - start_ts <= level.retention:
+                return name
+        return "1h"
+
+    def rollup_range(self, level_name: str, start_ts: Optional[float] = None,
+                     end_ts: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """롤업 구간 조회 (진행 중 구간 포함)"""
+        return self.levels[level_name].range(start_ts, end_ts)
+
+    def summary(self, start_ts: float, end_ts: Optional[float] = None) -> Dict[str, float]:
+        """구간 통계 - 원본이 구간을 모두 보관하면 정확히, 아니면 롤업을 병합하여 계산"""
+        if self._covers_raw(start_ts):
+            _, values = self.raw_range(start_ts, end_ts)
+            if not len(values):
+                return {"count": 0}
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            return {
+                "count": int(len(values)), "min": float(values.min()), "max": float(values.max()),
+                "avg": float(values.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99),
+                "source": "raw"
+            }
+
+        level_name = self.choose_level(start_ts)
+        resolution = self.levels[level_name].resolution
+        data = self.rollup_range(level_name, start_ts, end_ts)
+
+        # 조회 구간 경계에 걸친 롤업 구간은 겹치는 비율만큼만 반영 (구간 안 균등 분포 가정)
+        bucket_start = data["ts"]
+        overlap = np.minimum(bucket_start + resolution, np.inf if end_ts is None else end_ts) - np.maximum(bucket_start, start_ts)
+        weights = data["count"] * np.clip(overlap / resolution, 0.0, 1.0)
+        total = weights.sum()
+        if not total:
+            return {"count": 0}
+        included = weights > 0
+
+        # 백분위는 구간별 분위 표본을 가중치와 함께 병합해 계산
+        p50, p95, p99 = weighted_percentiles(
+            data["sketch"][included].ravel().astype(np.float64),
+            np.repeat(weights[included] / SKETCH_POINTS, SKETCH_POINTS),
+            (50, 95, 99)
+        )
+        return {
+            "count": int(round(total)), "min": float(data["min"][included].min()), "max": float(data["max"][included].max()),
+            "avg": float((data["sum"] / data["count"] * weights)[included].sum() / total),
+            "p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "source": level_name
+        }
+
+
+class TimeSeriesStore:
+    """메트릭 이름별 시계열 레지스트리"""
+
+    def __init__(self, raw_capacity: int = 4096):
+        self.raw_capacity = raw_capacity
+        self._series: Dict[str, MetricSeries] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._series
+
+    def names(self) -> List[str]:
+        return list(self._series)
+
+    def get(self, name: str) -> Optional[MetricSeries]:
+        return self._series.get(name)
+
+    def record(self, name: str, value: float, ts: Optional[float] = None) -> MetricSeries:
+        series = self._series.get(name)
+        if series is None:
+            series = self._series[name] = MetricSeries(self.raw_capacity)
+        series.append(float(value), ts)
+        return series
+
+    def remove(self, name: str):
+        self._series.pop(name, None)
+
+    def memory_bytes(self) -> int:
+        """배열 메모리 사용량 (진행 중 구간 표본 제외)"""
+        total = 0
+        for series in self._series.values():
+            total += series.raw.ts.nbytes + sum(array.nbytes for array in series.raw.data.values())
+            for level in series.levels.values():
+                total += level.buffer.ts.nbytes + sum(array.nbytes for array in level.buffer.data.values())
+                total += level.sketch.nbytes
+        return total
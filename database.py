@@ -7,17 +7,21 @@
 
 import asyncio
 import re
+import time
+import logging
 import aiohttp
 from datetime import datetime, timezone
 from typing import List, Optional, Tuple, Dict
 from sqlalchemy import (
     MetaData, Table, Column, String, Integer, Float, create_engine,
-    text, select, insert, PrimaryKeyConstraint
+    text, select, insert, PrimaryKeyConstraint, Index, event
 )
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 import os
 from dotenv import load_dotenv
 
+from core.utils.instrumentation import instrument_sqlalchemy
+
 # 설정 로드
 load_dotenv()
 
@@ -26,6 +30,9 @@
 UPBIT_BASE = "https://api.upbit.com"
 DEFAULT_YEARS = int(os.getenv("YEARS", "3"))
 BATCH = 200  # Upbit candles limit
+UPSERT_BATCH = int(os.getenv("UPSERT_BATCH", "50000"))  # 대량 적재 트랜잭션당 행 수
+
+logger = logging.getLogger(__name__)
 
 # 데이터베이스 스키마 정의
 metadata = MetaData()
@@ -80,8 +87,88 @@
     Column("signal_data", String, nullable=True)
 )
 
+# 거래 원장 (추가 전용) - 체결(fill)과 청산 완료(close) 기록, (user, market, ts) 키셋 조회용 인덱스
+trade_ledger_table = Table(
+    "trade_ledger",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", Integer, nullable=False),  # 세션 없는 전역 엔진은 0
+    Column("market", String, nullable=False),
+    Column("ts", Integer, nullable=False),
+    Column("event", String, nullable=False),     # fill, close
+    Column("side", String, nullable=False),      # bid, ask
+    Column("price", Float, nullable=False),
+    Column("amount", Float, nullable=False),
+    Column("total", Float, nullable=False),
+    Column("fee", Float, nullable=False),
+    Column("profit_loss", Float, nullable=True),
+    Column("profit_rate", Float, nullable=True),
+    Column("hold_seconds", Integer, nullable=True),
+    Column("reason", String, nullable=True),
+    Column("order_id", String, nullable=True),
+    Index("ix_trade_ledger_user_market_ts", "user_id", "market", "ts", "id"),
+    Index("ix_trade_ledger_user_ts", "user_id", "ts", "id")
+)
+
+# 거래 통계 집계 (원장 기록 시 함께 누적) - (user, market, KST 일자, 시) 단위
+trade_stats_table = Table(
+    "trade_stats",
+    metadata,
+    Column("user_id", Integer, nullable=False),
+    Column("market", String, nullable=False),
+    Column("day_ts", Integer, nullable=False),   # KST 자정 epoch
+    Column("hour", Integer, nullable=False),     # KST 시 (0~23)
+    Column("fills", Integer, nullable=False, default=0),
+    Column("fill_volume", Float, nullable=False, default=0.0),
+    Column("fees", Float, nullable=False, default=0.0),
+    Column("trades", Integer, nullable=False, default=0),
+    Column("wins", Integer, nullable=False, default=0),
+    Column("losses", Integer, nullable=False, default=0),
+    Column("volume", Float, nullable=False, default=0.0),  # 청산 거래의 매수 금액
+    Column("profit_loss", Float, nullable=False, default=0.0),
+    Column("gross_profit", Float, nullable=False, default=0.0),
+    Column("gross_loss", Float, nullable=False, default=0.0),
+    Column("hold_seconds", Float, nullable=False, default=0.0),
+    PrimaryKeyConstraint("user_id", "market", "day_ts", "hour")
+)
+
+# 과거 캔들 수집 진행 상황 (조회를 마친 구간 - 거래가 없어 캔들이 없는 구간 재조회 방지)
+backfill_progress_table = Table(
+    "backfill_progress",
+    metadata,
+    Column("market", String, nullable=False),
+    Column("unit", Integer, nullable=False),
+    Column("start_ts", Integer, nullable=False),
+    Column("end_ts", Integer, nullable=False),
+    Column("updated_at", Integer, nullable=False),
+    PrimaryKeyConstraint("market", "unit", "start_ts")
+)
+
+# 상위 봉 집계 진행 상황 (마지막으로 완성된 집계 구간 시작 시각)
+candle_rollup_state_table = Table(
+    "candle_rollup_state",
+    metadata,
+    Column("market", String, nullable=False),
+    Column("unit", Integer, nullable=False),
+    Column("last_bucket_ts", Integer, nullable=False),
+    Column("updated_at", Integer, nullable=False),
+    PrimaryKeyConstraint("market", "unit")
+)
+
 # 데이터베이스 엔진
 async_engine: AsyncEngine = create_async_engine(DB_URL, future=True, echo=False)
+instrument_sqlalchemy(async_engine, DB_URL.split(":", 1)[0].split("+", 1)[0])
+
+if async_engine.dialect.name == "sqlite":
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """SQLite 적재 최적화 - WAL(읽기/쓰기 동시 진행), 커밋 시 fsync 최소화, 큰 페이지 캐시"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-65536")  # 64MB
+        cursor.close()
 
 # FastAPI 의존성용 데이터베이스 세션
 async def get_db():
@@ -176,23 +263,48 @@ async def fetch_minutes(
     
     raise RuntimeError(f"Upbit {unit}m fetch failed after 3 retries (rate limit)")
 
-async def upsert_candles(rows: List[tuple], market: str, unit: int):
-    """캔들 데이터 업서트"""
+def _candle_upsert_sql(dialect_name: str, paramstyle: str, replace: bool = False) -> str:
+    """DB별 캔들 업서트 SQL - 드라이버 파라미터 형식으로 직접 작성
+
+    replace=False: 기존 행 유지 (원본 1분봉), replace=True: 기존 행을 새 값으로 갱신 (재집계한 상위 봉)
+    """
+    placeholder = "?" if paramstyle == "qmark" else "%s"
+    columns = "market, unit, ts, open, high, low, close, volume"
+    values = ", ".join([placeholder] * 8)
+    prices = ("open", "high", "low", "close", "volume")
+
+    if dialect_name == "mysql":
+        updates = ", ".join(f"{name} = VALUES({name})" for name in prices) if replace else "ts = ts"
+        return f"INSERT INTO candles ({columns}) VALUES ({values}) ON DUPLICATE KEY UPDATE {updates}"
+    if replace:
+        updates = ", ".join(f"{name} = excluded.{name}" for name in prices)
+        return f"INSERT INTO candles ({columns}) VALUES ({values}) ON CONFLICT(market, unit, ts) DO UPDATE SET {updates}"
+    return f"INSERT INTO candles ({columns}) VALUES ({values}) ON CONFLICT(market, unit, ts) DO NOTHING"
+
+async def upsert_candles(rows: List[tuple], market: str, unit: int, batch_size: int = UPSERT_BATCH,
+                         replace: bool = False) -> Dict[str, float]:
+    """캔들 데이터 대량 업서트 - 배치 단위 executemany
+
+    rows: (ts, open, high, low, close, volume) 튜플 목록
+    replace: False면 이미 있는 (market, unit, ts)는 건너뜀, True면 새 값으로 갱신
+    반환: 처리 행 수, 소요 시간, 초당 처리 행 수
+    """
     if not rows:
-        return
-    
-    async with async_engine.begin() as conn:
-        for row in rows:
-            ts, o, h, l, c, v = row
-            stmt = text("""
-                INSERT INTO candles (market, unit, ts, open, high, low, close, volume) 
-                VALUES (:market, :unit, :ts, :open, :high, :low, :close, :volume)
-                ON CONFLICT(market, unit, ts) DO NOTHING
-            """)
-            await conn.execute(stmt, {
-                "market": market, "unit": unit, "ts": ts,
-                "open": o, "high": h, "low": l, "close": c, "volume": v
-            })
+        return {"rows": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+
+    dialect = async_engine.dialect
+    sql = _candle_upsert_sql(dialect.name, dialect.paramstyle, replace)
+    start = time.perf_counter()
+
+    for offset in range(0, len(rows), batch_size):
+        params = [(market, unit, ts, o, h, l, c, v) for ts, o, h, l, c, v in rows[offset:offset + batch_size]]
+        async with async_engine.begin() as conn:
+            await conn.exec_driver_sql(sql, params)
+
+    elapsed = time.perf_counter() - start
+    rows_per_sec = len(rows) / elapsed if elapsed > 0 else 0.0
+    logger.debug(f"💾 {market} {unit}분봉 {len(rows):,}행 적재 ({elapsed:.2f}초, {rows_per_sec:,.0f}행/초)")
+    return {"rows": len(rows), "seconds": elapsed, "rows_per_sec": rows_per_sec}
 
 async def insert_trading_log(
     market: str,
@@ -323,51 +435,11 @@ async def fetch_orderbook_data(session: aiohttp.ClientSession, market: str):
     raise RuntimeError(f"Upbit orderbook fetch failed after 3 retries (rate limit)")
 
 async def generate_5min_candles_from_1min(market: str):
-    """1분봉에서 5분봉 생성"""
-    async with async_engine.begin() as conn:
-        stmt = text("""
-            INSERT OR IGNORE INTO candles (market, unit, ts, open, high, low, close, volume)
-            SELECT 
-                market,
-                5 as unit,
-                (ts / 300) * 300 as ts_5min,
-                (SELECT open FROM candles c2 WHERE c2.market = c1.market AND c2.unit = 1 
-                 AND c2.ts >= (c1.ts / 300) * 300 AND c2.ts < ((c1.ts / 300) + 1) * 300 
-                 ORDER BY c2.ts LIMIT 1) as open,
-                MAX(high) as high,
-                MIN(low) as low,
-                (SELECT close FROM candles c3 WHERE c3.market = c1.market AND c3.unit = 1 
-                 AND c3.ts >= (c1.ts / 300) * 300 AND c3.ts < ((c1.ts / 300) + 1) * 300 
-                 ORDER BY c3.ts DESC LIMIT 1) as close,
-                SUM(volume) as volume
-            FROM candles c1 
-            WHERE c1.market = :market AND c1.unit = 1
-            GROUP BY c1.market, (c1.ts / 300) * 300
-            HAVING COUNT(*) >= 4  -- 최소 4개 1분봉 필요
-        """)
-        await conn.execute(stmt, {"market": market})
+    """1분봉에서 5분봉 생성 (마지막 완성 구간 이후만 증분 집계)"""
+    from core.services.candle_rollup import candle_rollup
+    return await candle_rollup.update(market, units=[5])
 
 async def generate_15min_candles_from_1min(market: str):
-    """1분봉에서 15분봉 생성"""
-    async with async_engine.begin() as conn:
-        stmt = text("""
-            INSERT OR IGNORE INTO candles (market, unit, ts, open, high, low, close, volume)
-            SELECT 
-                market,
-                15 as unit,
-                (ts / 900) * 900 as ts_15min,
-                (SELECT open FROM candles c2 WHERE c2.market = c1.market AND c2.unit = 1 
-                 AND c2.ts >= (c1.ts / 900) * 900 AND c2.ts < ((c1.ts / 900) + 1) * 900 
-                 ORDER BY c2.ts LIMIT 1) as open,
-                MAX(high) as high,
-                MIN(low) as low,
-                (SELECT close FROM candles c3 WHERE c3.market = c1.market AND c3.unit = 1 
-                 AND c3.ts >= (c1.ts / 900) * 900 AND c3.ts < ((c1.ts / 900) + 1) * 900 
-                 ORDER BY c3.ts DESC LIMIT 1) as close,
-                SUM(volume) as volume
-            FROM candles c1 
-            WHERE c1.market = :market AND c1.unit = 1
-            GROUP BY c1.market, (c1.ts / 900) * 900
-            HAVING COUNT(*) >= 10  -- 최소 10개 1분봉 필요
-        """)
-        await conn.execute(stmt, {"market": market})
\ No newline at end of file
+    """1분봉에서 15분봉 생성 (마지막 완성 구간 이후만 증분 집계)"""
+    from core.services.candle_rollup import candle_rollup
+    return await candle_rollup.update(market, units=[15])
@@ -5,68 +5,185 @@
 - 기존 시스템의 데이터를 읽기 전용으로만 접근합니다.
 - 독립적인 WebSocket 연결로 기존 시스템에 영향을 주지 않습니다.
 - Flutter 앱에 최적화된 실시간 데이터 스트리밍을 제공합니다.
+
+📡 채널 발행/구독 구조:
+- 채널 데이터는 틱마다 한 번만 조회·직렬화하고, 인코딩별 프레임을 모든 구독자가 공유합니다.
+- 연결마다 전송 태스크가 있으며, 밀린 연결은 채널별 최신 프레임만 받습니다 (오래된 프레임은 대체).
+- 인코딩: json(텍스트) / zlib(압축 JSON 바이너리). 전송 계층 permessage-deflate는 서버(uvicorn)가 협상합니다.
 """
 
 import asyncio
 import json
+import time
+import zlib
 import logging
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Dict, List, Set, Optional, Any
+from typing import Any, Callable, Dict, List, Optional, Set, Union
 from fastapi import WebSocket, WebSocketDisconnect
-from contextlib import asynccontextmanager
 
 from .data_adapter import ReadOnlyDataAdapter
 from ..models.mobile_response import MobileWebSocketMessage
 
 logger = logging.getLogger(__name__)
 
+SUPPORTED_ENCODINGS = ("json", "zlib")
+
+class ChannelFrame:
+    """한 틱의 채널 메시지 - 인코딩별 직렬화 결과를 한 번만 만들어 공유"""
+
+    __slots__ = ("channel", "message", "published_at", "_encoded")
+
+    def __init__(self, channel: str, message: Dict[str, Any]):
+        self.channel = channel
+        self.message = message
+        self.published_at = time.perf_counter()
+        self._encoded: Dict[str, Union[str, bytes]] = {}
+
+    def encode(self, encoding: str) -> Union[str, bytes]:
+        frame = self._encoded.get(encoding)
+        if frame is None:
+            text = self._encoded.get("json")
+            if text is None:
+                text = self._encoded["json"] = json.dumps(self.message, ensure_ascii=False, default=str)
+            frame = self._encoded[encoding] = text if encoding == "json" else zlib.compress(text.encode("utf-8"), 6)
+        return frame
+
+
+class MobileConnection:
+    """단일 모바일 연결 - 채널별 최신 프레임 슬롯과 전용 전송 태스크"""
+
+    def __init__(self, websocket: WebSocket, user_id: str, device_id: Optional[str], encoding: str = "json"):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.device_id = device_id
+        self.encoding = encoding if encoding in SUPPORTED_ENCODINGS else "json"
+        self.connected_at = datetime.utcnow()
+        self.last_heartbeat = datetime.utcnow()
+        self.subscribed_channels: Set[str] = set()
+
+        # 채널 프레임은 채널당 최신 1개만 유지 (밀리면 대체), 개별 메시지는 순서대로 전송
+        self.pending: "OrderedDict[str, ChannelFrame]" = OrderedDict()
+        self.direct: deque = deque(maxlen=32)
+        self.wakeup = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+        self.closed = False  # 연결 해제 표시 - 전송 태스크 취소가 wait_for에 묻혀도 루프를 끝냄
+
+        self.frames_sent = 0
+        self.frames_replaced = 0
+        self.bytes_sent = 0
+
+    def enqueue(self, frame: ChannelFrame) -> bool:
+        """채널 프레임 적재 - 아직 보내지 못한 같은 채널 프레임이 있으면 대체 (False 반환)"""
+        replaced = frame.channel in self.pending
+        if replaced:
+            self.frames_replaced += 1
+            del self.pending[frame.channel]
+        self.pending[frame.channel] = frame
+        self.wakeup.set()
+        return not replaced
+
+    def enqueue_direct(self, frame: ChannelFrame):
+        self.direct.append(frame)
+        self.wakeup.set()
+
+
+class ChannelMetrics:
+    """채널별 발행/전송 지표 (전송 지연은 발행 시점부터 소켓 전송 완료까지)"""
+
+    def __init__(self, window: int = 500):
+        self.published = 0
+        self.delivered = 0
+        self.replaced = 0
+        self.failed = 0
+        self.build_ms = 0.0
+        self.bytes = {encoding: 0 for encoding in SUPPORTED_ENCODINGS}
+        self._latencies: deque = deque(maxlen=window)
+
+    def record_send(self, latency_ms: float):
+        self.delivered += 1
+        self._latencies.append(latency_ms)
+
+    def snapshot(self, subscribers: int) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 3) if latencies else 0.0
+
+        return {
+            "subscribers": subscribers,
+            "published": self.published,
+            "delivered": self.delivered,
+            "replaced": self.replaced,
+            "failed": self.failed,
+            "last_build_ms": round(self.build_ms, 3),
+            "frame_bytes": dict(self.bytes),
+            "send_latency_ms": {
+                "avg": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": round(latencies[-1], 3) if latencies else 0.0
+            }
+        }
+
+
 class MobileWebSocketManager:
-    """모바일용 WebSocket 연결 관리자"""
-    
+    """모바일용 WebSocket 연결 관리자 (채널 발행/구독)"""
+
     def __init__(self):
         # WebSocket 연결 관리
-        self.connections: Dict[str, Dict[str, Any]] = {}  # user_id -> connection_info
+        self.connections: Dict[str, MobileConnection] = {}  # user_id -> connection
         self.channels: Dict[str, Set[str]] = {}  # channel -> user_ids
-        
+
         # 데이터 어댑터
         self.data_adapter = ReadOnlyDataAdapter()
-        
+
         # 서비스 상태
         self.is_running = False
         self.broadcast_tasks: Dict[str, asyncio.Task] = {}
-        
+
         # 설정
         self.heartbeat_interval = 30  # 30초마다 heartbeat
         self.data_update_interval = 5  # 5초마다 데이터 업데이트
-        
+        self.send_timeout = 10.0  # 단일 프레임 전송 제한 시간 (초과 시 연결 정리)
+
+        # 채널 발행자 (채널 → 데이터 생성 함수) 및 지표
+        self.publishers: Dict[str, Callable[[], Dict[str, Any]]] = {
+            "trading_status": self._build_trading_status,
+            "portfolio_update": self._build_portfolio_update
+        }
+        self.metrics: Dict[str, ChannelMetrics] = {}
+        self._last_frames: Dict[str, ChannelFrame] = {}  # 채널별 마지막 발행 프레임 (신규 구독자 초기 상태)
+        self._sequence = 0
+
         logger.info("📱 모바일 WebSocket 매니저 초기화")
-    
+
     async def start(self):
         """WebSocket 매니저 시작"""
         if self.is_running:
             logger.warning("⚠️ WebSocket 매니저가 이미 실행 중입니다")
             return
-        
+
         self.is_running = True
-        
-        # 브로드캐스트 태스크 시작
+
+        # 브로드캐스트 태스크 시작 (채널마다 하나의 발행 루프)
         self.broadcast_tasks["heartbeat"] = asyncio.create_task(self._heartbeat_loop())
-        self.broadcast_tasks["trading_status"] = asyncio.create_task(self._trading_status_loop())
-        self.broadcast_tasks["portfolio_update"] = asyncio.create_task(self._portfolio_update_loop())
-        
+        for channel in self.publishers:
+            self.broadcast_tasks[channel] = asyncio.create_task(self._publish_loop(channel))
+
         logger.info("✅ 모바일 WebSocket 매니저 시작 완료")
-    
+
     async def stop(self):
         """WebSocket 매니저 정지"""
         if not self.is_running:
             return
-        
+
         self.is_running = False
-        
+
         # 모든 연결 종료
         for user_id in list(self.connections.keys()):
             await self.disconnect_user(user_id)
-        
+
         # 브로드캐스트 태스크 정리
         for task_name, task in self.broadcast_tasks.items():
             task.cancel()
@@ -75,26 +192,394 @@ async def stop(self):
             except asyncio.CancelledError:
                 pass
             logger.info(f"🛑 브로드캐스트 태스크 정리: {task_name}")
-        
+
         self.broadcast_tasks.clear()
         logger.info("✅ 모바일 WebSocket 매니저 정지 완료")
-    
-    async def connect_user(self, websocket: WebSocket, user_id: str, device_id: str = None):
+
+    async def connect_user(self, websocket: WebSocket, user_id: str, device_id: str = None, encoding: str = "json"):
         """사용자 WebSocket 연결"""
         try:
             await websocket.accept()
-            
+
             # 기존 연결이 있다면 종료
             if user_id in self.connections:
                 await self.disconnect_user(user_id)
-            
-            # 새 연결 등록
-            self.connections[user_id] = {
-                "websocket": websocket,
-                "device_id": device_id,
-                "connected_at": datetime.utcnow(),
-                "last_heartbeat": datetime.utcnow(),
-                "subscribed_channels": set()
+
+            # 새 연결 등록 및 전송 태스크 시작
+            connection = MobileConnection(websocket, user_id, device_id, encoding)
+            connection.writer = asyncio.create_task(self._writer_loop(connection))
+            self.connections[user_id] = connection
+
+            logger.info(f"📱 사용자 연결: {user_id} ({device_id}, {connection.encoding})")
+
+            # 환영 메시지 전송
+            await self.send_to_user(user_id, {
+                "type": "welcome",
+                "channel": "system",
+                "data": {
+                    "message": "모바일 WebSocket 연결 성공",
+                    "user_id": user_id,
+                    "encoding": connection.encoding,
+                    "channels": list(self.publishers),
+                    "server_time": datetime.utcnow().isoformat()
+                }
+            })
+
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ 사용자 연결 실패 {user_id}: {e}")
+            return False
+
+    async def disconnect_user(self, user_id: str):
+        """사용자 WebSocket 연결 해제"""
+        connection = self.connections.pop(user_id, None)
+        if connection is None:
+            return
+
+        try:
+            # 구독 채널에서 제거
+            for channel in connection.subscribed_channels:
+                if channel in self.channels:
+                    self.channels[channel].discard(user_id)
+
+            # 전송 태스크 정리 (전송 태스크 자신이 호출한 경우 제외)
+            connection.closed = True
+            connection.wakeup.set()
+            if connection.writer is not None and connection.writer is not asyncio.current_task():
+                connection.writer.cancel()
+
+            # WebSocket 연결 종료
+            try:
+                await connection.websocket.close()
+            except Exception:
+                pass
+
+            logger.info(f"📱 사용자 연결 해제: {user_id}")
+
+        except Exception as e:
+            logger.error(f"❌ 사용자 연결 해제 실패 {user_id}: {e}")
+
+    async def subscribe_channel(self, user_id: str, channel: str):
+        """채널 구독 - 발행 데이터가 있는 채널이면 현재 상태를 바로 전송"""
+        if user_id not in self.connections:
+            return False
+
+        # 채널이 없으면 생성
+        if channel not in self.channels:
+            self.channels[channel] = set()
+
+        # 사용자를 채널에 추가
+        self.channels[channel].add(user_id)
+        self.connections[user_id].subscribed_channels.add(channel)
+
+        if channel in self.publishers:
+            # 마지막 발행 프레임은 한 발행 주기 안일 때만 재사용 (구독자가 없던 동안은 갱신되지 않음)
+            frame = self._last_frames.get(channel)
+            if frame is None or time.perf_counter() - frame.published_at >= self.data_update_interval:
+                frame = self._build_frame(channel)
+            if frame is not None:
+                self.connections[user_id].enqueue(frame)
+
+        logger.info(f"📡 채널 구독: {user_id} -> {channel}")
+        return True
+
+    async def unsubscribe_channel(self, user_id: str, channel: str):
+        """채널 구독 해제"""
+        if user_id not in self.connections:
+            return False
+
+        # 채널에서 사용자 제거
+        if channel in self.channels:
+            self.channels[channel].discard(user_id)
+
+        # 사용자 구독 목록에서 제거 (아직 보내지 않은 채널 프레임도 제거)
+        connection = self.connections[user_id]
+        connection.subscribed_channels.discard(channel)
+        connection.pending.pop(channel, None)
+
+        logger.info(f"📡 채널 구독 해제: {user_id} -> {channel}")
+        return True
+
+    # ----- 발행 -----
+
+    def _message(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """메시지 모델 검증 후 직렬화용 dict 생성"""
+        self._sequence += 1
+        message = {"timestamp": datetime.utcnow().isoformat(), **data, "sequence": self._sequence}
+        return MobileWebSocketMessage(**message).dict()
+
+    async def send_to_user(self, user_id: str, data: Dict[str, Any]):
+        """특정 사용자에게 메시지 전송 (전송 태스크 큐에 적재)"""
+        connection = self.connections.get(user_id)
+        if connection is None:
+            return False
+
+        try:
+            connection.enqueue_direct(ChannelFrame(data.get("channel", "system"), self._message(data)))
+            return True
+        except Exception as e:
+            logger.error(f"❌ 메시지 전송 실패 {user_id}: {e}")
+            return False
+
+    def publish(self, channel: str, data: Dict[str, Any]) -> int:
+        """채널 메시지 발행 - 한 번 직렬화한 프레임을 구독자 전송 큐에 적재 (대기 없이 반환)"""
+        subscribers = self.channels.get(channel)
+        if not subscribers:
+            return 0
+
+        frame = self._last_frames[channel] = ChannelFrame(channel, self._message(data))
+        metrics = self.metrics.setdefault(channel, ChannelMetrics())
+        metrics.published += 1
+
+        connections = []
+        for user_id in list(subscribers):
+            connection = self.connections.get(user_id)
+            if connection is None:
+                subscribers.discard(user_id)
+            else:
+                connections.append(connection)
+
+        # 구독자가 사용하는 인코딩별로 한 번씩만 직렬화
+        for encoding in {connection.encoding for connection in connections}:
+            metrics.bytes[encoding] = len(frame.encode(encoding))
+
+        queued = 0
+        for connection in connections:
+            if connection.enqueue(frame):
+                queued += 1
+            else:
+                metrics.replaced += 1
+        return queued
+
+    async def broadcast_to_channel(self, channel: str, data: Dict[str, Any]):
+        """채널의 모든 사용자에게 브로드캐스트"""
+        return self.publish(channel, data)
+
+    def _build_frame(self, channel: str) -> Optional[ChannelFrame]:
+        """채널 현재 상태로 단일 프레임 생성 (신규 구독자 초기 상태용)"""
+        try:
+            frame = self._last_frames[channel] = ChannelFrame(channel, self._message(self.publishers[channel]()))
+            return frame
+        except Exception as e:
+            logger.error(f"❌ 채널 데이터 생성 실패 {channel}: {e}")
+            return None
+
+    async def _writer_loop(self, connection: MobileConnection):
+        """연결별 전송 루프 - 대기 중인 개별 메시지와 채널 최신 프레임을 순서대로 전송"""
+        websocket = connection.websocket
+        try:
+            while not connection.closed:
+                await connection.wakeup.wait()
+                connection.wakeup.clear()
+
+                while not connection.closed and (connection.direct or connection.pending):
+                    if connection.direct:
+                        frame = connection.direct.popleft()
+                    else:
+                        _, frame = connection.pending.popitem(last=False)
+
+                    payload = frame.encode(connection.encoding)
+                    if isinstance(payload, bytes):
+                        await asyncio.wait_for(websocket.send_bytes(payload), timeout=self.send_timeout)
+                    else:
+                        await asyncio.wait_for(websocket.send_text(payload), timeout=self.send_timeout)
+
+                    connection.frames_sent += 1
+                    connection.bytes_sent += len(payload)
+                    metrics = self.metrics.get(frame.channel)
+                    if metrics is not None:
+                        metrics.record_send((time.perf_counter() - frame.published_at) * 1000)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            for channel in connection.subscribed_channels:
+                if channel in self.metrics:
+                    self.metrics[channel].failed += 1
+            logger.info(f"📱 전송 실패로 연결 정리 {connection.user_id}: {type(e).__name__}")
+            if self.connections.get(connection.user_id) is connection:
+                await self.disconnect_user(connection.user_id)
+
+    async def handle_connection(self, websocket: WebSocket, user_id: str, device_id: str = None, encoding: str = "json"):
+        """WebSocket 연결 처리 (FastAPI 라우터에서 사용)"""
+        # 사용자 연결
+        if not await self.connect_user(websocket, user_id, device_id, encoding):
+            return
+
+        connection = self.connections[user_id]
+        try:
+            while self.is_running and self.connections.get(user_id) is connection:
+                try:
+                    # 클라이언트 메시지 수신 (타임아웃 설정)
+                    message = await asyncio.wait_for(
+                        websocket.receive_text(),
+                        timeout=60.0
+                    )
+
+                    # 메시지 처리
+                    await self._handle_client_message(user_id, message)
+
+                except asyncio.TimeoutError:
+                    # 타임아웃 시 heartbeat 전송
+                    await self.send_to_user(user_id, {
+                        "type": "heartbeat",
+                        "channel": "system",
+                        "data": {"timestamp": datetime.utcnow().isoformat()}
+                    })
+
+                except WebSocketDisconnect:
+                    logger.info(f"📱 클라이언트 연결 해제: {user_id}")
+                    break
+
+        except Exception as e:
+            logger.error(f"❌ WebSocket 연결 처리 오류 {user_id}: {e}")
+
+        finally:
+            if self.connections.get(user_id) is connection:
+                await self.disconnect_user(user_id)
+
+    async def _handle_client_message(self, user_id: str, message: str):
+        """클라이언트 메시지 처리"""
+        try:
+            data = json.loads(message)
+            msg_type = data.get("type")
+
+            if msg_type == "subscribe":
+                channel = data.get("channel")
+                if channel:
+                    await self.subscribe_channel(user_id, channel)
+
+            elif msg_type == "unsubscribe":
+                channel = data.get("channel")
+                if channel:
+                    await self.unsubscribe_channel(user_id, channel)
+
+            elif msg_type == "encoding":
+                encoding = data.get("encoding")
+                if encoding in SUPPORTED_ENCODINGS and user_id in self.connections:
+                    self.connections[user_id].encoding = encoding
+
+            elif msg_type == "ping":
+                await self.send_to_user(user_id, {
+                    "type": "pong",
+                    "channel": "system",
+                    "data": {"timestamp": datetime.utcnow().isoformat()}
+                })
+
+            elif msg_type == "heartbeat":
+                self.connections[user_id].last_heartbeat = datetime.utcnow()
+
+            else:
+                logger.warning(f"⚠️ 알 수 없는 메시지 타입: {msg_type}")
+
+        except json.JSONDecodeError:
+            logger.error(f"❌ 잘못된 JSON 메시지: {user_id}")
+        except Exception as e:
+            logger.error(f"❌ 클라이언트 메시지 처리 오류: {e}")
+
+    async def _heartbeat_loop(self):
+        """주기적 heartbeat 브로드캐스트"""
+        while self.is_running:
+            try:
+                await asyncio.sleep(self.heartbeat_interval)
+
+                if not self.connections:
+                    continue
+
+                # 모든 연결된 사용자에게 같은 heartbeat 프레임 전송
+                frame = ChannelFrame("system", self._message({
+                    "type": "heartbeat",
+                    "channel": "system",
+                    "data": {
+                        "timestamp": datetime.utcnow().isoformat(),
+                        "active_connections": len(self.connections)
+                    }
+                }))
+                for connection in list(self.connections.values()):
+                    connection.enqueue_direct(frame)
+
+                logger.debug(f"💓 Heartbeat 전송: {len(self.connections)}명")
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Heartbeat 루프 오류: {e}")
+
+    async def _publish_loop(self, channel: str):
+        """채널 발행 루프 - 구독자가 있을 때만 틱마다 데이터를 한 번 생성하여 발행"""
+        while self.is_running:
+            try:
+                await asyncio.sleep(self.data_update_interval)
+
+                if not self.channels.get(channel):
+                    continue
+
+                # 기존 시스템에서 데이터 조회 (읽기 전용) - 구독자 수와 무관하게 한 번
+                build_start = time.perf_counter()
+                broadcast_data = self.publishers[channel]()
+                self.metrics.setdefault(channel, ChannelMetrics()).build_ms = (time.perf_counter() - build_start) * 1000
+
+                queued = self.publish(channel, broadcast_data)
+                logger.debug(f"📊 {channel} 브로드캐스트: {queued}명")
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ {channel} 발행 루프 오류: {e}")
+
+    def _build_trading_status(self) -> Dict[str, Any]:
+        """거래 상태 채널 데이터"""
+        return {
+            "type": "data",
+            "channel": "trading_status",
+            "data": {
+                "trading_status": self.data_adapter.get_trading_state(),
+                "positions": self.data_adapter.get_current_positions(),
+                "timestamp": datetime.utcnow().isoformat()
             }
-            
-            logger.info(f"📱 사용자 연결: {user_id} ({device_id})")\n            \n            # 환영 메시지 전송\n            await self.send_to_user(user_id, {\n                "type": "welcome",\n                "channel": "system",\n                "data": {\n                    "message": "모바일 WebSocket 연결 성공",\n                    "user_id": user_id,\n                    "server_time": datetime.utcnow().isoformat()\n                }\n            })\n            \n            return True\n            \n        except Exception as e:\n            logger.error(f"❌ 사용자 연결 실패 {user_id}: {e}")\n            return False\n    \n    async def disconnect_user(self, user_id: str):\n        """사용자 WebSocket 연결 해제"""\n        if user_id not in self.connections:\n            return\n        \n        try:\n            connection_info = self.connections[user_id]\n            websocket = connection_info["websocket"]\n            \n            # 구독 채널에서 제거\n            for channel in connection_info["subscribed_channels"]:\n                if channel in self.channels and user_id in self.channels[channel]:\n                    self.channels[channel].remove(user_id)\n            \n            # WebSocket 연결 종료\n            try:\n                await websocket.close()\n            except:\n                pass\n            \n            # 연결 정보 제거\n            del self.connections[user_id]\n            \n            logger.info(f"📱 사용자 연결 해제: {user_id}")\n            \n        except Exception as e:\n            logger.error(f"❌ 사용자 연결 해제 실패 {user_id}: {e}")\n    \n    async def subscribe_channel(self, user_id: str, channel: str):\n        """채널 구독"""\n        if user_id not in self.connections:\n            return False\n        \n        # 채널이 없으면 생성\n        if channel not in self.channels:\n            self.channels[channel] = set()\n        \n        # 사용자를 채널에 추가\n        self.channels[channel].add(user_id)\n        self.connections[user_id]["subscribed_channels"].add(channel)\n        \n        logger.info(f"📡 채널 구독: {user_id} -> {channel}")\n        return True\n    \n    async def unsubscribe_channel(self, user_id: str, channel: str):\n        """채널 구독 해제"""\n        if user_id not in self.connections:\n            return False\n        \n        # 채널에서 사용자 제거\n        if channel in self.channels and user_id in self.channels[channel]:\n            self.channels[channel].remove(user_id)\n        \n        # 사용자 구독 목록에서 제거\n        if channel in self.connections[user_id]["subscribed_channels"]:\n            self.connections[user_id]["subscribed_channels"].remove(channel)\n        \n        logger.info(f"📡 채널 구독 해제: {user_id} -> {channel}")\n        return True\n    \n    async def send_to_user(self, user_id: str, data: Dict[str, Any]):\n        """특정 사용자에게 메시지 전송"""\n        if user_id not in self.connections:\n            return False\n        \n        try:\n            websocket = self.connections[user_id]["websocket"]\n            message = MobileWebSocketMessage(**data)\n            \n            await websocket.send_text(json.dumps(message.dict()))\n            return True\n            \n        except WebSocketDisconnect:\n            await self.disconnect_user(user_id)\n            return False\n        except Exception as e:\n            logger.error(f"❌ 메시지 전송 실패 {user_id}: {e}")\n            await self.disconnect_user(user_id)\n            return False\n    \n    async def broadcast_to_channel(self, channel: str, data: Dict[str, Any]):\n        """채널의 모든 사용자에게 브로드캐스트"""\n        if channel not in self.channels:\n            return 0\n        \n        success_count = 0\n        failed_users = []\n        \n        for user_id in list(self.channels[channel]):\n            if await self.send_to_user(user_id, data):\n                success_count += 1\n            else:\n                failed_users.append(user_id)\n        \n        # 실패한 사용자들 정리\n        for user_id in failed_users:\n            if channel in self.channels:\n                self.channels[channel].discard(user_id)\n        \n        return success_count\n    \n    async def handle_connection(self, websocket: WebSocket, user_id: str, device_id: str = None):\n        """WebSocket 연결 처리 (FastAPI 라우터에서 사용)"""\n        # 사용자 연결\n        if not await self.connect_user(websocket, user_id, device_id):\n            return\n        \n        try:\n            while self.is_running:\n                try:\n                    # 클라이언트 메시지 수신 (타임아웃 설정)\n                    message = await asyncio.wait_for(\n                        websocket.receive_text(),\n                        timeout=60.0\n                    )\n                    \n                    # 메시지 처리\n                    await self._handle_client_message(user_id, message)\n                    \n                except asyncio.TimeoutError:\n                    # 타임아웃 시 heartbeat 전송\n                    await self.send_to_user(user_id, {\n                        "type": "heartbeat",\n                        "channel": "system",\n                        "data": {"timestamp": datetime.utcnow().isoformat()}\n                    })\n                    \n                except WebSocketDisconnect:\n                    logger.info(f"📱 클라이언트 연결 해제: {user_id}")\n                    break\n                    \n        except Exception as e:\n            logger.error(f"❌ WebSocket 연결 처리 오류 {user_id}: {e}")\n        \n        finally:\n            await self.disconnect_user(user_id)\n    \n    async def _handle_client_message(self, user_id: str, message: str):\n        """클라이언트 메시지 처리"""\n        try:\n            data = json.loads(message)\n            msg_type = data.get("type")\n            \n            if msg_type == "subscribe":\n                channel = data.get("channel")\n                if channel:\n                    await self.subscribe_channel(user_id, channel)\n                    \n            elif msg_type == "unsubscribe":\n                channel = data.get("channel")\n                if channel:\n                    await self.unsubscribe_channel(user_id, channel)\n                    \n            elif msg_type == "ping":\n                await self.send_to_user(user_id, {\n                    "type": "pong",\n                    "channel": "system",\n                    "data": {"timestamp": datetime.utcnow().isoformat()}\n                })\n                \n            elif msg_type == "heartbeat":\n                self.connections[user_id]["last_heartbeat"] = datetime.utcnow()\n                \n            else:\n                logger.warning(f"⚠️ 알 수 없는 메시지 타입: {msg_type}")\n                \n        except json.JSONDecodeError:\n            logger.error(f"❌ 잘못된 JSON 메시지: {user_id}")\n        except Exception as e:\n            logger.error(f"❌ 클라이언트 메시지 처리 오류: {e}")\n    \n    async def _heartbeat_loop(self):\n        """주기적 heartbeat 브로드캐스트"""\n        while self.is_running:\n            try:\n                await asyncio.sleep(self.heartbeat_interval)\n                \n                if not self.connections:\n                    continue\n                \n                # 모든 연결된 사용자에게 heartbeat 전송\n                heartbeat_data = {\n                    "type": "heartbeat",\n                    "channel": "system",\n                    "data": {\n                        "timestamp": datetime.utcnow().isoformat(),\n                        "active_connections": len(self.connections)\n                    }\n                }\n                \n                for user_id in list(self.connections.keys()):\n                    await self.send_to_user(user_id, heartbeat_data)\n                \n                logger.debug(f"💓 Heartbeat 전송: {len(self.connections)}명")\n                \n            except asyncio.CancelledError:\n                break\n            except Exception as e:\n                logger.error(f"❌ Heartbeat 루프 오류: {e}")\n    \n    async def _trading_status_loop(self):\n        """거래 상태 실시간 브로드캐스트"""\n        while self.is_running:\n            try:\n                await asyncio.sleep(self.data_update_interval)\n                \n                if "trading_status" not in self.channels or not self.channels["trading_status"]:\n                    continue\n                \n                # 기존 시스템에서 거래 상태 조회 (읽기 전용)\n                trading_data = self.data_adapter.get_trading_state()\n                positions_data = self.data_adapter.get_current_positions()\n                \n                broadcast_data = {\n                    "type": "data",\n                    "channel": "trading_status",\n                    "data": {\n                        "trading_status": trading_data,\n                        "positions": positions_data,\n                        "timestamp": datetime.utcnow().isoformat()\n                    }\n                }\n                \n                sent_count = await self.broadcast_to_channel("trading_status", broadcast_data)\n                logger.debug(f"📊 거래 상태 브로드캐스트: {sent_count}명")\n                \n            except asyncio.CancelledError:\n                break\n            except Exception as e:\n                logger.error(f"❌ 거래 상태 루프 오류: {e}")\n    \n    async def _portfolio_update_loop(self):\n        """포트폴리오 실시간 업데이트 브로드캐스트"""\n        while self.is_running:\n            try:\n                await asyncio.sleep(self.data_update_interval)\n                \n                if "portfolio_update" not in self.channels or not self.channels["portfolio_update"]:\n                    continue\n                \n                # 기존 시스템에서 포트폴리오 데이터 조회 (읽기 전용)\n                portfolio_data = self.data_adapter.get_portfolio_summary()\n                \n                broadcast_data = {\n                    "type": "data",\n                    "channel": "portfolio_update",\n                    "data": {\n                        "portfolio": portfolio_data,\n                        "timestamp": datetime.utcnow().isoformat()\n                    }\n                }\n                \n                sent_count = await self.broadcast_to_channel("portfolio_update", broadcast_data)\n                logger.debug(f"💼 포트폴리오 브로드캐스트: {sent_count}명")\n                \n            except asyncio.CancelledError:\n                break\n            except Exception as e:\n                logger.error(f"❌ 포트폴리오 루프 오류: {e}")\n    \n    def get_connection_count(self) -> int:\n        """현재 연결 수 반환"""\n        return len(self.connections)\n    \n    def get_channel_stats(self) -> Dict[str, int]:\n        """채널별 구독자 수 통계"""\n        return {channel: len(users) for channel, users in self.channels.items()}\n    \n    def get_user_info(self, user_id: str) -> Optional[Dict[str, Any]]:\n        """사용자 연결 정보 조회"""\n        if user_id not in self.connections:\n            return None\n        \n        conn_info = self.connections[user_id]\n        return {\n            "user_id": user_id,\n            "device_id": conn_info.get("device_id"),\n            "connected_at": conn_info["connected_at"].isoformat(),\n            "last_heartbeat": conn_info["last_heartbeat"].isoformat(),\n            "subscribed_channels": list(conn_info["subscribed_channels"])\n        }
\ No newline at end of file
+        }
+
+    def _build_portfolio_update(self) -> Dict[str, Any]:
+        """포트폴리오 채널 데이터"""
+        return {
+            "type": "data",
+            "channel": "portfolio_update",
+            "data": {
+                "portfolio": self.data_adapter.get_portfolio_summary(),
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        }
+
+    def get_connection_count(self) -> int:
+        """현재 연결 수 반환"""
+        return len(self.connections)
+
+    def get_channel_stats(self) -> Dict[str, int]:
+        """채널별 구독자 수 통계"""
+        return {channel: len(users) for channel, users in self.channels.items()}
+
+    def get_channel_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """채널별 발행/전송 지연 지표"""
+        return {
+            channel: metrics.snapshot(len(self.channels.get(channel, ())))
+            for channel, metrics in self.metrics.items()
+        }
+
+    def get_user_info(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """사용자 연결 정보 조회"""
+        connection = self.connections.get(user_id)
+        if connection is None:
+            return None
+
+        return {
+            "user_id": user_id,
+            "device_id": connection.device_id,
+            "encoding": connection.encoding,
+            "connected_at": connection.connected_at.isoformat(),
+            "last_heartbeat": connection.last_heartbeat.isoformat(),
+            "subscribed_channels": list(connection.subscribed_channels),
+            "frames_sent": connection.frames_sent,
+            "frames_replaced": connection.frames_replaced,
+            "bytes_sent": connection.bytes_sent,
+            "pending_frames": len(connection.pending) + len(connection.direct)
+        }
@@ -189,7 +189,8 @@ async def health_check():
         websocket_status = {
             "healthy": websocket_manager.is_running,
             "status": "active" if websocket_manager.is_running else "inactive",
-            "connections": websocket_manager.get_connection_count()
+            "connections": websocket_manager.get_connection_count(),
+            "channels": websocket_manager.get_channel_metrics()
         }
         
         # 기존 시스템 연결 확인
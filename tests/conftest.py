@@ -0,0 +1,10 @@
+"""테스트 공통 설정 - 저장소 루트를 import 경로에 넣고 임시 SQLite DB 사용 (database import 전에 설정)"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["DB_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='teamprime-test-')}/candles.db"
@@ -0,0 +1,132 @@
+"""API 매니저 - 우선순위 순서, 실행 중 조회 병합, 캐시 상한/복사본 반환, 워커 중지 시 실패 처리 테스트"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from core.utils.api_manager import APIPriority, UpbitAPIManager
+
+class FakeClient:
+    """호출 기록용 클라이언트 - gate가 닫혀 있으면 호출이 완료되지 않음"""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def fetch(self, name: str):
+        self.calls.append(name)
+        await self.gate.wait()
+        return {"name": name}
+
+    async def get_ticker(self, market: str):
+        self.calls.append(market)
+        await self.gate.wait()
+        return [{"market": market, "trade_price": 100.0}]
+
+
+async def _until(condition):
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("조건 미충족")
+
+
+@pytest_asyncio.fixture
+async def manager():
+    manager = UpbitAPIManager(max_concurrency=1)
+    yield manager
+    await manager.stop_worker()
+
+
+@pytest.mark.asyncio
+async def test_queued_calls_run_by_priority(manager):
+    client = FakeClient()
+    client.gate.clear()
+    blocker = asyncio.create_task(manager.safe_api_call(client, "fetch", "blocker"))
+    await _until(lambda: client.calls == ["blocker"])
+
+    # 워커가 막혀 있는 동안 도착 순서와 반대로 우선순위가 높은 호출이 대기
+    order = [("sync", APIPriority.ACCOUNT_SYNC), ("signal", APIPriority.SIGNAL_ANALYSIS),
+             ("position", APIPriority.POSITION_MONITORING), ("signal2", APIPriority.SIGNAL_ANALYSIS)]
+    tasks = [asyncio.create_task(manager.safe_api_call(client, "fetch", name, priority=priority))
+             for name, priority in order]
+    await _until(lambda: len(manager._queue) == 4)
+    assert manager.get_metrics()["queue_depth_by_priority"]["SIGNAL_ANALYSIS"] == 2
+
+    # 주문은 큐를 거치지 않고 바로 실행
+    client.gate.set()
+    assert await manager.safe_api_call(client, "fetch", "order", priority=APIPriority.TRADING_ORDERS) == {"name": "order"}
+    await asyncio.gather(blocker, *tasks)
+
+    assert [name for name in client.calls if name != "order"] == ["blocker", "position", "signal", "signal2", "sync"]
+    assert manager.stats["direct_orders"] == 1 and manager.stats["executed"] == 5
+
+
+@pytest.mark.asyncio
+async def test_coalescing_cache_and_copies(manager):
+    client = FakeClient()
+    client.gate.clear()
+    first = asyncio.create_task(manager.safe_api_call(client, "get_ticker", "KRW-BTC"))
+    second = asyncio.create_task(manager.safe_api_call(client, "get_ticker", "KRW-BTC"))
+    await _until(lambda: manager.stats["coalesced"] == 1)
+    client.gate.set()
+    results = await asyncio.gather(first, second)
+
+    # 실행은 한 번, 결과는 호출자마다 별도 복사본
+    assert client.calls == ["KRW-BTC"]
+    assert results[0] == results[1] and results[0] is not results[1]
+    results[0][0]["trade_price"] = -1.0
+
+    # TTL 안의 재조회는 캐시에서 - 앞선 호출자의 수정이 캐시에 반영되지 않음
+    cached = await manager.safe_api_call(client, "get_ticker", "KRW-BTC")
+    assert cached == [{"market": "KRW-BTC", "trade_price": 100.0}]
+    assert client.calls == ["KRW-BTC"] and manager.stats["cache_hits"] == 1
+
+    # 캐시하지 않는 메서드는 매번 실행
+    await manager.safe_api_call(client, "fetch", "a")
+    await manager.safe_api_call(client, "fetch", "a")
+    assert client.calls.count("a") == 2 and manager.get_metrics()["cache_entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_capped_oldest_first(manager):
+    manager.CACHE_MAX_ENTRIES = 3
+    client = FakeClient()
+    for market in ("A", "B", "C"):
+        await manager.safe_api_call(client, "get_ticker", market)
+    await manager.safe_api_call(client, "get_ticker", "A")   # 캐시 적중 → 최근 사용으로 이동
+    await manager.safe_api_call(client, "get_ticker", "D")   # 상한 초과 → 가장 오래된 B 제거
+
+    assert len(manager._cache) == 3
+    assert [key[2] for key in manager._cache] == [repr(("C",)), repr(("A",)), repr(("D",))]
+    await manager.safe_api_call(client, "get_ticker", "B")
+    assert client.calls == ["A", "B", "C", "D", "B"]
+
+
+@pytest.mark.asyncio
+async def test_stop_worker_fails_running_and_queued_calls(manager):
+    client = FakeClient()
+    client.gate.clear()
+    owner = object()
+    await manager.start_worker(owner)
+    running = asyncio.create_task(manager.safe_api_call(client, "fetch", "running"))
+    queued = asyncio.create_task(manager.safe_api_call(client, "fetch", "queued"))
+    await _until(lambda: client.calls == ["running"] and len(manager._queue) == 1)
+
+    # 워커를 사용 중인 엔진이 남아 있으면 중지하지 않음
+    await manager.stop_worker()
+    assert manager.get_metrics()["workers"] == 1
+
+    await manager.stop_worker(owner)
+    for task in (running, queued):
+        with pytest.raises(RuntimeError, match="API worker stopped"):
+            await task
+    assert client.calls == ["running"]
+    assert manager._inflight == {} and manager._queue == []
+
+    # 중지 후 새 호출은 워커를 다시 띄워 정상 처리
+    client.gate.set()
+    assert await manager.safe_api_call(client, "fetch", "again") == {"name": "again"}
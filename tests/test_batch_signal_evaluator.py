@@ -0,0 +1,86 @@
+"""배치 신호 평가기 - 시드 고정 랜덤 캔들에서 SignalAnalyzer 스칼라 경로와의 결과 일치 테스트 (지표 엔진 유무 모두)"""
+
+import random
+
+import pytest
+
+from core.services.batch_signal_evaluator import BatchSignalEvaluator, CandleBatch
+from core.services.indicator_engine import MarketIndicators
+from core.services.signal_analyzer import signal_analyzer
+
+PARAMS = {"volume_mult": 1.5, "price_change": 0.3, "candle_pos": 0.6, "mtfa_threshold": 0.6}
+HISTORY = 40   # 지표 엔진 준비용 이력 (평가 윈도우는 마지막 20개)
+
+def _random_candles(rng: random.Random, base: float, hot: bool):
+    """랜덤 워크 1분봉 - hot이면 마지막 구간에 거래량 급증과 상승 캔들을 넣어 신호 후보로 만듦"""
+    candles, close = [], base
+    for j in range(HISTORY):
+        open_ = close
+        step = rng.gauss(0, 0.003)
+        volume = rng.lognormvariate(3, 0.5)
+        if hot and j >= HISTORY - 5:
+            step = abs(step) + rng.uniform(0.001, 0.004)
+        if hot and j >= HISTORY - 3:
+            volume *= rng.uniform(2, 6)
+        close = open_ * (1 + step)
+        high = max(open_, close) * (1 + rng.uniform(0, 0.002 if not hot else 0.0005))
+        low = min(open_, close) * (1 - rng.uniform(0, 0.002))
+        candles.append({"timestamp": j * 60, "open": open_, "high": high, "low": low, "close": close, "volume": volume})
+    return candles
+
+
+def _market_set(seed: int, count: int = 60):
+    rng = random.Random(seed)
+    histories = {f"KRW-C{i:02d}": _random_candles(rng, 100.0 * (i + 1), hot=i % 3 == 0) for i in range(count)}
+    # 0 가격이 섞인 마켓은 스칼라 경로로 평가되어야 함
+    histories["KRW-BAD"] = _random_candles(rng, 50.0, hot=True)
+    histories["KRW-BAD"][-7]["close"] = 0.0
+
+    thresholds = {market: rng.choice([0.5, 0.6, 0.7]) for market in histories}
+    confidences = {market: rng.choice([None, rng.random(), 0.9]) for market in histories}
+    return histories, thresholds, confidences
+
+
+@pytest.mark.parametrize("use_engine", [False, True], ids=["window", "engine"])
+@pytest.mark.parametrize("seed", [7, 2024])
+def test_batch_matches_scalar_pipeline(seed, use_engine):
+    histories, thresholds, confidences = _market_set(seed)
+    windows = {market: candles[-20:] for market, candles in histories.items()}
+    indicators = {}
+    if use_engine:
+        for market, candles in histories.items():
+            state = indicators[market] = MarketIndicators(market)
+            for candle in candles:
+                state.update(candle)
+
+    batch = CandleBatch.from_candle_windows(windows)
+    results = BatchSignalEvaluator().evaluate(batch, PARAMS, thresholds, indicators, confidences)
+    assert set(results) == set(windows)
+
+    buys = 0
+    for market, window in windows.items():
+        result = results[market]
+        state = indicators.get(market)
+        params = {**PARAMS, "mtfa_threshold": thresholds[market]}
+        signal = signal_analyzer.evaluate_buy_signal(market, window, params, indicators=state,
+                                                     mtfa_confidence=confidences[market])
+        assert result["should_buy"] == bool(signal), market
+        if signal:
+            buys += 1
+            assert result["signal_strength"] == signal["signal_strength"]
+            assert result["technical_score"] == signal["technical_score"]
+            assert result["candle_score"] == signal["candle_score"]
+        if market == "KRW-BAD":
+            continue
+
+        # 탈락한 마켓도 단계별 값이 스칼라 구현과 일치
+        assert result["indicator_source"] == ("engine" if use_engine else "window")
+        volume_signal = signal_analyzer._check_volume_surge(window, params, state)
+        assert result["volume_surge_ratio"] == pytest.approx(volume_signal["surge_ratio"], rel=1e-12)
+        assert result["price_change"] == pytest.approx(signal_analyzer._calculate_price_change(window), rel=1e-12)
+        technical = signal_analyzer._calculate_technical_indicators(window, params, state)
+        assert result["technical_score"] == technical["score"], market
+        assert result["candle_score"] == signal_analyzer._analyze_candle_pattern(window, params)["score"], market
+
+    # 시드 데이터가 통과/탈락 양쪽을 모두 포함해야 비교가 의미 있음
+    assert 0 < buys < len(windows)
@@ -0,0 +1,128 @@
+"""과거 캔들 백필 - 로컬 가짜 업비트 HTTP 서버 대상 수집/재시작/구멍 보충 테스트"""
+
+import time
+from datetime import datetime, timezone
+
+import pytest
+from aiohttp import web
+from sqlalchemy import text
+
+import database
+from core.services.candle_backfill import CandleBackfillService
+
+MARKET = "KRW-TEST"
+
+class FakeUpbit:
+    """/v1/candles/minutes/{unit} 만 흉내내는 서버 - listed 이후 1분봉, empty 분은 거래 없음"""
+
+    def __init__(self, listed: int, empty: set):
+        self.listed = listed
+        self.empty = empty
+        self.failing = 0      # 남은 실패 응답 수 (500)
+        self.requests = 0
+        self.runner = None
+        self.base_url = None
+
+    async def handler(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.failing:
+            self.failing -= 1
+            return web.Response(status=500, text="fake failure")
+
+        step = int(request.match_info["unit"]) * 60
+        count = int(request.query["count"])
+        to = datetime.strptime(request.query["to"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+        ts = int(to.timestamp()) - step
+        ts -= ts % step
+
+        candles = []
+        while len(candles) < count and ts >= self.listed:
+            if ts not in self.empty:
+                candles.append({
+                    "candle_date_time_utc": datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S"),
+                    "opening_price": 100.0, "high_price": 101.0, "low_price": 99.0,
+                    "trade_price": 100.5, "candle_acc_trade_volume": 1.0
+                })
+            ts -= step
+        return web.json_response(candles)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/v1/candles/minutes/{unit}", self.handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+async def _count(conn, start: int, end: int) -> int:
+    return (await conn.execute(text(
+        "SELECT COUNT(*) FROM candles WHERE market = :market AND unit = 1 AND ts BETWEEN :start AND :end"
+    ), {"market": MARKET, "start": start, "end": end})).scalar()
+
+async def _reset():
+    await database.init_db()
+    async with database.async_engine.begin() as conn:
+        for table in ("candles", "backfill_progress", "candle_rollup_state"):
+            await conn.execute(text(f"DELETE FROM {table}"))
+
+
+@pytest.mark.asyncio
+async def test_backfill_resume_and_interior_gap_repair():
+    await _reset()
+    now = int(time.time())
+    span_end = CandleBackfillService.target_span(1, 1, now)[1]
+    listed = span_end - 1000 * 60
+    empty = {listed + minute * 60 for minute in range(0, 1000, 7)}  # 거래 없는 분
+    expected = sum(1 for ts in range(listed, span_end + 60, 60) if ts not in empty)
+
+    server = FakeUpbit(listed, empty)
+    await server.start()
+    service = CandleBackfillService(base_url=server.base_url, concurrency=4, max_retries=1)
+    try:
+        # 1) 일부 요청 실패 - 실패한 창만 남음
+        server.failing = 2
+        result = await service.run(markets=[MARKET], units=[1], years=1, now=now)
+        assert result["failed_windows"] == 2
+        assert (await service.detect_gaps(MARKET, 1, 1, now)).holes
+
+        # 2) 재실행 - 남은 구간만 수집해 전 구간 완성
+        before = server.requests
+        result = await service.run(markets=[MARKET], units=[1], years=1, now=now)
+        assert result["failed_windows"] == 0
+        assert 0 < server.requests - before <= 3
+        async with database.async_engine.connect() as conn:
+            assert await _count(conn, listed, span_end) == expected
+
+        # 3) 완성 후에는 거래 없는 분/상장 전 구간 포함 요청 없음
+        assert (await service.detect_gaps(MARKET, 1, 1, now)).holes == []
+        before = server.requests
+        assert (await service.run(markets=[MARKET], units=[1], years=1, now=now))["windows"] == 0
+        assert server.requests == before
+
+        # 4) 중간 60분 삭제 - 진행 기록이 남아 있어도 구멍으로 감지하고 보충
+        hole_start = listed + 500 * 60
+        hole_end = hole_start + 59 * 60
+        async with database.async_engine.begin() as conn:
+            await conn.execute(text(
+                "DELETE FROM candles WHERE market = :market AND unit = 1 AND ts BETWEEN :start AND :end"
+            ), {"market": MARKET, "start": hole_start, "end": hole_end})
+
+        deleted = {ts for ts in range(hole_start, hole_end + 60, 60) if ts not in empty}
+        holes = (await service.detect_gaps(MARKET, 1, 1, now)).holes
+        assert {ts for start, end in holes for ts in range(start, end + 60, 60)} == deleted
+
+        before = server.requests
+        result = await service.run(markets=[MARKET], units=[1], years=1, now=now)
+        assert server.requests - before == 1
+        async with database.async_engine.connect() as conn:
+            assert await _count(conn, listed, span_end) == expected
+        assert (await service.detect_gaps(MARKET, 1, 1, now)).holes == []
+    finally:
+        await service.close()
+        await server.stop()
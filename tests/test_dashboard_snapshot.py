@@ -0,0 +1,61 @@
+"""대시보드 스냅샷 - 사용자 공통 섹션 공유, 동시 첫 요청의 생성 대기 테스트"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from core.services.dashboard_snapshot import DashboardSnapshotService
+from core.session import session_manager
+
+def _session():
+    engine = SimpleNamespace(is_running=False, session_start_time=None)
+    state = SimpleNamespace(positions={}, available_budget=100000, daily_trades=0, daily_loss=0.0)
+    return SimpleNamespace(trading_engine=engine, trading_state=state, upbit_client=None)
+
+
+@pytest.mark.asyncio
+async def test_shared_sections_and_concurrent_first_requests(monkeypatch):
+    monkeypatch.setattr(session_manager, "get_all_sessions", lambda: {1: _session(), 2: _session()})
+    service = DashboardSnapshotService(interval=0.2)
+    calls = {"conditions": 0, "prices": 0, "account": 0}
+
+    async def conditions():
+        calls["conditions"] += 1
+        await asyncio.sleep(0.05)
+        return [{"market": "KRW-BTC", "status": "조건x"}]
+
+    async def prices():
+        calls["prices"] += 1
+        await asyncio.sleep(0.05)
+        return {"KRW-BTC": {"trade_price": 100.0}}
+
+    async def account(user_session):
+        calls["account"] += 1
+        return {"success": True}
+
+    monkeypatch.setattr(service, "_build_buy_conditions", conditions)
+    monkeypatch.setattr(service, "_build_current_prices", prices)
+    monkeypatch.setattr(service, "_build_account_info", account)
+
+    try:
+        # 같은 사용자의 동시 첫 요청 둘 + 다른 사용자 - 모두 완성된 문서를 받음
+        first, second, other = await asyncio.gather(
+            service.get_snapshot(1, "alice"), service.get_snapshot(1, "alice"), service.get_snapshot(2, "bob"))
+        assert first is second and first.version == 1
+        for snapshot in (first, other):
+            document = json.loads(snapshot.body)
+            assert document["buy_conditions"][0]["market"] == "KRW-BTC"
+            assert document["current_prices"]["KRW-BTC"]["trade_price"] == 100.0
+
+        # 매수 조건/현재가는 사용자 수와 무관하게 한 번만, 계좌는 사용자별
+        assert calls == {"conditions": 1, "prices": 1, "account": 2}
+        assert service._initial_builds == {}
+
+        # 다음 갱신 주기 - 현재가만 새로 조회, 매수 조건은 조건 주기까지 재사용
+        await asyncio.sleep(service.interval * 1.5 + 0.1)
+        assert calls["prices"] >= 2 and calls["conditions"] == 1 and calls["account"] == 2
+    finally:
+        service._task.cancel()
+        await asyncio.gather(service._task, return_exceptions=True)
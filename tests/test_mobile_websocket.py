@@ -0,0 +1,148 @@
+"""모바일 WebSocket 채널 발행 - 팬아웃, 느린 연결의 프레임 대체, zlib 인코딩, 신규 구독자 초기 프레임 테스트
+
+mobile/services/__init__.py가 auth_service를 import하므로 패키지 초기화 없이 websocket 모듈만 직접 적재한다.
+"""
+
+import asyncio
+import importlib
+import json
+import os
+import sys
+import types
+import zlib
+
+import pytest
+import pytest_asyncio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _load_websocket_module():
+    if "mobile.services" not in sys.modules:
+        importlib.import_module("mobile")
+        package = types.ModuleType("mobile.services")
+        package.__path__ = [os.path.join(ROOT, "mobile", "services")]
+        sys.modules["mobile.services"] = package
+    return importlib.import_module("mobile.services.websocket")
+
+websocket_module = _load_websocket_module()
+
+class FakeWebSocket:
+    """전송 프레임을 기록하는 WebSocket - gate가 닫혀 있으면 전송이 막힘 (느린 연결)"""
+
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload: str):
+        await self.gate.wait()
+        self.sent.append(payload)
+
+    async def send_bytes(self, payload: bytes):
+        await self.gate.wait()
+        self.sent.append(payload)
+
+    async def close(self):
+        pass
+
+    def messages(self):
+        return [json.loads(zlib.decompress(item) if isinstance(item, bytes) else item) for item in self.sent]
+
+
+async def _drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest_asyncio.fixture
+async def manager():
+    manager = websocket_module.MobileWebSocketManager()
+    yield manager
+    for user_id in list(manager.connections):
+        await manager.disconnect_user(user_id)
+
+
+def _status(value):
+    return lambda: {"type": "data", "channel": "trading_status", "data": {"value": value()}}
+
+
+@pytest.mark.asyncio
+async def test_fan_out_replacement_and_zlib(manager):
+    counter = iter(range(1000))
+    manager.publishers = {"trading_status": _status(lambda: next(counter))}
+
+    sockets = {}
+    for user_id, encoding in (("a", "json"), ("b", "json"), ("z", "zlib"), ("slow", "json")):
+        sockets[user_id] = FakeWebSocket()
+        await manager.connect_user(sockets[user_id], user_id, encoding=encoding)
+        await manager.subscribe_channel(user_id, "trading_status")
+    await _drain()
+
+    # 초기 프레임은 한 번만 만들어 모든 구독자가 공유
+    initial = [message for message in sockets["a"].messages() if message["channel"] == "trading_status"]
+    assert [message["data"]["value"] for message in initial] == [0]
+    for user_id in ("b", "z", "slow"):
+        assert [m for m in sockets[user_id].messages() if m["channel"] == "trading_status"] == initial
+
+    # 팬아웃 - 프레임 하나를 인코딩별로 한 번씩만 직렬화해 모든 연결에 전송
+    sockets["slow"].gate.clear()
+    assert manager.publish("trading_status", {"type": "data", "channel": "trading_status", "data": {"value": 100}}) == 4
+    await _drain()
+    frame = manager._last_frames["trading_status"]
+    assert set(frame._encoded) == {"json", "zlib"}
+    assert sockets["a"].sent[-1] is sockets["b"].sent[-1] is frame.encode("json")
+    assert isinstance(sockets["z"].sent[-1], bytes)
+    assert json.loads(zlib.decompress(sockets["z"].sent[-1])) == json.loads(sockets["a"].sent[-1])
+    assert manager.metrics["trading_status"].bytes["zlib"] < manager.metrics["trading_status"].bytes["json"] * 2
+
+    # 느린 연결 - 전송 중인 프레임 뒤에는 채널당 최신 프레임 하나만 대기
+    for value in (101, 102, 103):
+        manager.publish("trading_status", {"type": "data", "channel": "trading_status", "data": {"value": value}})
+        await _drain()
+    slow = manager.connections["slow"]
+    assert len(slow.pending) == 1 and slow.frames_replaced == 2
+    assert [m["data"]["value"] for m in sockets["a"].messages() if m["channel"] == "trading_status"] == [0, 100, 101, 102, 103]
+
+    sockets["slow"].gate.set()
+    await _drain()
+    assert [m["data"]["value"] for m in sockets["slow"].messages() if m["channel"] == "trading_status"] == [0, 100, 103]
+    assert manager.metrics["trading_status"].replaced == 2
+
+    # 연결 해제 시 전송 태스크가 남지 않음 (전송 직후 취소가 wait_for에 묻히는 경우 포함)
+    writers = [connection.writer for connection in manager.connections.values()]
+    manager.publish("trading_status", {"type": "data", "channel": "trading_status", "data": {"value": 104}})
+    await asyncio.sleep(0)
+    for user_id in list(manager.connections):
+        await manager.disconnect_user(user_id)
+    await _drain()
+    assert all(writer.done() for writer in writers)
+
+
+@pytest.mark.asyncio
+async def test_new_subscriber_gets_fresh_frame_after_idle(manager):
+    current = {"value": 1}
+    manager.publishers = {"trading_status": _status(lambda: current["value"])}
+
+    first = FakeWebSocket()
+    await manager.connect_user(first, "first")
+    await manager.subscribe_channel("first", "trading_status")
+    await manager.unsubscribe_channel("first", "trading_status")
+
+    # 한 발행 주기 안의 신규 구독자는 마지막 프레임을 그대로 공유
+    current["value"] = 2
+    recent = FakeWebSocket()
+    await manager.connect_user(recent, "recent")
+    await manager.subscribe_channel("recent", "trading_status")
+    await _drain()
+    assert [m["data"]["value"] for m in recent.messages() if m["channel"] == "trading_status"] == [1]
+
+    # 구독자가 없던 동안 발행 주기가 지나면 새 프레임을 만들어 전송
+    manager._last_frames["trading_status"].published_at -= manager.data_update_interval
+    late = FakeWebSocket()
+    await manager.connect_user(late, "late")
+    await manager.subscribe_channel("late", "trading_status")
+    await _drain()
+    assert [m["data"]["value"] for m in late.messages() if m["channel"] == "trading_status"] == [2]
@@ -0,0 +1,130 @@
+"""업비트 레이트 리미터 - 초/분 윈도우, 우선순위 순서, Remaining-Req 보정, 429 차단 후 재개 테스트"""
+
+import asyncio
+import time
+
+import pytest
+
+import api_client
+from api_client import SlidingWindowLimiter, UpbitRateLimiter
+
+class FakeClock:
+    """time.monotonic 대체 - 동기 테스트에서 윈도우 경과를 직접 조작"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(api_client.time, "monotonic", clock)
+    return clock
+
+
+def test_per_second_window(clock):
+    limiter = SlidingWindowLimiter("t", per_second=3)
+    assert [limiter.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert limiter.next_slot_time() == pytest.approx(1001.0)
+
+    clock.now = 1000.999
+    assert not limiter.try_acquire()
+    clock.now = 1001.0
+    assert limiter.try_acquire()
+    assert limiter.remaining()["per_second"] == 2
+
+
+def test_per_minute_window(clock):
+    limiter = SlidingWindowLimiter("t", per_second=10, per_minute=5)
+    for step in range(5):
+        clock.now = 1000.0 + step * 2
+        assert limiter.try_acquire()
+
+    # 초당 한도는 여유가 있어도 분당 한도에 걸리면 가장 오래된 승인 + 60초까지 대기
+    clock.now = 1010.0
+    assert not limiter.try_acquire()
+    assert limiter.next_slot_time() == pytest.approx(1060.0)
+    assert limiter.remaining()["per_minute"] == 0
+
+    clock.now = 1060.0
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()  # 두 번째로 오래된 승인(1002)은 아직 윈도우 안
+    assert limiter.next_slot_time() == pytest.approx(1062.0)
+
+
+def test_remaining_req_header_sync(clock):
+    limiter = UpbitRateLimiter()
+    market = limiter.groups["market"]
+    market.try_acquire()
+
+    # 서버 기준 잔여 2회 → 로컬 1회 사용분 외 7회를 추가 기록
+    parsed = limiter.update_from_headers({"Remaining-Req": "group=market; min=573; sec=2"})
+    assert parsed == {"group": "market", "min": 573, "sec": 2}
+    assert market.remaining()["per_second"] == 2
+    assert market.stats["header_corrections"] == 1
+    assert [market.try_acquire() for _ in range(3)] == [True, True, False]
+
+    # 서버 잔여가 로컬보다 많으면 보정하지 않음, 다른 그룹/형식 오류/헤더 없음은 무시
+    assert limiter.update_from_headers({"Remaining-Req": "group=market; sec=9"})["min"] is None
+    assert market.stats["header_corrections"] == 1
+    assert limiter.update_from_headers({"Remaining-Req": "group=order; min=199; sec=1"})["group"] == "order"
+    assert limiter.groups["order"].remaining()["per_second"] == 1
+    assert limiter.update_from_headers({"Remaining-Req": "garbage"}) is None
+    assert limiter.update_from_headers({}) is None
+    assert limiter.update_from_headers(None) is None
+
+
+@pytest.mark.asyncio
+async def test_priority_order_and_cancelled_waiters():
+    limiter = SlidingWindowLimiter("t", per_second=100)
+    limiter.penalize(0.2)  # 대기열이 생기도록 잠시 차단
+
+    granted = []
+
+    async def request(name: str, priority: int):
+        await limiter.acquire(priority)
+        granted.append(name)
+
+    tasks = [asyncio.create_task(request(name, priority))
+             for name, priority in (("scan", 5), ("ticker", 2), ("order", 1), ("candle", 3), ("order2", 1))]
+    cancelled = asyncio.create_task(request("cancelled", 0))
+    await asyncio.sleep(0.05)
+    assert limiter.remaining()["waiters"] == 6
+    cancelled.cancel()
+    await asyncio.gather(*tasks)
+
+    # 우선순위(작을수록 먼저) → 같은 우선순위는 도착 순서, 취소된 대기자는 건너뜀
+    assert granted == ["order", "order2", "ticker", "candle", "scan"]
+    assert limiter.stats["granted"] == 5 and limiter.remaining()["waiters"] == 0
+
+
+@pytest.mark.asyncio
+async def test_waiters_paced_by_per_second_window():
+    limiter = SlidingWindowLimiter("t", per_second=3)
+    started = time.monotonic()
+    waits = await asyncio.gather(*(limiter.acquire() for _ in range(5)))
+
+    assert sorted(waits)[:3] == [0.0, 0.0, 0.0]
+    assert all(0.9 <= wait <= 1.5 for wait in sorted(waits)[3:])
+    assert time.monotonic() - started < 1.5
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_penalty_and_recovery():
+    limiter = UpbitRateLimiter()
+    assert await limiter.wait_for_slot("market") == 0.0
+
+    limiter.handle_rate_limited("market", retry_after=0.3)
+    assert not await limiter.can_make_rest_request()
+    assert await limiter.can_make_order_request()  # 다른 그룹은 영향 없음
+
+    waited = await limiter.wait_for_slot("market", priority=1)
+    assert 0.25 <= waited <= 0.6
+    assert limiter.groups["market"].stats["penalties"] == 1
+
+    # 차단이 끝나면 바로 발급
+    assert await limiter.wait_for_slot("market") == 0.0
+    assert await limiter.can_make_rest_request()
@@ -0,0 +1,63 @@
+"""거래 원장 - 백그라운드 기록, 수수료 차감 손익, 집계 통계, 키셋 페이지네이션 테스트"""
+
+import pytest
+from fastapi import HTTPException
+
+import database
+from core.api import trading_history
+from core.services.trade_ledger import trade_ledger
+
+USER_ID = 4242
+
+@pytest.mark.asyncio
+async def test_ledger_statistics_and_paging():
+    await database.init_db()
+
+    # 100 → 110 × 10 전량 청산: 수수료 (1000 + 1100) × 0.05% = 1.05 → 순손익 98.95
+    trade_ledger.record_buy(USER_ID, "KRW-AAA", price=100.0, amount=10.0, total=1000.0)
+    trade_ledger.record_sell(USER_ID, "KRW-AAA", price=110.0, amount=10.0, buy_price=100.0)
+    # 200 × 4 매수 후 2개만 190에 부분 청산: 수수료 (400 + 380) × 0.05% = 0.39 → 순손익 -20.39
+    trade_ledger.record_buy(USER_ID, "KRW-BBB", price=200.0, amount=4.0, total=800.0)
+    trade_ledger.record_sell(USER_ID, "KRW-BBB", price=190.0, amount=2.0, buy_price=200.0)
+    await trade_ledger.flush()
+
+    stats = await trade_ledger.get_statistics(USER_ID, 0)
+    summary = stats["summary"]
+    assert summary["trades"] == 2 and summary["wins"] == 1 and summary["losses"] == 1
+    assert summary["profit_loss"] == pytest.approx(98.95 - 20.39)
+    assert summary["fees"] == pytest.approx((1000 + 1100 + 800 + 380) * 0.0005)  # 체결 행만 합산
+    assert summary["volume"] == pytest.approx(1000 + 400)                        # 청산 수량의 매수 금액
+    assert summary["fill_volume"] == pytest.approx(1000 + 1100 + 800 + 380)
+    assert stats["markets"]["KRW-AAA"]["profit_loss"] == pytest.approx(98.95)
+    assert stats["markets"]["KRW-BBB"]["profit_loss"] == pytest.approx(-20.39)
+
+    # API 순손익은 수수료를 다시 빼지 않음
+    response = await trading_history.get_trading_statistics(days=30, market="KRW-AAA", current_user={"id": USER_ID})
+    assert response["data"]["summary"]["net_profit"] == pytest.approx(98.95)
+    assert response["data"]["summary"]["total_volume"] == pytest.approx(1000)
+
+    # 체결 4건 + 청산 2건을 4건씩 페이지 조회 - 중복/누락 없이 최신순
+    first = await trade_ledger.get_entries(USER_ID, 0, limit=4)
+    assert len(first["entries"]) == 4 and first["has_next"]
+    second = await trade_ledger.get_entries(USER_ID, 0, limit=4, cursor=first["next_cursor"])
+    assert len(second["entries"]) == 2 and not second["has_next"] and second["next_cursor"] is None
+
+    rows = first["entries"] + second["entries"]
+    assert len({row["id"] for row in rows}) == 6
+    keys = [(row["ts"], row["id"]) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+
+    closes = await trade_ledger.get_entries(USER_ID, 0, event="close", market="KRW-AAA")
+    (close,) = closes["entries"]
+    assert close["profit_loss"] == pytest.approx(98.95)
+    assert close["fee"] == pytest.approx(1.05)
+    assert close["profit_rate"] == pytest.approx(98.95 / 1000 * 100)
+
+
+@pytest.mark.asyncio
+async def test_malformed_cursor_is_bad_request():
+    for cursor in ("garbage", "1:x", "12"):
+        with pytest.raises(HTTPException) as error:
+            await trading_history.get_trading_logs(days=7, market=None, event=None, limit=10,
+                                                   cursor=cursor, current_user={"id": USER_ID})
+        assert error.value.status_code == 400
@@ -0,0 +1,142 @@
+"""WebSocket 시장 데이터 피드 - 로컬 websockets 서버 대상 구독/재연결/재구독/REST 대체 테스트"""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+websockets = pytest.importorskip("websockets")
+
+from core.api import system
+from core.services.market_data_service import MarketDataService
+
+MARKET = "KRW-TEST"
+OTHER = "KRW-OTHER"
+
+class FakeUpbitSocket:
+    """업비트 WebSocket 흉내 - 연결별 구독 요청을 기록하고 체결을 보내거나 연결을 끊음"""
+
+    def __init__(self):
+        self.subscriptions = []   # (연결 번호, 구독 요청)
+        self.connections = []
+        self.server = None
+        self.url = None
+
+    async def handler(self, ws):
+        self.connections.append(ws)
+        number = len(self.connections)
+        async for message in ws:
+            self.subscriptions.append((number, json.loads(message)))
+
+    async def start(self):
+        self.server = await websockets.serve(self.handler, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.url = f"ws://127.0.0.1:{port}"
+
+    async def send_trade(self, market: str, price: float, sequential_id: int, ts_ms: int):
+        await self.connections[-1].send(json.dumps({
+            "type": "trade", "code": market, "trade_price": price, "trade_volume": 1.0,
+            "trade_timestamp": ts_ms, "sequential_id": sequential_id
+        }).encode())
+
+    async def drop(self):
+        await self.connections[-1].close()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class FakeRest:
+    """공개 REST 1분봉 - 현재 분 직전까지 count개 (최신순)"""
+
+    def __init__(self):
+        self.requests = 0
+
+    async def get_minute_candles(self, market: str, count: int = 20, use_cache: bool = True):
+        self.requests += 1
+        now = int(time.time())
+        start = now - now % 60
+        candles = []
+        for index in range(1, count + 1):
+            ts = start - index * 60
+            candles.append({
+                "market": market,
+                "candle_date_time_utc": datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S"),
+                "opening_price": 100.0, "high_price": 100.0, "low_price": 100.0, "trade_price": 100.0,
+                "timestamp": ts * 1000 + 59000, "candle_acc_trade_volume": 1.0, "unit": 1
+            })
+        return candles
+
+
+async def _until(condition, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "시간 초과"
+        await asyncio.sleep(0.02)
+
+
+def _codes(subscription):
+    return {item["type"]: item["codes"] for item in subscription if "type" in item}
+
+
+@pytest.mark.asyncio
+async def test_stream_reconnect_resubscribe_and_rest_fallback(monkeypatch):
+    rest = FakeRest()
+    monkeypatch.setattr(system.public_upbit_client, "get_minute_candles", rest.get_minute_candles)
+
+    server = FakeUpbitSocket()
+    await server.start()
+    service = MarketDataService(candle_count=5)
+    service._subscribers["test"] = {MARKET}   # 틱 루프 없이 구독 마켓만 등록
+    service.enable_streaming(server.url)
+    feed = service.feed
+    feed.reconnect_delay = 0.2
+    try:
+        # 1) 연결 시 trade/ticker 구독 후 REST 이력으로 시드
+        await _until(lambda: feed.is_live(MARKET, 5))
+        assert _codes(server.subscriptions[0][1]) == {"trade": [MARKET], "ticker": [MARKET]}
+        assert rest.requests == 1
+
+        # 2) 체결로 진행 중 1분봉 생성 - 중복 체결은 무시, REST 호출 없음
+        now_ms = int(time.time() * 1000)
+        await server.send_trade(MARKET, 101.0, 1, now_ms)
+        await server.send_trade(MARKET, 101.0, 1, now_ms)
+        await server.send_trade(MARKET, 103.0, 2, now_ms + 1)
+        await _until(lambda: feed.stats["trades"] == 2)
+        candles = await service.get_candles(MARKET, 6)
+        assert candles[0]["trade_price"] == 103.0 and candles[0]["candle_acc_trade_volume"] == 2.0
+        assert len(candles) == 6 and feed.stats["duplicates"] == 1
+        assert rest.requests == 1 and service.stats["stream_hits"] == 1
+
+        # 3) 연결 유지 중 마켓 변경 - 같은 연결로 재구독
+        await feed.set_markets([MARKET, OTHER])
+        await _until(lambda: len(server.subscriptions) == 2)
+        assert server.subscriptions[1][0] == 1
+        assert _codes(server.subscriptions[1][1])["trade"] == [OTHER, MARKET]
+
+        # 4) 연결 끊김 - 로컬 캔들 무효화, 재연결 전까지 REST로 대체
+        await server.drop()
+        await _until(lambda: not feed.connected)
+        assert not feed.is_live(MARKET)
+        candles = await service.get_candles(MARKET, 5, max_age=0)
+        assert len(candles) == 5 and candles[0]["trade_price"] == 100.0
+        assert rest.requests == 2 and service.stats["stream_hits"] == 1
+
+        # 5) 자동 재연결 - 새 연결에 전체 마켓 재구독 후 다시 시드되어 스트림 사용
+        await _until(lambda: feed.is_live(MARKET, 5))
+        assert len(server.connections) == 2
+        number, subscription = server.subscriptions[-1]
+        assert number == 2 and _codes(subscription) == {"trade": [OTHER, MARKET], "ticker": [OTHER, MARKET]}
+        assert feed.stats["connects"] == 2 and feed.stats["disconnects"] == 1
+
+        await server.send_trade(MARKET, 99.0, 3, int(time.time() * 1000))
+        await _until(lambda: feed.stats["trades"] == 3)
+        requests = rest.requests
+        candles = await service.get_candles(MARKET, 5)
+        assert candles[0]["trade_price"] == 99.0 and rest.requests == requests
+    finally:
+        await service.disable_streaming()
+        await server.stop()